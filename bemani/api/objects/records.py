@@ -1,4 +1,5 @@
-from typing import Any, Dict, List, Set, Tuple
+import itertools
+from typing import Any, Dict, Iterable, List, Set, Tuple
 
 from bemani.api.exceptions import APIException
 from bemani.api.objects.base import BaseObject
@@ -240,14 +241,15 @@ class RecordsObject(BaseObject):
         since = params.get("since")
         until = params.get("until")
 
-        # Fetch the scores
-        records: List[Tuple[UserID, Score]] = []
+        # Fetch the scores. Bulk lookups are streamed so that we never hold every score
+        # on the network in memory at once.
+        records: List[Iterable[Tuple[UserID, Score]]] = []
         if idtype == APIConstants.ID_TYPE_SERVER:
             # Because of the way this query works, we can't apply since/until to it directly.
             # If we did, it would miss higher scores earned before since or after until, and
             # incorrectly report records.
-            records.extend(
-                self.data.local.music.get_all_records(self.game, self.music_version)
+            records.append(
+                self.data.local.music.iter_all_records(self.game, self.music_version)
             )
         elif idtype == APIConstants.ID_TYPE_SONG:
             if len(ids) == 1:
@@ -256,8 +258,8 @@ class RecordsObject(BaseObject):
             else:
                 songid = int(ids[0])
                 chart = int(ids[1])
-            records.extend(
-                self.data.local.music.get_all_scores(
+            records.append(
+                self.data.local.music.iter_all_scores(
                     self.game,
                     self.music_version,
                     songid=songid,
@@ -276,7 +278,7 @@ class RecordsObject(BaseObject):
                     self.game, self.music_version, userid, songid, chart
                 )
                 if score is not None:
-                    records.append((userid, score))
+                    records.append([(userid, score)])
         elif idtype == APIConstants.ID_TYPE_CARD:
             users: Set[UserID] = set()
             for cardid in ids:
@@ -288,7 +290,7 @@ class RecordsObject(BaseObject):
                         continue
                     users.add(userid)
 
-                    records.extend(
+                    records.append(
                         [
                             (userid, score)
                             for score in self.data.local.music.get_scores(
@@ -306,7 +308,7 @@ class RecordsObject(BaseObject):
         # Now, fetch the users, and filter out scores belonging to orphaned users
         id_to_cards: Dict[UserID, List[str]] = {}
         retval: List[Dict[str, Any]] = []
-        for (userid, record) in records:
+        for (userid, record) in itertools.chain.from_iterable(records):
             # Postfilter for queries that can't filter. This will save on data transferred.
             if since is not None:
                 if record.update < since:
@@ -1,4 +1,5 @@
-from typing import List, Dict, Tuple, Any
+import itertools
+from typing import Iterable, List, Dict, Optional, Tuple, Any
 
 from bemani.api.exceptions import APIException
 from bemani.api.objects.base import BaseObject
@@ -147,7 +148,7 @@ class StatisticsObject(BaseObject):
 
         return False
 
-    def __aggregate_global(self, attempts: List[Attempt]) -> List[Dict[str, Any]]:
+    def __aggregate_global(self, attempts: Iterable[Attempt]) -> List[Dict[str, Any]]:
         stats: Dict[int, Dict[int, Dict[str, int]]] = {}
 
         for attempt in attempts:
@@ -178,7 +179,9 @@ class StatisticsObject(BaseObject):
         return retval
 
     def __aggregate_local(
-        self, cards: Dict[int, List[str]], attempts: List[Tuple[UserID, Attempt]]
+        self,
+        cards: Dict[int, List[str]],
+        attempts: Iterable[Tuple[Optional[UserID], Attempt]],
     ) -> List[Dict[str, Any]]:
         stats: Dict[UserID, Dict[int, Dict[int, Dict[str, int]]]] = {}
 
@@ -217,15 +220,14 @@ class StatisticsObject(BaseObject):
     ) -> List[Dict[str, Any]]:
         retval: List[Dict[str, Any]] = []
 
-        # Fetch the attempts
+        # Fetch the attempts. These are streamed and aggregated as they arrive so that
+        # we never hold every attempt on the network in memory at once.
         if idtype == APIConstants.ID_TYPE_SERVER:
             retval = self.__aggregate_global(
-                [
-                    attempt[1]
-                    for attempt in self.data.local.music.get_all_attempts(
-                        self.game, self.music_version
-                    )
-                ]
+                attempt[1]
+                for attempt in self.data.local.music.iter_all_attempts(
+                    self.game, self.music_version
+                )
             )
         elif idtype == APIConstants.ID_TYPE_SONG:
             if len(ids) == 1:
@@ -235,12 +237,10 @@ class StatisticsObject(BaseObject):
                 songid = int(ids[0])
                 chart = int(ids[1])
             retval = self.__aggregate_global(
-                [
-                    attempt[1]
-                    for attempt in self.data.local.music.get_all_attempts(
-                        self.game, self.music_version, songid=songid, songchart=chart
-                    )
-                ]
+                attempt[1]
+                for attempt in self.data.local.music.iter_all_attempts(
+                    self.game, self.music_version, songid=songid, songchart=chart
+                )
             )
         elif idtype == APIConstants.ID_TYPE_INSTANCE:
             songid = int(ids[0])
@@ -250,7 +250,7 @@ class StatisticsObject(BaseObject):
             if userid is not None:
                 retval = self.__aggregate_local(
                     {userid: self.data.local.user.get_cards(userid)},
-                    self.data.local.music.get_all_attempts(
+                    self.data.local.music.iter_all_attempts(
                         self.game,
                         self.music_version,
                         songid=songid,
@@ -260,7 +260,7 @@ class StatisticsObject(BaseObject):
                 )
         elif idtype == APIConstants.ID_TYPE_CARD:
             id_to_cards: Dict[int, List[str]] = {}
-            attempts: List[Tuple[UserID, Attempt]] = []
+            attempts: List[Iterable[Tuple[Optional[UserID], Attempt]]] = []
             for cardid in ids:
                 userid = self.data.local.user.from_cardid(cardid)
                 if userid is not None:
@@ -270,12 +270,14 @@ class StatisticsObject(BaseObject):
                         continue
 
                     id_to_cards[userid] = self.data.local.user.get_cards(userid)
-                    attempts.extend(
-                        self.data.local.music.get_all_attempts(
+                    attempts.append(
+                        self.data.local.music.iter_all_attempts(
                             self.game, self.music_version, userid=userid
                         )
                     )
-            retval = self.__aggregate_local(id_to_cards, attempts)
+            retval = self.__aggregate_local(
+                id_to_cards, itertools.chain.from_iterable(attempts)
+            )
         else:
             raise APIException("Invalid ID type!")
 
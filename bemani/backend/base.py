@@ -339,7 +339,8 @@ class Base(ABC):
     def get_any_profiles(self, userids: List[UserID]) -> List[Tuple[UserID, Profile]]:
         """
         Does the identical thing to the above function, but takes a list of user IDs to
-        fetch in bulk.
+        fetch in bulk. Duplicate user IDs are only looked up and returned once, in the order
+        they were first seen.
 
         Parameters:
             userids - List of user IDs we are getting the profile for.
@@ -348,10 +349,18 @@ class Base(ABC):
             A list of tuples with the User ID and dictionary representing the user's profile,
             or an empty dictionary if nothing was found.
         """
-        userids = list(set(userids))
-        profiles = self.data.remote.user.get_any_profiles(
-            self.game, self.version, userids
-        )
+        userids = list(dict.fromkeys(userids))
+        if len(userids) == 0:
+            return []
+        if any(RemoteUser.is_remote(userid) for userid in userids):
+            profiles = self.data.remote.user.get_any_profiles(
+                self.game, self.version, userids
+            )
+        else:
+            # Nothing to ask remote servers about, so load everything locally in bulk.
+            profiles = self.data.local.user.get_any_profiles(
+                self.game, self.version, userids
+            )
         return [
             (
                 userid,
@@ -222,15 +222,17 @@ class PASELIHandler(Base):
                 return root
             arcadeid = arcade.id
 
-        # Now, look up all transactions for this specific group
-        events = self.data.local.network.get_events(
-            userid=userid,
-            arcadeid=arcadeid,
-            event="paseli_transaction",
-        )
-
-        # Further filter it down to the current PCBID
-        events = [event for event in events if event.data.get("pcbid") == target]
+        # Now, look up all transactions for this specific group, and further filter
+        # it down to the current PCBID as they are streamed in.
+        events = [
+            event
+            for event in self.data.local.network.iter_events(
+                userid=userid,
+                arcadeid=arcadeid,
+                event="paseli_transaction",
+            )
+            if event.data.get("pcbid") == target
+        ]
 
         # Grab the end of day today as a timestamp
         end_of_today = Time.end_of_today()
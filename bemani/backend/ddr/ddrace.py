@@ -130,7 +130,7 @@ class DDRAce(
         # a new profile after creating a blank one) and have blank names and delete
         # them in order to keep the profiles on the network in sane order. This
         # should normally never delete any profiles.
-        profiles = data.local.user.get_all_profiles(cls.game, cls.version)
+        profiles = data.local.user.iter_all_profiles(cls.game, cls.version)
         several_minutes_ago = Time.now() - (Time.SECONDS_IN_MINUTE * 5)
         events = []
 
@@ -89,7 +89,7 @@ class Dispatch:
 
         request = tree.children[0]
 
-        config = self.__config.clone()
+        config = self.__config.overlay()
         config["machine"] = {
             "pcbid": pcbid,
             "arcade": pcb.arcade,
@@ -201,6 +201,25 @@ class IIDXBase(CoreHandler, CardManagerHandler, PASELIHandler, Base):
         machine = self.data.local.machine.get_machine(self.config.machine.pcbid)
         return machine.arcade is not None
 
+    @classmethod
+    def attempt_counters(cls, points: int, data: ValidatedDict) -> Dict[str, int]:
+        """
+        Given the points and data saved for an attempt, return the clear rate counters
+        that the attempt should be added to. These are summed up for us by the data layer
+        and returned by get_clear_rates.
+        """
+        clear_status = data.get_int("clear_status", cls.CLEAR_STATUS_FAILED)
+        if clear_status == cls.CLEAR_STATUS_NO_PLAY:
+            # This attempt was outside of the clear infra, so don't bother with it.
+            return {}
+        if clear_status == cls.CLEAR_STATUS_FAILED:
+            # This attempt was a failure, so don't count it against clears of full combos
+            return {"total": 1}
+        if clear_status == cls.CLEAR_STATUS_FULL_COMBO:
+            # This was a full combo clear, so it also counts as a clear
+            return {"total": 1, "clears": 1, "fcs": 1}
+        return {"total": 1, "clears": 1}
+
     def get_clear_rates(
         self,
         songid: Optional[int] = None,
@@ -219,9 +238,9 @@ class IIDXBase(CoreHandler, CardManagerHandler, PASELIHandler, Base):
             },
         }
         """
-        all_attempts, remote_attempts = Parallel.execute(
+        local_attempts, remote_attempts = Parallel.execute(
             [
-                lambda: self.data.local.music.get_all_attempts(
+                lambda: self.data.local.music.get_clear_rates(
                     game=self.game,
                     version=self.music_version,
                     songid=songid,
@@ -237,44 +256,15 @@ class IIDXBase(CoreHandler, CardManagerHandler, PASELIHandler, Base):
         )
 
         attempts: Dict[int, Dict[int, Dict[str, int]]] = {}
-        for (_, attempt) in all_attempts:
-            if attempt.data.get_int("clear_status") == self.CLEAR_STATUS_NO_PLAY:
-                # This attempt was outside of the clear infra, so don't bother with it.
-                continue
-
-            # Terrible temporary structure is terrible.
-            if attempt.id not in attempts:
-                attempts[attempt.id] = {}
-            if attempt.chart not in attempts[attempt.id]:
-                attempts[attempt.id][attempt.chart] = {
-                    "total": 0,
-                    "clears": 0,
-                    "fcs": 0,
+        for musicid in local_attempts:
+            attempts[musicid] = {}
+            for chart, counters in local_attempts[musicid].items():
+                attempts[musicid][chart] = {
+                    "total": counters.get("total", 0),
+                    "clears": counters.get("clears", 0),
+                    "fcs": counters.get("fcs", 0),
                 }
 
-            # We saw an attempt, keep the total attempts in sync.
-            attempts[attempt.id][attempt.chart]["total"] = (
-                attempts[attempt.id][attempt.chart]["total"] + 1
-            )
-
-            if (
-                attempt.data.get_int("clear_status", self.CLEAR_STATUS_FAILED)
-                == self.CLEAR_STATUS_FAILED
-            ):
-                # This attempt was a failure, so don't count it against clears of full combos
-                continue
-
-            # It was at least a clear
-            attempts[attempt.id][attempt.chart]["clears"] = (
-                attempts[attempt.id][attempt.chart]["clears"] + 1
-            )
-
-            if attempt.data.get_int("clear_status") == self.CLEAR_STATUS_FULL_COMBO:
-                # This was a full combo clear, so it also counts here
-                attempts[attempt.id][attempt.chart]["fcs"] = (
-                    attempts[attempt.id][attempt.chart]["fcs"] + 1
-                )
-
         # Merge in remote attempts
         for songid in remote_attempts:
             if songid not in attempts:
@@ -447,6 +437,7 @@ class IIDXBase(CoreHandler, CardManagerHandler, PASELIHandler, Base):
             old_ex_score,
             history,
             raised,
+            counters=self.attempt_counters(old_ex_score, history),
         )
 
     def update_rank(
@@ -1,7 +1,7 @@
 # vim: set fileencoding=utf-8
 import math
 import random
-from typing import Optional, Dict, List, Any, Set, Tuple
+from typing import Optional, Dict, Iterable, List, Any, Set, Tuple
 from typing_extensions import Final
 
 from bemani.backend.base import Status
@@ -224,7 +224,7 @@ class JubeatProp(
 
     @classmethod
     def _get_league_scores(
-        cls, data: Data, current_id: int, profiles: List[Tuple[UserID, Profile]]
+        cls, data: Data, current_id: int, profiles: Iterable[Tuple[UserID, Profile]]
     ) -> Tuple[List[Tuple[UserID, int]], List[UserID]]:
         """
         Given the current League ID (calculated based on the date range) and a list of
@@ -377,7 +377,7 @@ class JubeatProp(
 
                 # Evaluate player scores on previous courses and find players
                 # that didn't play last week.
-                all_profiles = data.local.user.get_all_profiles(cls.game, cls.version)
+                all_profiles = data.local.user.iter_all_profiles(cls.game, cls.version)
                 scores, absentees = cls._get_league_scores(data, leagueid, all_profiles)
 
                 # Get user IDs to promote, demote and ignore based on scores.
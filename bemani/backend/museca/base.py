@@ -140,6 +140,18 @@ class MusecaBase(CoreHandler, CardManagerHandler, PASELIHandler, Base):
         """
         return oldprofile
 
+    @classmethod
+    def attempt_counters(cls, points: int, data: ValidatedDict) -> Dict[str, int]:
+        """
+        Given the points and data saved for an attempt, return the clear rate counters
+        that the attempt should be added to. These are summed up for us by the data layer
+        and returned by get_clear_rates.
+        """
+        if data.get_int("clear_type", cls.CLEAR_TYPE_FAILED) != cls.CLEAR_TYPE_FAILED:
+            # This attempt was a failure, so don't count it against clears of full combos
+            return {"total": 1}
+        return {"total": 1, "clears": 1}
+
     def get_clear_rates(self) -> Dict[int, Dict[int, Dict[str, int]]]:
         """
         Returns a dictionary similar to the following:
@@ -153,9 +165,9 @@ class MusecaBase(CoreHandler, CardManagerHandler, PASELIHandler, Base):
             },
         }
         """
-        all_attempts, remote_attempts = Parallel.execute(
+        local_attempts, remote_attempts = Parallel.execute(
             [
-                lambda: self.data.local.music.get_all_attempts(
+                lambda: self.data.local.music.get_clear_rates(
                     game=self.game,
                     version=self.music_version,
                 ),
@@ -166,33 +178,14 @@ class MusecaBase(CoreHandler, CardManagerHandler, PASELIHandler, Base):
             ]
         )
         attempts: Dict[int, Dict[int, Dict[str, int]]] = {}
-        for (_, attempt) in all_attempts:
-            # Terrible temporary structure is terrible.
-            if attempt.id not in attempts:
-                attempts[attempt.id] = {}
-            if attempt.chart not in attempts[attempt.id]:
-                attempts[attempt.id][attempt.chart] = {
-                    "total": 0,
-                    "clears": 0,
+        for musicid in local_attempts:
+            attempts[musicid] = {}
+            for chart, counters in local_attempts[musicid].items():
+                attempts[musicid][chart] = {
+                    "total": counters.get("total", 0),
+                    "clears": counters.get("clears", 0),
                 }
 
-            # We saw an attempt, keep the total attempts in sync.
-            attempts[attempt.id][attempt.chart]["total"] = (
-                attempts[attempt.id][attempt.chart]["total"] + 1
-            )
-
-            if (
-                attempt.data.get_int("clear_type", self.CLEAR_TYPE_FAILED)
-                != self.CLEAR_TYPE_FAILED
-            ):
-                # This attempt was a failure, so don't count it against clears of full combos
-                continue
-
-            # It was at least a clear
-            attempts[attempt.id][attempt.chart]["clears"] = (
-                attempts[attempt.id][attempt.chart]["clears"] + 1
-            )
-
         # Merge in remote attempts
         for songid in remote_attempts:
             if songid not in attempts:
@@ -326,4 +319,5 @@ class MusecaBase(CoreHandler, CardManagerHandler, PASELIHandler, Base):
             oldpoints,
             history,
             raised,
+            counters=self.attempt_counters(oldpoints, history),
         )
@@ -13,7 +13,7 @@ from bemani.common.card import CardCipher, CardCipherException
 from bemani.common.id import ID
 from bemani.common.aes import AESCipher
 from bemani.common.time import Time
-from bemani.common.parallel import Parallel
+from bemani.common.parallel import AsyncParallel, Parallel
 from bemani.common.pe import PEFile
 
 
@@ -35,6 +35,7 @@ __all__ = [
     "AESCipher",
     "Time",
     "Parallel",
+    "AsyncParallel",
     "intish",
     "PEFile",
 ]
@@ -1,5 +1,9 @@
+import asyncio
 import concurrent.futures
-from typing import Any, Callable, List, TypeVar
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 
 T = TypeVar("T")
 
@@ -9,81 +13,216 @@ class Parallel:
     Utilities for executing parallel operations. This is used as a convenience
     so that we don't have to plumb async/await support (yuck) through the network,
     but we can still make multiple queries at once to remote services and the DB.
+
+    Everything runs on a single bounded pool of named worker threads that is shared
+    by the whole process, instead of spinning up threads for every call. Parallel
+    operations started from inside a worker are run inline on that worker, so that
+    nested calls never spawn more threads and the pool can't deadlock waiting on
+    itself.
     """
 
-    @staticmethod
-    def execute(lambdas: List[Callable[[], Any]]) -> List[Any]:
+    DEFAULT_WORKERS: int = 32
+
+    __lock = threading.Lock()
+    __local = threading.local()
+    __executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+    __pid: Optional[int] = None
+    __workers: int = DEFAULT_WORKERS
+
+    # Instrumentation, guarded by the above lock.
+    __queued = 0
+    __running = 0
+    __completed = 0
+    __timeouts = 0
+    __wait_total = 0.0
+    __wait_max = 0.0
+    __run_total = 0.0
+    __run_max = 0.0
+
+    @classmethod
+    def configure(cls, workers: int) -> None:
         """
-        Given a list of callables, execute them and return a list of their returns.
-        Guarantees order of return based on order of callable.
+        Set the maximum number of worker threads in the shared pool. If the pool
+        already exists, it is replaced, letting any work already on it finish.
         """
+        with cls.__lock:
+            cls.__workers = max(workers, 1)
+            executor = cls.__executor
+            cls.__executor = None
+        if executor is not None:
+            executor.shutdown(wait=False)
 
-        if len(lambdas) == 0:
-            return []
-        with concurrent.futures.ThreadPoolExecutor(
-            max_workers=len(lambdas)
-        ) as executor:
-            futures = {
-                executor.submit(lambdas[pos]): pos for pos in range(len(lambdas))
-            }
-            results = []  # List: Tuple[Any, int]
+    @classmethod
+    def __mark_worker(cls) -> None:
+        cls.__local.worker = True
 
-            for future in concurrent.futures.as_completed(futures):
-                pos = futures[future]
-                data = future.result()
-                results.append((data, pos))
+    @classmethod
+    def __get_executor(cls) -> concurrent.futures.ThreadPoolExecutor:
+        pid = os.getpid()
+        with cls.__lock:
+            if cls.__executor is None or cls.__pid != pid:
+                # Threads don't survive a fork, so a child always needs its own pool.
+                cls.__executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=cls.__workers,
+                    thread_name_prefix="parallel",
+                    initializer=cls.__mark_worker,
+                )
+                cls.__pid = pid
+            return cls.__executor
 
-            return [r[0] for r in sorted(results, key=lambda r: r[1])]
+    @classmethod
+    def __run(cls, submitted: float, lam: Callable[..., T], *params: Any) -> T:
+        start = time.monotonic()
+        with cls.__lock:
+            cls.__queued -= 1
+            cls.__running += 1
+            cls.__wait_total += start - submitted
+            cls.__wait_max = max(cls.__wait_max, start - submitted)
+        try:
+            return lam(*params)
+        finally:
+            elapsed = time.monotonic() - start
+            with cls.__lock:
+                cls.__running -= 1
+                cls.__completed += 1
+                cls.__run_total += elapsed
+                cls.__run_max = max(cls.__run_max, elapsed)
 
-    @staticmethod
-    def map(lam: Callable[[T], Any], params: List[T]) -> List[Any]:
+    @classmethod
+    def __cancelled(cls, future: "concurrent.futures.Future[Any]") -> None:
+        if future.cancelled():
+            with cls.__lock:
+                cls.__queued -= 1
+
+    @classmethod
+    def submit(
+        cls, lam: Callable[..., T], *params: Any
+    ) -> "concurrent.futures.Future[T]":
         """
-        Given a callable and a list of params, executes that callable with each set
-        of params in the list and returns a list of their returns. Guarantees order
-        of return.
+        Schedule a callable to be called with the given params on the shared pool,
+        returning a future for its return value.
         """
+        executor = cls.__get_executor()
+        with cls.__lock:
+            cls.__queued += 1
+        try:
+            future = executor.submit(cls.__run, time.monotonic(), lam, *params)
+        except Exception:
+            with cls.__lock:
+                cls.__queued -= 1
+            raise
+        future.add_done_callback(cls.__cancelled)
+        return future
 
-        if len(params) == 0:
-            return []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=len(params)) as executor:
-            futures = {
-                executor.submit(lam, params[pos]): pos for pos in range(len(params))
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """
+        Return statistics about the shared pool. This includes the configured number of
+        workers, the number of calls waiting for a worker and currently running, the
+        number of calls completed and parallel operations that timed out, and the average
+        and maximum number of seconds that calls waited for a worker and took to run.
+        """
+        with cls.__lock:
+            completed = cls.__completed
+            return {
+                "workers": cls.__workers,
+                "queued": cls.__queued,
+                "running": cls.__running,
+                "completed": completed,
+                "timeouts": cls.__timeouts,
+                "wait_avg": cls.__wait_total / completed if completed else 0.0,
+                "wait_max": cls.__wait_max,
+                "run_avg": cls.__run_total / completed if completed else 0.0,
+                "run_max": cls.__run_max,
             }
-            results = []  # List: Tuple[Any, int]
 
-            for future in concurrent.futures.as_completed(futures):
-                pos = futures[future]
-                data = future.result()
-                results.append((data, pos))
+    @classmethod
+    def __execute(
+        cls,
+        calls: List[Tuple[Callable[..., Any], Tuple[Any, ...]]],
+        timeout: Optional[float],
+    ) -> List[Any]:
+        if len(calls) == 0:
+            return []
 
-            return [r[0] for r in sorted(results, key=lambda r: r[1])]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if getattr(cls.__local, "worker", False) or (
+            len(calls) == 1 and timeout is None
+        ):
+            # Either we're already on a worker, or there's nothing to run alongside. A call
+            # can't be interrupted once it is running, so the deadline is checked as each
+            # call finishes and nothing after it is run once the deadline has passed.
+            inline = []
+            for lam, params in calls:
+                inline.append(lam(*params))
+                if deadline is not None and time.monotonic() > deadline:
+                    with cls.__lock:
+                        cls.__timeouts += 1
+                    raise concurrent.futures.TimeoutError()
+            return inline
 
-    @staticmethod
-    def call(lambdas: "List[Callable[..., Any]]", *params: Any) -> List[Any]:
+        futures = [cls.submit(lam, *params) for lam, params in calls]
+        try:
+            results = []
+            for future in futures:
+                remaining = (
+                    None if deadline is None else max(deadline - time.monotonic(), 0.0)
+                )
+                results.append(future.result(timeout=remaining))
+            return results
+        except concurrent.futures.TimeoutError:
+            with cls.__lock:
+                cls.__timeouts += 1
+            raise
+        finally:
+            # If we're bailing early, don't bother running anything that hasn't started.
+            for future in futures:
+                future.cancel()
+
+    @classmethod
+    def execute(
+        cls, lambdas: List[Callable[[], Any]], timeout: Optional[float] = None
+    ) -> List[Any]:
+        """
+        Given a list of callables, execute them and return a list of their returns.
+        Guarantees order of return based on order of callable.
+
+        If a timeout in seconds is given and the callables don't all finish in time,
+        raises concurrent.futures.TimeoutError. Callables that haven't started yet are
+        cancelled, as are they when any callable raises. When called from a worker, the
+        callables run one after another, so the timeout is raised once the callable that
+        was running at the deadline returns.
+        """
+        return cls.__execute([(lam, ()) for lam in lambdas], timeout)
+
+    @classmethod
+    def map(
+        cls,
+        lam: Callable[[T], Any],
+        params: List[T],
+        timeout: Optional[float] = None,
+    ) -> List[Any]:
+        """
+        Given a callable and a list of params, executes that callable with each set
+        of params in the list and returns a list of their returns. Guarantees order
+        of return. Timeouts are handled the same as execute().
+        """
+        return cls.__execute([(lam, (param,)) for param in params], timeout)
+
+    @classmethod
+    def call(
+        cls,
+        lambdas: "List[Callable[..., Any]]",
+        *params: Any,
+        timeout: Optional[float] = None,
+    ) -> List[Any]:
         """
         Given a list of callables and zero or more params, calls each callable in
         parallel with the params specified. Essentially a map of params to multiple
         callables in parallel. Returns a list of returns, garanteed to be in the
-        same order as the lambdas.
+        same order as the lambdas. Timeouts are handled the same as execute().
         """
-
-        if len(lambdas) == 0:
-            return []
-        with concurrent.futures.ThreadPoolExecutor(
-            max_workers=len(lambdas)
-        ) as executor:
-            futures = {
-                executor.submit(lambdas[pos], *params): pos
-                for pos in range(len(lambdas))
-            }
-            results = []  # List: Tuple[Any, int]
-
-            for future in concurrent.futures.as_completed(futures):
-                pos = futures[future]
-                data = future.result()
-                results.append((data, pos))
-
-            return [r[0] for r in sorted(results, key=lambda r: r[1])]
+        return cls.__execute([(lam, params) for lam in lambdas], timeout)
 
     @staticmethod
     def flatten(lists: List[List[Any]]) -> List[Any]:
@@ -94,3 +233,51 @@ class Parallel:
         """
 
         return [item for sublist in lists for item in sublist]
+
+
+class AsyncParallel:
+    """
+    The same operations as Parallel, for callers running inside an asyncio event loop
+    such as an async web server. The callables still run on Parallel's shared pool so
+    that blocking work never stalls the loop, but the results are awaited instead of
+    blocking the calling thread. Timeouts raise asyncio.TimeoutError and cancel any
+    callables that haven't started yet.
+    """
+
+    @staticmethod
+    async def __execute(
+        calls: List[Tuple[Callable[..., Any], Tuple[Any, ...]]],
+        timeout: Optional[float],
+    ) -> List[Any]:
+        if len(calls) == 0:
+            return []
+        futures = [
+            asyncio.wrap_future(Parallel.submit(lam, *params)) for lam, params in calls
+        ]
+        return await asyncio.wait_for(asyncio.gather(*futures), timeout)
+
+    @staticmethod
+    async def execute(
+        lambdas: List[Callable[[], Any]], timeout: Optional[float] = None
+    ) -> List[Any]:
+        return await AsyncParallel.__execute([(lam, ()) for lam in lambdas], timeout)
+
+    @staticmethod
+    async def map(
+        lam: Callable[[T], Any],
+        params: List[T],
+        timeout: Optional[float] = None,
+    ) -> List[Any]:
+        return await AsyncParallel.__execute(
+            [(lam, (param,)) for param in params], timeout
+        )
+
+    @staticmethod
+    async def call(
+        lambdas: "List[Callable[..., Any]]",
+        *params: Any,
+        timeout: Optional[float] = None,
+    ) -> List[Any]:
+        return await AsyncParallel.__execute(
+            [(lam, params) for lam in lambdas], timeout
+        )
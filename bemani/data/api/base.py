@@ -1,23 +1,37 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from bemani.data.api.client import APIClient
+from bemani.data.config import Config
 from bemani.data.interfaces import APIProviderInterface
+from bemani.data.types import Server
 
 
 class BaseGlobalData:
-    def __init__(self, api: APIProviderInterface) -> None:
+    def __init__(self, config: Config, api: APIProviderInterface) -> None:
+        self.__config = config
         self.__localapi = api
-        self.__apiclients: Optional[List[APIClient]] = None
+        self.__servers: Optional[List[Tuple[Server, APIClient]]] = None
 
     @property
-    def clients(self) -> List[APIClient]:
-        if self.__apiclients is None:
+    def servers(self) -> List[Tuple[Server, APIClient]]:
+        if self.__servers is None:
             servers = self.__localapi.get_all_servers()
-            self.__apiclients = [
-                APIClient(
-                    server.uri, server.token, server.allow_stats, server.allow_scores
+            self.__servers = [
+                (
+                    server,
+                    APIClient(
+                        server.uri,
+                        server.token,
+                        server.allow_stats,
+                        server.allow_scores,
+                        self.__config,
+                    ),
                 )
                 for server in servers
             ]
 
-        return self.__apiclients
+        return self.__servers
+
+    @property
+    def clients(self) -> List[APIClient]:
+        return [client for _, client in self.servers]
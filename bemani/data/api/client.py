@@ -1,5 +1,5 @@
+import concurrent.futures
 import json
-import requests
 from typing import Tuple, Dict, List, Any, Optional
 from typing_extensions import Final
 
@@ -10,6 +10,8 @@ from bemani.common import (
     DBConstants,
     ValidatedDict,
 )
+from bemani.data.api.federation import FederationPool
+from bemani.data.config import Config
 
 
 class APIException(Exception):
@@ -44,12 +46,18 @@ class APIClient:
     API_VERSION: Final[str] = "v1"
 
     def __init__(
-        self, base_uri: str, token: str, allow_stats: bool, allow_scores: bool
+        self,
+        base_uri: str,
+        token: str,
+        allow_stats: bool,
+        allow_scores: bool,
+        config: Optional[Config] = None,
     ) -> None:
         self.base_uri = base_uri
         self.token = token
         self.allow_stats = allow_stats
         self.allow_scores = allow_scores
+        self.__pool = FederationPool.shared(config)
 
     def _content_type_valid(self, content_type: str) -> bool:
         if ";" in content_type:
@@ -81,25 +89,42 @@ class APIClient:
         }
         data = json.dumps(request_args).encode("utf8")
 
+        breaker = self.__pool.breaker(self.base_uri)
+        if not breaker.allow():
+            raise APIException("Remote server is unavailable, not querying it!")
+
         try:
-            r = requests.request(
+            r = self.__pool.session(self.base_uri).request(
                 "GET",
                 uri,
                 headers=headers,
                 data=data,
                 allow_redirects=False,
-                timeout=10,
+                timeout=self.__pool.timeout,
             )
         except Exception:
+            breaker.failure()
             raise APIException("Failed to query remote server!")
 
+        # Only count the server as healthy if it answered sensibly. Refusing a
+        # request is fine, but returning garbage or crashing is not.
+        if r.status_code >= 500 and r.status_code != 501:
+            breaker.failure()
+        elif not self._content_type_valid(r.headers.get("content-type", "")):
+            breaker.failure()
+        else:
+            breaker.success()
+
         # Verify that content type is in the form of "application/json; charset=utf-8".
-        if not self._content_type_valid(r.headers["content-type"]):
+        if not self._content_type_valid(r.headers.get("content-type", "")):
             raise APIException(
-                f'API returned invalid content type \'{r.headers["content-type"]}\'!'
+                f'API returned invalid content type \'{r.headers.get("content-type")}\'!'
             )
 
-        jsondata = r.json()
+        try:
+            jsondata = r.json()
+        except ValueError:
+            raise APIException("API returned invalid JSON!")
 
         if r.status_code == 200:
             return jsondata
@@ -134,6 +159,21 @@ class APIClient:
             "The server returned an invalid status code {}!", format(r.status_code)
         )
 
+    def __exchange_game_data(
+        self, request_uri: str, request_args: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        # Game requests are made from inside packet handlers, so they go through the
+        # response cache and are abandoned if the server takes longer than we can wait.
+        key = json.dumps(
+            [self.base_uri, self.token, request_uri, request_args], sort_keys=True
+        )
+        try:
+            return self.__pool.fetch(
+                key, lambda: self.__exchange_data(request_uri, request_args)
+            )
+        except concurrent.futures.TimeoutError:
+            raise APIException("Remote server did not respond in time!")
+
     def __translate(self, game: GameConstants, version: int) -> Tuple[str, str]:
         servergame = {
             GameConstants.DDR: "ddr",
@@ -247,7 +287,7 @@ class APIClient:
 
         try:
             servergame, serverversion = self.__translate(game, version)
-            resp = self.__exchange_data(
+            resp = self.__exchange_game_data(
                 f"{self.API_VERSION}/{servergame}/{serverversion}",
                 {
                     "ids": ids,
@@ -284,7 +324,7 @@ class APIClient:
                 data["since"] = since
             if until is not None:
                 data["until"] = until
-            resp = self.__exchange_data(
+            resp = self.__exchange_game_data(
                 f"{self.API_VERSION}/{servergame}/{serverversion}",
                 data,
             )
@@ -302,7 +342,7 @@ class APIClient:
 
         try:
             servergame, serverversion = self.__translate(game, version)
-            resp = self.__exchange_data(
+            resp = self.__exchange_game_data(
                 f"{self.API_VERSION}/{servergame}/{serverversion}",
                 {
                     "ids": ids,
@@ -315,6 +355,59 @@ class APIClient:
             # Couldn't talk to server, assume empty statistics
             return []
 
+    def sync_records(
+        self,
+        game: GameConstants,
+        version: int,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Pull every record on the remote server for a game version, optionally only those
+        updated within a time range. Unlike get_records, this is meant for background
+        syncing, so it skips the response cache and latency budget and raises an
+        APIException instead of assuming no records when the server can't be reached.
+        """
+        if not self.allow_scores:
+            return []
+
+        servergame, serverversion = self.__translate(game, version)
+        data: Dict[str, Any] = {
+            "ids": [],
+            "type": APIConstants.ID_TYPE_SERVER.value,
+            "objects": ["records"],
+        }
+        if since is not None:
+            data["since"] = since
+        if until is not None:
+            data["until"] = until
+        resp = self.__exchange_data(
+            f"{self.API_VERSION}/{servergame}/{serverversion}",
+            data,
+        )
+        return resp["records"]
+
+    def sync_statistics(
+        self, game: GameConstants, version: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Pull statistics for every song on the remote server for a game version. Like
+        sync_records, this raises an APIException when the server can't be reached.
+        """
+        if not self.allow_stats:
+            return []
+
+        servergame, serverversion = self.__translate(game, version)
+        resp = self.__exchange_data(
+            f"{self.API_VERSION}/{servergame}/{serverversion}",
+            {
+                "ids": [],
+                "type": APIConstants.ID_TYPE_SERVER.value,
+                "objects": ["statistics"],
+            },
+        )
+        return resp["statistics"]
+
     def get_catalog(
         self, game: GameConstants, version: int
     ) -> Dict[str, List[Dict[str, Any]]]:
@@ -0,0 +1,281 @@
+import collections
+import concurrent.futures
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from typing_extensions import Final
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from bemani.data.config import Config
+
+
+class CircuitBreaker:
+    """
+    Tracks the health of a single remote server. After enough consecutive failures
+    the breaker opens and requests to that server are refused outright, so that a
+    dead server costs nothing instead of a timeout on every request. Once the reset
+    time has passed, a single trial request is let through to see if it is back.
+    """
+
+    CLOSED: Final[str] = "closed"
+    OPEN: Final[str] = "open"
+    HALF_OPEN: Final[str] = "half-open"
+
+    def __init__(self, failures: int, reset: int) -> None:
+        """
+        Initialize the breaker.
+
+        Parameters:
+            failures - Number of consecutive failures before the breaker opens. If
+                       this is zero or negative, the breaker never opens.
+            reset - Number of seconds to wait after opening before trying again.
+        """
+        self.failures = failures
+        self.reset = reset
+        self.__lock = threading.Lock()
+        self.__count = 0
+        self.__opened: Optional[float] = None
+        self.__trial = False
+
+    @property
+    def state(self) -> str:
+        with self.__lock:
+            if self.__opened is None:
+                return self.CLOSED
+            if self.__trial or time.time() >= self.__opened + self.reset:
+                return self.HALF_OPEN
+            return self.OPEN
+
+    def allow(self) -> bool:
+        """
+        Returns whether a request should be made right now. Every allowed request
+        must be followed by a call to either success() or failure().
+        """
+        with self.__lock:
+            if self.__opened is None:
+                return True
+            if self.__trial:
+                # Another request is already checking whether the server is back.
+                return False
+            if time.time() < self.__opened + self.reset:
+                return False
+            self.__trial = True
+            return True
+
+    def success(self) -> None:
+        with self.__lock:
+            self.__count = 0
+            self.__opened = None
+            self.__trial = False
+
+    def failure(self) -> None:
+        with self.__lock:
+            self.__count += 1
+            self.__trial = False
+            if self.__opened is not None or (
+                self.failures > 0 and self.__count >= self.failures
+            ):
+                self.__opened = time.time()
+
+
+class ResponseCache:
+    """
+    A bounded in-memory cache of responses from remote servers which evicts the
+    least recently used entry when full. Responses are kept serialized so that
+    every hit hands out a fresh copy that callers are free to modify.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.__lock = threading.Lock()
+        self.__entries: "collections.OrderedDict[str, Tuple[float, str]]" = (
+            collections.OrderedDict()
+        )
+
+    def get(self, key: str) -> Optional[Tuple[float, str]]:
+        """
+        Look up an entry, returning a tuple of the time it was fetched and the
+        serialized response, or None if there is no entry.
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                self.__entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, value: str) -> None:
+        with self.__lock:
+            self.__entries[key] = (time.time(), value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > max(self.size, 0):
+                self.__entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+
+
+class FederationPool:
+    """
+    Process-wide state for talking to remote servers over BEMAPI. This outlives the
+    data objects created for every request, and holds a keep-alive session and a
+    circuit breaker for each remote server as well as a cache of their responses.
+
+    Requests are made on a small pool of worker threads so that the caller can stop
+    waiting once the configured latency budget runs out and fall back to local data,
+    while the request itself finishes in the background and warms the cache.
+    """
+
+    __pools: Dict[int, "FederationPool"] = {}
+    __pools_lock = threading.Lock()
+
+    def __init__(self, config: Config) -> None:
+        self.__lock = threading.Lock()
+        self.__sessions: Dict[str, requests.Session] = {}
+        self.__breakers: Dict[str, CircuitBreaker] = {}
+        self.__inflight: Dict[str, "concurrent.futures.Future[Dict[str, Any]]"] = {}
+        self.__executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self.__cache = ResponseCache(config.federation.cache_size)
+        self.configure(config)
+
+    @classmethod
+    def shared(cls, config: Optional[Config] = None) -> "FederationPool":
+        """
+        Return the pool for this process, creating it if needed. Pools are never
+        shared with forked children, since sessions and threads don't survive a fork.
+
+        Parameters:
+            config - A config structure, whose federation settings will be applied. If
+                     not provided, an existing pool is returned as it was last configured,
+                     and a new pool gets the default settings.
+        """
+        pid = os.getpid()
+        pool = cls.__pools.get(pid)
+        if pool is None:
+            with cls.__pools_lock:
+                pool = cls.__pools.get(pid)
+                if pool is None:
+                    pool = FederationPool(config if config is not None else Config())
+                    cls.__pools = {pid: pool}
+                    return pool
+        if config is not None:
+            pool.configure(config)
+        return pool
+
+    def configure(self, config: Config) -> None:
+        settings = config.federation
+        self.pool_size = settings.pool_size
+        self.workers = settings.workers
+        self.timeout = settings.timeout
+        self.latency_budget = settings.latency_budget
+        self.cache_ttl = settings.cache_ttl
+        self.cache_stale_ttl = settings.cache_stale_ttl
+        self.breaker_failures = settings.breaker_failures
+        self.breaker_reset = settings.breaker_reset
+        self.__cache.size = settings.cache_size
+
+    def session(self, peer: str) -> requests.Session:
+        """
+        Return the keep-alive session used to talk to a remote server.
+        """
+        session = self.__sessions.get(peer)
+        if session is None:
+            with self.__lock:
+                session = self.__sessions.get(peer)
+                if session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=1, pool_maxsize=self.pool_size
+                    )
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self.__sessions[peer] = session
+        return session
+
+    def breaker(self, peer: str) -> CircuitBreaker:
+        """
+        Return the circuit breaker tracking the health of a remote server.
+        """
+        breaker = self.__breakers.get(peer)
+        if breaker is None:
+            with self.__lock:
+                breaker = self.__breakers.get(peer)
+                if breaker is None:
+                    breaker = CircuitBreaker(self.breaker_failures, self.breaker_reset)
+                    self.__breakers[peer] = breaker
+        breaker.failures = self.breaker_failures
+        breaker.reset = self.breaker_reset
+        return breaker
+
+    def stats(self) -> Dict[str, str]:
+        """
+        Return the circuit breaker state of every remote server talked to so far.
+        """
+        with self.__lock:
+            breakers = dict(self.__breakers)
+        return {peer: breaker.state for peer, breaker in breakers.items()}
+
+    def fetch(self, key: str, lookup: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Return the response for a request. A fresh cached response is returned as-is.
+        A stale one is also returned immediately, but is refreshed in the background.
+        Otherwise, the lookup is performed, waiting no longer than the latency budget.
+
+        Parameters:
+            key - A key uniquely identifying the request, including the server.
+            lookup - A function that performs the request and returns the response.
+
+        Raises:
+            concurrent.futures.TimeoutError if the latency budget ran out. The request
+            is left to finish in the background so that its response can be cached.
+            Any exception raised by the lookup is passed on to the caller.
+        """
+        if self.cache_ttl > 0:
+            entry = self.__cache.get(key)
+            if entry is not None:
+                fetched, value = entry
+                age = time.time() - fetched
+                if age < self.cache_ttl + self.cache_stale_ttl:
+                    if age >= self.cache_ttl:
+                        self.__refresh(key, lookup)
+                    return json.loads(value)
+
+        return self.__refresh(key, lookup).result(timeout=self.latency_budget)
+
+    def __refresh(
+        self, key: str, lookup: Callable[[], Dict[str, Any]]
+    ) -> "concurrent.futures.Future[Dict[str, Any]]":
+        # Only ever have one copy of a given request in flight, so that a slow
+        # server doesn't get the same request over and over while it catches up.
+        with self.__lock:
+            future = self.__inflight.get(key)
+            if future is None:
+                if self.__executor is None:
+                    self.__executor = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=max(self.workers, 1)
+                    )
+                future = self.__executor.submit(self.__lookup, key, lookup)
+                self.__inflight[key] = future
+            return future
+
+    def __lookup(
+        self, key: str, lookup: Callable[[], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        try:
+            response = lookup()
+            if self.cache_ttl > 0:
+                self.__cache.put(key, json.dumps(response))
+            return response
+        finally:
+            with self.__lock:
+                self.__inflight.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Throw away every cached response.
+        """
+        self.__cache.clear()
@@ -1,14 +1,17 @@
 from typing import List, Optional, Dict, Any, Tuple, Set
+from typing_extensions import Final
 
 from bemani.common import (
-    APIConstants,
     GameConstants,
     VersionConstants,
     DBConstants,
     Parallel,
+    Time,
 )
 from bemani.data.interfaces import APIProviderInterface
 from bemani.data.api.base import BaseGlobalData
+from bemani.data.api.client import APIException, UnsupportedRequestAPIException
+from bemani.data.config import Config
 from bemani.data.mysql.user import UserData
 from bemani.data.mysql.music import MusicData
 from bemani.data.remoteuser import RemoteUser
@@ -16,10 +19,21 @@ from bemani.data.types import UserID, Score, Song
 
 
 class GlobalMusicData(BaseGlobalData):
+
+    # How many seconds each records sync goes back over what the last sync already pulled.
+    # Remote servers filter on their own clock, so without this any records updated on a
+    # server whose clock is behind ours would fall before the next sync and never be pulled.
+    # Pulling a record twice is harmless, since remote scores are upserted.
+    SYNC_OVERLAP: Final[int] = 5 * 60
+
     def __init__(
-        self, api: APIProviderInterface, user: UserData, music: MusicData
+        self,
+        config: Config,
+        api: APIProviderInterface,
+        user: UserData,
+        music: MusicData,
     ) -> None:
-        super().__init__(api)
+        super().__init__(config, api)
         self.user = user
         self.music = music
 
@@ -564,6 +578,112 @@ class GlobalMusicData(BaseGlobalData):
 
         return oldscore
 
+    def __score_serverids(self) -> List[int]:
+        return [server.id for server, _ in self.servers if server.allow_scores]
+
+    def __statistics_serverids(self) -> List[int]:
+        return [server.id for server, _ in self.servers if server.allow_stats]
+
+    def __attribute_remote_scores(
+        self, serverids: List[int], remotescores: List[Tuple[str, Score]]
+    ) -> List[Tuple[UserID, Score]]:
+        # Remote scores belong to a local user if they share a card, otherwise they
+        # belong to a remote user identified by their card.
+        owners = self.music.get_remote_card_owners(serverids)
+        return [
+            (owners.get(cardid, RemoteUser.card_to_userid(cardid)), score)
+            for (cardid, score) in remotescores
+        ]
+
+    def sync_records(self, game: GameConstants, version: int) -> int:
+        """
+        Pull records that changed since the last sync from every remote server into the
+        local copy that score lookups read from. This is meant to be run periodically by
+        the scheduler, so that game and frontend requests never wait on remote servers.
+
+        Returns:
+            The number of records that were pulled.
+        """
+        total = 0
+        for server, client in self.servers:
+            if not server.allow_scores:
+                continue
+
+            since = self.music.get_remote_sync(server.id, game, version, "records")
+            until = Time.now()
+            try:
+                records = client.sync_records(game, version, since, until)
+            except UnsupportedRequestAPIException:
+                # Either we or the remote server don't know about this game version.
+                continue
+            except APIException:
+                # Try again next time, picking up where we left off.
+                continue
+
+            scores: List[Tuple[List[str], Score]] = []
+            for record in records:
+                cards = record.get("cards", [])
+                songid = int(record["song"])
+                chart = int(record["chart"])
+                score = self.__format_score(game, version, songid, chart, record)
+                if score is not None and cards:
+                    scores.append((cards, score))
+
+            total += self.music.put_remote_scores(server.id, game, version, scores)
+            self.music.put_remote_sync(
+                server.id, game, version, "records", until - self.SYNC_OVERLAP
+            )
+        return total
+
+    def sync_statistics(self, game: GameConstants, version: int) -> int:
+        """
+        Pull statistics from every remote server into the local copy that clear rate
+        lookups read from. Like sync_records, this is meant to be run by the scheduler.
+
+        Returns:
+            The number of song/charts that statistics were pulled for.
+        """
+        total = 0
+        for server, client in self.servers:
+            if not server.allow_stats:
+                continue
+
+            # Statistics for every song are pulled each time, so unlike records there is
+            # nothing to miss, and this only records when they were last refreshed.
+            until = Time.now()
+            try:
+                statistics = client.sync_statistics(game, version)
+            except APIException:
+                continue
+
+            charts: Dict[int, Dict[int, Dict[str, int]]] = {}
+            for stat in statistics:
+                songid = stat.get("song")
+                songchart = stat.get("chart")
+                if songid is None or songchart is None:
+                    continue
+                chart = charts.setdefault(int(songid), {}).setdefault(
+                    int(songchart), {"plays": 0, "clears": 0, "combos": 0}
+                )
+                for key in ["plays", "clears", "combos"]:
+                    chart[key] += max(int(stat.get(key, -1)), 0)
+
+            total += self.music.put_remote_statistics(server.id, game, version, charts)
+            self.music.put_remote_sync(server.id, game, version, "statistics", until)
+        return total
+
+    def get_last_sync(self, game: GameConstants, version: int) -> Optional[int]:
+        """
+        Look up how old the remote scores returned by this class are for a game version.
+
+        Returns:
+            A unix timestamp that every remote server has been synced up to, or None
+            if there are no remote servers or one of them has never been synced.
+        """
+        return self.music.get_oldest_remote_sync(
+            game, version, self.__score_serverids(), "records"
+        )
+
     def get_score(
         self,
         game: GameConstants,
@@ -572,53 +692,25 @@ class GlobalMusicData(BaseGlobalData):
         songid: int,
         songchart: int,
     ) -> Optional[Score]:
-        # Helper function so we can iterate over all servers for a single card
-        def get_scores_for_card(cardid: str) -> List[Score]:
-            return Parallel.flatten(
-                Parallel.call(
-                    [client.get_records for client in self.clients],
-                    game,
-                    version,
-                    APIConstants.ID_TYPE_INSTANCE,
-                    [songid, songchart, cardid],
-                )
-            )
-
-        relevant_cards = self.__get_cardids(userid)
         if RemoteUser.is_remote(userid):
             # No need to look up local score for this user
-            scores = Parallel.flatten(
-                Parallel.map(
-                    get_scores_for_card,
-                    relevant_cards,
-                )
-            )
-            localscore = None
+            topscore = None
         else:
-            localscore, scores = Parallel.execute(
-                [
-                    lambda: self.music.get_score(
-                        game, version, userid, songid, songchart
-                    ),
-                    lambda: Parallel.flatten(
-                        Parallel.map(
-                            get_scores_for_card,
-                            relevant_cards,
-                        )
-                    ),
-                ]
-            )
-
-        topscore = localscore
+            topscore = self.music.get_score(game, version, userid, songid, songchart)
 
-        for score in scores:
-            if int(score["song"]) != songid:
-                continue
-            if int(score["chart"]) != songchart:
-                continue
-
-            newscore = self.__format_score(game, version, songid, songchart, score)
+        serverids = self.__score_serverids()
+        if not serverids:
+            return topscore
 
+        remotescores = self.music.get_remote_scores(
+            game,
+            version,
+            serverids,
+            cards=self.__get_cardids(userid),
+            songid=songid,
+            songchart=songchart,
+        )
+        for _, newscore in remotescores:
             if topscore is None:
                 # No merging needed
                 topscore = newscore
@@ -636,38 +728,24 @@ class GlobalMusicData(BaseGlobalData):
         since: Optional[int] = None,
         until: Optional[int] = None,
     ) -> List[Score]:
-        relevant_cards = self.__get_cardids(userid)
         if RemoteUser.is_remote(userid):
             # No need to look up local score for this user
-            scores = Parallel.flatten(
-                Parallel.call(
-                    [client.get_records for client in self.clients],
-                    game,
-                    version,
-                    APIConstants.ID_TYPE_CARD,
-                    relevant_cards,
-                    since,
-                    until,
-                )
-            )
             localscores: List[Score] = []
         else:
-            localscores, scores = Parallel.execute(
-                [
-                    lambda: self.music.get_scores(game, version, userid, since, until),
-                    lambda: Parallel.flatten(
-                        Parallel.call(
-                            [client.get_records for client in self.clients],
-                            game,
-                            version,
-                            APIConstants.ID_TYPE_CARD,
-                            relevant_cards,
-                            since,
-                            until,
-                        )
-                    ),
-                ]
-            )
+            localscores = self.music.get_scores(game, version, userid, since, until)
+
+        serverids = self.__score_serverids()
+        if not serverids:
+            return localscores
+
+        remotescores = self.music.get_remote_scores(
+            game,
+            version,
+            serverids,
+            cards=self.__get_cardids(userid),
+            since=since,
+            until=until,
+        )
 
         allscores: Dict[int, Dict[int, Score]] = {}
 
@@ -684,11 +762,8 @@ class GlobalMusicData(BaseGlobalData):
             add_score(score)
 
         # Second, merge in remote scorse
-        for remotescore in scores:
-            songid = int(remotescore["song"])
-            chart = int(remotescore["chart"])
-            newscore = self.__format_score(game, version, songid, chart, remotescore)
-            oldscore = get_score(songid, chart)
+        for _, newscore in remotescores:
+            oldscore = get_score(newscore.id, newscore.chart)
 
             if oldscore is None:
                 add_score(newscore)
@@ -707,11 +782,9 @@ class GlobalMusicData(BaseGlobalData):
         self,
         game: GameConstants,
         version: int,
-        localcards: List[Tuple[str, UserID]],
         localscores: List[Tuple[UserID, Score]],
-        remotescores: List[Dict[str, Any]],
+        remotescores: List[Tuple[UserID, Score]],
     ) -> List[Tuple[UserID, Score]]:
-        card_to_id = {cardid: userid for (cardid, userid) in localcards}
         allscores: Dict[UserID, Dict[int, Dict[int, Score]]] = {}
 
         def add_score(userid: UserID, score: Score) -> None:
@@ -729,23 +802,8 @@ class GlobalMusicData(BaseGlobalData):
             add_score(userid, score)
 
         # Second, merge in remote scorse
-        for remotescore in remotescores:
-            # Figure out the userid of this score
-            cardids = sorted([card.upper() for card in remotescore.get("cards", [])])
-            if len(cardids) == 0:
-                continue
-
-            for cardid in cardids:
-                if cardid in card_to_id:
-                    userid = card_to_id[cardid]
-                    break
-            else:
-                userid = RemoteUser.card_to_userid(cardids[0])
-
-            songid = int(remotescore["song"])
-            chart = int(remotescore["chart"])
-            newscore = self.__format_score(game, version, songid, chart, remotescore)
-            oldscore = get_score(userid, songid, chart)
+        for userid, newscore in remotescores:
+            oldscore = get_score(userid, newscore.id, newscore.chart)
 
             if oldscore is None:
                 add_score(userid, newscore)
@@ -771,52 +829,36 @@ class GlobalMusicData(BaseGlobalData):
         since: Optional[int] = None,
         until: Optional[int] = None,
     ) -> List[Tuple[UserID, Score]]:
-        # First, pass off to local-only if this was called with parameters we don't support
-        if version is None or userid is not None or songid is None:
-            return self.music.get_all_scores(
-                game, version, userid, songid, songchart, since, until
-            )
-
-        # Now, figure out the request key based on passed in parameters
-        if songchart is None:
-            songkey = [songid]
-        else:
-            songkey = [songid, songchart]
-
-        # Now, fetch all the scores remotely and locally
-        localcards, localscores, remotescores = Parallel.execute(
-            [
-                self.user.get_all_cards,
-                lambda: self.music.get_all_scores(
-                    game, version, userid, songid, songchart, since, until
-                ),
-                lambda: Parallel.flatten(
-                    Parallel.call(
-                        [client.get_records for client in self.clients],
-                        game,
-                        version,
-                        APIConstants.ID_TYPE_SONG,
-                        songkey,
-                        since,
-                        until,
-                    )
-                ),
-            ]
+        localscores = self.music.get_all_scores(
+            game, version, userid, songid, songchart, since, until
         )
 
-        return self.__merge_global_scores(
-            game, version, localcards, localscores, remotescores
+        # Only merge in remote scores if this was called with parameters we support
+        serverids = self.__score_serverids()
+        if version is None or userid is not None or songid is None or not serverids:
+            return localscores
+
+        remotescores = self.__attribute_remote_scores(
+            serverids,
+            self.music.get_remote_scores(
+                game,
+                version,
+                serverids,
+                songid=songid,
+                songchart=songchart,
+                since=since,
+                until=until,
+            ),
         )
+        return self.__merge_global_scores(game, version, localscores, remotescores)
 
     def __merge_global_records(
         self,
         game: GameConstants,
         version: int,
-        localcards: List[Tuple[str, UserID]],
         localscores: List[Tuple[UserID, Score]],
-        remotescores: List[Dict[str, Any]],
+        remotescores: List[Tuple[UserID, Score]],
     ) -> List[Tuple[UserID, Score]]:
-        card_to_id = {cardid: userid for (cardid, userid) in localcards}
         allscores: Dict[int, Dict[int, Tuple[UserID, Score]]] = {}
 
         def add_score(userid: UserID, score: Score) -> None:
@@ -834,23 +876,8 @@ class GlobalMusicData(BaseGlobalData):
             add_score(userid, score)
 
         # Second, merge in remote records
-        for remotescore in remotescores:
-            # Figure out the userid of this score
-            cardids = sorted([card.upper() for card in remotescore.get("cards", [])])
-            if len(cardids) == 0:
-                continue
-
-            for cardid in cardids:
-                if cardid in card_to_id:
-                    userid = card_to_id[cardid]
-                    break
-            else:
-                userid = RemoteUser.card_to_userid(cardids[0])
-
-            songid = int(remotescore["song"])
-            chart = int(remotescore["chart"])
-            newscore = self.__format_score(game, version, songid, chart, remotescore)
-            oldid, oldscore = get_score(songid, chart)
+        for userid, newscore in remotescores:
+            oldid, oldscore = get_score(newscore.id, newscore.chart)
 
             if oldscore is None:
                 add_score(userid, newscore)
@@ -882,32 +909,22 @@ class GlobalMusicData(BaseGlobalData):
         userlist: Optional[List[UserID]] = None,
         locationlist: Optional[List[int]] = None,
     ) -> List[Tuple[UserID, Score]]:
-        # First, pass off to local-only if this was called with parameters we don't support
-        if version is None or userlist is not None or locationlist is not None:
-            return self.music.get_all_records(game, version, userlist, locationlist)
-
-        # Now, fetch all records remotely and locally
-        localcards, localscores, remotescores = Parallel.execute(
-            [
-                self.user.get_all_cards,
-                lambda: self.music.get_all_records(
-                    game, version, userlist, locationlist
-                ),
-                lambda: Parallel.flatten(
-                    Parallel.call(
-                        [client.get_records for client in self.clients],
-                        game,
-                        version,
-                        APIConstants.ID_TYPE_SERVER,
-                        [],
-                    )
-                ),
-            ]
-        )
-
-        return self.__merge_global_records(
-            game, version, localcards, localscores, remotescores
+        localscores = self.music.get_all_records(game, version, userlist, locationlist)
+
+        # Only merge in remote records if this was called with parameters we support
+        serverids = self.__score_serverids()
+        if (
+            version is None
+            or userlist is not None
+            or locationlist is not None
+            or not serverids
+        ):
+            return localscores
+
+        remotescores = self.__attribute_remote_scores(
+            serverids, self.music.get_remote_scores(game, version, serverids)
         )
+        return self.__merge_global_records(game, version, localscores, remotescores)
 
     def get_clear_rates(
         self,
@@ -918,9 +935,10 @@ class GlobalMusicData(BaseGlobalData):
     ) -> Dict[int, Dict[int, Dict[str, int]]]:
         """
         Given an optional songid, or optional songid and songchart, looks up clear rates
-        in remote servers that are connected to us. If neither id or chart is given, looks
-        up global clear rates. If songid is given, looks up clear rates for each chart for
-        the song. If songid and chart is given, looks up clear rates for that song/chart.
+        from remote servers that are connected to us, as of the last time statistics were
+        synced from them. If neither id or chart is given, looks up global clear rates. If
+        songid is given, looks up clear rates for each chart for the song. If songid and
+        chart is given, looks up clear rates for that song/chart.
 
         Returns a dictionary keyed by songid, whos values are a dictionary keyed by chart,
         whos values are a dictionary containing integer counts keyed by 'plays', 'clears',
@@ -937,63 +955,12 @@ class GlobalMusicData(BaseGlobalData):
         }
         """
 
-        if songid is None and songchart is None:
-            statistics = Parallel.flatten(
-                Parallel.call(
-                    [client.get_statistics for client in self.clients],
-                    game,
-                    version,
-                    APIConstants.ID_TYPE_SERVER,
-                    [],
-                )
-            )
-        elif songid is not None:
-            if songchart is None:
-                ids = [songid]
-            else:
-                ids = [songid, songchart]
-            statistics = Parallel.flatten(
-                Parallel.call(
-                    [client.get_statistics for client in self.clients],
-                    game,
-                    version,
-                    APIConstants.ID_TYPE_SONG,
-                    ids,
-                )
-            )
-        else:
-            statistics = []
-
-        retval: Dict[int, Dict[int, Dict[str, int]]] = {}
-        for stat in statistics:
-            songid = stat.get("song")
-            songchart = stat.get("chart")
-
-            if songid is None or songchart is None:
-                continue
-            songid = int(songid)
-            songchart = int(songchart)
-
-            if songid not in retval:
-                retval[songid] = {}
-            if songchart not in retval[songid]:
-                retval[songid][songchart] = {
-                    "plays": 0,
-                    "clears": 0,
-                    "combos": 0,
-                }
-
-            def get_val(v: str) -> int:
-                out = stat.get(v, -1)
-                if out < 0:
-                    out = 0
-                return out
-
-            retval[songid][songchart]["plays"] += get_val("plays")
-            retval[songid][songchart]["clears"] += get_val("clears")
-            retval[songid][songchart]["combos"] += get_val("combos")
+        if songid is None and songchart is not None:
+            return {}
 
-        return retval
+        return self.music.get_remote_statistics(
+            game, version, self.__statistics_serverids(), songid, songchart
+        )
 
     def __format_ddr_song(
         self,
@@ -3,14 +3,17 @@ from typing import List, Tuple, Optional
 from bemani.common import APIConstants, GameConstants, Profile, Parallel
 from bemani.data.interfaces import APIProviderInterface
 from bemani.data.api.base import BaseGlobalData
+from bemani.data.config import Config
 from bemani.data.mysql.user import UserData
 from bemani.data.remoteuser import RemoteUser
 from bemani.data.types import UserID
 
 
 class GlobalUserData(BaseGlobalData):
-    def __init__(self, api: APIProviderInterface, user: UserData) -> None:
-        super().__init__(api)
+    def __init__(
+        self, config: Config, api: APIProviderInterface, user: UserData
+    ) -> None:
+        super().__init__(config, api)
         self.user = user
 
     def __format_ddr_profile(self, updates: Profile, profile: Profile) -> None:
@@ -0,0 +1,189 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class CacheStore:
+    """
+    A local in-memory store for cached lookups, which is private to the current
+    process. Entries are kept as encoded strings so that callers always get a fresh
+    copy of the value that they are free to modify.
+    """
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__entries: Dict[str, Tuple[float, str]] = {}
+
+    def get(self, key: str) -> Optional[Tuple[float, str]]:
+        """
+        Look up an entry, returning a tuple of expiration time and encoded value
+        or None if there is no entry.
+        """
+        return self.__entries.get(key)
+
+    def put(self, key: str, expiration: float, value: str) -> None:
+        with self.__lock:
+            self.__entries[key] = (expiration, value)
+
+    def delete(self, key: str) -> None:
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries = {}
+
+
+class FileCacheStore(CacheStore):
+    """
+    A file-backed store for cached lookups, which is shared by every process that
+    points at the same directory. This lets a write in one worker (or in the frontend)
+    invalidate the cache for every other worker immediately.
+    """
+
+    def __init__(self, directory: str) -> None:
+        super().__init__()
+        self.__directory = directory
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def __path(self, key: str) -> str:
+        return os.path.join(
+            self.__directory, hashlib.sha1(key.encode("utf-8")).hexdigest()
+        )
+
+    def get(self, key: str) -> Optional[Tuple[float, str]]:
+        try:
+            with open(self.__path(key), "r", encoding="utf-8") as fp:
+                expiration, _, value = fp.read().partition("\n")
+            return float(expiration), value
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, expiration: float, value: str) -> None:
+        path = self.__path(key)
+        tmppath = f"{path}.{os.getpid()}.{threading.get_ident()}"
+        try:
+            with open(tmppath, "w", encoding="utf-8") as fp:
+                fp.write(f"{expiration}\n{value}")
+            os.replace(tmppath, path)
+        except OSError:
+            # Failing to cache something is not fatal, we'll just look it up again.
+            pass
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.__path(key))
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        for filename in os.listdir(self.__directory):
+            try:
+                os.remove(os.path.join(self.__directory, filename))
+            except OSError:
+                pass
+
+
+class LookupCache:
+    """
+    A read-through cache with a TTL, meant to sit in front of hot lookups that are
+    rarely written, such as looking up a machine by PCBID on every packet. Code that
+    writes to the underlying data is responsible for invalidating affected keys.
+    """
+
+    __caches: Dict[Tuple[str, Optional[str]], "LookupCache"] = {}
+    __caches_lock = threading.Lock()
+
+    def __init__(self, ttl: int, store: Optional[CacheStore] = None) -> None:
+        """
+        Initialize the cache.
+
+        Parameters:
+            ttl - Number of seconds that a cached entry is valid for. If this is
+                  zero or negative, the cache is disabled.
+            store - Optionally, a store to keep entries in. Defaults to a local
+                    in-memory store.
+        """
+        self.ttl = ttl
+        self.__store = store if store is not None else CacheStore()
+
+    @classmethod
+    def shared(cls, name: str, ttl: int, directory: Optional[str]) -> "LookupCache":
+        """
+        Return the process-wide cache with a given name, creating it if needed. This
+        allows caches to outlive the data objects that are created for every request.
+
+        Parameters:
+            name - A unique name for this cache.
+            ttl - Number of seconds that a cached entry is valid for.
+            directory - Optionally, a directory to keep entries in so that they can
+                        be shared with other processes.
+        """
+        key = (name, directory)
+        cache = cls.__caches.get(key)
+        if cache is None:
+            with cls.__caches_lock:
+                cache = cls.__caches.get(key)
+                if cache is None:
+                    if directory is not None:
+                        # Keep each cache in its own subdirectory so that different
+                        # caches sharing a directory never see each other's entries.
+                        store: CacheStore = FileCacheStore(
+                            os.path.join(
+                                directory,
+                                hashlib.sha1(name.encode("utf-8")).hexdigest(),
+                            )
+                        )
+                    else:
+                        store = CacheStore()
+                    cache = LookupCache(ttl, store)
+                    cls.__caches[key] = cache
+        cache.ttl = ttl
+        return cache
+
+    def fetch(
+        self,
+        key: str,
+        lookup: Callable[[], T],
+        encode: Callable[[T], str],
+        decode: Callable[[str], T],
+    ) -> T:
+        """
+        Return the cached value for a key, calling lookup to find and cache the
+        value if there is no unexpired entry.
+
+        Parameters:
+            key - The key to look up.
+            lookup - A function that returns the current value for this key.
+            encode - A function that converts a value to a string for storage.
+            decode - A function that converts a stored string back to a value.
+        """
+        if self.ttl <= 0:
+            return lookup()
+
+        now = time.time()
+        entry = self.__store.get(key)
+        if entry is not None:
+            expiration, value = entry
+            if expiration > now:
+                return decode(value)
+
+        result = lookup()
+        self.__store.put(key, now + self.ttl, encode(result))
+        return result
+
+    def invalidate(self, key: str) -> None:
+        """
+        Throw away any cached value for a key, so the next fetch looks it up again.
+        """
+        self.__store.delete(key)
+
+    def clear(self) -> None:
+        """
+        Throw away every cached value.
+        """
+        self.__store.clear()
@@ -3,7 +3,7 @@ import os
 from sqlalchemy.engine import Engine  # type: ignore
 from typing import Any, Dict, Optional, Set
 
-from bemani.common import GameConstants, RegionConstants
+from bemani.common import GameConstants, Parallel, RegionConstants
 from bemani.data.types import ArcadeID
 
 
@@ -44,6 +44,40 @@ class Database:
     def read_only(self) -> bool:
         return bool(self.__config.get("database", {}).get("read_only", False))
 
+    @property
+    def pooled(self) -> bool:
+        return bool(self.__config.get("database", {}).get("pooled", False))
+
+    @property
+    def pool_size(self) -> int:
+        return int(self.__config.get("database", {}).get("pool_size", 5))
+
+    @property
+    def max_overflow(self) -> int:
+        return int(self.__config.get("database", {}).get("max_overflow", 10))
+
+    @property
+    def pool_timeout(self) -> int:
+        return int(self.__config.get("database", {}).get("pool_timeout", 30))
+
+    @property
+    def pool_recycle(self) -> int:
+        return int(self.__config.get("database", {}).get("pool_recycle", 3600))
+
+    @property
+    def pool_pre_ping(self) -> bool:
+        return bool(self.__config.get("database", {}).get("pool_pre_ping", False))
+
+    @property
+    def machine_cache_ttl(self) -> int:
+        return int(self.__config.get("database", {}).get("machine_cache_ttl", 0))
+
+    @property
+    def machine_cache_shared(self) -> bool:
+        return bool(
+            self.__config.get("database", {}).get("machine_cache_shared", False)
+        )
+
 
 class Server:
     def __init__(self, parent_config: "Config") -> None:
@@ -133,6 +167,49 @@ class Machine:
         return self.__config.get("machine", {}).get("arcade")
 
 
+class Federation:
+    def __init__(self, parent_config: "Config") -> None:
+        self.__config = parent_config
+
+    @property
+    def pool_size(self) -> int:
+        return int(self.__config.get("federation", {}).get("pool_size", 10))
+
+    @property
+    def workers(self) -> int:
+        return int(self.__config.get("federation", {}).get("workers", 16))
+
+    @property
+    def timeout(self) -> float:
+        return float(self.__config.get("federation", {}).get("timeout", 10))
+
+    @property
+    def latency_budget(self) -> float:
+        return float(
+            self.__config.get("federation", {}).get("latency_budget", self.timeout)
+        )
+
+    @property
+    def cache_ttl(self) -> int:
+        return int(self.__config.get("federation", {}).get("cache_ttl", 0))
+
+    @property
+    def cache_stale_ttl(self) -> int:
+        return int(self.__config.get("federation", {}).get("cache_stale_ttl", 0))
+
+    @property
+    def cache_size(self) -> int:
+        return int(self.__config.get("federation", {}).get("cache_size", 1000))
+
+    @property
+    def breaker_failures(self) -> int:
+        return int(self.__config.get("federation", {}).get("breaker_failures", 5))
+
+    @property
+    def breaker_reset(self) -> int:
+        return int(self.__config.get("federation", {}).get("breaker_reset", 60))
+
+
 class PASELI:
     def __init__(self, parent_config: "Config") -> None:
         self.__config = parent_config
@@ -186,6 +263,51 @@ class Config(dict):
         self.webhooks = WebHooks(self)
         self.assets = Assets(self)
         self.machine = Machine(self)
+        self.federation = Federation(self)
+
+        # Top level sections that are still shared with the config this was overlaid on.
+        self.__shared: Set[str] = set()
+
+    def __getitem__(self, key: str) -> Any:
+        value = super().__getitem__(key)
+        if key in self.__shared:
+            # Somebody is about to look inside (and possibly modify) a section that we
+            # share with our parent, so make it our own first.
+            self.__shared.discard(key)
+            value = self.__copy(value)
+            super().__setitem__(key, value)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.__shared.discard(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        self.__shared.discard(key)
+        super().__delitem__(key)
+
+    def __copy(self, value: Any) -> Any:
+        # Never copy the SQLAlchemy engine, since it can't be copied and everyone
+        # should share the same connection pool anyway.
+        memo: Dict[int, Any] = {}
+        engine = dict.get(self, "database", {}).get("engine")
+        if engine is not None:
+            memo[id(engine)] = engine
+        return copy.deepcopy(value, memo)
+
+    def overlay(self) -> "Config":
+        """
+        Return a copy-on-write version of this config. Sections are shared with
+        this config until they are looked up using subscripting on the overlay,
+        at which point that section is copied. This means that reading values using
+        the properties or get() is free and modifications made by subscripting such
+        as overlay["paseli"]["enabled"] = False never affect this config. This is much
+        cheaper than clone() for the common case of a per-request config that only
+        overrides a few values.
+        """
+        overlay = Config(self)
+        overlay.__shared = set(self.keys())
+        return overlay
 
     def clone(self) -> "Config":
         # Somehow its not possible to clone this object if an instantiated Engine is present,
@@ -240,11 +362,31 @@ class Config(dict):
     def cache_dir(self) -> str:
         return os.path.abspath(str(self.get("cache_dir", "/tmp")))
 
+    @property
+    def cache_threshold(self) -> int:
+        return int(self.get("cache_threshold", 10000))
+
+    @property
+    def jsx_directory(self) -> str:
+        directory = self.get("jsx_directory")
+        if directory:
+            return os.path.abspath(str(directory))
+        return os.path.join(self.cache_dir, "jsx")
+
     @property
     def theme(self) -> str:
         return str(self.get("theme", "default"))
 
+    @property
+    def parallel_workers(self) -> int:
+        return int(self.get("parallel_workers", Parallel.DEFAULT_WORKERS))
+
     @property
     def event_log_duration(self) -> Optional[int]:
         duration = self.get("event_log_duration")
         return int(duration) if duration else None
+
+    @property
+    def attempt_archive_duration(self) -> Optional[int]:
+        duration = self.get("attempt_archive_duration")
+        return int(duration) if duration else None
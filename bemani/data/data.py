@@ -1,4 +1,5 @@
 import os
+from typing import Dict
 
 import alembic.config
 from alembic.migration import MigrationContext
@@ -7,6 +8,7 @@ from sqlalchemy import create_engine  # type: ignore
 from sqlalchemy.orm import scoped_session  # type: ignore
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.engine import Engine  # type: ignore
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.sql import text  # type: ignore
 from sqlalchemy.exc import ProgrammingError  # type: ignore
 
@@ -63,18 +65,22 @@ class GlobalProvider:
 
     def __init__(
         self,
+        config: Config,
         local: LocalProvider,
     ) -> None:
         self.user = GlobalUserData(
+            config,
             local.api,
             local.user,
         )
         self.music = GlobalMusicData(
+            config,
             local.api,
             local.user,
             local.music,
         )
         self.game = GlobalGameData(
+            config,
             local.api,
         )
 
@@ -118,7 +124,7 @@ class Data:
             self.__lobby,
             self.__api,
         )
-        self.remote = GlobalProvider(self.local)
+        self.remote = GlobalProvider(config, self.local)
         self.triggers = Triggers(config)
 
     @classmethod
@@ -129,9 +135,37 @@ class Data:
     def create_engine(cls, config: Config) -> Engine:
         return create_engine(
             Data.sqlalchemy_url(config),
-            pool_recycle=3600,
+            pool_size=config.database.pool_size,
+            max_overflow=config.database.max_overflow,
+            pool_timeout=config.database.pool_timeout,
+            pool_recycle=config.database.pool_recycle,
+            pool_pre_ping=config.database.pool_pre_ping,
         )
 
+    @classmethod
+    def pool_stats(cls, config: Config) -> Dict[str, int]:
+        """
+        Return statistics about the connection pool for the engine in a config.
+
+        Parameters:
+            config - A config structure with an instantiated engine.
+
+        Returns:
+            A dictionary containing the configured pool size, the number of connections
+            currently checked in and checked out of the pool, and the number of overflow
+            connections. If the engine isn't backed by a queue pool, returns an empty
+            dictionary instead.
+        """
+        pool = config.database.engine.pool
+        if not isinstance(pool, QueuePool):
+            return {}
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        }
+
     def __exists(self) -> bool:
         # See if the DB was already created
         try:
@@ -228,3 +262,12 @@ class Data:
         if self.__session is not None:
             self.__session.close()
             self.__session = None
+
+    def release(self) -> None:
+        """
+        Return the current thread's connection back to the pool without closing this
+        data object. Use this at the end of a request when a single data object is
+        shared across many requests instead of calling close().
+        """
+        if self.__session is not None:
+            self.__session.remove()
@@ -1,10 +1,10 @@
-import json
 import random
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Generator, Optional
 from typing_extensions import Final
 
 from bemani.common import Time
 from bemani.data.config import Config
+from bemani.data.mysql.codec import Codec
 
 from sqlalchemy.engine.base import Connection  # type: ignore
 from sqlalchemy.engine import CursorResult  # type: ignore
@@ -29,18 +29,13 @@ session = Table(
 )
 
 
-class _BytesEncoder(json.JSONEncoder):
-    def default(self, obj: Any) -> Any:
-        if isinstance(obj, bytes):
-            # We're abusing lists here, we have a mixed type
-            return ["__bytes__"] + [b for b in obj]
-        return json.JSONEncoder.default(self, obj)
-
-
 class BaseData:
 
     SESSION_LENGTH: Final[int] = 32
 
+    # How data columns are converted to and from JSON, shared by every data class.
+    codec: Codec = Codec()
+
     def __init__(self, config: Config, conn: Connection) -> None:
         """
         Initialize any DB singleton.
@@ -88,11 +83,49 @@ class BaseData:
             params if params is not None else {},
         )
 
+    def stream(
+        self,
+        sql: str,
+        params: Optional[Dict[str, Any]] = None,
+        chunksize: int = 1000,
+    ) -> Generator[Any, None, None]:
+        """
+        Given a SQL select and some parameters, execute the query using a server-side cursor
+        and yield each row, fetching a chunk of rows at a time instead of loading every row
+        into memory at once.
+
+        The query runs on its own connection from the configured engine, since a connection
+        can't be used for anything else while a server-side cursor is open on it. That way,
+        callers are free to keep making queries while iterating. The connection is given
+        back when every row has been read or the generator is closed.
+
+        Parameters:
+            sql - The SQL statement to execute.
+            params - Dictionary of parameters which will be substituted into the sql string.
+            chunksize - Number of rows to fetch from the server at once.
+
+        Returns:
+            A generator of SQLAlchemy Row objects.
+        """
+        with self.__config.database.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(
+                text(sql),
+                params if params is not None else {},
+            )
+            try:
+                while True:
+                    rows = result.fetchmany(chunksize)
+                    if not rows:
+                        break
+                    yield from rows
+            finally:
+                result.close()
+
     def serialize(self, data: Dict[str, Any]) -> str:
         """
         Given an arbitrary dict, serialize it to JSON.
         """
-        return json.dumps(data, cls=_BytesEncoder)
+        return self.codec.encode(data)
 
     def deserialize(self, data: Optional[str]) -> Dict[str, Any]:
         """
@@ -100,29 +133,7 @@ class BaseData:
         """
         if data is None:
             return {}
-
-        def fix(jd: Any) -> Any:
-            if type(jd) == dict:
-                # Fix each element in the dictionary.
-                for key in jd:
-                    jd[key] = fix(jd[key])
-                return jd
-
-            if type(jd) == list:
-                # Could be serialized by us, could be a normal list.
-                if len(jd) >= 1 and jd[0] == "__bytes__":
-                    # This is a serialized bytestring
-                    return bytes(jd[1:])
-
-                # Possibly one of these is a dictionary/list/serialized.
-                for i in range(len(jd)):
-                    jd[i] = fix(jd[i])
-                return jd
-
-            # Normal value, its deserialized version is itself.
-            return jd
-
-        return fix(json.loads(data))
+        return self.codec.decode(data)
 
     def _from_session(self, session: str, sesstype: str) -> Optional[int]:
         """
@@ -0,0 +1,203 @@
+import base64
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from typing_extensions import Final
+
+# Attempt to use the much faster compiled JSON library if it's available
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+"""
+How bytes are stored inside a JSON blob. Every version that was ever written must stay
+decodable, since rows are never rewritten just because the encoding changed.
+
+Version 0 wrote bytes as a list of integers tagged with a leading "__bytes__" string,
+which takes four or so characters per byte and meant walking the whole decoded blob
+looking for tagged lists.
+
+Version 1 writes bytes as base64 strings and lists where each of them is under a top-level
+"__b64__" key, so decoding only has to touch the values that are actually bytes. Blobs
+without any bytes in them are plain JSON in both versions.
+"""
+BYTES_TAG_V0: Final[str] = "__bytes__"
+BYTES_PATHS_V1: Final[str] = "__b64__"
+
+
+class JSONBackend:
+    """
+    A JSON library that a Codec can use to do the actual parsing and generating. The
+    default backend is the standard library, which is always available.
+    """
+
+    name: str = "json"
+
+    def dumps(self, data: Dict[str, Any], default: Callable[[Any], Any]) -> str:
+        return json.dumps(data, default=default, separators=(",", ":"))
+
+    def loads(self, data: str) -> Any:
+        return json.loads(data)
+
+
+class OrjsonBackend(JSONBackend):
+    """
+    A backend for orjson, which is several times faster than the standard library. Anything
+    orjson can't handle is handed back to the standard library so that both backends accept
+    and return the same data. When generating, orjson refuses integers wider than 64 bits.
+    When parsing, it quietly turns them into floats instead, so blobs that might hold one
+    are never given to it.
+    """
+
+    name: str = "orjson"
+
+    # Every integer orjson can parse exactly has at most 19 digits, as do some it can't,
+    # such as one less than the smallest signed 64 bit integer. So, any blob with a run
+    # of 19 digits is parsed by the standard library instead. Anything else with that
+    # many digits in a row, such as a long string of digits, is only parsed more slowly.
+    # Looking for zeros after turning every digit into one is much faster than a regex.
+    __DIGITS: Final[bytes] = bytes.maketrans(b"123456789", b"000000000")
+    __WIDE_INTEGER: Final[bytes] = b"0" * 19
+
+    def dumps(self, data: Dict[str, Any], default: Callable[[Any], Any]) -> str:
+        try:
+            return orjson.dumps(
+                data, default=default, option=orjson.OPT_NON_STR_KEYS
+            ).decode("utf-8")
+        except TypeError:
+            return super().dumps(data, default)
+
+    def loads(self, data: str) -> Any:
+        try:
+            raw = data.encode("utf-8")
+            if self.__WIDE_INTEGER in raw.translate(self.__DIGITS):
+                return super().loads(data)
+            return orjson.loads(raw)
+        except ValueError:
+            return super().loads(data)
+
+
+def available_backends() -> Dict[str, JSONBackend]:
+    """
+    Return every JSON backend that can be used on this system, keyed by name.
+    """
+    backends: Dict[str, JSONBackend] = {JSONBackend.name: JSONBackend()}
+    if orjson is not None:
+        backends[OrjsonBackend.name] = OrjsonBackend()
+    return backends
+
+
+_CONTAINS_BYTES: Final[Tuple[type, ...]] = (bytes, dict, list, tuple)
+
+
+def _find_bytes(
+    jd: Any, path: List[Union[str, int]], paths: List[List[Union[str, int]]]
+) -> None:
+    # Remember the path to every bytes value, skipping past everything else as quickly
+    # as possible since most of a blob is plain values.
+    if isinstance(jd, dict):
+        for key, value in jd.items():
+            if isinstance(value, _CONTAINS_BYTES):
+                if not isinstance(key, str):
+                    # Keys that aren't strings are written out the same way JSON writes them.
+                    key = json.dumps(key)
+                if isinstance(value, bytes):
+                    paths.append(path + [key])
+                else:
+                    path.append(key)
+                    _find_bytes(value, path, paths)
+                    path.pop()
+    else:
+        for i, value in enumerate(jd):
+            if isinstance(value, _CONTAINS_BYTES):
+                if isinstance(value, bytes):
+                    paths.append(path + [i])
+                else:
+                    path.append(i)
+                    _find_bytes(value, path, paths)
+                    path.pop()
+
+
+def _fix_v0(jd: Any) -> Any:
+    if type(jd) == dict:
+        # Fix each element in the dictionary.
+        for key in jd:
+            jd[key] = _fix_v0(jd[key])
+        return jd
+
+    if type(jd) == list:
+        # Could be serialized by us, could be a normal list.
+        if len(jd) >= 1 and jd[0] == BYTES_TAG_V0:
+            # This is a serialized bytestring
+            return bytes(jd[1:])
+
+        # Possibly one of these is a dictionary/list/serialized.
+        for i in range(len(jd)):
+            jd[i] = _fix_v0(jd[i])
+        return jd
+
+    # Normal value, its deserialized version is itself.
+    return jd
+
+
+class Codec:
+    """
+    Converts the arbitrary dictionaries that games store in data columns to and from JSON,
+    including any bytes found in them.
+    """
+
+    def __init__(self, backend: Optional[JSONBackend] = None) -> None:
+        """
+        Initialize the codec.
+
+        Parameters:
+            backend - The JSON library to use. Defaults to the fastest one available.
+        """
+        if backend is None:
+            backend = OrjsonBackend() if orjson is not None else JSONBackend()
+        self.backend = backend
+
+    def encode(self, data: Dict[str, Any]) -> str:
+        """
+        Given an arbitrary dict, serialize it to JSON.
+        """
+        found = False
+
+        def default(obj: Any) -> Any:
+            nonlocal found
+            if isinstance(obj, bytes):
+                found = True
+                return base64.b64encode(obj).decode("ascii")
+            raise TypeError(
+                f"Object of type {type(obj).__name__} is not JSON serializable"
+            )
+
+        encoded = self.backend.dumps(data, default)
+        if not found:
+            return encoded
+
+        # Only blobs that actually have bytes in them pay for finding where they are.
+        paths: List[List[Union[str, int]]] = []
+        _find_bytes(data, [], paths)
+        return self.backend.dumps({**data, BYTES_PATHS_V1: paths}, default)
+
+    def decode(self, data: str) -> Dict[str, Any]:
+        """
+        Given a string, deserialize it from JSON, converting bytes written by any
+        version of encode back to bytes.
+        """
+        jd = self.backend.loads(data)
+        if type(jd) != dict:
+            return jd
+
+        paths = jd.pop(BYTES_PATHS_V1, None)
+        if paths is not None:
+            for path in paths:
+                parent = jd
+                for key in path[:-1]:
+                    parent = parent[key]
+                parent[path[-1]] = base64.b64decode(parent[path[-1]])
+        elif BYTES_TAG_V0 in data:
+            jd = _fix_v0(jd)
+        return jd
@@ -1,7 +1,7 @@
 from sqlalchemy import Table, Column, UniqueConstraint  # type: ignore
 from sqlalchemy.types import String, Integer, JSON  # type: ignore
 from sqlalchemy.dialects.mysql import BIGINT as BigInteger  # type: ignore
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from bemani.common import GameConstants, ValidatedDict, Time
 from bemani.data.mysql.base import BaseData, metadata
@@ -103,6 +103,35 @@ class GameData(BaseData):
         result = cursor.fetchone()
         return ValidatedDict(self.deserialize(result["data"]))
 
+    def get_all_settings(
+        self, game: GameConstants, userids: Optional[List[UserID]] = None
+    ) -> List[Tuple[UserID, ValidatedDict]]:
+        """
+        Given a game, look up game-wide settings for every user in one query, optionally
+        only for some users.
+
+        Parameters:
+            game - Enum value identifying a game series.
+            userids - Optional list of user IDs to restrict the lookup to.
+
+        Returns:
+            A list of (UserID, ValidatedDict) tuples for each user that has settings.
+        """
+        if userids is not None and len(userids) == 0:
+            return []
+
+        sql = "SELECT userid, data FROM game_settings WHERE game = :game"
+        vals: Dict[str, Any] = {"game": game.value}
+        if userids is not None:
+            sql += " AND userid IN :userids"
+            vals["userids"] = list(set(userids))
+        cursor = self.execute(sql, vals)
+
+        return [
+            (UserID(result["userid"]), ValidatedDict(self.deserialize(result["data"])))
+            for result in cursor.fetchall()
+        ]
+
     def put_settings(
         self, game: GameConstants, userid: UserID, settings: Dict[str, Any]
     ) -> None:
@@ -1,10 +1,15 @@
+import json
+import os
 from sqlalchemy import Table, Column, UniqueConstraint  # type: ignore
 from sqlalchemy.types import String, Integer, JSON  # type: ignore
 from sqlalchemy.dialects.mysql import BIGINT as BigInteger  # type: ignore
+from sqlalchemy.engine.base import Connection
 from typing import Optional, Dict, List, Tuple, Any
 from typing_extensions import Final
 
 from bemani.common import GameConstants, ValidatedDict
+from bemani.data.cache import LookupCache
+from bemani.data.config import Config
 from bemani.data.mysql.base import BaseData, metadata
 from bemani.data.types import Machine, Arcade, UserID, ArcadeID
 
@@ -88,6 +93,87 @@ class MachineData(BaseData):
     # and thus will start at 1.
     DEFAULT_SETTINGS_ARCADE: Final[ArcadeID] = ArcadeID(-1)
 
+    def __init__(self, config: Config, conn: Connection) -> None:
+        super().__init__(config, conn)
+
+        # Machines and arcades are looked up on every packet but almost never change,
+        # so put a cache in front of them. This is shared by every MachineData in the
+        # process, and optionally with other processes through the cache directory.
+        directory: Optional[str] = None
+        if config.database.machine_cache_shared:
+            directory = os.path.join(config.cache_dir, "machinecache")
+        self.__cache = LookupCache.shared(
+            f"machine:{config.database.address}/{config.database.database}",
+            config.database.machine_cache_ttl,
+            directory,
+        )
+
+    def __encode_machine(self, machine: Optional[Machine]) -> str:
+        if machine is None:
+            return "null"
+        return json.dumps(
+            [
+                machine.id,
+                machine.pcbid,
+                machine.name,
+                machine.description,
+                machine.arcade,
+                machine.port,
+                machine.game.value if machine.game else None,
+                machine.version,
+                self.serialize(machine.data),
+            ]
+        )
+
+    def __decode_machine(self, data: str) -> Optional[Machine]:
+        values = json.loads(data)
+        if values is None:
+            return None
+        machineid, pcbid, name, description, arcade, port, game, version, extra = values
+        return Machine(
+            machineid,
+            pcbid,
+            name,
+            description,
+            arcade,
+            port,
+            GameConstants(game) if game else None,
+            version,
+            self.deserialize(extra),
+        )
+
+    def __encode_arcade(self, arcade: Optional[Arcade]) -> str:
+        if arcade is None:
+            return "null"
+        return json.dumps(
+            [
+                arcade.id,
+                arcade.name,
+                arcade.description,
+                arcade.pin,
+                arcade.region,
+                arcade.area,
+                self.serialize(arcade.data),
+                arcade.owners,
+            ]
+        )
+
+    def __decode_arcade(self, data: str) -> Optional[Arcade]:
+        values = json.loads(data)
+        if values is None:
+            return None
+        arcadeid, name, description, pin, region, area, extra, owners = values
+        return Arcade(
+            arcadeid,
+            name,
+            description,
+            pin,
+            region,
+            area,
+            self.deserialize(extra),
+            [UserID(owner) for owner in owners],
+        )
+
     def from_port(self, port: int) -> Optional[str]:
         """
         Given a port, look up the PCBID attached to that port.
@@ -167,6 +253,14 @@ class MachineData(BaseData):
         Returns:
             A Machine object representing a machine, or None if not found.
         """
+        return self.__cache.fetch(
+            f"machine:{pcbid}",
+            lambda: self.__get_machine(pcbid),
+            self.__encode_machine,
+            self.__decode_machine,
+        )
+
+    def __get_machine(self, pcbid: str) -> Optional[Machine]:
         sql = "SELECT name, description, arcadeid, id, port, game, version, data FROM machine WHERE pcbid = :pcbid"
         cursor = self.execute(sql, {"pcbid": pcbid})
         if cursor.rowcount != 1:
@@ -240,6 +334,7 @@ class MachineData(BaseData):
                 "data": self.serialize(machine.data),
             },
         )
+        self.__cache.invalidate(f"machine:{machine.pcbid}")
 
     def create_machine(
         self,
@@ -299,6 +394,8 @@ class MachineData(BaseData):
                 # Failed to add machine, try with new port
                 continue
 
+            # Make sure we don't return a cached lookup from before it existed.
+            self.__cache.invalidate(f"machine:{pcbid}")
             machine = self.get_machine(pcbid)
             if machine is not None:
                 return machine
@@ -312,6 +409,7 @@ class MachineData(BaseData):
         """
         sql = "DELETE FROM `machine` WHERE pcbid = :pcbid LIMIT 1"
         self.execute(sql, {"pcbid": pcbid})
+        self.__cache.invalidate(f"machine:{pcbid}")
 
     def create_arcade(
         self,
@@ -350,6 +448,7 @@ class MachineData(BaseData):
                 "INSERT INTO arcade_owner (userid, arcadeid) VALUES(:userid, :arcadeid)"
             )
             self.execute(sql, {"userid": owner, "arcadeid": arcadeid})
+        self.__cache.invalidate(f"arcade:{arcadeid}")
         new_arcade = self.get_arcade(arcadeid)
         if new_arcade is None:
             raise Exception("Failed to create an arcade!")
@@ -365,6 +464,14 @@ class MachineData(BaseData):
         Returns:
             An Arcade object if this arcade was found, or None otherwise.
         """
+        return self.__cache.fetch(
+            f"arcade:{arcadeid}",
+            lambda: self.__get_arcade(arcadeid),
+            self.__encode_arcade,
+            self.__decode_arcade,
+        )
+
+    def __get_arcade(self, arcadeid: ArcadeID) -> Optional[Arcade]:
         sql = (
             "SELECT name, description, pin, pref, area, data FROM arcade WHERE id = :id"
         )
@@ -421,6 +528,7 @@ class MachineData(BaseData):
                 "INSERT INTO arcade_owner (userid, arcadeid) VALUES(:userid, :arcadeid)"
             )
             self.execute(sql, {"userid": owner, "arcadeid": arcade.id})
+        self.__cache.invalidate(f"arcade:{arcade.id}")
 
     def destroy_arcade(self, arcadeid: ArcadeID) -> None:
         """
@@ -430,12 +538,17 @@ class MachineData(BaseData):
         Parameters:
             arcadeid - Integer specifying the arcade to delete.
         """
+        # Machines in this arcade are about to be unlinked, so they need invalidating too.
+        pcbids = [machine.pcbid for machine in self.get_all_machines(arcadeid)]
         sql = "DELETE FROM `arcade` WHERE id = :arcadeid LIMIT 1"
         self.execute(sql, {"arcadeid": arcadeid})
         sql = "DELETE FROM `arcade_owner` WHERE arcadeid = :arcadeid"
         self.execute(sql, {"arcadeid": arcadeid})
         sql = "UPDATE `machine` SET arcadeid = NULL WHERE arcadeid = :arcadeid"
         self.execute(sql, {"arcadeid": arcadeid})
+        self.__cache.invalidate(f"arcade:{arcadeid}")
+        for pcbid in pcbids:
+            self.__cache.invalidate(f"machine:{pcbid}")
 
     def get_all_arcades(self) -> List[Arcade]:
         """
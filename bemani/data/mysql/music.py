@@ -1,10 +1,10 @@
-from sqlalchemy import Table, Column, UniqueConstraint  # type: ignore
+from sqlalchemy import Table, Column, Index, UniqueConstraint  # type: ignore
 from sqlalchemy.exc import IntegrityError  # type: ignore
 from sqlalchemy.types import String, Integer, JSON  # type: ignore
 from sqlalchemy.dialects.mysql import BIGINT as BigInteger  # type: ignore
-from typing import Optional, Dict, List, Tuple, Any
+from typing import Callable, Iterator, Optional, Dict, List, Tuple, Any
 
-from bemani.common import GameConstants, Time
+from bemani.common import GameConstants, Time, ValidatedDict
 from bemani.data.exceptions import ScoreSaveException
 from bemani.data.mysql.base import BaseData, metadata
 from bemani.data.types import Score, Attempt, Song, UserID
@@ -31,6 +31,7 @@ score = Table(
     Column("lid", Integer, nullable=False, index=True),
     Column("data", JSON, nullable=False),
     UniqueConstraint("userid", "musicid", name="userid_musicid"),
+    Index("musicid_points_timestamp", "musicid", "points", "timestamp"),
     mysql_charset="utf8mb4",
 )
 
@@ -51,6 +52,51 @@ score_history = Table(
     Column("new_record", Integer, nullable=False),
     Column("data", JSON, nullable=False),
     UniqueConstraint("userid", "musicid", "timestamp", name="userid_musicid_timestamp"),
+    Index("musicid_userid", "musicid", "userid"),
+    mysql_charset="utf8mb4",
+)
+
+"""
+Table for storing attempts that were moved out of the score_history table by the
+scheduler once they got old enough. This has the same layout as score_history and
+keeps each attempt's original ID, but uses compressed rows since it is rarely read.
+Lookups of old attempts fall back to this table, and everything that only needs
+play counts uses the score_history_summary table below instead.
+"""
+score_history_archive = Table(
+    "score_history_archive",
+    metadata,
+    Column("id", Integer, nullable=False, primary_key=True, autoincrement=False),
+    Column("userid", BigInteger(unsigned=True), nullable=False),
+    Column("musicid", Integer, nullable=False),
+    Column("points", Integer, nullable=False),
+    Column("timestamp", Integer, nullable=False, index=True),
+    Column("lid", Integer, nullable=False),
+    Column("new_record", Integer, nullable=False),
+    Column("data", JSON, nullable=False),
+    Index("musicid_userid", "musicid", "userid"),
+    mysql_charset="utf8mb4",
+    mysql_row_format="COMPRESSED",
+)
+
+"""
+Table for storing a summary of each user's archived attempts on a particular song/chart,
+so that play counts and last played times don't need to look at archived attempts. The
+lastid column is the ID of the newest attempt folded into the summary, which lets an
+interrupted archival run pick back up without counting an attempt twice.
+"""
+score_history_summary = Table(
+    "score_history_summary",
+    metadata,
+    Column("userid", BigInteger(unsigned=True), nullable=False),
+    Column("musicid", Integer, nullable=False, index=True),
+    Column("plays", Integer, nullable=False),
+    Column("new_records", Integer, nullable=False),
+    Column("best_points", Integer, nullable=False),
+    Column("first_timestamp", Integer, nullable=False),
+    Column("last_timestamp", Integer, nullable=False),
+    Column("lastid", Integer, nullable=False),
+    UniqueConstraint("userid", "musicid", name="userid_musicid"),
     mysql_charset="utf8mb4",
 )
 
@@ -81,8 +127,146 @@ music = Table(
     mysql_charset="utf8mb4",
 )
 
+"""
+Table for storing running counters of attempts for a particular song/chart, such as
+total plays and clears. These are incremented every time an attempt is saved, so that
+clear rates can be looked up without scanning the score_history table. Like the score
+tables, this is keyed by internal musicid. Which counters are kept is up to the game
+that saves the attempt, so each counter is a separate row keyed by name.
+"""
+attempt_counter = Table(
+    "attempt_counter",
+    metadata,
+    Column("musicid", Integer, nullable=False),
+    Column("name", String(32), nullable=False),
+    Column("value", BigInteger, nullable=False),
+    UniqueConstraint("musicid", "name", name="musicid_name"),
+    mysql_charset="utf8mb4",
+)
+
+"""
+Table for storing a local copy of high scores pulled from remote BEMAPI servers by
+the scheduler, so that looking up scores never has to talk to a remote server. Much
+like the score table, this is keyed by musicid and a remote user, which is identified
+by the first of their cards (sorted) since remote users have no local user ID. The data
+column holds the score data already converted to the format that the game stores locally.
+"""
+remote_score = Table(
+    "remote_score",
+    metadata,
+    Column("serverid", Integer, nullable=False),
+    Column("musicid", Integer, nullable=False, index=True),
+    Column("cardid", String(16), nullable=False, index=True),
+    Column("points", Integer, nullable=False),
+    Column("timestamp", Integer, nullable=False),
+    Column("update", Integer, nullable=False, index=True),
+    Column("data", JSON, nullable=False),
+    UniqueConstraint("serverid", "musicid", "cardid", name="serverid_musicid_cardid"),
+    mysql_charset="utf8mb4",
+)
+
+"""
+Table mapping every card that a remote user has to the card that identifies them in
+the remote_score table, so that a user's remote scores can be found using any of their
+cards and so that remote scores can be attributed to a local user sharing a card.
+"""
+remote_card = Table(
+    "remote_card",
+    metadata,
+    Column("serverid", Integer, nullable=False),
+    Column("cardid", String(16), nullable=False, index=True),
+    Column("ownerid", String(16), nullable=False),
+    UniqueConstraint("serverid", "cardid", name="serverid_cardid"),
+    mysql_charset="utf8mb4",
+)
+
+"""
+Table for storing a local copy of play statistics pulled from remote BEMAPI servers
+by the scheduler, keyed by musicid.
+"""
+remote_statistic = Table(
+    "remote_statistic",
+    metadata,
+    Column("serverid", Integer, nullable=False),
+    Column("musicid", Integer, nullable=False, index=True),
+    Column("plays", Integer, nullable=False),
+    Column("clears", Integer, nullable=False),
+    Column("combos", Integer, nullable=False),
+    UniqueConstraint("serverid", "musicid", name="serverid_musicid"),
+    mysql_charset="utf8mb4",
+)
+
+"""
+Table for remembering when a particular kind of data was last pulled from a remote
+BEMAPI server for a game/version, so that the scheduler only has to ask for what
+changed since then and so that readers know how old the local copy is.
+"""
+remote_sync = Table(
+    "remote_sync",
+    metadata,
+    Column("serverid", Integer, nullable=False),
+    Column("game", String(32), nullable=False),
+    Column("version", Integer, nullable=False),
+    Column("type", String(32), nullable=False),
+    Column("timestamp", Integer, nullable=False),
+    UniqueConstraint(
+        "serverid", "game", "version", "type", name="serverid_game_version_type"
+    ),
+    mysql_charset="utf8mb4",
+)
+
 
 class MusicData(BaseData):
+    def __songid_chart_select(self, version: Optional[int]) -> str:
+        """
+        Construct a select statement mapping musicid to game songid/chart, suitable for
+        joining against the score or score_history tables. When version is None, the
+        songid/chart from the newest version of the game containing each song is used.
+        Expects a :game parameter, and a :version parameter if the version is given.
+        """
+        if version is not None:
+            return "SELECT id, songid, chart FROM music WHERE game = :game AND version = :version"
+        return (
+            "SELECT music.id AS id, music.songid AS songid, music.chart AS chart FROM music, "
+            + "(SELECT id, MAX(version) AS version FROM music WHERE game = :game GROUP BY id) latest "
+            + "WHERE music.id = latest.id AND music.version = latest.version AND music.game = :game"
+        )
+
+    def __plays_select(self, userid: str) -> str:
+        """
+        Construct a subquery counting a user's plays of the song in the music table being
+        selected from, including archived plays. The userid given is substituted into the
+        query as-is, so it should be a parameter or column name.
+        """
+        return (
+            "((SELECT COUNT(score_history.timestamp) FROM score_history WHERE score_history.musicid = music.id "
+            + f"AND score_history.userid = {userid}) + COALESCE((SELECT score_history_summary.plays FROM score_history_summary "
+            + f"WHERE score_history_summary.musicid = music.id AND score_history_summary.userid = {userid}), 0))"
+        )
+
+    def __grouped_plays_select(self, musicids: str, columns: str, where: str) -> str:
+        """
+        Construct a select statement counting plays, including archived plays, of the
+        songs in the musicids select grouped by the given columns, which must be one or
+        both of musicid and userid. Any extra where clause applies to both tables.
+        """
+        return (
+            f"SELECT {columns}, CAST(SUM(plays) AS SIGNED) AS plays FROM ("
+            + f"SELECT {columns}, COUNT(timestamp) AS plays FROM score_history WHERE musicid IN ({musicids}){where} GROUP BY {columns} "
+            + f"UNION ALL SELECT {columns}, plays FROM score_history_summary WHERE musicid IN ({musicids}){where}"
+            + f") counts GROUP BY {columns}"
+        )
+
+    def __get_archive_horizon(self) -> Optional[int]:
+        """
+        Look up the timestamp of the newest archived attempt, or None if nothing has been
+        archived. Attempts newer than this are never found in score_history_archive.
+        """
+        cursor = self.execute(
+            "SELECT MAX(timestamp) AS timestamp FROM score_history_archive"
+        )
+        return cursor.fetchone()["timestamp"]
+
     def __get_musicid(
         self, game: GameConstants, version: int, songid: int, songchart: int
     ) -> int:
@@ -189,12 +373,15 @@ class MusicData(BaseData):
         data: Dict[str, Any],
         new_record: bool,
         timestamp: Optional[int] = None,
+        counters: Optional[Dict[str, int]] = None,
     ) -> None:
         """
         Given a game/version/song/chart and user ID, save a single score attempt.
 
         Note that this is different than put_score above, because a user may have only one score
         per song/chart in a given game, but they can have as many history entries as times played.
+        Any counters given are added to the running counters for the song/chart, which can be
+        looked up later with get_clear_rates.
 
         Parameters:
             game - Enum value representing a game series.
@@ -207,6 +394,7 @@ class MusicData(BaseData):
             data - Optional data that the game wishes to record along with the score.
             new_record - Whether this score was a new record or not.
             timestamp - Optional integer specifying when the attempt happened.
+            counters - Optional dictionary of counter names to amounts to increment them by.
         """
         # First look up the song/chart from the music DB
         musicid = self.__get_musicid(game, version, songid, songchart)
@@ -235,6 +423,276 @@ class MusicData(BaseData):
                 f"There is already an attempt by {userid if userid is not None else 0} for music id {musicid} at {ts}"
             )
 
+        if counters:
+            self.__increment_counters({musicid: counters})
+
+    def __increment_counters(self, counters: Dict[int, Dict[str, int]]) -> None:
+        """
+        Given a dictionary of musicid to counter names and amounts, atomically add
+        each amount to the running counter, creating counters that don't exist yet.
+        """
+        values: List[str] = []
+        params: Dict[str, Any] = {}
+        for musicid, amounts in counters.items():
+            for name, amount in amounts.items():
+                i = len(values)
+                values.append(f"(:musicid{i}, :name{i}, :value{i})")
+                params[f"musicid{i}"] = musicid
+                params[f"name{i}"] = name
+                params[f"value{i}"] = amount
+        if not values:
+            return
+
+        sql = (
+            "INSERT INTO `attempt_counter` (musicid, name, value) VALUES "
+            + ", ".join(values)
+            + " ON DUPLICATE KEY UPDATE value = value + VALUES(value)"
+        )
+        self.execute(sql, params)
+
+    def get_clear_rates(
+        self,
+        game: GameConstants,
+        version: int,
+        songid: Optional[int] = None,
+        songchart: Optional[int] = None,
+    ) -> Dict[int, Dict[int, Dict[str, int]]]:
+        """
+        Look up the running attempt counters for a game, optionally limited to a song or a
+        single song/chart. These are maintained by put_attempt, so this doesn't need to look
+        at individual attempts.
+
+        Parameters:
+            game - Enum value representing a game series.
+            version - Integer representing which version of the game.
+            songid - Optional ID of the song according to the game.
+            songchart - Optional chart number according to the game.
+
+        Returns:
+            A dictionary keyed by songid, whos values are a dictionary keyed by chart, whos
+            values are a dictionary of counter names to values. Counters that were never
+            incremented for a chart are absent.
+        """
+        sql = (
+            "SELECT music.songid AS songid, music.chart AS chart, attempt_counter.name AS name, attempt_counter.value AS value "
+            + "FROM attempt_counter, music WHERE attempt_counter.musicid = music.id AND music.game = :game AND music.version = :version"
+        )
+        if songid is not None:
+            sql = sql + " AND music.songid = :songid"
+        if songchart is not None:
+            sql = sql + " AND music.chart = :songchart"
+        cursor = self.execute(
+            sql,
+            {
+                "game": game.value,
+                "version": version,
+                "songid": songid,
+                "songchart": songchart,
+            },
+        )
+
+        counters: Dict[int, Dict[int, Dict[str, int]]] = {}
+        for result in cursor.fetchall():
+            charts = counters.setdefault(result["songid"], {})
+            charts.setdefault(result["chart"], {})[result["name"]] = int(
+                result["value"]
+            )
+        return counters
+
+    def rebuild_attempt_counters(
+        self,
+        game: GameConstants,
+        counters: Callable[[int, ValidatedDict], Dict[str, int]],
+    ) -> int:
+        """
+        Throw away and recalculate the running attempt counters for every song in a game
+        from the score_history table, including archived attempts. This should be done with
+        no games connected and the scheduler stopped, since attempts saved or archived while
+        this runs may be counted twice or not at all.
+
+        Parameters:
+            game - Enum value representing a game series.
+            counters - A function which, given the points and data of an attempt, returns
+                       the counters that put_attempt would have been given for it.
+
+        Returns:
+            The number of attempts that were counted.
+        """
+        params: Dict[str, Any] = {"game": game.value}
+        musicids = "SELECT DISTINCT(id) FROM music WHERE game = :game"
+        self.execute(
+            f"DELETE FROM `attempt_counter` WHERE musicid IN ({musicids})", params
+        )
+
+        # Walk the history in ID order a chunk at a time so we never hold onto all of it.
+        totals: Dict[int, Dict[str, int]] = {}
+        attempts = 0
+        for table in ["score_history", "score_history_archive"]:
+            lastid = 0
+            while True:
+                cursor = self.execute(
+                    f"SELECT id, musicid, points, data FROM {table} WHERE musicid IN ({musicids}) "
+                    + "AND id > :lastid ORDER BY id ASC LIMIT 10000",
+                    {**params, "lastid": lastid},
+                )
+                results = cursor.fetchall()
+                if not results:
+                    break
+
+                for result in results:
+                    lastid = result["id"]
+                    attempts += 1
+                    chart = totals.setdefault(result["musicid"], {})
+                    for name, amount in counters(
+                        result["points"],
+                        ValidatedDict(self.deserialize(result["data"])),
+                    ).items():
+                        chart[name] = chart.get(name, 0) + amount
+
+        # Write the totals back a chunk of songs at a time.
+        musicidlist = list(totals.keys())
+        for i in range(0, len(musicidlist), 1000):
+            self.__increment_counters(
+                {musicid: totals[musicid] for musicid in musicidlist[i : (i + 1000)]}
+            )
+        return attempts
+
+    def archive_attempts(
+        self,
+        cutoff: int,
+        chunksize: int = 10000,
+        chunks: Optional[int] = None,
+    ) -> int:
+        """
+        Move attempts older than a cutoff out of the score_history table and into the
+        score_history_archive table, folding each one into the summary of plays for
+        its user and song/chart. Play counts, last played songs and hit charts keep
+        counting archived attempts, and attempt lookups find them when asked to look
+        far enough back, but everyday lookups no longer have to wade through them.
+
+        This works through attempts oldest first a chunk at a time, and everything it
+        does is safe to repeat, so it can be stopped at any point and picked back up
+        later by calling it again.
+
+        Parameters:
+            cutoff - Timestamp of the oldest attempt that should stay in score_history.
+            chunksize - Number of attempts to move at once.
+            chunks - Optional maximum number of chunks to move before returning.
+
+        Returns:
+            The number of attempts that were archived.
+        """
+        columns = [
+            "userid",
+            "musicid",
+            "plays",
+            "new_records",
+            "best_points",
+            "first_timestamp",
+            "last_timestamp",
+            "lastid",
+        ]
+        archived = 0
+        while chunks is None or chunks > 0:
+            cursor = self.execute(
+                "SELECT id, userid, musicid, points, timestamp, new_record FROM score_history "
+                + "WHERE timestamp < :cutoff ORDER BY id ASC LIMIT :chunksize",
+                {"cutoff": cutoff, "chunksize": chunksize},
+            )
+            results = cursor.fetchall()
+            if not results:
+                break
+            if chunks is not None:
+                chunks -= 1
+
+            # First, copy the attempts over, remembering which ones an interrupted run
+            # already got to, since it may have also counted them.
+            ids = tuple(result["id"] for result in results)
+            cursor = self.execute(
+                "SELECT id FROM score_history_archive WHERE id IN :ids", {"ids": ids}
+            )
+            copied = {result["id"] for result in cursor.fetchall()}
+            self.execute(
+                "INSERT INTO `score_history_archive` (id, userid, musicid, points, timestamp, lid, new_record, data) "
+                + "SELECT id, userid, musicid, points, timestamp, lid, new_record, data FROM score_history WHERE id IN :ids "
+                + "ON DUPLICATE KEY UPDATE id = VALUES(id)",
+                {"ids": ids},
+            )
+
+            # Now, fold them into the existing summaries, skipping any that an interrupted
+            # run already counted. Summaries are written in ID order, so those are the ones
+            # that aren't newer than the last attempt folded in.
+            cursor = self.execute(
+                f"SELECT {', '.join(columns)} FROM score_history_summary "
+                + "WHERE userid IN :userids AND musicid IN :musicids",
+                {
+                    "userids": tuple({result["userid"] for result in results}),
+                    "musicids": tuple({result["musicid"] for result in results}),
+                },
+            )
+            summaries: Dict[Tuple[int, int], Dict[str, int]] = {
+                (summary["userid"], summary["musicid"]): {
+                    column: summary[column] for column in columns
+                }
+                for summary in cursor.fetchall()
+            }
+            changed: Dict[Tuple[int, int], Dict[str, int]] = {}
+            for result in results:
+                key = (result["userid"], result["musicid"])
+                summary = summaries.get(key)
+                if summary is None:
+                    summary = {
+                        "userid": result["userid"],
+                        "musicid": result["musicid"],
+                        "plays": 0,
+                        "new_records": 0,
+                        "best_points": result["points"],
+                        "first_timestamp": result["timestamp"],
+                        "last_timestamp": result["timestamp"],
+                        "lastid": 0,
+                    }
+                    summaries[key] = summary
+                if result["id"] in copied and result["id"] <= summary["lastid"]:
+                    continue
+
+                summary["plays"] += 1
+                summary["new_records"] += 1 if result["new_record"] == 1 else 0
+                summary["best_points"] = max(summary["best_points"], result["points"])
+                summary["first_timestamp"] = min(
+                    summary["first_timestamp"], result["timestamp"]
+                )
+                summary["last_timestamp"] = max(
+                    summary["last_timestamp"], result["timestamp"]
+                )
+                summary["lastid"] = max(summary["lastid"], result["id"])
+                changed[key] = summary
+
+            if changed:
+                values: List[str] = []
+                params: Dict[str, Any] = {}
+                for i, summary in enumerate(changed.values()):
+                    values.append(
+                        "(" + ", ".join(f":{column}{i}" for column in columns) + ")"
+                    )
+                    params.update(
+                        {f"{column}{i}": summary[column] for column in columns}
+                    )
+                self.execute(
+                    f"INSERT INTO `score_history_summary` ({', '.join(columns)}) VALUES "
+                    + ", ".join(values)
+                    + " ON DUPLICATE KEY UPDATE "
+                    + ", ".join(
+                        f"{column} = VALUES({column})" for column in columns[2:]
+                    ),
+                    params,
+                )
+
+            # Finally, now that they're safely archived, get rid of the originals.
+            self.execute("DELETE FROM `score_history` WHERE id IN :ids", {"ids": ids})
+            archived += len(results)
+
+        return archived
+
     def get_score(
         self,
         game: GameConstants,
@@ -258,7 +716,7 @@ class MusicData(BaseData):
         """
         sql = (
             "SELECT music.songid AS songid, music.chart AS chart, score.id AS scorekey, score.timestamp AS timestamp, score.update AS `update`, score.lid AS lid, "
-            + "(select COUNT(score_history.timestamp) FROM score_history WHERE score_history.musicid = music.id AND score_history.userid = :userid) AS plays, "
+            + f"{self.__plays_select(':userid')} AS plays, "
             + "score.points AS points, score.data AS data FROM score, music WHERE score.userid = :userid AND score.musicid = music.id "
             + "AND music.game = :game AND music.version = :version AND music.songid = :songid AND music.chart = :songchart"
         )
@@ -306,7 +764,7 @@ class MusicData(BaseData):
         sql = (
             "SELECT music.songid AS songid, music.chart AS chart, score.id AS scorekey, score.timestamp AS timestamp, score.update AS `update`, "
             + "score.userid AS userid, score.lid AS lid, "
-            + "(select COUNT(score_history.timestamp) FROM score_history WHERE score_history.musicid = music.id AND score_history.userid = score.userid) AS plays, "
+            + f"{self.__plays_select('score.userid')} AS plays, "
             + "score.points AS points, score.data AS data FROM score, music WHERE score.id = :scorekey AND score.musicid = music.id "
             + "AND music.game = :game AND music.version = :version"
         )
@@ -359,7 +817,7 @@ class MusicData(BaseData):
         """
         sql = (
             "SELECT music.songid AS songid, music.chart AS chart, score.id AS scorekey, score.timestamp AS timestamp, score.update AS `update`, score.lid AS lid, "
-            + "(select COUNT(score_history.timestamp) FROM score_history WHERE score_history.musicid = music.id AND score_history.userid = :userid) AS plays, "
+            + f"{self.__plays_select(':userid')} AS plays, "
             + "score.points AS points, score.data AS data FROM score, music WHERE score.userid = :userid AND score.musicid = music.id "
             + "AND music.game = :game AND music.version = :version"
         )
@@ -411,10 +869,11 @@ class MusicData(BaseData):
         Returns:
             A list of tuples, containing the songid and the number of plays across all charts for that song.
         """
+        musicids = "SELECT id FROM music WHERE game = :game AND version = :version"
         sql = (
-            "SELECT music.songid AS songid, COUNT(score_history.timestamp) AS plays FROM score_history, music "
-            + "WHERE score_history.userid = :userid AND score_history.musicid = music.id "
-            + "AND music.game = :game AND music.version = :version "
+            "SELECT music.songid AS songid, CAST(SUM(counts.plays) AS SIGNED) AS plays "
+            + f"FROM ({self.__grouped_plays_select(musicids, 'musicid', ' AND userid = :userid')}) counts, music "
+            + "WHERE counts.musicid = music.id AND music.game = :game AND music.version = :version "
             + "GROUP BY songid ORDER BY plays DESC LIMIT :count"
         )
         cursor = self.execute(
@@ -443,9 +902,13 @@ class MusicData(BaseData):
         Returns:
             A list of tuples, containing the songid and the last played time for this song.
         """
+        # Archived plays only remember when the user last played each song/chart, which is
+        # all that is needed here.
         sql = (
-            "SELECT DISTINCT(music.songid) AS songid, score_history.timestamp AS timestamp FROM score_history, music "
-            + "WHERE score_history.userid = :userid AND score_history.musicid = music.id "
+            "SELECT DISTINCT(music.songid) AS songid, played.timestamp AS timestamp FROM ("
+            + "SELECT musicid, timestamp FROM score_history WHERE userid = :userid UNION ALL "
+            + "SELECT musicid, last_timestamp AS timestamp FROM score_history_summary WHERE userid = :userid"
+            + ") played, music WHERE played.musicid = music.id "
             + "AND music.game = :game AND music.version = :version "
             + "ORDER BY timestamp DESC LIMIT :count"
         )
@@ -478,17 +941,26 @@ class MusicData(BaseData):
         Returns:
             A list of tuples, containing the songid and the number of plays across all charts for that song.
         """
-        sql = (
-            "SELECT music.songid AS songid, COUNT(score_history.timestamp) AS plays FROM score_history, music "
-            + "WHERE score_history.musicid = music.id AND music.game = :game AND music.version = :version "
-        )
+        musicids = "SELECT id FROM music WHERE game = :game AND version = :version"
         timestamp: Optional[int] = None
         if days is not None:
-            # Only select the last X days of hit chart
-            sql = sql + "AND score_history.timestamp > :timestamp "
+            # Only select the last X days of hit chart. Summaries can't be limited by time,
+            # so count archived attempts themselves, of which only recent ones are looked at.
             timestamp = Time.now() - (Time.SECONDS_IN_DAY * days)
+            playselect = (
+                f"SELECT musicid, COUNT(timestamp) AS plays FROM score_history WHERE musicid IN ({musicids}) "
+                + "AND timestamp > :timestamp GROUP BY musicid UNION ALL "
+                + f"SELECT musicid, COUNT(timestamp) AS plays FROM score_history_archive WHERE musicid IN ({musicids}) "
+                + "AND timestamp > :timestamp GROUP BY musicid"
+            )
+        else:
+            playselect = self.__grouped_plays_select(musicids, "musicid", "")
 
-        sql = sql + "GROUP BY songid ORDER BY plays DESC LIMIT :count"
+        sql = (
+            f"SELECT music.songid AS songid, CAST(SUM(counts.plays) AS SIGNED) AS plays FROM ({playselect}) counts, music "
+            + "WHERE counts.musicid = music.id AND music.game = :game AND music.version = :version "
+            + "GROUP BY songid ORDER BY plays DESC LIMIT :count"
+        )
         cursor = self.execute(
             sql,
             {
@@ -661,17 +1133,50 @@ class MusicData(BaseData):
         Returns:
             A list of UserID, Score objects representing all high scores for a game.
         """
-        # First, construct the queries for grabbing the songid/chart
-        if version is not None:
-            songidquery = "SELECT songid FROM music WHERE music.id = score.musicid AND game = :game AND version = :version"
-            chartquery = "SELECT chart FROM music WHERE music.id = score.musicid AND game = :game AND version = :version"
-        else:
-            songidquery = "SELECT songid FROM music WHERE music.id = score.musicid AND game = :game ORDER BY version DESC LIMIT 1"
-            chartquery = "SELECT chart FROM music WHERE music.id = score.musicid AND game = :game ORDER BY version DESC LIMIT 1"
+        sql, params = self.__all_scores_query(
+            game, version, userid, songid, songchart, since, until
+        )
+        cursor = self.execute(sql, params)
+        return [self.__format_user_score(result) for result in cursor.fetchall()]
+
+    def iter_all_scores(
+        self,
+        game: GameConstants,
+        version: Optional[int] = None,
+        userid: Optional[UserID] = None,
+        songid: Optional[int] = None,
+        songchart: Optional[int] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+    ) -> Iterator[Tuple[UserID, Score]]:
+        """
+        Look up all of a game's high scores for all users, the same as get_all_scores. However,
+        scores are streamed from the DB and decoded as they are iterated over instead of all
+        being loaded at once, so this should be used when walking every score on the network.
+
+        Parameters:
+            game - Enum value representing a game series.
+            version - Integer representing which version of the game.
 
-        # Select statement for getting play count
-        playselect = "SELECT COUNT(timestamp) FROM score_history WHERE score_history.musicid = score.musicid AND score_history.userid = score.userid"
+        Returns:
+            A generator of UserID, Score objects representing all high scores for a game.
+        """
+        sql, params = self.__all_scores_query(
+            game, version, userid, songid, songchart, since, until
+        )
+        for result in self.stream(sql, params):
+            yield self.__format_user_score(result)
 
+    def __all_scores_query(
+        self,
+        game: GameConstants,
+        version: Optional[int],
+        userid: Optional[UserID],
+        songid: Optional[int],
+        songchart: Optional[int],
+        since: Optional[int],
+        until: Optional[int],
+    ) -> Tuple[str, Dict[str, Any]]:
         # Now, construct the inner select statement so we can choose which scores we care about
         innerselect = "SELECT DISTINCT(id) FROM music WHERE game = :game"
         if version is not None:
@@ -681,22 +1186,42 @@ class MusicData(BaseData):
         if songchart is not None:
             innerselect = innerselect + " AND chart = :songchart"
 
-        # Finally, construct the full query
-        sql = (
-            "SELECT ({}) AS songid, ({}) AS chart, id AS scorekey, points, timestamp, `update`, lid, data, userid, ({}) AS plays "
-            "FROM score WHERE musicid IN ({})"
-        ).format(songidquery, chartquery, playselect, innerselect)
-
-        # Now, limit the query
+        # Limit the scores to the requested user and time range.
+        scorewhere = ""
         if userid is not None:
-            sql = sql + " AND userid = :userid"
+            scorewhere = scorewhere + " AND score.userid = :userid"
         if since is not None:
-            sql = sql + " AND score.update >= :since"
+            scorewhere = scorewhere + " AND score.update >= :since"
         if until is not None:
-            sql = sql + " AND score.update < :until"
+            scorewhere = scorewhere + " AND score.update < :until"
+
+        # Count plays for every user/song we might return in one grouped pass over the
+        # score_history table instead of once per score.
+        playwhere = " AND userid = :userid" if userid is not None else ""
+        if since is not None or until is not None:
+            # Plays still count every attempt, but only for the user/songs whose scores
+            # are returned, so that looking up recent changes doesn't group the game's
+            # entire play history.
+            playwhere = (
+                playwhere
+                + f" AND (musicid, userid) IN (SELECT score.musicid, score.userid FROM score WHERE score.musicid IN ({innerselect}){scorewhere})"
+            )
+        playselect = self.__grouped_plays_select(
+            innerselect,
+            "musicid, userid",
+            playwhere,
+        )
 
-        # Now, query itself
-        cursor = self.execute(
+        # Finally, construct the full query
+        sql = (
+            "SELECT songs.songid AS songid, songs.chart AS chart, score.id AS scorekey, score.points AS points, score.timestamp AS timestamp, "
+            + "score.update AS `update`, score.lid AS lid, score.data AS data, score.userid AS userid, COALESCE(plays.plays, 0) AS plays "
+            + f"FROM score JOIN ({self.__songid_chart_select(version)}) songs ON songs.id = score.musicid "
+            + f"LEFT JOIN ({playselect}) plays ON plays.musicid = score.musicid AND plays.userid = score.userid "
+            + f"WHERE score.musicid IN ({innerselect}){scorewhere}"
+        )
+
+        return (
             sql,
             {
                 "game": game.value,
@@ -709,27 +1234,21 @@ class MusicData(BaseData):
             },
         )
 
-        # Objectify result
-        scores = []
-        for result in cursor.fetchall():
-            scores.append(
-                (
-                    UserID(result["userid"]),
-                    Score(
-                        result["scorekey"],
-                        result["songid"],
-                        result["chart"],
-                        result["points"],
-                        result["timestamp"],
-                        result["update"],
-                        result["lid"],
-                        result["plays"],
-                        self.deserialize(result["data"]),
-                    ),
-                )
-            )
-
-        return scores
+    def __format_user_score(self, result: Any) -> Tuple[UserID, Score]:
+        return (
+            UserID(result["userid"]),
+            Score(
+                result["scorekey"],
+                result["songid"],
+                result["chart"],
+                result["points"],
+                result["timestamp"],
+                result["update"],
+                result["lid"],
+                result["plays"],
+                self.deserialize(result["data"]),
+            ),
+        )
 
     def get_all_records(
         self,
@@ -754,73 +1273,88 @@ class MusicData(BaseData):
         Returns:
             A list of UserID, Score objects representing all high scores for a game.
         """
-        # First, construct the queries for grabbing the songid/chart
-        if version is not None:
-            songidquery = "SELECT songid FROM music WHERE music.id = score.musicid AND game = :game AND version = :version"
-            chartquery = "SELECT chart FROM music WHERE music.id = score.musicid AND game = :game AND version = :version"
-        else:
-            songidquery = "SELECT songid FROM music WHERE music.id = score.musicid AND game = :game ORDER BY version DESC LIMIT 1"
-            chartquery = "SELECT chart FROM music WHERE music.id = score.musicid AND game = :game ORDER BY version DESC LIMIT 1"
+        sql, params = self.__all_records_query(game, version, userlist, locationlist)
+        cursor = self.execute(sql, params)
+        return [self.__format_user_score(result) for result in cursor.fetchall()]
+
+    def iter_all_records(
+        self,
+        game: GameConstants,
+        version: Optional[int] = None,
+        userlist: Optional[List[UserID]] = None,
+        locationlist: Optional[List[int]] = None,
+    ) -> Iterator[Tuple[UserID, Score]]:
+        """
+        Look up all of a game's records, the same as get_all_records. However, records are
+        streamed from the DB and decoded as they are iterated over instead of all being loaded
+        at once.
+
+        Parameters:
+            game - Enum value representing a game series.
+            version - Integer representing which version of the game.
+            userlist - List of UserIDs to limit the search to.
+            locationlist - A list of location IDs to limit searches to.
 
-        # Next, get a list of all songs that were played given the input criteria
+        Returns:
+            A generator of UserID, Score objects representing all high scores for a game.
+        """
+        sql, params = self.__all_records_query(game, version, userlist, locationlist)
+        for result in self.stream(sql, params):
+            yield self.__format_user_score(result)
+
+    def __all_records_query(
+        self,
+        game: GameConstants,
+        version: Optional[int],
+        userlist: Optional[List[UserID]],
+        locationlist: Optional[List[int]],
+    ) -> Tuple[str, Dict[str, Any]]:
+        # First, get a list of all songs that were played given the input criteria
         musicid_sql = "SELECT DISTINCT(score.musicid) FROM score, music WHERE score.musicid = music.id AND music.game = :game"
         params: Dict[str, Any] = {"game": game.value}
         if version is not None:
             musicid_sql = musicid_sql + " AND music.version = :version"
             params["version"] = version
 
-        # Figure out where the record was earned
+        # Figure out where the record was earned and who got it. These restrictions apply to
+        # both sides of the join below so that we find the best score amongst those that match.
+        restrictions = ""
         if locationlist is not None:
             if len(locationlist) == 0:
                 # We don't have any locations, but SQL will shit the bed, so lets add a default one.
                 locationlist.append(-1)
-            location_sql = "AND score.lid IN :locationlist"
+            restrictions = restrictions + " AND {table}.lid IN :locationlist"
             params["locationlist"] = tuple(locationlist)
-        else:
-            location_sql = ""
-
-        # Figure out who got the record
         if userlist is not None:
             if len(userlist) == 0:
                 # We don't have any users, but SQL will shit the bed, so lets add a fake one.
                 userlist.append(UserID(-1))
-            user_sql = f"SELECT userid FROM score WHERE score.musicid = played.musicid AND score.userid IN :userlist {location_sql} ORDER BY points DESC, timestamp DESC LIMIT 1"
+            restrictions = restrictions + " AND {table}.userid IN :userlist"
             params["userlist"] = tuple(userlist)
-        else:
-            user_sql = f"SELECT userid FROM score WHERE score.musicid = played.musicid {location_sql} ORDER BY points DESC, timestamp DESC LIMIT 1"
-        records_sql = (
-            f"SELECT ({user_sql}) AS userid, musicid FROM ({musicid_sql}) played"
+
+        # A score is the record for a song when there is no better score for that song. Better
+        # means more points, or the same points earned later since king-of-the-hill rules are in
+        # effect. This walks the (musicid, points, timestamp) index instead of sorting every
+        # song's scores separately.
+        better_sql = (
+            "score.musicid = better.musicid AND (better.points > score.points OR "
+            + "(better.points = score.points AND better.timestamp > score.timestamp) OR "
+            + "(better.points = score.points AND better.timestamp = score.timestamp AND better.id > score.id))"
         )
 
-        # Now, join it up against the score and music table to grab the info we need
+        # Count plays for every song in one grouped pass over the score_history table.
+        playselect = self.__grouped_plays_select(musicid_sql, "musicid", "")
+
+        # Now, join it up against the music table and play counts to grab the info we need
         sql = (
-            "SELECT ({}) AS songid, ({}) AS chart, score.points AS points, score.userid AS userid, score.id AS scorekey, score.data AS data, "
-            + "score.timestamp AS timestamp, score.update AS `update`, "
-            + "score.lid AS lid, (select COUNT(score_history.timestamp) FROM score_history WHERE score_history.musicid = score.musicid) AS plays "
-            + "FROM score, ({}) records WHERE records.userid = score.userid AND records.musicid = score.musicid"
-        ).format(songidquery, chartquery, records_sql)
-        cursor = self.execute(sql, params)
-
-        scores = []
-        for result in cursor.fetchall():
-            scores.append(
-                (
-                    UserID(result["userid"]),
-                    Score(
-                        result["scorekey"],
-                        result["songid"],
-                        result["chart"],
-                        result["points"],
-                        result["timestamp"],
-                        result["update"],
-                        result["lid"],
-                        result["plays"],
-                        self.deserialize(result["data"]),
-                    ),
-                )
-            )
-
-        return scores
+            "SELECT songs.songid AS songid, songs.chart AS chart, score.points AS points, score.userid AS userid, score.id AS scorekey, score.data AS data, "
+            + "score.timestamp AS timestamp, score.update AS `update`, score.lid AS lid, COALESCE(plays.plays, 0) AS plays "
+            + f"FROM score JOIN ({self.__songid_chart_select(version)}) songs ON songs.id = score.musicid "
+            + f"LEFT JOIN score better ON {better_sql}{restrictions.format(table='better')} "
+            + f"LEFT JOIN ({playselect}) plays ON plays.musicid = score.musicid "
+            + f"WHERE score.musicid IN ({musicid_sql}){restrictions.format(table='score')} AND better.id IS NULL"
+        )
+        return sql, params
 
     def get_attempt_by_key(
         self, game: GameConstants, version: int, key: int
@@ -836,20 +1370,24 @@ class MusicData(BaseData):
         Returns:
             The optional data stored by the game previously, or None if no score exists.
         """
-        sql = (
-            "SELECT music.songid AS songid, music.chart AS chart, score_history.id AS scorekey, score_history.timestamp AS timestamp, score_history.userid AS userid, "
-            + "score_history.lid AS lid, score_history.new_record AS new_record, score_history.points AS points, score_history.data AS data FROM score_history, music "
-            + "WHERE score_history.id = :scorekey AND score_history.musicid = music.id AND music.game = :game AND music.version = :version"
-        )
-        cursor = self.execute(
-            sql,
-            {
-                "game": game.value,
-                "version": version,
-                "scorekey": key,
-            },
-        )
-        if cursor.rowcount != 1:
+        # Attempts keep their key when archived, so look there if it isn't a recent one.
+        for table in ["score_history", "score_history_archive"]:
+            sql = (
+                "SELECT music.songid AS songid, music.chart AS chart, history.id AS scorekey, history.timestamp AS timestamp, history.userid AS userid, "
+                + f"history.lid AS lid, history.new_record AS new_record, history.points AS points, history.data AS data FROM {table} history, music "
+                + "WHERE history.id = :scorekey AND history.musicid = music.id AND music.game = :game AND music.version = :version"
+            )
+            cursor = self.execute(
+                sql,
+                {
+                    "game": game.value,
+                    "version": version,
+                    "scorekey": key,
+                },
+            )
+            if cursor.rowcount == 1:
+                break
+        else:
             # score doesn't exist
             return None
 
@@ -889,6 +1427,95 @@ class MusicData(BaseData):
         Returns:
             A list of UserID, Attempt objects representing all score attempts for a game, sorted newest to oldest attempts.
         """
+        columns, where, params = self.__all_attempts_query(
+            game, version, userid, songid, songchart, timelimit
+        )
+        paging = ""
+        if limit is not None:
+            paging = paging + " LIMIT :limit"
+            params["limit"] = limit
+        if offset is not None:
+            paging = paging + " OFFSET :offset"
+            params["offset"] = offset
+
+        # Archived attempts are older than anything left in score_history, except for the
+        # odd attempt saved late. So, only look at them when they could be in the results.
+        horizon = self.__get_archive_horizon()
+        archived = horizon is not None and (timelimit is None or timelimit <= horizon)
+
+        # Finally, query recent attempts, which is all that a page of results usually needs.
+        results = None
+        if not archived or limit is not None:
+            sql = f"SELECT {columns} FROM score_history WHERE {where} ORDER BY timestamp DESC{paging}"
+            results = self.execute(sql, params).fetchall()
+            if archived and (
+                limit is None
+                or len(results) < limit
+                or results[-1]["timestamp"] <= horizon
+            ):
+                results = None
+
+        if results is None:
+            window = ""
+            if limit is not None:
+                # Each table only needs to provide enough attempts to fill the page.
+                window = " ORDER BY timestamp DESC LIMIT :window"
+                params["window"] = limit + (offset or 0)
+            history = " UNION ALL ".join(
+                f"(SELECT id, userid, musicid, points, timestamp, lid, new_record, data FROM {table} WHERE {where}{window})"
+                for table in ["score_history", "score_history_archive"]
+            )
+            sql = f"SELECT {columns} FROM ({history}) score_history ORDER BY timestamp DESC{paging}"
+            results = self.execute(sql, params).fetchall()
+
+        # Now objectify the attempts
+        return [self.__format_user_attempt(result) for result in results]
+
+    def iter_all_attempts(
+        self,
+        game: GameConstants,
+        version: Optional[int] = None,
+        userid: Optional[UserID] = None,
+        songid: Optional[int] = None,
+        songchart: Optional[int] = None,
+        timelimit: Optional[int] = None,
+    ) -> Iterator[Tuple[Optional[UserID], Attempt]]:
+        """
+        Look up all of the attempts to score for a particular game, the same as get_all_attempts.
+        However, attempts are streamed from the DB and decoded as they are iterated over instead
+        of all being loaded at once, so this should be used when aggregating every attempt on the
+        network. Note that in order to avoid sorting every attempt, they are returned in no
+        particular order.
+
+        Parameters:
+            game - Enum value representing a game series.
+            version - Integer representing which version of the game.
+
+        Returns:
+            A generator of UserID, Attempt objects representing all score attempts for a game.
+        """
+        columns, where, params = self.__all_attempts_query(
+            game, version, userid, songid, songchart, timelimit
+        )
+        horizon = self.__get_archive_horizon()
+        tables = ["score_history"]
+        if horizon is not None and (timelimit is None or timelimit <= horizon):
+            tables.append("score_history_archive")
+
+        for table in tables:
+            sql = f"SELECT {columns} FROM {table} score_history WHERE {where}"
+            for result in self.stream(sql, params):
+                yield self.__format_user_attempt(result)
+
+    def __all_attempts_query(
+        self,
+        game: GameConstants,
+        version: Optional[int],
+        userid: Optional[UserID],
+        songid: Optional[int],
+        songchart: Optional[int],
+        timelimit: Optional[int],
+    ) -> Tuple[str, str, Dict[str, Any]]:
         # First, construct the queries for grabbing the songid/chart
         if version is not None:
             songidquery = "SELECT songid FROM music WHERE music.id = score_history.musicid AND game = :game AND version = :version"
@@ -906,26 +1533,17 @@ class MusicData(BaseData):
         if songchart is not None:
             innerselect = innerselect + " AND chart = :songchart"
 
-        # Finally, construct the full query
-        sql = (
-            "SELECT ({}) AS songid, ({}) AS chart, id AS scorekey, timestamp, points, new_record, lid, data, userid "
-            "FROM score_history WHERE musicid IN ({})"
-        ).format(songidquery, chartquery, innerselect)
-
-        # Now, limit the query
+        # Now, construct the filter for the attempts we care about
+        where = f"musicid IN ({innerselect})"
         if userid is not None:
-            sql = sql + " AND userid = :userid"
+            where = where + " AND userid = :userid"
         if timelimit is not None:
-            sql = sql + " AND timestamp >= :timestamp"
-        sql = sql + " ORDER BY timestamp DESC"
-        if limit is not None:
-            sql = sql + " LIMIT :limit"
-        if offset is not None:
-            sql = sql + " OFFSET :offset"
+            where = where + " AND timestamp >= :timestamp"
 
-        # Now, query itself
-        cursor = self.execute(
-            sql,
+        columns = f"({songidquery}) AS songid, ({chartquery}) AS chart, id AS scorekey, timestamp, points, new_record, lid, data, userid"
+        return (
+            columns,
+            where,
             {
                 "game": game.value,
                 "version": version,
@@ -933,28 +1551,515 @@ class MusicData(BaseData):
                 "songid": songid,
                 "songchart": songchart,
                 "timestamp": timelimit,
-                "limit": limit,
-                "offset": offset,
             },
         )
 
-        # Now objectify the attempts
-        attempts = []
-        for result in cursor.fetchall():
-            attempts.append(
-                (
-                    UserID(result["userid"]) if result["userid"] > 0 else None,
-                    Attempt(
-                        result["scorekey"],
-                        result["songid"],
-                        result["chart"],
-                        result["points"],
-                        result["timestamp"],
-                        result["lid"],
-                        True if result["new_record"] == 1 else False,
-                        self.deserialize(result["data"]),
-                    ),
+    def __format_user_attempt(self, result: Any) -> Tuple[Optional[UserID], Attempt]:
+        return (
+            UserID(result["userid"]) if result["userid"] > 0 else None,
+            Attempt(
+                result["scorekey"],
+                result["songid"],
+                result["chart"],
+                result["points"],
+                result["timestamp"],
+                result["lid"],
+                True if result["new_record"] == 1 else False,
+                self.deserialize(result["data"]),
+            ),
+        )
+
+    def __upsert(
+        self,
+        table: str,
+        columns: List[str],
+        rows: List[Dict[str, Any]],
+        updates: List[str],
+    ) -> None:
+        """
+        Insert rows into a table a chunk at a time, overwriting the given columns of
+        any row that already exists with the same unique key.
+        """
+        for start in range(0, len(rows), 500):
+            values: List[str] = []
+            params: Dict[str, Any] = {}
+            for i, row in enumerate(rows[start : (start + 500)]):
+                values.append(
+                    "(" + ", ".join(f":{column}{i}" for column in columns) + ")"
                 )
+                for column in columns:
+                    params[f"{column}{i}"] = row[column]
+
+            sql = (
+                f"INSERT INTO `{table}` ("
+                + ", ".join(f"`{column}`" for column in columns)
+                + ") VALUES "
+                + ", ".join(values)
             )
+            if updates:
+                sql = (
+                    sql
+                    + " ON DUPLICATE KEY UPDATE "
+                    + ", ".join(
+                        f"`{column}` = VALUES(`{column}`)" for column in updates
+                    )
+                )
+            self.execute(sql, params)
 
-        return attempts
+    def __get_musicids(
+        self, game: GameConstants, version: int
+    ) -> Dict[Tuple[int, int], int]:
+        """
+        Look up the music ID of every song/chart in a game version at once.
+        """
+        cursor = self.execute(
+            "SELECT id, songid, chart FROM music WHERE game = :game AND version = :version",
+            {"game": game.value, "version": version},
+        )
+        return {
+            (result["songid"], result["chart"]): result["id"]
+            for result in cursor.fetchall()
+        }
+
+    def put_remote_scores(
+        self,
+        serverid: int,
+        game: GameConstants,
+        version: int,
+        scores: List[Tuple[List[str], Score]],
+    ) -> int:
+        """
+        Store high scores pulled from a remote server, replacing any previous copy of
+        the same remote user's score for a song/chart.
+
+        Parameters:
+            serverid - Integer ID of the remote server these scores came from.
+            game - Enum value representing a game series.
+            version - Integer representing which version of the game.
+            scores - A list of tuples, each containing the cards of the remote user
+                     and their Score object.
+
+        Returns:
+            The number of scores stored. Scores for songs that aren't in the local music
+            table for this game version are skipped.
+        """
+        if not scores:
+            return 0
+        musicids = self.__get_musicids(game, version)
+
+        cardrows: Dict[str, Dict[str, Any]] = {}
+        scorerows: Dict[Tuple[int, str], Dict[str, Any]] = {}
+        for cards, score in scores:
+            musicid = musicids.get((score.id, score.chart))
+            cards = sorted(card.upper() for card in cards)
+            if musicid is None or not cards:
+                continue
+
+            for cardid in cards:
+                cardrows[cardid] = {
+                    "serverid": serverid,
+                    "cardid": cardid,
+                    "ownerid": cards[0],
+                }
+            scorerows[(musicid, cards[0])] = {
+                "serverid": serverid,
+                "musicid": musicid,
+                "cardid": cards[0],
+                "points": score.points,
+                "timestamp": score.timestamp,
+                "update": score.update,
+                "data": self.serialize(score.data),
+            }
+        if not scorerows:
+            return 0
+
+        # A remote user is keyed by their lowest card, so picking up a new, lower card
+        # gives them a new key. Carry their existing scores over to it, since a sync
+        # only sends scores that changed recently, dropping any that are superseded by
+        # a score already stored under the new key.
+        cursor = self.execute(
+            "SELECT cardid, ownerid FROM remote_card WHERE serverid = :serverid AND cardid IN :cardids",
+            {"serverid": serverid, "cardids": list(cardrows)},
+        )
+        moves = {
+            (result["ownerid"], cardrows[result["cardid"]]["ownerid"])
+            for result in cursor.fetchall()
+            if result["ownerid"] != cardrows[result["cardid"]]["ownerid"]
+        }
+        for oldid, newid in sorted(moves):
+            self.execute(
+                "DELETE FROM old USING remote_score AS old, remote_score AS new WHERE old.serverid = :serverid "
+                + "AND old.cardid = :oldid AND new.serverid = :serverid AND new.cardid = :newid "
+                + "AND new.musicid = old.musicid",
+                {"serverid": serverid, "oldid": oldid, "newid": newid},
+            )
+            self.execute(
+                "UPDATE remote_score SET cardid = :newid WHERE serverid = :serverid AND cardid = :oldid",
+                {"serverid": serverid, "oldid": oldid, "newid": newid},
+            )
+
+        self.__upsert(
+            "remote_card",
+            ["serverid", "cardid", "ownerid"],
+            list(cardrows.values()),
+            ["ownerid"],
+        )
+        self.__upsert(
+            "remote_score",
+            ["serverid", "musicid", "cardid", "points", "timestamp", "update", "data"],
+            list(scorerows.values()),
+            ["points", "timestamp", "update", "data"],
+        )
+        return len(scorerows)
+
+    def get_remote_scores(
+        self,
+        game: GameConstants,
+        version: int,
+        serverids: List[int],
+        cards: Optional[List[str]] = None,
+        songid: Optional[int] = None,
+        songchart: Optional[int] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+    ) -> List[Tuple[str, Score]]:
+        """
+        Look up the local copy of high scores pulled from remote servers.
+
+        Parameters:
+            game - Enum value representing a game series.
+            version - Integer representing which version of the game.
+            serverids - List of remote server IDs to return scores from.
+            cards - Optionally, only return scores for remote users with one of these cards.
+            songid - Optionally, only return scores for this song.
+            songchart - Optionally, only return scores for this chart of the above song.
+            since - Return only scores updated on or after this timestamp.
+            until - Return only scores updated before this timestamp.
+
+        Returns:
+            A list of tuples, each containing the card identifying a remote user and a
+            Score object. The same remote user on different servers is returned separately.
+        """
+        if not serverids or (cards is not None and not cards):
+            return []
+
+        sql = (
+            "SELECT remote_score.cardid AS cardid, music.songid AS songid, music.chart AS chart, remote_score.points AS points, "
+            + "remote_score.timestamp AS timestamp, remote_score.update AS `update`, remote_score.data AS data "
+            + "FROM remote_score, music WHERE remote_score.musicid = music.id AND music.game = :game AND music.version = :version "
+            + "AND remote_score.serverid IN :serverids"
+        )
+        if cards is not None:
+            sql = (
+                sql
+                + " AND remote_score.cardid IN (SELECT ownerid FROM remote_card WHERE remote_card.serverid = remote_score.serverid "
+                + "AND remote_card.cardid IN :cards)"
+            )
+        if songid is not None:
+            sql = sql + " AND music.songid = :songid"
+        if songchart is not None:
+            sql = sql + " AND music.chart = :songchart"
+        if since is not None:
+            sql = sql + " AND remote_score.update >= :since"
+        if until is not None:
+            sql = sql + " AND remote_score.update < :until"
+        cursor = self.execute(
+            sql,
+            {
+                "game": game.value,
+                "version": version,
+                "serverids": tuple(serverids),
+                "cards": tuple(card.upper() for card in (cards or [])),
+                "songid": songid,
+                "songchart": songchart,
+                "since": since,
+                "until": until,
+            },
+        )
+
+        return [
+            (
+                result["cardid"],
+                Score(
+                    -1,
+                    result["songid"],
+                    result["chart"],
+                    result["points"],
+                    result["timestamp"],
+                    result["update"],
+                    -1,  # No location for remote play
+                    1,  # No play info for remote play
+                    self.deserialize(result["data"]),
+                ),
+            )
+            for result in cursor.fetchall()
+        ]
+
+    def get_remote_card_owners(self, serverids: List[int]) -> Dict[str, UserID]:
+        """
+        Look up which local users share a card with a remote user, so that remote scores
+        can be attributed to them.
+
+        Parameters:
+            serverids - List of remote server IDs to look at.
+
+        Returns:
+            A dictionary keyed by the card identifying a remote user, whos values are the
+            local user ID owning one of that remote user's cards. When more than one local
+            user matches, the one owning the lowest card ID wins.
+        """
+        if not serverids:
+            return {}
+
+        sql = (
+            "SELECT remote_card.ownerid AS ownerid, card.userid AS userid FROM remote_card, card "
+            + "WHERE remote_card.cardid = card.id AND remote_card.serverid IN :serverids ORDER BY remote_card.cardid DESC"
+        )
+        cursor = self.execute(sql, {"serverids": tuple(serverids)})
+        # Later rows overwrite earlier ones, so going in descending order leaves the lowest card.
+        return {
+            result["ownerid"]: UserID(result["userid"]) for result in cursor.fetchall()
+        }
+
+    def put_remote_statistics(
+        self,
+        serverid: int,
+        game: GameConstants,
+        version: int,
+        statistics: Dict[int, Dict[int, Dict[str, int]]],
+    ) -> int:
+        """
+        Replace the local copy of play statistics pulled from a remote server for a game version.
+
+        Parameters:
+            serverid - Integer ID of the remote server these statistics came from.
+            game - Enum value representing a game series.
+            version - Integer representing which version of the game.
+            statistics - A dictionary keyed by songid, whos values are a dictionary keyed by
+                         chart, whos values are dictionaries of 'plays', 'clears' and 'combos'.
+
+        Returns:
+            The number of song/charts stored. Statistics for songs that aren't in the local
+            music table for this game version are skipped.
+        """
+        musicids = self.__get_musicids(game, version)
+        self.execute(
+            "DELETE FROM `remote_statistic` WHERE serverid = :serverid AND musicid IN "
+            + "(SELECT id FROM music WHERE game = :game AND version = :version)",
+            {"serverid": serverid, "game": game.value, "version": version},
+        )
+
+        rows: List[Dict[str, Any]] = []
+        for songid, charts in statistics.items():
+            for songchart, stats in charts.items():
+                musicid = musicids.get((songid, songchart))
+                if musicid is None:
+                    continue
+                rows.append(
+                    {
+                        "serverid": serverid,
+                        "musicid": musicid,
+                        "plays": stats.get("plays", 0),
+                        "clears": stats.get("clears", 0),
+                        "combos": stats.get("combos", 0),
+                    }
+                )
+
+        self.__upsert(
+            "remote_statistic",
+            ["serverid", "musicid", "plays", "clears", "combos"],
+            rows,
+            ["plays", "clears", "combos"],
+        )
+        return len(rows)
+
+    def get_remote_statistics(
+        self,
+        game: GameConstants,
+        version: int,
+        serverids: List[int],
+        songid: Optional[int] = None,
+        songchart: Optional[int] = None,
+    ) -> Dict[int, Dict[int, Dict[str, int]]]:
+        """
+        Look up the local copy of play statistics pulled from remote servers, summed
+        across all of the given servers.
+
+        Parameters:
+            game - Enum value representing a game series.
+            version - Integer representing which version of the game.
+            serverids - List of remote server IDs to sum statistics from.
+            songid - Optionally, only return statistics for this song.
+            songchart - Optionally, only return statistics for this chart of the above song.
+
+        Returns:
+            A dictionary keyed by songid, whos values are a dictionary keyed by chart, whos
+            values are dictionaries of 'plays', 'clears' and 'combos'.
+        """
+        if not serverids:
+            return {}
+
+        sql = (
+            "SELECT music.songid AS songid, music.chart AS chart, SUM(remote_statistic.plays) AS plays, "
+            + "SUM(remote_statistic.clears) AS clears, SUM(remote_statistic.combos) AS combos "
+            + "FROM remote_statistic, music WHERE remote_statistic.musicid = music.id AND music.game = :game "
+            + "AND music.version = :version AND remote_statistic.serverid IN :serverids"
+        )
+        if songid is not None:
+            sql = sql + " AND music.songid = :songid"
+        if songchart is not None:
+            sql = sql + " AND music.chart = :songchart"
+        sql = sql + " GROUP BY music.songid, music.chart"
+        cursor = self.execute(
+            sql,
+            {
+                "game": game.value,
+                "version": version,
+                "serverids": tuple(serverids),
+                "songid": songid,
+                "songchart": songchart,
+            },
+        )
+
+        statistics: Dict[int, Dict[int, Dict[str, int]]] = {}
+        for result in cursor.fetchall():
+            statistics.setdefault(result["songid"], {})[result["chart"]] = {
+                "plays": int(result["plays"]),
+                "clears": int(result["clears"]),
+                "combos": int(result["combos"]),
+            }
+        return statistics
+
+    def get_remote_sync(
+        self, serverid: int, game: GameConstants, version: int, synctype: str
+    ) -> Optional[int]:
+        """
+        Look up when a type of data was last pulled from a remote server.
+
+        Parameters:
+            serverid - Integer ID of the remote server.
+            game - Enum value representing a game series.
+            version - Integer representing which version of the game.
+            synctype - The type of data, such as 'records' or 'statistics'.
+
+        Returns:
+            A unix timestamp that everything up until was pulled, or None if this
+            has never been pulled.
+        """
+        sql = (
+            "SELECT timestamp FROM remote_sync WHERE serverid = :serverid AND game = :game "
+            + "AND version = :version AND type = :type"
+        )
+        cursor = self.execute(
+            sql,
+            {
+                "serverid": serverid,
+                "game": game.value,
+                "version": version,
+                "type": synctype,
+            },
+        )
+        if cursor.rowcount != 1:
+            return None
+        return cursor.fetchone()["timestamp"]
+
+    def put_remote_sync(
+        self,
+        serverid: int,
+        game: GameConstants,
+        version: int,
+        synctype: str,
+        timestamp: int,
+    ) -> None:
+        """
+        Remember when a type of data was last pulled from a remote server.
+
+        Parameters:
+            serverid - Integer ID of the remote server.
+            game - Enum value representing a game series.
+            version - Integer representing which version of the game.
+            synctype - The type of data, such as 'records' or 'statistics'.
+            timestamp - A unix timestamp that everything up until was pulled.
+        """
+        self.__upsert(
+            "remote_sync",
+            ["serverid", "game", "version", "type", "timestamp"],
+            [
+                {
+                    "serverid": serverid,
+                    "game": game.value,
+                    "version": version,
+                    "type": synctype,
+                    "timestamp": timestamp,
+                }
+            ],
+            ["timestamp"],
+        )
+
+    def get_oldest_remote_sync(
+        self, game: GameConstants, version: int, serverids: List[int], synctype: str
+    ) -> Optional[int]:
+        """
+        Look up how old the local copy of a type of data from remote servers is.
+
+        Parameters:
+            game - Enum value representing a game series.
+            version - Integer representing which version of the game.
+            serverids - List of remote server IDs to look at.
+            synctype - The type of data, such as 'records' or 'statistics'.
+
+        Returns:
+            The oldest unix timestamp that data was pulled up until across all of the
+            given servers, or None if any of them has never been pulled from.
+        """
+        if not serverids:
+            return None
+
+        sql = (
+            "SELECT COUNT(serverid) AS count, MIN(timestamp) AS timestamp FROM remote_sync WHERE game = :game "
+            + "AND version = :version AND type = :type AND serverid IN :serverids"
+        )
+        cursor = self.execute(
+            sql,
+            {
+                "game": game.value,
+                "version": version,
+                "type": synctype,
+                "serverids": tuple(serverids),
+            },
+        )
+        result = cursor.fetchone()
+        if result["count"] != len(set(serverids)):
+            return None
+        return result["timestamp"]
+
+    def get_latest_remote_sync(self, serverid: int) -> Optional[int]:
+        """
+        Look up the last time that anything was pulled from a remote server.
+
+        Parameters:
+            serverid - Integer ID of the remote server.
+
+        Returns:
+            A unix timestamp, or None if nothing has ever been pulled from this server.
+        """
+        cursor = self.execute(
+            "SELECT MAX(timestamp) AS timestamp FROM remote_sync WHERE serverid = :serverid",
+            {"serverid": serverid},
+        )
+        return cursor.fetchone()["timestamp"]
+
+    def destroy_remote_data(self, serverids: List[int]) -> None:
+        """
+        Throw away everything pulled from remote servers other than the given servers.
+        This is used to clean up after a server is removed.
+
+        Parameters:
+            serverids - List of remote server IDs whose data should be kept.
+        """
+        keep = tuple(serverids) if serverids else (-1,)
+        for table in ["remote_score", "remote_card", "remote_statistic", "remote_sync"]:
+            self.execute(
+                f"DELETE FROM `{table}` WHERE serverid NOT IN :serverids",
+                {"serverids": keep},
+            )
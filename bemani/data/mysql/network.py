@@ -1,7 +1,7 @@
 from sqlalchemy import Table, Column, UniqueConstraint  # type: ignore
 from sqlalchemy.types import String, Integer, Text, JSON  # type: ignore
 from sqlalchemy.dialects.mysql import BIGINT as BigInteger  # type: ignore
-from typing import Optional, Dict, List, Tuple, Any
+from typing import Iterator, Optional, Dict, List, Tuple, Any
 
 from bemani.common import GameConstants, Time
 from bemani.data.mysql.base import BaseData, metadata
@@ -285,6 +285,41 @@ class NetworkData(BaseData):
         since_id: Optional[int] = None,
         until_id: Optional[int] = None,
     ) -> List[Event]:
+        sql, params = self.__events_query(
+            userid, arcadeid, event, limit, since_id, until_id
+        )
+        cursor = self.execute(sql, params)
+        return [self.__format_event(result) for result in cursor.fetchall()]
+
+    def iter_events(
+        self,
+        userid: Optional[UserID] = None,
+        arcadeid: Optional[ArcadeID] = None,
+        event: Optional[str] = None,
+        limit: Optional[int] = None,
+        since_id: Optional[int] = None,
+        until_id: Optional[int] = None,
+    ) -> Iterator[Event]:
+        """
+        Look up events the same as get_events, newest to oldest. However, events are streamed
+        from the DB and decoded as they are iterated over instead of all being loaded at once,
+        so this should be used when filtering through a potentially large part of the audit log.
+        """
+        sql, params = self.__events_query(
+            userid, arcadeid, event, limit, since_id, until_id
+        )
+        for result in self.stream(sql, params):
+            yield self.__format_event(result)
+
+    def __events_query(
+        self,
+        userid: Optional[UserID],
+        arcadeid: Optional[ArcadeID],
+        event: Optional[str],
+        limit: Optional[int],
+        since_id: Optional[int],
+        until_id: Optional[int],
+    ) -> Tuple[str, Dict[str, Any]]:
         # Base query
         sql = "SELECT id, timestamp, userid, arcadeid, type, data FROM audit "
 
@@ -307,7 +342,7 @@ class NetworkData(BaseData):
         sql = sql + "ORDER BY id DESC"
         if limit is not None:
             sql = sql + " LIMIT :limit"
-        cursor = self.execute(
+        return (
             sql,
             {
                 "userid": userid,
@@ -318,27 +353,16 @@ class NetworkData(BaseData):
                 "until_id": until_id,
             },
         )
-        events = []
-        for result in cursor.fetchall():
-            if result["userid"] is not None:
-                userid = UserID(result["userid"])
-            else:
-                userid = None
-            if result["arcadeid"] is not None:
-                arcadeid = ArcadeID(result["arcadeid"])
-            else:
-                arcadeid = None
-            events.append(
-                Event(
-                    result["id"],
-                    result["timestamp"],
-                    userid,
-                    arcadeid,
-                    result["type"],
-                    self.deserialize(result["data"]),
-                ),
-            )
-        return events
+
+    def __format_event(self, result: Any) -> Event:
+        return Event(
+            result["id"],
+            result["timestamp"],
+            UserID(result["userid"]) if result["userid"] is not None else None,
+            ArcadeID(result["arcadeid"]) if result["arcadeid"] is not None else None,
+            result["type"],
+            self.deserialize(result["data"]),
+        )
 
     def delete_events(self, oldest_event_ts: int) -> None:
         """
@@ -1,9 +1,9 @@
 import random
-from sqlalchemy import Table, Column, UniqueConstraint  # type: ignore
+from sqlalchemy import Table, Column, Index, UniqueConstraint  # type: ignore
 from sqlalchemy.types import String, Integer, JSON  # type: ignore
 from sqlalchemy.dialects.mysql import BIGINT as BigInteger  # type: ignore
 from sqlalchemy.exc import IntegrityError  # type: ignore
-from typing import Optional, Dict, List, Tuple, Any
+from typing import Optional, Dict, Iterator, List, Tuple, Any
 from typing_extensions import Final
 from passlib.hash import pbkdf2_sha512  # type: ignore
 
@@ -76,6 +76,7 @@ refid = Table(
     Column("refid", String(16), nullable=False, unique=True),
     Column("userid", BigInteger(unsigned=True), nullable=False),
     UniqueConstraint("game", "version", "userid", name="game_version_userid"),
+    Index("userid_game_version", "userid", "game", "version"),
     mysql_charset="utf8mb4",
 )
 
@@ -565,7 +566,8 @@ class UserData(BaseData):
     ) -> List[Tuple[UserID, Optional[Profile]]]:
         """
         Does the exact same thing as get_any_profile but across a list of users instead of one.
-        Provided purely as a convenience function.
+        This looks up every profile in two queries no matter how many users are requested, so
+        prefer it over calling get_any_profile in a loop.
 
         Parameters:
             game - Enum value identifier of the game looking up the user.
@@ -578,34 +580,57 @@ class UserData(BaseData):
         """
         if not userids:
             return []
-        sql = "SELECT version, userid FROM refid WHERE game = :game AND userid IN :userids AND refid IN (SELECT refid FROM profile)"
-        cursor = self.execute(sql, {"game": game.value, "userids": userids})
-        profilever: Dict[UserID, int] = {}
+
+        # First, figure out which profile we want for each user.
+        sql = (
+            "SELECT refid.version AS version, refid.userid AS userid, refid.refid AS refid "
+            "FROM refid, profile "
+            "WHERE refid.game = :game AND refid.userid IN :userids AND profile.refid = refid.refid"
+        )
+        cursor = self.execute(sql, {"game": game.value, "userids": list(set(userids))})
+        profilever: Dict[UserID, Tuple[int, str]] = {}
 
         for result in cursor.fetchall():
             tuid = UserID(result["userid"])
             tver = result["version"]
+            tref = result["refid"]
 
             if tuid not in profilever:
                 # Just assign it the first profile we find
-                profilever[tuid] = tver
+                profilever[tuid] = (tver, tref)
             else:
                 # If the profile for this version exists, prioritize it
                 if tver == version:
-                    profilever[tuid] = tver
+                    profilever[tuid] = (tver, tref)
 
                 # Only update the profile version with the newest game profile if the game
                 # profile for this version doesn't exist.
-                elif profilever[tuid] != version:
-                    profilever[tuid] = max(profilever[tuid], tver)
+                elif profilever[tuid][0] != version and tver > profilever[tuid][0]:
+                    profilever[tuid] = (tver, tref)
+
+        # Now, load all of those profiles at once instead of one at a time.
+        profiles: Dict[UserID, Profile] = {}
+        if profilever:
+            sql = (
+                "SELECT refid.userid AS userid, refid.refid AS refid, extid.extid AS extid, profile.data AS data "
+                "FROM refid, extid, profile "
+                "WHERE refid.refid IN :refids AND extid.userid = refid.userid AND extid.game = refid.game "
+                "AND profile.refid = refid.refid"
+            )
+            cursor = self.execute(
+                sql, {"refids": [tref for (_, tref) in profilever.values()]}
+            )
+            for result in cursor.fetchall():
+                tuid = UserID(result["userid"])
+                profiles[tuid] = Profile(
+                    game,
+                    profilever[tuid][0],
+                    result["refid"],
+                    result["extid"],
+                    self.deserialize(result["data"]),
+                )
 
-        result = []
-        for uid in userids:
-            if uid not in profilever:
-                result.append((uid, None))
-            else:
-                result.append((uid, self.get_profile(game, profilever[uid], uid)))
-        return result
+        return [(uid, profiles.get(uid)) for uid in userids]
 
     def get_games_played(
         self, userid: UserID, game: Optional[GameConstants] = None
@@ -633,6 +658,32 @@ class UserData(BaseData):
             profiles.append((GameConstants(result["game"]), result["version"]))
         return profiles
 
+    def __all_profiles_select(self) -> str:
+        """
+        Construct the select statement for every profile of a game/version, shared by
+        get_all_profiles and iter_all_profiles. Expects :game and :version parameters.
+        """
+        return (
+            "SELECT refid.userid AS userid, refid.refid AS refid, extid.extid AS extid, profile.data AS data "
+            "FROM refid, profile, extid "
+            "WHERE refid.game = :game AND refid.version = :version "
+            "AND refid.refid = profile.refid AND extid.game = refid.game AND extid.userid = refid.userid"
+        )
+
+    def __format_all_profiles(
+        self, game: GameConstants, version: int, result: Any
+    ) -> Tuple[UserID, Profile]:
+        return (
+            UserID(result["userid"]),
+            Profile(
+                game,
+                version,
+                result["refid"],
+                result["extid"],
+                self.deserialize(result["data"]),
+            ),
+        )
+
     def get_all_profiles(
         self, game: GameConstants, version: int
     ) -> List[Tuple[UserID, Profile]]:
@@ -646,30 +697,80 @@ class UserData(BaseData):
         Returns:
             A list of (UserID, dictionaries) previously stored by a game class for each profile.
         """
+        cursor = self.execute(
+            self.__all_profiles_select(), {"game": game.value, "version": version}
+        )
+        return [
+            self.__format_all_profiles(game, version, result)
+            for result in cursor.fetchall()
+        ]
+
+    def iter_all_profiles(
+        self, game: GameConstants, version: int
+    ) -> Iterator[Tuple[UserID, Profile]]:
+        """
+        Given a game/version, look up all user profiles for that game, the same as
+        get_all_profiles. However, profiles are streamed from the DB and decoded as they
+        are iterated over instead of all being loaded at once, so this should be used by
+        anything that walks every profile on the network.
+
+        Parameters:
+            game - Enum value identifier of the game we want all user profiles for.
+            version - Integer version of the game we want all user profiles for.
+
+        Returns:
+            A generator of (UserID, Profile) tuples.
+        """
+        for result in self.stream(
+            self.__all_profiles_select(), {"game": game.value, "version": version}
+        ):
+            yield self.__format_all_profiles(game, version, result)
+
+    def get_all_game_profiles(
+        self, game: GameConstants, userids: Optional[List[UserID]] = None
+    ) -> List[Tuple[UserID, Profile]]:
+        """
+        Given a game, look up every profile for every version of that game in one query,
+        optionally only for some users. This is much cheaper than calling get_profile for
+        each user and version when displaying lists of players.
+
+        Parameters:
+            game - Enum value identifier of the game we want all user profiles for.
+            userids - Optional list of user IDs to restrict the lookup to.
+
+        Returns:
+            A list of (UserID, Profile) tuples, one for each version of the game that a
+            user has a profile for. Each profile's version is set accordingly.
+        """
+        if userids is not None and len(userids) == 0:
+            return []
+
         sql = (
-            "SELECT refid.userid AS userid, refid.refid AS refid, extid.extid AS extid, profile.data AS data "
+            "SELECT refid.userid AS userid, refid.version AS version, refid.refid AS refid, "
+            "extid.extid AS extid, profile.data AS data "
             "FROM refid, profile, extid "
-            "WHERE refid.game = :game AND refid.version = :version "
-            "AND refid.refid = profile.refid AND extid.game = refid.game AND extid.userid = refid.userid"
+            "WHERE refid.game = :game AND refid.refid = profile.refid "
+            "AND extid.game = refid.game AND extid.userid = refid.userid"
         )
-        cursor = self.execute(sql, {"game": game.value, "version": version})
+        vals: Dict[str, Any] = {"game": game.value}
+        if userids is not None:
+            sql += " AND refid.userid IN :userids"
+            vals["userids"] = list(set(userids))
+        cursor = self.execute(sql, vals)
 
-        profiles = []
-        for result in cursor.fetchall():
-            profiles.append(
-                (
-                    UserID(result["userid"]),
-                    Profile(
-                        game,
-                        version,
-                        result["refid"],
-                        result["extid"],
-                        self.deserialize(result["data"]),
-                    ),
-                )
+        return [
+            (
+                UserID(result["userid"]),
+                Profile(
+                    game,
+                    result["version"],
+                    result["refid"],
+                    result["extid"],
+                    self.deserialize(result["data"]),
+                ),
             )
-
-        return profiles
+            for result in cursor.fetchall()
+        ]
 
     def get_all_players(self, game: GameConstants, version: int) -> List[UserID]:
         """
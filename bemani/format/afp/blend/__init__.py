@@ -1,11 +1,31 @@
+from .blend import CompositorPool, affine_projection, perspective_projection
+
 try:
     # If we compiled the faster cython/c++ code, we can use it instead!
     from .blendcpp import affine_composite
     from .blendcpp import perspective_composite
+
+    backend = "c++"
 except ImportError:
-    # If we didn't, then fall back to the pure python implementation.
-    from .blend import affine_composite
-    from .blend import perspective_composite
+    try:
+        # If numpy is installed, we can at least work on whole textures at once.
+        from .blendnumpy import affine_composite
+        from .blendnumpy import perspective_composite
+
+        backend = "numpy"
+    except ImportError:
+        # If we didn't, then fall back to the pure python implementation.
+        from .blend import affine_composite
+        from .blend import perspective_composite
+
+        backend = "python"
 
 
-__all__ = ["affine_composite", "perspective_composite"]
+__all__ = [
+    "affine_composite",
+    "affine_projection",
+    "perspective_composite",
+    "perspective_projection",
+    "CompositorPool",
+    "backend",
+]
@@ -1,12 +1,21 @@
 import multiprocessing
+import queue
 import signal
+import traceback
+import weakref
+from multiprocessing import shared_memory
 from PIL import Image  # type: ignore
-from typing import Any, Callable, List, Optional, Sequence, Union
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from typing_extensions import Final
 
-from ..types import Color, HSL, Matrix, Point, AAMode
+from ..types import Color, HSL, Matrix, Point, Rectangle, AAMode
 from .perspective import perspective_calculate
 
 
+# How many seconds to wait on compositing processes before checking that they are still running.
+WORKER_POLL_INTERVAL: Final[float] = 1.0
+
+
 def clamp(color: float) -> int:
     return min(max(0, round(color)), 255)
 
@@ -260,9 +269,9 @@ def pixel_renderer(
     mult_color: Color,
     hsl_shift: HSL,
     blendfunc: int,
-    imgbytes: Union[bytes, bytearray],
-    texbytes: Union[bytes, bytearray],
-    maskbytes: Optional[Union[bytes, bytearray]],
+    imgbytes: Union[bytes, bytearray, memoryview],
+    texbytes: Union[bytes, bytearray, memoryview],
+    maskbytes: Optional[Union[bytes, bytearray, memoryview]],
     aa_mode: int,
 ) -> Sequence[int]:
     # Determine offset
@@ -472,74 +481,463 @@ def pixel_renderer(
         )
 
 
-def affine_line_renderer(
+def _mask_bytes(mask: Optional[Image.Image]) -> Optional[bytes]:
+    if mask:
+        alpha = mask.split()[-1]
+        return alpha.tobytes("raw", "L")
+    else:
+        return None
+
+
+def _projection(
+    perspective: bool, inverse: Matrix
+) -> Callable[[Point], Optional[Point]]:
+    if not perspective:
+        return inverse.multiply_point
+
+    def perspective_inverse(imgpoint: Point) -> Optional[Point]:
+        # Calculate the texture coordinate with our perspective interpolation.
+        texdiv = inverse.multiply_point(imgpoint)
+        if texdiv.z <= 0.0:
+            return None
+
+        return Point(texdiv.x / texdiv.z, texdiv.y / texdiv.z)
+
+    return perspective_inverse
+
+
+def _render_rows(
+    rows: range,
+    minx: int,
+    maxx: int,
+    imgwidth: int,
+    imgheight: int,
+    texwidth: int,
+    texheight: int,
+    xscale: float,
+    yscale: float,
+    callback: Callable[[Point], Optional[Point]],
+    add_color: Color,
+    mult_color: Color,
+    hsl_shift: HSL,
+    blendfunc: int,
+    imgbytes: Union[bytearray, memoryview],
+    texbytes: Union[bytes, bytearray, memoryview],
+    maskbytes: Optional[Union[bytes, bytearray, memoryview]],
+    aa_mode: int,
+) -> None:
+    for imgy in range(rows.start, rows.stop):
+        # Every pixel only ever looks at its own spot on the canvas, so a whole row can
+        # be rendered before it is written back.
+        rowstart = ((imgy * imgwidth) + minx) * 4
+        rowend = ((imgy * imgwidth) + maxx) * 4
+        rowbytes = bytearray(imgbytes[rowstart:rowend])
+        for imgx in range(minx, maxx):
+            # Blit new pixel into the correct range.
+            rowoff = (imgx - minx) * 4
+            rowbytes[rowoff : (rowoff + 4)] = pixel_renderer(
+                imgx,
+                imgy,
+                imgwidth,
+                imgheight,
+                texwidth,
+                texheight,
+                xscale,
+                yscale,
+                callback,
+                add_color,
+                mult_color,
+                hsl_shift,
+                blendfunc,
+                imgbytes,
+                texbytes,
+                maskbytes,
+                aa_mode,
+            )
+        imgbytes[rowstart:rowend] = rowbytes
+
+
+def _composite_worker(
     work: multiprocessing.Queue,
     results: multiprocessing.Queue,
+) -> None:
+    # The process that owns the pool decides what happens on a ctrl-c, and will tear
+    # us down if it needs to.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Shared memory we've attached to, keyed by name so that textures only get attached
+    # once no matter how many times they're drawn.
+    segments: Dict[str, shared_memory.SharedMemory] = {}
+
+    while True:
+        band = work.get()
+        if band is None:
+            break
+
+        jobid, names = band[0], band[1:4]
+        try:
+            _render_band(segments, *band[1:])
+            error: Optional[str] = None
+        except Exception:
+            error = traceback.format_exc()
+        results.put((jobid, error))
+
+        # Don't hold onto an ever growing list of segments that the pool has replaced.
+        if len(segments) > 64:
+            for name in list(segments):
+                if name not in names:
+                    segments.pop(name).close()
+
+    for segment in segments.values():
+        segment.close()
+
+
+def _render_band(
+    segments: Dict[str, shared_memory.SharedMemory],
+    canvasname: str,
+    texturename: str,
+    maskname: Optional[str],
+    rows: range,
     minx: int,
     maxx: int,
     imgwidth: int,
     imgheight: int,
     texwidth: int,
     texheight: int,
+    perspective: bool,
     inverse: Matrix,
+    xscale: float,
+    yscale: float,
     add_color: Color,
     mult_color: Color,
     hsl_shift: HSL,
     blendfunc: int,
-    imgbytes: Union[bytes, bytearray],
-    texbytes: Union[bytes, bytearray],
-    maskbytes: Optional[Union[bytes, bytearray]],
     aa_mode: int,
 ) -> None:
-    while True:
-        imgy = work.get()
-        if imgy is None:
-            return
+    def attach(name: str) -> memoryview:
+        if name not in segments:
+            segments[name] = shared_memory.SharedMemory(name=name)
+        return segments[name].buf
+
+    _render_rows(
+        rows,
+        minx,
+        maxx,
+        imgwidth,
+        imgheight,
+        texwidth,
+        texheight,
+        xscale,
+        yscale,
+        _projection(perspective, inverse),
+        add_color,
+        mult_color,
+        hsl_shift,
+        blendfunc,
+        attach(canvasname),
+        attach(texturename),
+        attach(maskname) if maskname is not None else None,
+        aa_mode,
+    )
+
 
-        rowbytes = bytearray(
-            imgbytes[(imgy * imgwidth * 4) : ((imgy + 1) * imgwidth * 4)]
+def _close_pool(
+    procs: List[multiprocessing.Process],
+    segments: Dict[str, shared_memory.SharedMemory],
+) -> None:
+    # Workers hold no state of their own, so there's nothing to wait for.
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        proc.join()
+    procs.clear()
+
+    for segment in segments.values():
+        segment.close()
+        segment.unlink()
+    segments.clear()
+
+
+class CompositorPool:
+    """
+    A long-lived set of processes for compositing with the pure python blend code,
+    meant to be held onto for as long as there is rendering to do. The canvas, mask
+    and textures are handed to the processes through shared memory, and textures that
+    are given a name are only copied there the first time they are drawn, so each
+    composite only has to send out the rows to draw and the parameters to draw them
+    with. Processes are started on the first composite that needs them and are shut
+    down on close() or when the pool is garbage collected.
+    """
+
+    def __init__(self, processes: Optional[int] = None) -> None:
+        self.processes = processes or multiprocessing.cpu_count()
+        self.__work: Optional[multiprocessing.Queue] = None
+        self.__results: Optional[multiprocessing.Queue] = None
+        self.__procs: List[multiprocessing.Process] = []
+        self.__jobid = 0
+
+        # Shared memory that we own, keyed by what it holds. Named textures are stored
+        # alongside the image they were copied from so we can tell if it was replaced.
+        self.__segments: Dict[str, shared_memory.SharedMemory] = {}
+        self.__textures: Dict[str, Image.Image] = {}
+        self.__finalizer = weakref.finalize(
+            self, _close_pool, self.__procs, self.__segments
         )
-        for imgx in range(imgwidth):
-            if imgx < minx or imgx >= maxx:
-                # No need to even consider this pixel.
-                continue
-            else:
-                # Blit new pixel into the correct range.
-                rowbytes[(imgx * 4) : ((imgx + 1) * 4)] = pixel_renderer(
-                    imgx,
-                    imgy,
+
+    def __enter__(self) -> "CompositorPool":
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Stop all processes and free all shared memory. The pool can still be used
+        afterwards, it will start over on the next composite.
+        """
+        _close_pool(self.__procs, self.__segments)
+        self.__textures.clear()
+        self.__work = None
+        self.__results = None
+
+    def affine_composite(
+        self,
+        img: Image.Image,
+        add_color: Color,
+        mult_color: Color,
+        hsl_shift: HSL,
+        transform: Matrix,
+        mask: Optional[Image.Image],
+        blendfunc: int,
+        texture: Image.Image,
+        aa_mode: int = AAMode.SSAA_OR_BILINEAR,
+        texture_name: Optional[str] = None,
+        clip: Optional[Rectangle] = None,
+    ) -> Image.Image:
+        """
+        The same as affine_composite(), rendered on this pool's processes. If the texture
+        is given a name, it is only copied to the processes the first time that name is
+        seen, so the same name must not be reused for a different image.
+        """
+        projection = affine_projection(img, transform, blendfunc, texture, clip)
+        if projection is None:
+            return img
+
+        return self.__composite(
+            img,
+            add_color,
+            mult_color,
+            hsl_shift,
+            mask,
+            blendfunc,
+            texture,
+            texture_name,
+            aa_mode,
+            False,
+            *projection,
+        )
+
+    def perspective_composite(
+        self,
+        img: Image.Image,
+        add_color: Color,
+        mult_color: Color,
+        hsl_shift: HSL,
+        transform: Matrix,
+        camera: Point,
+        focal_length: float,
+        mask: Optional[Image.Image],
+        blendfunc: int,
+        texture: Image.Image,
+        aa_mode: int = AAMode.SSAA_ONLY,
+        texture_name: Optional[str] = None,
+        clip: Optional[Rectangle] = None,
+    ) -> Image.Image:
+        """
+        The same as perspective_composite(), rendered on this pool's processes. Named
+        textures work the same as for affine_composite().
+        """
+        projection = perspective_projection(
+            img, transform, camera, focal_length, blendfunc, texture, clip
+        )
+        if projection is None:
+            return img
+
+        return self.__composite(
+            img,
+            add_color,
+            mult_color,
+            hsl_shift,
+            mask,
+            blendfunc,
+            texture,
+            texture_name,
+            aa_mode,
+            True,
+            *projection,
+        )
+
+    def __start(self) -> Tuple[multiprocessing.Queue, multiprocessing.Queue]:
+        if self.__work is None or self.__results is None:
+            self.__work = multiprocessing.Queue()
+            self.__results = multiprocessing.Queue()
+            for _ in range(self.processes):
+                proc = multiprocessing.Process(
+                    target=_composite_worker,
+                    args=(self.__work, self.__results),
+                    daemon=True,
+                )
+                self.__procs.append(proc)
+                proc.start()
+        return self.__work, self.__results
+
+    def __segment(self, key: str, data: bytes) -> str:
+        segment = self.__segments.get(key)
+        if segment is None or segment.size < len(data):
+            # Too small to hold this, so make a new one. Processes still attached to the
+            # old one will let go of it eventually.
+            if segment is not None:
+                segment.close()
+                segment.unlink()
+            segment = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+            self.__segments[key] = segment
+
+        segment.buf[: len(data)] = data
+        return segment.name
+
+    def __texture(self, name: Optional[str], texture: Image.Image) -> str:
+        if name is None:
+            return self.__segment("texture", texture.tobytes("raw", "RGBA"))
+
+        key = f"texture:{name}"
+        if self.__textures.get(name) is not texture:
+            # Make a new segment so processes that attached to an old image don't keep using it.
+            segment = self.__segments.pop(key, None)
+            if segment is not None:
+                segment.close()
+                segment.unlink()
+            self.__segment(key, texture.tobytes("raw", "RGBA"))
+            self.__textures[name] = texture
+        return self.__segments[key].name
+
+    def __composite(
+        self,
+        img: Image.Image,
+        add_color: Color,
+        mult_color: Color,
+        hsl_shift: HSL,
+        mask: Optional[Image.Image],
+        blendfunc: int,
+        texture: Image.Image,
+        texture_name: Optional[str],
+        aa_mode: int,
+        perspective: bool,
+        inverse: Matrix,
+        xscale: float,
+        yscale: float,
+        minx: int,
+        miny: int,
+        maxx: int,
+        maxy: int,
+    ) -> Image.Image:
+        imgwidth = img.width
+        imgheight = img.height
+        canvasname = self.__segment("canvas", img.tobytes("raw", "RGBA"))
+        texturename = self.__texture(texture_name, texture)
+        maskbytes = _mask_bytes(mask)
+        maskname = self.__segment("mask", maskbytes) if maskbytes is not None else None
+
+        # Processes must only be started once we've made some shared memory, so that they
+        # share our resource tracker instead of starting their own, which would free our
+        # shared memory out from under us when they exit.
+        work, results = self.__start()
+
+        # Hand out several bands per process so that one process getting the slow part
+        # of the texture doesn't leave the rest of them idle.
+        self.__jobid += 1
+        bands = 0
+        bandsize = max(
+            ((maxy - miny) + (self.processes * 4) - 1) // (self.processes * 4), 1
+        )
+        for start in range(miny, maxy, bandsize):
+            work.put(
+                (
+                    self.__jobid,
+                    canvasname,
+                    texturename,
+                    maskname,
+                    range(start, min(start + bandsize, maxy)),
+                    minx,
+                    maxx,
                     imgwidth,
                     imgheight,
-                    texwidth,
-                    texheight,
-                    1.0 / inverse.xscale,
-                    1.0 / inverse.yscale,
-                    lambda point: inverse.multiply_point(point),
+                    texture.width,
+                    texture.height,
+                    perspective,
+                    inverse,
+                    xscale,
+                    yscale,
                     add_color,
                     mult_color,
                     hsl_shift,
                     blendfunc,
-                    imgbytes,
-                    texbytes,
-                    maskbytes,
                     aa_mode,
                 )
+            )
+            bands += 1
+
+        try:
+            while bands > 0:
+                try:
+                    jobid, error = results.get(timeout=WORKER_POLL_INTERVAL)
+                except queue.Empty:
+                    # Processes only exit when we stop them, so one that is gone was
+                    # killed and will never send back the bands it was drawing.
+                    for proc in self.__procs:
+                        if not proc.is_alive():
+                            raise Exception(
+                                f"Compositing process exited unexpectedly with code {proc.exitcode}!"
+                            )
+                    continue
+                if jobid != self.__jobid:
+                    continue
+                if error is not None:
+                    raise Exception(f"Compositing process failed:\n{error}")
+                bands -= 1
+        except BaseException:
+            # The processes might still be drawing this composite into the canvas, so start
+            # over rather than let them draw over the next one.
+            self.close()
+            raise
+
+        return Image.frombytes(
+            "RGBA",
+            (imgwidth, imgheight),
+            bytes(self.__segments["canvas"].buf[: (imgwidth * imgheight * 4)]),
+        )
 
-        results.put((imgy, bytes(rowbytes)))
 
+def _clip_bounds(
+    minx: int, miny: int, maxx: int, maxy: int, clip: Optional[Rectangle]
+) -> Tuple[int, int, int, int]:
+    # Only draw inside of the part of the canvas that we were asked to, if any.
+    if clip is None:
+        return minx, miny, maxx, maxy
+    return (
+        max(minx, int(clip.left)),
+        max(miny, int(clip.top)),
+        min(maxx, int(clip.right)),
+        min(maxy, int(clip.bottom)),
+    )
 
-def affine_composite(
+
+def affine_projection(
     img: Image.Image,
-    add_color: Color,
-    mult_color: Color,
-    hsl_shift: HSL,
     transform: Matrix,
-    mask: Optional[Image.Image],
     blendfunc: int,
     texture: Image.Image,
-    single_threaded: bool = False,
-    aa_mode: int = AAMode.SSAA_OR_BILINEAR,
-) -> Image.Image:
+    clip: Optional[Rectangle] = None,
+) -> Optional[Tuple[Matrix, float, float, int, int, int, int]]:
     # Calculate the inverse so we can map canvas space back to texture space.
     try:
         inverse = transform.inverse()
@@ -547,12 +945,12 @@ def affine_composite(
         # If this happens, that means one of the scaling factors was zero, making
         # this object invisible. We can ignore this since the object should not
         # be drawn.
-        return img
+        return None
 
     # Warn if we have an unsupported blend.
     if blendfunc not in {0, 1, 2, 3, 8, 9, 13, 70, 256, 257}:
         print(f"WARNING: Unsupported blend {blendfunc}")
-        return img
+        return None
 
     # These are calculated properties and caching them outside of the loop
     # speeds things up a bit.
@@ -572,355 +970,190 @@ def affine_composite(
     maxx = min(int(max(pix1.x, pix2.x, pix3.x, pix4.x)) + 1, imgwidth)
     miny = max(int(min(pix1.y, pix2.y, pix3.y, pix4.y)), 0)
     maxy = min(int(max(pix1.y, pix2.y, pix3.y, pix4.y)) + 1, imgheight)
+    minx, miny, maxx, maxy = _clip_bounds(minx, miny, maxx, maxy, clip)
 
     if maxx <= minx or maxy <= miny:
         # This image is entirely off the screen!
-        return img
-
-    cores = multiprocessing.cpu_count()
-    if single_threaded or cores < 2:
-        # Get the data in an easier to manipulate and faster to update fashion.
-        imgbytes = bytearray(img.tobytes("raw", "RGBA"))
-        texbytes = texture.tobytes("raw", "RGBA")
-        if mask:
-            alpha = mask.split()[-1]
-            maskbytes = alpha.tobytes("raw", "L")
-        else:
-            maskbytes = None
-
-        # We don't have enough CPU cores to bother multiprocessing.
-        for imgy in range(miny, maxy):
-            for imgx in range(minx, maxx):
-                # Determine offset
-                imgoff = (imgx + (imgy * imgwidth)) * 4
-                imgbytes[imgoff : (imgoff + 4)] = pixel_renderer(
-                    imgx,
-                    imgy,
-                    imgwidth,
-                    imgheight,
-                    texwidth,
-                    texheight,
-                    1.0 / inverse.xscale,
-                    1.0 / inverse.yscale,
-                    lambda point: inverse.multiply_point(point),
-                    add_color,
-                    mult_color,
-                    hsl_shift,
-                    blendfunc,
-                    imgbytes,
-                    texbytes,
-                    maskbytes,
-                    aa_mode,
-                )
+        return None
 
-        img = Image.frombytes("RGBA", (imgwidth, imgheight), bytes(imgbytes))
-    else:
-        imgbytes = img.tobytes("raw", "RGBA")
-        texbytes = texture.tobytes("raw", "RGBA")
-        if mask:
-            alpha = mask.split()[-1]
-            maskbytes = alpha.tobytes("raw", "L")
-        else:
-            maskbytes = None
-
-        # Let's spread the load across multiple processors.
-        procs: List[multiprocessing.Process] = []
-        work: multiprocessing.Queue = multiprocessing.Queue()
-        results: multiprocessing.Queue = multiprocessing.Queue()
-        expected: int = 0
-        interrupted: bool = False
-
-        def ctrlc(sig: Any, frame: Any) -> None:
-            nonlocal interrupted
-            interrupted = True
-
-        previous_handler = signal.getsignal(signal.SIGINT)
-        signal.signal(signal.SIGINT, ctrlc)
-
-        for _ in range(cores):
-            proc = multiprocessing.Process(
-                target=affine_line_renderer,
-                args=(
-                    work,
-                    results,
-                    minx,
-                    maxx,
-                    imgwidth,
-                    imgheight,
-                    texwidth,
-                    texheight,
-                    inverse,
-                    add_color,
-                    mult_color,
-                    hsl_shift,
-                    blendfunc,
-                    imgbytes,
-                    texbytes,
-                    maskbytes,
-                    aa_mode,
-                ),
-            )
-            procs.append(proc)
-            proc.start()
-
-        for imgy in range(miny, maxy):
-            work.put(imgy)
-            expected += 1
-
-        lines: List[bytes] = [
-            imgbytes[x : (x + (imgwidth * 4))]
-            for x in range(
-                0,
-                imgwidth * imgheight * 4,
-                imgwidth * 4,
-            )
-        ]
-        for _ in range(expected):
-            imgy, result = results.get()
-            lines[imgy] = result
-
-        for _proc in procs:
-            work.put(None)
-        for proc in procs:
-            proc.join()
-
-        signal.signal(signal.SIGINT, previous_handler)
-        if interrupted:
-            raise KeyboardInterrupt()
-
-        img = Image.frombytes("RGBA", (imgwidth, imgheight), b"".join(lines))
-    return img
+    return (
+        inverse,
+        1.0 / inverse.xscale,
+        1.0 / inverse.yscale,
+        minx,
+        miny,
+        maxx,
+        maxy,
+    )
 
 
-def perspective_line_renderer(
-    work: multiprocessing.Queue,
-    results: multiprocessing.Queue,
-    minx: int,
-    maxx: int,
-    imgwidth: int,
-    imgheight: int,
-    texwidth: int,
-    texheight: int,
-    xscale: float,
-    yscale: float,
-    inverse: Matrix,
+def affine_composite(
+    img: Image.Image,
     add_color: Color,
     mult_color: Color,
     hsl_shift: HSL,
+    transform: Matrix,
+    mask: Optional[Image.Image],
     blendfunc: int,
-    imgbytes: Union[bytes, bytearray],
-    texbytes: Union[bytes, bytearray],
-    maskbytes: Optional[Union[bytes, bytearray]],
-    aa_mode: int,
-) -> None:
-    def perspective_inverse(imgpoint: Point) -> Optional[Point]:
-        # Calculate the texture coordinate with our perspective interpolation.
-        texdiv = inverse.multiply_point(imgpoint)
-        if texdiv.z <= 0.0:
-            return None
-
-        return Point(texdiv.x / texdiv.z, texdiv.y / texdiv.z)
-
-    while True:
-        imgy = work.get()
-        if imgy is None:
-            return
+    texture: Image.Image,
+    single_threaded: bool = False,
+    aa_mode: int = AAMode.SSAA_OR_BILINEAR,
+    clip: Optional[Rectangle] = None,
+) -> Image.Image:
+    cores = multiprocessing.cpu_count()
+    if not single_threaded and cores >= 2:
+        # Let's spread the load across multiple processors. Anything compositing more
+        # than once should hold onto a CompositorPool instead of starting one each time.
+        with CompositorPool(cores) as pool:
+            return pool.affine_composite(
+                img,
+                add_color,
+                mult_color,
+                hsl_shift,
+                transform,
+                mask,
+                blendfunc,
+                texture,
+                aa_mode=aa_mode,
+                clip=clip,
+            )
 
-        rowbytes = bytearray(
-            imgbytes[(imgy * imgwidth * 4) : ((imgy + 1) * imgwidth * 4)]
-        )
-        for imgx in range(imgwidth):
-            if imgx < minx or imgx >= maxx:
-                # No need to even consider this pixel.
-                continue
-            else:
-                # Blit new pixel into the correct range.
-                rowbytes[(imgx * 4) : ((imgx + 1) * 4)] = pixel_renderer(
-                    imgx,
-                    imgy,
-                    imgwidth,
-                    imgheight,
-                    texwidth,
-                    texheight,
-                    xscale,
-                    yscale,
-                    perspective_inverse,
-                    add_color,
-                    mult_color,
-                    hsl_shift,
-                    blendfunc,
-                    imgbytes,
-                    texbytes,
-                    maskbytes,
-                    aa_mode,
-                )
+    projection = affine_projection(img, transform, blendfunc, texture, clip)
+    if projection is None:
+        return img
 
-        results.put((imgy, bytes(rowbytes)))
+    # We don't have enough CPU cores to bother multiprocessing.
+    inverse, xscale, yscale, minx, miny, maxx, maxy = projection
+    imgbytes = bytearray(img.tobytes("raw", "RGBA"))
+    _render_rows(
+        range(miny, maxy),
+        minx,
+        maxx,
+        img.width,
+        img.height,
+        texture.width,
+        texture.height,
+        xscale,
+        yscale,
+        _projection(False, inverse),
+        add_color,
+        mult_color,
+        hsl_shift,
+        blendfunc,
+        imgbytes,
+        texture.tobytes("raw", "RGBA"),
+        _mask_bytes(mask),
+        aa_mode,
+    )
+    return Image.frombytes("RGBA", (img.width, img.height), bytes(imgbytes))
 
 
-def perspective_composite(
+def perspective_projection(
     img: Image.Image,
-    add_color: Color,
-    mult_color: Color,
-    hsl_shift: HSL,
     transform: Matrix,
     camera: Point,
     focal_length: float,
-    mask: Optional[Image.Image],
     blendfunc: int,
     texture: Image.Image,
-    single_threaded: bool = False,
-    aa_mode: int = AAMode.SSAA_ONLY,
-) -> Image.Image:
+    clip: Optional[Rectangle] = None,
+) -> Optional[Tuple[Matrix, float, float, int, int, int, int]]:
     # Warn if we have an unsupported blend.
     if blendfunc not in {0, 1, 2, 3, 8, 9, 13, 70, 256, 257}:
         print(f"WARNING: Unsupported blend {blendfunc}")
-        return img
-
-    # These are calculated properties and caching them outside of the loop
-    # speeds things up a bit.
-    imgwidth = img.width
-    imgheight = img.height
-    texwidth = texture.width
-    texheight = texture.height
+        return None
 
     # Get the perspective-correct inverse matrix for looking up texture coordinates.
     inverse_matrix, minx, miny, maxx, maxy = perspective_calculate(
-        imgwidth, imgheight, texwidth, texheight, transform, camera, focal_length
+        img.width,
+        img.height,
+        texture.width,
+        texture.height,
+        transform,
+        camera,
+        focal_length,
     )
     if inverse_matrix is None:
         # This texture is entirely off of the screen.
-        return img
+        return None
 
-    # Get the data in an easier to manipulate and faster to update fashion.
-    imgbytes = bytearray(img.tobytes("raw", "RGBA"))
-    texbytes = texture.tobytes("raw", "RGBA")
-    if mask:
-        alpha = mask.split()[-1]
-        maskbytes = alpha.tobytes("raw", "L")
-    else:
-        maskbytes = None
+    minx, miny, maxx, maxy = _clip_bounds(minx, miny, maxx, maxy, clip)
+    if maxx <= minx or maxy <= miny:
+        # This texture is entirely outside of where we were asked to draw.
+        return None
 
-    def perspective_inverse(imgpoint: Point) -> Optional[Point]:
-        # Calculate the texture coordinate with our perspective interpolation.
-        texdiv = inverse_matrix.multiply_point(imgpoint)
-        if texdiv.z <= 0.0:
-            return None
+    return (
+        inverse_matrix,
+        transform.xscale,
+        transform.yscale,
+        minx,
+        miny,
+        maxx,
+        maxy,
+    )
 
-        return Point(texdiv.x / texdiv.z, texdiv.y / texdiv.z)
 
+def perspective_composite(
+    img: Image.Image,
+    add_color: Color,
+    mult_color: Color,
+    hsl_shift: HSL,
+    transform: Matrix,
+    camera: Point,
+    focal_length: float,
+    mask: Optional[Image.Image],
+    blendfunc: int,
+    texture: Image.Image,
+    single_threaded: bool = False,
+    aa_mode: int = AAMode.SSAA_ONLY,
+    clip: Optional[Rectangle] = None,
+) -> Image.Image:
     cores = multiprocessing.cpu_count()
-    if single_threaded or cores < 2:
-        # Get the data in an easier to manipulate and faster to update fashion.
-        imgbytes = bytearray(img.tobytes("raw", "RGBA"))
-        texbytes = texture.tobytes("raw", "RGBA")
-        if mask:
-            alpha = mask.split()[-1]
-            maskbytes = alpha.tobytes("raw", "L")
-        else:
-            maskbytes = None
-
-        # We don't have enough CPU cores to bother multiprocessing.
-        for imgy in range(miny, maxy):
-            for imgx in range(minx, maxx):
-                # Determine offset
-                imgoff = (imgx + (imgy * imgwidth)) * 4
-                imgbytes[imgoff : (imgoff + 4)] = pixel_renderer(
-                    imgx,
-                    imgy,
-                    imgwidth,
-                    imgheight,
-                    texwidth,
-                    texheight,
-                    transform.xscale,
-                    transform.yscale,
-                    perspective_inverse,
-                    add_color,
-                    mult_color,
-                    hsl_shift,
-                    blendfunc,
-                    imgbytes,
-                    texbytes,
-                    maskbytes,
-                    aa_mode,
-                )
-
-        img = Image.frombytes("RGBA", (imgwidth, imgheight), bytes(imgbytes))
-    else:
-        imgbytes = img.tobytes("raw", "RGBA")
-        texbytes = texture.tobytes("raw", "RGBA")
-        if mask:
-            alpha = mask.split()[-1]
-            maskbytes = alpha.tobytes("raw", "L")
-        else:
-            maskbytes = None
-
-        # Let's spread the load across multiple processors.
-        procs: List[multiprocessing.Process] = []
-        work: multiprocessing.Queue = multiprocessing.Queue()
-        results: multiprocessing.Queue = multiprocessing.Queue()
-        expected: int = 0
-        interrupted: bool = False
-
-        def ctrlc(sig: Any, frame: Any) -> None:
-            nonlocal interrupted
-            interrupted = True
-
-        previous_handler = signal.getsignal(signal.SIGINT)
-        signal.signal(signal.SIGINT, ctrlc)
-
-        for _ in range(cores):
-            proc = multiprocessing.Process(
-                target=perspective_line_renderer,
-                args=(
-                    work,
-                    results,
-                    minx,
-                    maxx,
-                    imgwidth,
-                    imgheight,
-                    texwidth,
-                    texheight,
-                    transform.xscale,
-                    transform.yscale,
-                    inverse_matrix,
-                    add_color,
-                    mult_color,
-                    hsl_shift,
-                    blendfunc,
-                    imgbytes,
-                    texbytes,
-                    maskbytes,
-                    aa_mode,
-                ),
+    if not single_threaded and cores >= 2:
+        # Let's spread the load across multiple processors. Anything compositing more
+        # than once should hold onto a CompositorPool instead of starting one each time.
+        with CompositorPool(cores) as pool:
+            return pool.perspective_composite(
+                img,
+                add_color,
+                mult_color,
+                hsl_shift,
+                transform,
+                camera,
+                focal_length,
+                mask,
+                blendfunc,
+                texture,
+                aa_mode=aa_mode,
+                clip=clip,
             )
-            procs.append(proc)
-            proc.start()
-
-        for imgy in range(miny, maxy):
-            work.put(imgy)
-            expected += 1
-
-        lines: List[bytes] = [
-            imgbytes[x : (x + (imgwidth * 4))]
-            for x in range(
-                0,
-                imgwidth * imgheight * 4,
-                imgwidth * 4,
-            )
-        ]
-        for _ in range(expected):
-            imgy, result = results.get()
-            lines[imgy] = result
 
-        for _proc in procs:
-            work.put(None)
-        for proc in procs:
-            proc.join()
-
-        signal.signal(signal.SIGINT, previous_handler)
-        if interrupted:
-            raise KeyboardInterrupt()
+    projection = perspective_projection(
+        img, transform, camera, focal_length, blendfunc, texture, clip
+    )
+    if projection is None:
+        return img
 
-        img = Image.frombytes("RGBA", (imgwidth, imgheight), b"".join(lines))
-    return img
+    # We don't have enough CPU cores to bother multiprocessing.
+    inverse, xscale, yscale, minx, miny, maxx, maxy = projection
+    imgbytes = bytearray(img.tobytes("raw", "RGBA"))
+    _render_rows(
+        range(miny, maxy),
+        minx,
+        maxx,
+        img.width,
+        img.height,
+        texture.width,
+        texture.height,
+        xscale,
+        yscale,
+        _projection(True, inverse),
+        add_color,
+        mult_color,
+        hsl_shift,
+        blendfunc,
+        imgbytes,
+        texture.tobytes("raw", "RGBA"),
+        _mask_bytes(mask),
+        aa_mode,
+    )
+    return Image.frombytes("RGBA", (img.width, img.height), bytes(imgbytes))
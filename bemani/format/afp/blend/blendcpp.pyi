@@ -1,7 +1,7 @@
 from PIL import Image  # type: ignore
 from typing import Optional
 
-from ..types import Color, HSL, Point, Matrix
+from ..types import Color, HSL, Point, Matrix, Rectangle
 
 
 def affine_composite(
@@ -14,7 +14,8 @@ def affine_composite(
     blendfunc: int,
     texture: Image.Image,
     single_threaded: bool = ...,
-    aa_mode: int = ...
+    aa_mode: int = ...,
+    clip: Optional[Rectangle] = ...
 ) -> Image.Image:
     ...
 
@@ -31,6 +32,7 @@ def perspective_composite(
     blendfunc: int,
     texture: Image.Image,
     single_threaded: bool = ...,
-    aa_mode: int = ...
+    aa_mode: int = ...,
+    clip: Optional[Rectangle] = ...
 ) -> Image.Image:
     ...
@@ -2,7 +2,7 @@ import multiprocessing
 from PIL import Image  # type: ignore
 from typing import Optional, Tuple
 
-from ..types import Color, HSL, Matrix, Point, AAMode
+from ..types import Color, HSL, Matrix, Point, Rectangle, AAMode
 from .perspective import perspective_calculate
 
 cdef extern struct floatcolor_t:
@@ -65,6 +65,7 @@ def affine_composite(
     texture: Image.Image,
     single_threaded: bool = False,
     aa_mode: int = AAMode.SSAA_OR_BILINEAR,
+    clip: Optional[Rectangle] = None,
 ) -> Image.Image:
     if blendfunc not in {0, 1, 2, 3, 8, 9, 13, 70, 256, 257}:
         print(f"WARNING: Unsupported blend {blendfunc}")
@@ -98,6 +99,13 @@ def affine_composite(
     miny = max(int(min(pix1.y, pix2.y, pix3.y, pix4.y)), 0)
     maxy = min(int(max(pix1.y, pix2.y, pix3.y, pix4.y)) + 1, imgheight)
 
+    if clip is not None:
+        # Only draw inside of the part of the canvas that we were asked to.
+        minx = max(minx, int(clip.left))
+        maxx = min(maxx, int(clip.right))
+        miny = max(miny, int(clip.top))
+        maxy = min(maxy, int(clip.bottom))
+
     if maxx <= minx or maxy <= miny:
         # This image is entirely off the screen!
         return img
@@ -175,6 +183,7 @@ def perspective_composite(
     texture: Image.Image,
     single_threaded: bool = False,
     aa_mode: int = AAMode.SSAA_ONLY,
+    clip: Optional[Rectangle] = None,
 ) -> Image.Image:
     if blendfunc not in {0, 1, 2, 3, 8, 9, 13, 70, 256, 257}:
         print(f"WARNING: Unsupported blend {blendfunc}")
@@ -193,6 +202,15 @@ def perspective_composite(
         # This texture is entirely off of the screen.
         return img
 
+    if clip is not None:
+        # Only draw inside of the part of the canvas that we were asked to.
+        minx = max(minx, int(clip.left))
+        maxx = min(maxx, int(clip.right))
+        miny = max(miny, int(clip.top))
+        maxy = min(maxy, int(clip.bottom))
+        if maxx <= minx or maxy <= miny:
+            return img
+
     # Grab the raw image data.
     imgbytes = img.tobytes('raw', 'RGBA')
     texbytes = texture.tobytes('raw', 'RGBA')
@@ -0,0 +1,546 @@
+import numpy as np
+from PIL import Image  # type: ignore
+from typing import Optional, Tuple
+
+from ..types import Color, HSL, Matrix, Point, Rectangle, AAMode
+from .blend import affine_projection, perspective_projection
+
+# This is a vectorized version of the pure python blend code, which works on every
+# pixel in the area a texture can land at once instead of one pixel at a time. It is
+# written to give exactly the same output as the pure python code, so any change to
+# the semantics over there needs to be made here as well.
+
+# The same constants colorsys uses, so that HSL shifts come out identically.
+ONE_THIRD = 1.0 / 3.0
+ONE_SIXTH = 1.0 / 6.0
+TWO_THIRD = 2.0 / 3.0
+
+
+def _rgba(img: Image.Image) -> np.ndarray:
+    return np.frombuffer(img.tobytes("raw", "RGBA"), dtype=np.uint8).reshape(
+        (img.height, img.width, 4)
+    )
+
+
+def _clamp(color: np.ndarray) -> np.ndarray:
+    # Python's round() and numpy's rint() both round halves to even.
+    return np.clip(np.rint(color), 0, 255).astype(np.int64)
+
+
+def _truncate(color: np.ndarray) -> np.ndarray:
+    return np.trunc(color).astype(np.int64)
+
+
+def _project(
+    inverse: Matrix, perspective: bool, x: np.ndarray, y: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Look up the texture coordinates for a set of canvas points, along with whether
+    # each point could be mapped at all.
+    texx = (inverse.a11 * x) + (inverse.a21 * y) + inverse.a41
+    texy = (inverse.a12 * x) + (inverse.a22 * y) + inverse.a42
+    if not perspective:
+        return texx, texy, np.ones(x.shape, dtype=bool)
+
+    texz = (inverse.a13 * x) + (inverse.a23 * y) + inverse.a43
+    valid = texz > 0.0
+    texz = np.where(valid, texz, 1.0)
+    return texx / texz, texy / texz, valid
+
+
+def _texel(coord: np.ndarray, size: int) -> np.ndarray:
+    # The same as Point.as_tuple(), with anything well outside of the texture pinned
+    # to just outside of it so that it can be safely converted to an integer.
+    return _truncate(np.clip(np.round(coord, 5), -1.0, size + 1.0))
+
+
+def _sample_center(
+    imgx: np.ndarray,
+    imgy: np.ndarray,
+    inverse: Matrix,
+    perspective: bool,
+    texdata: np.ndarray,
+    texwidth: int,
+    texheight: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    texx, texy, valid = _project(inverse, perspective, imgx + 0.5, imgy + 0.5)
+    texx = _texel(texx, texwidth)
+    texy = _texel(texy, texheight)
+
+    # If we're out of bounds, don't update.
+    hit = valid & (texx >= 0) & (texy >= 0) & (texx < texwidth) & (texy < texheight)
+    return hit, texdata[texx[hit] + (texy[hit] * texwidth)]
+
+
+def _sample_bilinear(
+    imgx: np.ndarray,
+    imgy: np.ndarray,
+    inverse: Matrix,
+    perspective: bool,
+    texdata: np.ndarray,
+    texwidth: int,
+    texheight: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    texx, texy, valid = _project(inverse, perspective, imgx + 0.5, imgy + 0.5)
+    aax = _texel(texx, texwidth)
+    aay = _texel(texy, texheight)
+
+    # Only pixels with all four neighbors inside the texture can be interpolated.
+    hit = valid & ~(
+        (aax <= 0) | (aay <= 0) | (aax >= (texwidth - 1)) | (aay >= (texheight - 1))
+    )
+    aax = aax[hit]
+    aay = aay[hit]
+    aaxrem = (texx[hit] - aax)[:, None]
+    aayrem = (texy[hit] - aay)[:, None]
+
+    # Find the four pixels that we can interpolate from. The first number is the x, and second is y.
+    tex00 = texdata[aax + (aay * texwidth)]
+    tex10 = texdata[(aax + 1) + (aay * texwidth)]
+    tex01 = texdata[aax + ((aay + 1) * texwidth)]
+    tex11 = texdata[(aax + 1) + ((aay + 1) * texwidth)]
+
+    # Calculate various scaling factors based on alpha and percentage.
+    tex00percent = tex00[:, 3:] / 255.0
+    tex10percent = tex10[:, 3:] / 255.0
+    tex01percent = tex01[:, 3:] / 255.0
+    tex11percent = tex11[:, 3:] / 255.0
+
+    y0percent = (tex00percent * (1.0 - aaxrem)) + (tex10percent * aaxrem)
+    y1percent = (tex01percent * (1.0 - aaxrem)) + (tex11percent * aaxrem)
+    finalpercent = (y0percent * (1.0 - aayrem)) + (y1percent * aayrem)
+
+    # Interpolate in the X direction on both Y axis, and then the Y direction.
+    y0 = (tex00[:, :3] * tex00percent * (1.0 - aaxrem)) + (
+        tex10[:, :3] * tex10percent * aaxrem
+    )
+    y1 = (tex01[:, :3] * tex01percent * (1.0 - aaxrem)) + (
+        tex11[:, :3] * tex11percent * aaxrem
+    )
+    blank = finalpercent <= 0.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        color = ((y0 * (1.0 - aayrem)) + (y1 * aayrem)) / finalpercent
+
+    # Pixels that would be blank are left white so we avoid dividing by zero.
+    average = np.concatenate(
+        [
+            np.where(blank, 255, _truncate(np.where(blank, 0.0, color))),
+            np.where(blank, 0, _truncate(finalpercent * 255)),
+        ],
+        axis=1,
+    )
+    return hit, average
+
+
+def _sample_ssaa(
+    imgx: np.ndarray,
+    imgy: np.ndarray,
+    imgwidth: int,
+    imgheight: int,
+    inverse: Matrix,
+    perspective: bool,
+    texdata: np.ndarray,
+    texwidth: int,
+    texheight: int,
+    xswing: float,
+    yswing: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    xpoints = [
+        0.5 - xswing,
+        0.5 - (xswing / 2.0),
+        0.5,
+        0.5 + (xswing / 2.0),
+        0.5 + xswing,
+    ]
+    ypoints = [
+        0.5 - yswing,
+        0.5 - (yswing / 2.0),
+        0.5,
+        0.5 + (yswing / 2.0),
+        0.5 + yswing,
+    ]
+
+    total = np.zeros((imgx.shape[0], 4), dtype=np.int64)
+    count = np.zeros(imgx.shape[0], dtype=np.int64)
+    denom = np.zeros(imgx.shape[0], dtype=np.int64)
+
+    for addy in ypoints:
+        for addx in xpoints:
+            xloc = imgx + addx
+            yloc = imgy + addy
+            inside = ~(
+                (xloc < 0.0) | (yloc < 0.0) | (xloc >= imgwidth) | (yloc >= imgheight)
+            )
+            denom += inside
+
+            texx, texy, valid = _project(inverse, perspective, xloc, yloc)
+            aax = _texel(texx, texwidth)
+            aay = _texel(texy, texheight)
+
+            # If we're out of bounds, don't update. Factor this in, however, so we can get partial
+            # transparency to the pixel that is already there.
+            hit = (
+                inside
+                & valid
+                & (aax >= 0)
+                & (aay >= 0)
+                & (aax < texwidth)
+                & (aay < texheight)
+            )
+            texel = texdata[np.where(hit, aax + (aay * texwidth), 0)]
+
+            # Fully transparent pixels add nothing, so skip them altogether.
+            hit &= texel[:, 3] != 0
+
+            # Make sure to factor in alpha as a poor-man's blend to ensure that partial
+            # transparency pixel values don't unnecessarily factor into average calculations.
+            apercent = texel[:, 3:] / 255.0
+            total[:, :3] += np.where(
+                hit[:, None], _truncate(texel[:, :3] * apercent), 0
+            )
+            total[:, 3] += np.where(hit, texel[:, 3], 0)
+            count += hit
+
+    # Pixels where none of the samples existed in-bounds are left alone.
+    hit = count > 0
+    total = total[hit]
+    denom = denom[hit][:, None]
+
+    # Average the pixels. Make sure to divide out the alpha in preparation for blending.
+    alpha = total[:, 3:] // denom
+    blank = alpha == 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        color = (total[:, :3] / denom) / (alpha / 255.0)
+    average = np.concatenate(
+        [np.where(blank, 255, _truncate(np.where(blank, 0.0, color))), alpha],
+        axis=1,
+    )
+    return hit, average
+
+
+def _hsl_shift(src: np.ndarray, hsl_shift: HSL) -> np.ndarray:
+    # This follows Color.as_hsl(), HSL.add() and HSL.as_rgb(), which in turn use colorsys.
+    r = src[:, 0] / 255
+    g = src[:, 1] / 255
+    b = src[:, 2] / 255
+
+    maxc = np.maximum(np.maximum(r, g), b)
+    minc = np.minimum(np.minimum(r, g), b)
+    sumc = maxc + minc
+    rangec = maxc - minc
+    l = sumc / 2.0
+    gray = minc == maxc
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = np.where(l <= 0.5, rangec / sumc, rangec / (2.0 - maxc - minc))
+        rc = (maxc - r) / rangec
+        gc = (maxc - g) / rangec
+        bc = (maxc - b) / rangec
+    h = np.where(r == maxc, bc - gc, np.where(g == maxc, 2.0 + rc - bc, 4.0 + gc - rc))
+    h = np.where(gray, 0.0, (h / 6.0) % 1.0)
+    s = np.where(gray, 0.0, s)
+
+    h = h + hsl_shift.h
+    s = s + hsl_shift.s
+    l = l + hsl_shift.l
+    while np.any(h < 0.0):
+        h = np.where(h < 0.0, h + 1.0, h)
+    while np.any(h > 1.0):
+        h = np.where(h > 1.0, h - 1.0, h)
+    s = np.minimum(np.maximum(s, 0.0), 1.0)
+    l = np.minimum(np.maximum(l, 0.0), 1.0)
+
+    m2 = np.where(l <= 0.5, l * (1.0 + s), l + s - (l * s))
+    m1 = 2.0 * l - m2
+
+    def v(hue: np.ndarray) -> np.ndarray:
+        hue = hue % 1.0
+        return np.select(
+            [hue < ONE_SIXTH, hue < 0.5, hue < TWO_THIRD],
+            [m1 + (m2 - m1) * hue * 6.0, m2, m1 + (m2 - m1) * (TWO_THIRD - hue) * 6.0],
+            m1,
+        )
+
+    gray = s == 0.0
+    return np.stack(
+        [
+            _clamp(np.where(gray, l, v(h + ONE_THIRD)) * 255),
+            _clamp(np.where(gray, l, v(h)) * 255),
+            _clamp(np.where(gray, l, v(h - ONE_THIRD)) * 255),
+            src[:, 3],
+        ],
+        axis=1,
+    )
+
+
+def _blend_point(
+    add_color: Color,
+    mult_color: Color,
+    hsl_shift: HSL,
+    src: np.ndarray,
+    dest: np.ndarray,
+    blendfunc: int,
+) -> np.ndarray:
+    # Calculate multiplicative and additive colors against the source.
+    src = np.stack(
+        [
+            _clamp((src[:, 0] * mult_color.r) + (255 * add_color.r)),
+            _clamp((src[:, 1] * mult_color.g) + (255 * add_color.g)),
+            _clamp((src[:, 2] * mult_color.b) + (255 * add_color.b)),
+            _clamp((src[:, 3] * mult_color.a) + (255 * add_color.a)),
+        ],
+        axis=1,
+    )
+
+    # Only add in HSL shift effects if they exist, since its expensive to convert and shift.
+    if not hsl_shift.is_identity:
+        src = _hsl_shift(src, hsl_shift)
+
+    srcalpha = src[:, 3:]
+    destalpha = dest[:, 3:]
+    if blendfunc == 3:
+        # Multiply, see blend_multiply().
+        src_alpha = srcalpha / 255.0
+        src_remainder = 1.0 - src_alpha
+        return np.concatenate(
+            [
+                _clamp(
+                    (255 * ((dest[:, :3] / 255.0) * (src[:, :3] / 255.0) * src_alpha))
+                    + (dest[:, :3] * src_remainder)
+                ),
+                destalpha,
+            ],
+            axis=1,
+        )
+    elif blendfunc == 8:
+        # Addition, see blend_addition().
+        srcpercent = srcalpha / 255.0
+        blended = np.concatenate(
+            [
+                _clamp(dest[:, :3] + (src[:, :3] * srcpercent)),
+                _clamp(destalpha + (255 * srcpercent)),
+            ],
+            axis=1,
+        )
+        return np.where(srcalpha == 0, dest, blended)
+    elif blendfunc == 9 or blendfunc == 70:
+        # Subtraction, see blend_subtraction().
+        srcpercent = srcalpha / 255.0
+        blended = np.concatenate(
+            [_clamp(dest[:, :3] - (src[:, :3] * srcpercent)), destalpha], axis=1
+        )
+        return np.where(srcalpha == 0, dest, blended)
+    elif blendfunc == 13:
+        # Overlay, see blend_overlay().
+        return np.concatenate(
+            [
+                _clamp(255 * (2.0 * (dest[:, :3] / 255.0) * (src[:, :3] / 255.0))),
+                destalpha,
+            ],
+            axis=1,
+        )
+    elif blendfunc == 256:
+        # Mask combining, see blend_mask_combine().
+        return np.where(
+            (destalpha != 0) & (srcalpha != 0),
+            np.array([255, 0, 0, 255]),
+            np.array([0, 0, 0, 0]),
+        )
+    elif blendfunc == 257:
+        # Mask creation, see blend_mask_create().
+        return np.where(
+            srcalpha != 0, np.array([255, 0, 0, 255]), np.array([0, 0, 0, 0])
+        )
+    else:
+        # Normal alpha blending, see blend_normal().
+        srcpercent = srcalpha / 255.0
+        destpercent = destalpha / 255.0
+        srcremainder = 1.0 - srcpercent
+        new_alpha = np.maximum(
+            np.minimum(0.0, srcpercent + destpercent * srcremainder), 1.0
+        )
+        blended = np.concatenate(
+            [
+                _clamp(
+                    (
+                        (dest[:, :3] * destpercent * srcremainder)
+                        + (src[:, :3] * srcpercent)
+                    )
+                    / new_alpha
+                ),
+                _clamp(255 * new_alpha),
+            ],
+            axis=1,
+        )
+        return np.where(srcalpha == 0, dest, np.where(srcalpha == 255, src, blended))
+
+
+def _composite(
+    img: Image.Image,
+    add_color: Color,
+    mult_color: Color,
+    hsl_shift: HSL,
+    mask: Optional[Image.Image],
+    blendfunc: int,
+    texture: Image.Image,
+    aa_mode: int,
+    perspective: bool,
+    inverse: Matrix,
+    xscale: float,
+    yscale: float,
+    minx: int,
+    miny: int,
+    maxx: int,
+    maxy: int,
+) -> Image.Image:
+    imgwidth = img.width
+    imgheight = img.height
+    texwidth = texture.width
+    texheight = texture.height
+
+    # Every pixel in the area the texture can land in, as one flat list.
+    canvas = _rgba(img).copy()
+    texdata = _rgba(texture).reshape((-1, 4)).astype(np.int64)
+    imgy, imgx = np.mgrid[miny:maxy, minx:maxx]
+    imgx = imgx.ravel()
+    imgy = imgy.ravel()
+    dest = canvas[miny:maxy, minx:maxx].reshape((-1, 4)).astype(np.int64)
+
+    # Pixels that are masked off are never touched.
+    if mask is not None:
+        maskdata = np.frombuffer(
+            mask.split()[-1].tobytes("raw", "L"), dtype=np.uint8
+        ).reshape((imgheight, imgwidth))
+        drawn = np.flatnonzero(maskdata[miny:maxy, minx:maxx].ravel() != 0)
+    else:
+        drawn = np.arange(imgx.shape[0])
+
+    # Work out which pixels get drawn and with what color, in the same manner as
+    # pixel_renderer() does for a single pixel.
+    updates = []
+    if aa_mode == AAMode.NONE:
+        hit, average = _sample_center(
+            imgx[drawn],
+            imgy[drawn],
+            inverse,
+            perspective,
+            texdata,
+            texwidth,
+            texheight,
+        )
+        updates.append((drawn[hit], average))
+    else:
+        if aa_mode == AAMode.SSAA_OR_BILINEAR and xscale >= 1.0 and yscale >= 1.0:
+            hit, average = _sample_bilinear(
+                imgx[drawn],
+                imgy[drawn],
+                inverse,
+                perspective,
+                texdata,
+                texwidth,
+                texheight,
+            )
+            updates.append((drawn[hit], average))
+            drawn = drawn[~hit]
+
+        # Anything that can't be interpolated is supersampled instead. This has the effect
+        # of anti-aliasing scaled up images a bit softer than would otherwise be achieved.
+        if aa_mode == AAMode.UNSCALED_SSAA_ONLY:
+            xswing = 0.5
+            yswing = 0.5
+        else:
+            xswing = 0.5 * max(1.0, xscale)
+            yswing = 0.5 * max(1.0, yscale)
+
+        hit, average = _sample_ssaa(
+            imgx[drawn],
+            imgy[drawn],
+            imgwidth,
+            imgheight,
+            inverse,
+            perspective,
+            texdata,
+            texwidth,
+            texheight,
+            xswing,
+            yswing,
+        )
+        updates.append((drawn[hit], average))
+
+    # Finally, blend it with the destination.
+    for pixels, average in updates:
+        if pixels.shape[0] > 0:
+            dest[pixels] = _blend_point(
+                add_color, mult_color, hsl_shift, average, dest[pixels], blendfunc
+            )
+
+    canvas[miny:maxy, minx:maxx] = dest.reshape((maxy - miny, maxx - minx, 4))
+    return Image.frombytes("RGBA", (imgwidth, imgheight), canvas.tobytes())
+
+
+def affine_composite(
+    img: Image.Image,
+    add_color: Color,
+    mult_color: Color,
+    hsl_shift: HSL,
+    transform: Matrix,
+    mask: Optional[Image.Image],
+    blendfunc: int,
+    texture: Image.Image,
+    single_threaded: bool = False,
+    aa_mode: int = AAMode.SSAA_OR_BILINEAR,
+    clip: Optional[Rectangle] = None,
+) -> Image.Image:
+    # Everything is done on this thread, single_threaded is only here so that this can
+    # be swapped in for the other implementations.
+    projection = affine_projection(img, transform, blendfunc, texture, clip)
+    if projection is None:
+        return img
+
+    return _composite(
+        img,
+        add_color,
+        mult_color,
+        hsl_shift,
+        mask,
+        blendfunc,
+        texture,
+        aa_mode,
+        False,
+        *projection,
+    )
+
+
+def perspective_composite(
+    img: Image.Image,
+    add_color: Color,
+    mult_color: Color,
+    hsl_shift: HSL,
+    transform: Matrix,
+    camera: Point,
+    focal_length: float,
+    mask: Optional[Image.Image],
+    blendfunc: int,
+    texture: Image.Image,
+    single_threaded: bool = False,
+    aa_mode: int = AAMode.SSAA_ONLY,
+    clip: Optional[Rectangle] = None,
+) -> Image.Image:
+    # Everything is done on this thread, single_threaded is only here so that this can
+    # be swapped in for the other implementations.
+    projection = perspective_projection(
+        img, transform, camera, focal_length, blendfunc, texture, clip
+    )
+    if projection is None:
+        return img
+
+    return _composite(
+        img,
+        add_color,
+        mult_color,
+        hsl_shift,
+        mask,
+        blendfunc,
+        texture,
+        aa_mode,
+        True,
+        *projection,
+    )
@@ -1,7 +1,21 @@
-from typing import Any, Dict, Generator, List, Set, Tuple, Optional, Union
+import collections
+import difflib
+import multiprocessing
+import queue
+import signal
+import traceback
+from typing import Any, Deque, Dict, Generator, List, Set, Tuple, Optional, Union
+from typing_extensions import Final
 from PIL import Image  # type: ignore
 
-from .blend import affine_composite, perspective_composite
+from .blend import (
+    CompositorPool,
+    affine_composite,
+    affine_projection,
+    perspective_composite,
+    perspective_projection,
+    backend,
+)
 from .swf import (
     SWF,
     Frame,
@@ -42,6 +56,16 @@ from .types import (
 from .geo import Shape, DrawParams
 from .util import VerboseOutput
 
+# Past this many separate areas of a frame that need to be drawn again, they are drawn
+# as one area covering all of them.
+MAX_DIRTY_RECTANGLES: Final[int] = 4
+
+# How many seconds to wait on frame processes before checking that they are still running.
+WORKER_POLL_INTERVAL: Final[float] = 1.0
+
+# How many bytes of rectangle textures and projected masks to hold on to between frames.
+DEFAULT_CACHE_SIZE: Final[int] = 64 * 1024 * 1024
+
 
 class RegisteredClip:
     # A movie clip that we are rendering, frame by frame. These are manifest by the root
@@ -85,7 +109,8 @@ class RegisteredShape:
         self.tex_points: List[Point] = tex_points
         self.tex_colors: List[Color] = tex_colors
         self.draw_params: List[DrawParams] = draw_params
-        self.rectangle: Optional[Image.image] = None
+        # The size and color of this shape, if it turns out to be a solid rectangle.
+        self.rectangle: Optional[Tuple[int, int, Tuple[int, int, int, int]]] = None
 
     @property
     def reference(self) -> str:
@@ -126,7 +151,6 @@ class RegisteredDummy:
 class Mask:
     def __init__(self, bounds: Rectangle) -> None:
         self.bounds = bounds
-        self.rectangle: Optional[Image.Image] = None
 
 
 class PlacedObject:
@@ -470,6 +494,211 @@ class PlacedCamera:
         self.adjusted = False
 
 
+def _union(
+    first: Tuple[int, int, int, int], second: Tuple[int, int, int, int]
+) -> Tuple[int, int, int, int]:
+    return (
+        min(first[0], second[0]),
+        min(first[1], second[1]),
+        max(first[2], second[2]),
+        max(first[3], second[3]),
+    )
+
+
+def _matrix_key(matrix: Matrix) -> Tuple[float, ...]:
+    return (
+        matrix.a11,
+        matrix.a12,
+        matrix.a13,
+        matrix.a21,
+        matrix.a22,
+        matrix.a23,
+        matrix.a31,
+        matrix.a32,
+        matrix.a33,
+        matrix.a41,
+        matrix.a42,
+        matrix.a43,
+    )
+
+
+def _camera_key(camera: Optional[PlacedCamera]) -> Optional[Tuple[float, ...]]:
+    if camera is None:
+        return None
+    return (camera.center.x, camera.center.y, camera.center.z, camera.focal_length)
+
+
+class DrawMask:
+    # A mask that some placed object was drawn with on a particular frame. It is cut out of
+    # the mask that the object's parent was drawn with, or out of the whole movie if there
+    # is no parent mask. A camera means that the mask is drawn with perspective projection.
+    def __init__(
+        self,
+        parent: Optional["DrawMask"],
+        bounds: Rectangle,
+        transform: Matrix,
+        camera: Optional[PlacedCamera],
+    ) -> None:
+        self.parent = parent
+        self.bounds = bounds
+        self.transform = transform
+        self.camera = camera
+
+    def key(self) -> Tuple[Any, ...]:
+        # Two masks with the same key cut out exactly the same pixels.
+        return (
+            self.parent.key() if self.parent is not None else None,
+            (self.bounds.left, self.bounds.top, self.bounds.bottom, self.bounds.right),
+            _matrix_key(self.transform),
+            _camera_key(self.camera),
+        )
+
+
+class DrawCommand:
+    # A single texture to composite onto a frame, with everything about how to draw it
+    # already worked out from the placed objects it came from. Exactly one of texture (the
+    # name of a registered texture) or rectangle (the size and color of a solid rectangle)
+    # is set. A camera means that the texture is drawn with perspective projection.
+    def __init__(
+        self,
+        texture: Optional[str],
+        rectangle: Optional[Tuple[int, int, Tuple[int, int, int, int]]],
+        transform: Matrix,
+        camera: Optional[PlacedCamera],
+        add_color: Color,
+        mult_color: Color,
+        hsl_shift: HSL,
+        blend: int,
+        mask: Optional[DrawMask],
+        aa_mode: int,
+    ) -> None:
+        self.texture = texture
+        self.rectangle = rectangle
+        self.transform = transform
+        self.camera = camera
+        self.add_color = add_color
+        self.mult_color = mult_color
+        self.hsl_shift = hsl_shift
+        self.blend = blend
+        self.mask = mask
+        self.aa_mode = aa_mode
+
+    def key(self) -> Tuple[Any, ...]:
+        # Two commands with the same key draw exactly the same pixels onto the same canvas.
+        return (
+            self.texture,
+            self.rectangle,
+            _matrix_key(self.transform),
+            _camera_key(self.camera),
+            (self.add_color.r, self.add_color.g, self.add_color.b, self.add_color.a),
+            (
+                self.mult_color.r,
+                self.mult_color.g,
+                self.mult_color.b,
+                self.mult_color.a,
+            ),
+            (self.hsl_shift.h, self.hsl_shift.s, self.hsl_shift.l),
+            self.blend,
+            self.mask.key() if self.mask is not None else None,
+            self.aa_mode,
+        )
+
+
+class DisplayList:
+    # Everything that needs to be drawn for a single frame, in the order it should be drawn.
+    # This is a snapshot, so it stays the same no matter how far the animation it came from
+    # has advanced since, and it can be drawn somewhere else entirely by AFPRenderer.rasterize().
+    def __init__(
+        self, width: int, height: int, color: Color, commands: List[DrawCommand]
+    ) -> None:
+        self.width = width
+        self.height = height
+        self.color = color
+        self.commands = commands
+
+
+class FrameStats:
+    # How much work it took to rasterize a frame. Objects that were reused didn't need to
+    # be drawn again because they look the same as on the last frame drawn and nothing
+    # changed around them, and pixels is how much of the frame had to be drawn again.
+    def __init__(
+        self, objects: int, reused: int, pixels: int, total_pixels: int
+    ) -> None:
+        self.objects = objects
+        self.reused = reused
+        self.pixels = pixels
+        self.total_pixels = total_pixels
+
+    def __repr__(self) -> str:
+        return f"reused {self.reused}/{self.objects} objects, drew {self.pixels}/{self.total_pixels} pixels"
+
+
+class DrawnFrame:
+    # The last frame that was rasterized, along with what each command in it looked like and
+    # where it was drawn, so the next frame can work out what is different.
+    def __init__(
+        self,
+        display_list: DisplayList,
+        keys: List[Tuple[Any, ...]],
+        bounds: List[Optional[Tuple[int, int, int, int]]],
+        image: Image.Image,
+    ) -> None:
+        self.display_list = display_list
+        self.keys = keys
+        self.bounds = bounds
+        self.image = image
+
+
+class ImageCache:
+    # Images that are expensive to draw and that are likely to be needed again, such as
+    # projected masks, keyed by anything that fully describes how they were drawn. Once the
+    # images held add up to more than max_bytes, the least recently used ones are dropped.
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.__images: "collections.OrderedDict[Any, Image.Image]" = (
+            collections.OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self.__images)
+
+    def __repr__(self) -> str:
+        return f"{len(self.__images)} images, {self.bytes}/{self.max_bytes} bytes, {self.hits} hits, {self.misses} misses"
+
+    @staticmethod
+    def size(image: Image.Image) -> int:
+        return image.width * image.height * len(image.getbands())
+
+    def get(self, key: Any) -> Optional[Image.Image]:
+        image = self.__images.get(key)
+        if image is None:
+            self.misses += 1
+            return None
+
+        self.__images.move_to_end(key)
+        self.hits += 1
+        return image
+
+    def put(self, key: Any, image: Image.Image) -> None:
+        old = self.__images.pop(key, None)
+        if old is not None:
+            self.bytes -= self.size(old)
+
+        size = self.size(image)
+        if size > self.max_bytes:
+            # Would push everything else out and still not fit.
+            return
+
+        self.__images[key] = image
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, evicted = self.__images.popitem(last=False)
+            self.bytes -= self.size(evicted)
+
+
 class Global:
     def __init__(self, root: PlacedClip, clip: PlacedClip) -> None:
         self.root = root
@@ -722,6 +951,9 @@ class AFPRenderer(VerboseOutput):
         swfs: Dict[str, SWF] = {},
         single_threaded: bool = False,
         enable_aa: bool = False,
+        frame_processes: int = 0,
+        frame_window: Optional[int] = None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
     ) -> None:
         super().__init__()
 
@@ -729,6 +961,24 @@ class AFPRenderer(VerboseOutput):
         self.__single_threaded = single_threaded
         self.__enable_aa = enable_aa
 
+        # When rendering animations, draw whole frames on this many other processes while
+        # the animation keeps playing here, with no more than frame_window frames handed out
+        # at once. Zero means to draw every frame here as soon as it is played.
+        self.__frame_processes = frame_processes
+        self.__frame_window = max(frame_window or (frame_processes * 2), 1)
+
+        # The pure python compositor spreads its work across processes, so keep them
+        # around for every frame instead of starting new ones for every object drawn.
+        # The other compositors are fast enough to not need them.
+        self.__pool: Optional[CompositorPool] = None
+        if (
+            not single_threaded
+            and frame_processes == 0
+            and backend == "python"
+            and multiprocessing.cpu_count() >= 2
+        ):
+            self.__pool = CompositorPool()
+
         # Library of shapes (draw instructions), textures (actual images) and swfs (us and other files for imports).
         self.shapes: Dict[str, Shape] = shapes
         self.textures: Dict[str, Image.Image] = textures
@@ -742,6 +992,17 @@ class AFPRenderer(VerboseOutput):
         self.__root: Optional[PlacedClip] = None
         self.__camera: Optional[PlacedCamera] = None
 
+        # Textures that are drawn for rectangle shapes and masks, as well as masks that have
+        # already been projected onto a canvas, which can be reused across frames as long as
+        # they fit in cache_size bytes. When drawing frames on other processes, each of them
+        # gets a cache this size of its own.
+        self.__cache_size = cache_size
+        self.__cache = ImageCache(cache_size)
+
+        # The last frame that was rasterized, and how much drawing that frame took.
+        self.__last_frame: Optional[DrawnFrame] = None
+        self.frame_stats: Optional[FrameStats] = None
+
         # List of imports that we provide stub implementations for.
         self.__stubbed_swfs: Set[str] = {
             "aeplib.aeplib",
@@ -757,6 +1018,7 @@ class AFPRenderer(VerboseOutput):
     def add_texture(self, name: str, data: Image.Image) -> None:
         # Register a named texture (already loaded PIL image) with the renderer.
         self.textures[name] = data.convert("RGBA")
+        self.__last_frame = None
 
     def add_swf(self, name: str, data: SWF) -> None:
         # Register a named SWF with the renderer.
@@ -764,6 +1026,12 @@ class AFPRenderer(VerboseOutput):
             data.parse()
         self.swfs[name] = data
 
+    def close(self) -> None:
+        # Shut down any processes we started for rendering. They will be started again
+        # if anything else is rendered afterwards.
+        if self.__pool is not None:
+            self.__pool.close()
+
     def render_path(
         self,
         path: str,
@@ -1417,16 +1685,344 @@ class AFPRenderer(VerboseOutput):
         else:
             raise Exception(f"Failed to process tag: {tag}")
 
-    def __apply_mask(
+    def __affine_composite(
         self,
-        parent_mask: Image.Image,
+        img: Image.Image,
+        add_color: Color,
+        mult_color: Color,
+        hsl_shift: HSL,
         transform: Matrix,
-        projection: int,
-        mask: Mask,
+        mask: Optional[Image.Image],
+        blendfunc: int,
+        texture: Image.Image,
+        texture_name: Optional[str] = None,
+        aa_mode: int = AAMode.SSAA_OR_BILINEAR,
+        clip: Optional[Rectangle] = None,
     ) -> Image.Image:
-        if mask.rectangle is None:
+        # Textures are given by name when they come out of self.textures, so that the pool
+        # only has to be handed them once rather than for every frame they're drawn in.
+        if self.__pool is not None:
+            return self.__pool.affine_composite(
+                img,
+                add_color,
+                mult_color,
+                hsl_shift,
+                transform,
+                mask,
+                blendfunc,
+                texture,
+                aa_mode=aa_mode,
+                texture_name=texture_name,
+                clip=clip,
+            )
+
+        return affine_composite(
+            img,
+            add_color,
+            mult_color,
+            hsl_shift,
+            transform,
+            mask,
+            blendfunc,
+            texture,
+            single_threaded=self.__single_threaded,
+            aa_mode=aa_mode,
+            clip=clip,
+        )
+
+    def __perspective_composite(
+        self,
+        img: Image.Image,
+        add_color: Color,
+        mult_color: Color,
+        hsl_shift: HSL,
+        transform: Matrix,
+        camera: Point,
+        focal_length: float,
+        mask: Optional[Image.Image],
+        blendfunc: int,
+        texture: Image.Image,
+        texture_name: Optional[str] = None,
+        aa_mode: int = AAMode.SSAA_ONLY,
+        clip: Optional[Rectangle] = None,
+    ) -> Image.Image:
+        if self.__pool is not None:
+            return self.__pool.perspective_composite(
+                img,
+                add_color,
+                mult_color,
+                hsl_shift,
+                transform,
+                camera,
+                focal_length,
+                mask,
+                blendfunc,
+                texture,
+                aa_mode=aa_mode,
+                texture_name=texture_name,
+                clip=clip,
+            )
+
+        return perspective_composite(
+            img,
+            add_color,
+            mult_color,
+            hsl_shift,
+            transform,
+            camera,
+            focal_length,
+            mask,
+            blendfunc,
+            texture,
+            single_threaded=self.__single_threaded,
+            aa_mode=aa_mode,
+            clip=clip,
+        )
+
+    def rasterize(self, display_list: DisplayList) -> Image.Image:
+        # Draw a frame that was snapshotted while playing an animation. This only needs the
+        # textures that the snapshot refers to, so any renderer that has the same textures
+        # registered can draw it, including ones in other processes. The last frame drawn
+        # is kept around, so only the parts of this frame that look different from it are
+        # drawn again. How much that saved is available afterwards in frame_stats.
+        size = (display_list.width, display_list.height)
+        background = display_list.color.as_tuple()
+        textures = [self.__texture(command) for command in display_list.commands]
+        keys = [command.key() for command in display_list.commands]
+        bounds = [
+            self.__bounds(size, command, texture)
+            for command, texture in zip(display_list.commands, textures)
+        ]
+
+        last = self.__last_frame
+        if (
+            last is not None
+            and (last.display_list.width, last.display_list.height) == size
+            and last.display_list.color.as_tuple() == background
+        ):
+            # Start with the last frame, and clear out only the parts that are different.
+            dirty = self.__dirty_rectangles(last, keys, bounds)
+            curimage = last.image.copy()
+            for rectangle in dirty:
+                curimage.paste(background, rectangle)
+        else:
+            dirty = [(0, 0, display_list.width, display_list.height)]
+            curimage = Image.new("RGBA", size, color=background)
+
+        # Create the root mask for where to draw the root clip. The compositors only look at
+        # the alpha of a mask, so they are handed just that, which saves them pulling it out
+        # of the whole mask for every object drawn.
+        movie_mask = Image.new("RGBA", size, color=(255, 0, 0, 255))
+        movie_alpha = Image.new("L", size, color=255)
+
+        # Many commands are drawn with the same mask, so only look each one up once.
+        masks: Dict[int, Image.Image] = {}
+        alphas: Dict[int, Image.Image] = {}
+        drawn: Set[int] = set()
+
+        for left, top, right, bottom in dirty:
+            clip = Rectangle(left=left, top=top, bottom=bottom, right=right)
+            for i, command in enumerate(display_list.commands):
+                bound = bounds[i]
+                if (
+                    bound is None
+                    or bound[0] >= right
+                    or bound[2] <= left
+                    or bound[1] >= bottom
+                    or bound[3] <= top
+                ):
+                    # This doesn't draw anything inside of the area we're redrawing.
+                    continue
+                drawn.add(i)
+
+                if command.mask is not None:
+                    mask = self.__mask_alpha(command.mask, movie_mask, masks, alphas)
+                else:
+                    mask = movie_alpha
+
+                if command.camera is None:
+                    curimage = self.__affine_composite(
+                        curimage,
+                        command.add_color,
+                        command.mult_color,
+                        command.hsl_shift,
+                        command.transform,
+                        mask,
+                        command.blend,
+                        textures[i],
+                        texture_name=command.texture,
+                        aa_mode=command.aa_mode,
+                        clip=clip,
+                    )
+                else:
+                    curimage = self.__perspective_composite(
+                        curimage,
+                        command.add_color,
+                        command.mult_color,
+                        command.hsl_shift,
+                        command.transform,
+                        command.camera.center,
+                        command.camera.focal_length,
+                        mask,
+                        command.blend,
+                        textures[i],
+                        texture_name=command.texture,
+                        aa_mode=command.aa_mode,
+                        clip=clip,
+                    )
+
+        self.__last_frame = DrawnFrame(display_list, keys, bounds, curimage)
+        self.frame_stats = FrameStats(
+            len(display_list.commands),
+            len(display_list.commands) - len(drawn),
+            sum((r - l) * (b - t) for l, t, r, b in dirty),
+            display_list.width * display_list.height,
+        )
+        return curimage
+
+    def __texture(self, command: DrawCommand) -> Image.Image:
+        if command.texture is not None:
+            return self.textures[command.texture]
+        elif command.rectangle is not None:
+            return self.__rectangle(command.rectangle)
+        else:
+            raise Exception("Logic error, draw command without a texture!")
+
+    def __bounds(
+        self, size: Tuple[int, int], command: DrawCommand, texture: Image.Image
+    ) -> Optional[Tuple[int, int, int, int]]:
+        # The compositors never draw outside of the area that the texture is projected onto,
+        # so that's all that a command can change. This is asked for with the normal blend
+        # so that unsupported blends aren't warned about twice, they just won't draw anything.
+        canvas = Image.new("RGBA", size)
+        if command.camera is None:
+            projection = affine_projection(canvas, command.transform, 0, texture)
+        else:
+            projection = perspective_projection(
+                canvas,
+                command.transform,
+                command.camera.center,
+                command.camera.focal_length,
+                0,
+                texture,
+            )
+
+        if projection is None:
+            return None
+        _, _, _, minx, miny, maxx, maxy = projection
+        return (minx, miny, maxx, maxy)
+
+    def __dirty_rectangles(
+        self,
+        last: DrawnFrame,
+        keys: List[Tuple[Any, ...]],
+        bounds: List[Optional[Tuple[int, int, int, int]]],
+    ) -> List[Tuple[int, int, int, int]]:
+        # Any pixel that only had commands drawn over it that match up, in the same order,
+        # with the commands drawn over it on the last frame looks the same as it did then.
+        # So, only the areas under commands that come and go between frames need drawing.
+        dirty: List[Tuple[int, int, int, int]] = []
+        matcher = difflib.SequenceMatcher(None, last.keys, keys, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag != "equal":
+                dirty.extend(b for b in last.bounds[i1:i2] if b is not None)
+                dirty.extend(b for b in bounds[j1:j2] if b is not None)
+
+        # Combine overlapping areas so that nothing is drawn twice.
+        merged: List[Tuple[int, int, int, int]] = []
+        for rectangle in dirty:
+            overlapping = True
+            while overlapping:
+                overlapping = False
+                for other in merged:
+                    if (
+                        rectangle[0] < other[2]
+                        and other[0] < rectangle[2]
+                        and rectangle[1] < other[3]
+                        and other[1] < rectangle[3]
+                    ):
+                        merged.remove(other)
+                        rectangle = _union(rectangle, other)
+                        overlapping = True
+                        break
+            merged.append(rectangle)
+
+        if len(merged) > MAX_DIRTY_RECTANGLES:
+            # Every area drawn costs a pass over the whole canvas for each command under it,
+            # so past a few areas it is cheaper to draw everything around them at once.
+            rectangle = merged[0]
+            for other in merged[1:]:
+                rectangle = _union(rectangle, other)
+            merged = [rectangle]
+
+        return merged
+
+    def __rectangle(
+        self, rectangle: Tuple[int, int, Tuple[int, int, int, int]]
+    ) -> Image.Image:
+        key = ("rectangle", rectangle)
+        image = self.__cache.get(key)
+        if image is None:
+            width, height, color = rectangle
+            image = Image.new("RGBA", (width, height), color)
+            self.__cache.put(key, image)
+        return image
+
+    def __mask_alpha(
+        self,
+        mask: DrawMask,
+        movie_mask: Image.Image,
+        masks: Dict[int, Image.Image],
+        alphas: Dict[int, Image.Image],
+    ) -> Image.Image:
+        if id(mask) not in alphas:
+            key = ("mask alpha", movie_mask.size, mask.key())
+            alpha = self.__cache.get(key)
+            if alpha is None:
+                alpha = self.__draw_mask(mask, movie_mask, masks).getchannel("A")
+                self.__cache.put(key, alpha)
+            alphas[id(mask)] = alpha
+        return alphas[id(mask)]
+
+    def __draw_mask(
+        self,
+        mask: DrawMask,
+        movie_mask: Image.Image,
+        masks: Dict[int, Image.Image],
+    ) -> Image.Image:
+        if id(mask) not in masks:
+            # Masks are drawn on their own canvas, so the same mask on the same size canvas
+            # always comes out the same, even on another frame entirely.
+            key = ("mask", movie_mask.size, mask.key())
+            calculated = self.__cache.get(key)
+            if calculated is None:
+                calculated = self.__project_mask(mask, movie_mask, masks)
+                self.__cache.put(key, calculated)
+            masks[id(mask)] = calculated
+        return masks[id(mask)]
+
+    def __project_mask(
+        self,
+        mask: DrawMask,
+        movie_mask: Image.Image,
+        masks: Dict[int, Image.Image],
+    ) -> Image.Image:
+        if mask.parent is not None:
+            parent_mask = self.__draw_mask(mask.parent, movie_mask, masks)
+        else:
+            parent_mask = movie_mask
+
+        key = (
+            "mask rectangle",
+            mask.bounds.left,
+            mask.bounds.top,
+            mask.bounds.bottom,
+            mask.bounds.right,
+        )
+        rectangle = self.__cache.get(key)
+        if rectangle is None:
             # Calculate the new mask rectangle.
-            mask.rectangle = affine_composite(
+            rectangle = self.__affine_composite(
                 Image.new(
                     "RGBA",
                     (int(mask.bounds.right), int(mask.bounds.bottom)),
@@ -1443,65 +2039,44 @@ class AFPRenderer(VerboseOutput):
                     (int(mask.bounds.width), int(mask.bounds.height)),
                     (255, 0, 0, 255),
                 ),
-                single_threaded=self.__single_threaded,
                 aa_mode=AAMode.NONE,
             )
+            self.__cache.put(key, rectangle)
 
         # Draw the mask onto a new image.
-        if projection == AP2PlaceObjectTag.PROJECTION_AFFINE:
-            calculated_mask = affine_composite(
+        if mask.camera is None:
+            calculated_mask = self.__affine_composite(
                 Image.new(
                     "RGBA", (parent_mask.width, parent_mask.height), (0, 0, 0, 0)
                 ),
                 Color(0.0, 0.0, 0.0, 0.0),
                 Color(1.0, 1.0, 1.0, 1.0),
                 HSL(0.0, 0.0, 0.0),
-                transform,
+                mask.transform,
                 None,
                 257,
-                mask.rectangle,
-                single_threaded=self.__single_threaded,
+                rectangle,
+                aa_mode=AAMode.NONE,
+            )
+        else:
+            calculated_mask = self.__perspective_composite(
+                Image.new(
+                    "RGBA", (parent_mask.width, parent_mask.height), (0, 0, 0, 0)
+                ),
+                Color(0.0, 0.0, 0.0, 0.0),
+                Color(1.0, 1.0, 1.0, 1.0),
+                HSL(0.0, 0.0, 0.0),
+                mask.transform,
+                mask.camera.center,
+                mask.camera.focal_length,
+                None,
+                257,
+                rectangle,
                 aa_mode=AAMode.NONE,
             )
-        elif projection == AP2PlaceObjectTag.PROJECTION_PERSPECTIVE:
-            if self.__camera is None:
-                print(
-                    "WARNING: Element requests perspective projection but no camera exists!"
-                )
-                calculated_mask = affine_composite(
-                    Image.new(
-                        "RGBA", (parent_mask.width, parent_mask.height), (0, 0, 0, 0)
-                    ),
-                    Color(0.0, 0.0, 0.0, 0.0),
-                    Color(1.0, 1.0, 1.0, 1.0),
-                    HSL(0.0, 0.0, 0.0),
-                    transform,
-                    None,
-                    257,
-                    mask.rectangle,
-                    single_threaded=self.__single_threaded,
-                    aa_mode=AAMode.NONE,
-                )
-            else:
-                calculated_mask = perspective_composite(
-                    Image.new(
-                        "RGBA", (parent_mask.width, parent_mask.height), (0, 0, 0, 0)
-                    ),
-                    Color(0.0, 0.0, 0.0, 0.0),
-                    Color(1.0, 1.0, 1.0, 1.0),
-                    HSL(0.0, 0.0, 0.0),
-                    transform,
-                    self.__camera.center,
-                    self.__camera.focal_length,
-                    None,
-                    257,
-                    mask.rectangle,
-                    single_threaded=self.__single_threaded,
-                    aa_mode=AAMode.NONE,
-                )
 
         # Composite it onto the current mask.
-        return affine_composite(
+        return self.__affine_composite(
             parent_mask.copy(),
             Color(0.0, 0.0, 0.0, 0.0),
             Color(1.0, 1.0, 1.0, 1.0),
@@ -1510,30 +2085,29 @@ class AFPRenderer(VerboseOutput):
             None,
             256,
             calculated_mask,
-            single_threaded=self.__single_threaded,
             aa_mode=AAMode.NONE,
         )
 
-    def __render_object(
+    def __draw_object(
         self,
-        img: Image.Image,
+        commands: List[DrawCommand],
         renderable: PlacedObject,
         parent_transform: Matrix,
         parent_projection: int,
-        parent_mask: Image.Image,
+        parent_mask: Optional[DrawMask],
         parent_mult_color: Color,
         parent_add_color: Color,
         parent_hsl_shift: HSL,
         parent_blend: int,
         only_depths: Optional[List[int]] = None,
         prefix: str = "",
-    ) -> Image.Image:
+    ) -> None:
         if not renderable.visible:
             self.vprint(
                 f"{prefix}  Ignoring invisible placed object ID {renderable.object_id} from sprite {renderable.source.tag_id} ({renderable.source.reference}) on Depth {renderable.depth}",
                 component="render",
             )
-            return img
+            return
 
         self.vprint(
             f"{prefix}  Rendering placed object ID {renderable.object_id} from sprite {renderable.source.tag_id} ({renderable.source.reference}) onto Depth {renderable.depth}",
@@ -1565,9 +2139,22 @@ class AFPRenderer(VerboseOutput):
             blend = parent_blend
 
         if renderable.mask:
-            mask = self.__apply_mask(
-                parent_mask, transform, projection, renderable.mask
-            )
+            if projection == AP2PlaceObjectTag.PROJECTION_AFFINE:
+                mask: Optional[DrawMask] = DrawMask(
+                    parent_mask, renderable.mask.bounds, transform, None
+                )
+            elif projection == AP2PlaceObjectTag.PROJECTION_PERSPECTIVE:
+                if self.__camera is None:
+                    print(
+                        "WARNING: Element requests perspective projection but no camera exists!"
+                    )
+                mask = DrawMask(
+                    parent_mask, renderable.mask.bounds, transform, self.__camera
+                )
+            else:
+                raise Exception(
+                    f"Cannot apply mask to placed object ID {renderable.object_id} with no projection!"
+                )
         else:
             mask = parent_mask
 
@@ -1596,7 +2183,7 @@ class AFPRenderer(VerboseOutput):
                 if renderable.depth not in only_depths:
                     if renderable.depth != -1:
                         # Not on the correct depth plane.
-                        return img
+                        return
                     new_only_depths = only_depths
 
             self.vprint(
@@ -1619,8 +2206,8 @@ class AFPRenderer(VerboseOutput):
                 for obj in renderable.placed_objects:
                     if obj.depth != depth:
                         continue
-                    img = self.__render_object(
-                        img,
+                    self.__draw_object(
+                        commands,
                         obj,
                         transform,
                         projection,
@@ -1635,7 +2222,7 @@ class AFPRenderer(VerboseOutput):
         elif isinstance(renderable, PlacedShape):
             if only_depths is not None and renderable.depth not in only_depths:
                 # Not on the correct depth plane.
-                return img
+                return
 
             self.vprint(
                 f"{prefix}    Rendered object uses {projection_string} with transform [{transform}]",
@@ -1657,21 +2244,21 @@ class AFPRenderer(VerboseOutput):
             for params in shape.draw_params:
                 if not (params.flags & 0x1):
                     # Not instantiable, don't render.
-                    return img
+                    return
 
                 if params.flags & 0x4:
                     # TODO: Need to support blending and UV coordinate colors here.
                     print("WARNING: Unhandled UV coordinate color!")
 
-                texture = None
-                rectangle = False
+                texture_name = None
+                rectangle = None
                 if params.flags & 0x2:
                     # We need to look up the texture for this.
                     if params.region not in self.textures:
                         raise Exception(
                             f"Cannot find texture reference {params.region}!"
                         )
-                    texture = self.textures[params.region]
+                    texture_name = params.region
 
                     if params.flags & 0x8:
                         # TODO: This texture gets further blended somehow? Not sure this is ever used.
@@ -1708,15 +2295,14 @@ class AFPRenderer(VerboseOutput):
                         if bad:
                             print("WARNING: Unsupported non-rectangle shape!")
 
-                        shape.rectangle = Image.new(
-                            "RGBA",
-                            (int(right - left), int(bottom - top)),
-                            (params.blend.as_tuple()),
+                        shape.rectangle = (
+                            int(right - left),
+                            int(bottom - top),
+                            params.blend.as_tuple(),
                         )
-                    texture = shape.rectangle
-                    rectangle = True
+                    rectangle = shape.rectangle
 
-                if texture is not None:
+                if texture_name is not None or rectangle is not None:
                     if projection == AP2PlaceObjectTag.PROJECTION_AFFINE:
                         if self.__enable_aa:
                             aamode = (
@@ -1727,17 +2313,19 @@ class AFPRenderer(VerboseOutput):
                         else:
                             aamode = AAMode.NONE
 
-                        img = affine_composite(
-                            img,
-                            add_color,
-                            mult_color,
-                            hsl_shift,
-                            transform,
-                            mask,
-                            blend,
-                            texture,
-                            single_threaded=self.__single_threaded,
-                            aa_mode=aamode,
+                        commands.append(
+                            DrawCommand(
+                                texture_name,
+                                rectangle,
+                                transform,
+                                None,
+                                add_color,
+                                mult_color,
+                                hsl_shift,
+                                blend,
+                                mask,
+                                aamode,
+                            )
                         )
                     elif projection == AP2PlaceObjectTag.PROJECTION_PERSPECTIVE:
                         if self.__camera is None:
@@ -1753,18 +2341,6 @@ class AFPRenderer(VerboseOutput):
                             print(
                                 "WARNING: Element requests perspective projection but no camera exists!"
                             )
-                            img = affine_composite(
-                                img,
-                                add_color,
-                                mult_color,
-                                hsl_shift,
-                                transform,
-                                mask,
-                                blend,
-                                texture,
-                                single_threaded=self.__single_threaded,
-                                aa_mode=aamode,
-                            )
                         else:
                             if self.__enable_aa:
                                 aamode = (
@@ -1775,25 +2351,25 @@ class AFPRenderer(VerboseOutput):
                             else:
                                 aamode = AAMode.NONE
 
-                            img = perspective_composite(
-                                img,
+                        commands.append(
+                            DrawCommand(
+                                texture_name,
+                                rectangle,
+                                transform,
+                                self.__camera,
                                 add_color,
                                 mult_color,
                                 hsl_shift,
-                                transform,
-                                self.__camera.center,
-                                self.__camera.focal_length,
-                                mask,
                                 blend,
-                                texture,
-                                single_threaded=self.__single_threaded,
-                                aa_mode=aamode,
+                                mask,
+                                aamode,
                             )
+                        )
 
         elif isinstance(renderable, PlacedImage):
             if only_depths is not None and renderable.depth not in only_depths:
                 # Not on the correct depth plane.
-                return img
+                return
 
             self.vprint(
                 f"{prefix}    Rendered object uses {projection_string} with transform [{transform}]",
@@ -1809,64 +2385,52 @@ class AFPRenderer(VerboseOutput):
             )
 
             # This is a shape draw reference.
-            texture = self.textures[renderable.source.reference]
             if projection == AP2PlaceObjectTag.PROJECTION_AFFINE:
-                img = affine_composite(
-                    img,
-                    add_color,
-                    mult_color,
-                    hsl_shift,
-                    transform,
-                    mask,
-                    blend,
-                    texture,
-                    single_threaded=self.__single_threaded,
-                    aa_mode=AAMode.SSAA_OR_BILINEAR
-                    if self.__enable_aa
-                    else AAMode.NONE,
+                commands.append(
+                    DrawCommand(
+                        renderable.source.reference,
+                        None,
+                        transform,
+                        None,
+                        add_color,
+                        mult_color,
+                        hsl_shift,
+                        blend,
+                        mask,
+                        AAMode.SSAA_OR_BILINEAR if self.__enable_aa else AAMode.NONE,
+                    )
                 )
             elif projection == AP2PlaceObjectTag.PROJECTION_PERSPECTIVE:
                 if self.__camera is None:
                     print(
                         "WARNING: Element requests perspective projection but no camera exists!"
                     )
-                    img = affine_composite(
-                        img,
-                        add_color,
-                        mult_color,
-                        hsl_shift,
-                        transform,
-                        mask,
-                        blend,
-                        texture,
-                        single_threaded=self.__single_threaded,
-                        aa_mode=AAMode.SSAA_OR_BILINEAR
-                        if self.__enable_aa
-                        else AAMode.NONE,
+                    aamode = (
+                        AAMode.SSAA_OR_BILINEAR if self.__enable_aa else AAMode.NONE
                     )
                 else:
-                    img = perspective_composite(
-                        img,
+                    aamode = AAMode.SSAA_ONLY if self.__enable_aa else AAMode.NONE
+
+                commands.append(
+                    DrawCommand(
+                        renderable.source.reference,
+                        None,
+                        transform,
+                        self.__camera,
                         add_color,
                         mult_color,
                         hsl_shift,
-                        transform,
-                        self.__camera.center,
-                        self.__camera.focal_length,
-                        mask,
                         blend,
-                        texture,
-                        single_threaded=self.__single_threaded,
-                        aa_mode=AAMode.SSAA_ONLY if self.__enable_aa else AAMode.NONE,
+                        mask,
+                        aamode,
                     )
+                )
         elif isinstance(renderable, PlacedDummy):
             # Nothing to do!
             pass
         else:
             raise Exception(f"Unknown placed object type to render {renderable}!")
 
-        return img
-
     def __is_dirty(self, clip: PlacedClip) -> bool:
         # If we are dirty ourselves, then the clip is definitely dirty.
         if clip.requested_frame is not None:
@@ -2143,11 +2707,179 @@ class AFPRenderer(VerboseOutput):
         overridden_width: Optional[float],
         overridden_height: Optional[float],
     ) -> Generator[Image.Image, None, None]:
+        # Textures might have changed since the last render, so don't draw over a frame that
+        # might have been drawn with different ones.
+        self.__last_frame = None
+
+        snapshots = self.__snapshot(
+            swf,
+            only_depths,
+            only_frames,
+            movie_transform,
+            background_image,
+            overridden_width,
+            overridden_height,
+        )
+        if self.__frame_processes > 0:
+            rendered = self.__rasterize_pipelined(snapshots)
+        else:
+            rendered = self.__rasterize_in_order(snapshots)
+
+        frameno: int = 0
+        try:
+            for frameno, curimage, stats in rendered:
+                if stats is not None:
+                    self.vprint(
+                        f"Finished rendering frame {frameno}/{len(swf.frames)}, {stats}",
+                        component="core",
+                    )
+                else:
+                    self.vprint(
+                        f"Finished rendering frame {frameno}/{len(swf.frames)}",
+                        component="core",
+                    )
+                yield curimage
+
+            if self.__frame_processes == 0:
+                self.vprint(f"Image cache: {self.__cache}", component="core")
+        except KeyboardInterrupt:
+            # Allow ctrl-c to end early and render a partial animation.
+            print(
+                f"WARNING: Interrupted early, will render only {frameno}/{len(swf.frames)} frames of animation!"
+            )
+        finally:
+            rendered.close()
+            snapshots.close()
+
+    def __rasterize_in_order(
+        self, snapshots: Generator[Tuple[int, Optional[DisplayList]], None, None]
+    ) -> Generator[Tuple[int, Image.Image, Optional[FrameStats]], None, None]:
+        last_rendered_frame: Optional[Image.Image] = None
+        for frameno, display_list in snapshots:
+            stats: Optional[FrameStats] = None
+            if display_list is not None:
+                curimage = self.rasterize(display_list)
+                stats = self.frame_stats
+            elif last_rendered_frame is not None:
+                # Nothing changed, make a copy of the previous render.
+                curimage = last_rendered_frame.copy()
+            else:
+                raise Exception("Logic error, no previous frame to copy!")
+
+            last_rendered_frame = curimage
+            yield frameno, curimage, stats
+
+    def __rasterize_pipelined(
+        self, snapshots: Generator[Tuple[int, Optional[DisplayList]], None, None]
+    ) -> Generator[Tuple[int, Image.Image, Optional[FrameStats]], None, None]:
+        # Frames are drawn by other processes in whatever order they get to them, while we
+        # keep advancing the animation. Only so many frames are handed out past the one
+        # that is next to be returned, so that a long animation doesn't pile up in memory
+        # behind one slow frame.
+        work: multiprocessing.Queue = multiprocessing.Queue()
+        results: multiprocessing.Queue = multiprocessing.Queue()
+        procs: List[multiprocessing.Process] = []
+
+        # Frames in the order they should be returned, along with the job drawing them or
+        # None if they are a copy of the frame before them.
+        pending: Deque[Tuple[int, Optional[int]]] = collections.deque()
+        finished: Dict[int, Tuple[Image.Image, Optional[FrameStats]]] = {}
+        last_rendered_frame: Optional[Image.Image] = None
+        jobid = 0
+        exhausted = False
+
+        try:
+            while True:
+                while not exhausted and len(pending) < self.__frame_window:
+                    try:
+                        frameno, display_list = next(snapshots)
+                    except StopIteration:
+                        exhausted = True
+                        break
+
+                    if display_list is None:
+                        pending.append((frameno, None))
+                    else:
+                        if not procs:
+                            # Playing the animation registers textures of its own, such as
+                            # background images, so only hand the texture library over once
+                            # the first frame is ready to draw.
+                            procs = self.__start_workers(work, results)
+
+                        work.put((jobid, display_list))
+                        pending.append((frameno, jobid))
+                        jobid += 1
+
+                if not pending:
+                    break
+
+                frameno, job = pending.popleft()
+                stats: Optional[FrameStats] = None
+                if job is not None:
+                    while job not in finished:
+                        try:
+                            doneid, image, donestats, error = results.get(
+                                timeout=WORKER_POLL_INTERVAL
+                            )
+                        except queue.Empty:
+                            # Workers only exit when we stop them, so one that is gone
+                            # was killed and will never send back what it was drawing.
+                            for proc in procs:
+                                if not proc.is_alive():
+                                    raise Exception(
+                                        f"Rendering process exited unexpectedly with code {proc.exitcode}!"
+                                    )
+                            continue
+                        if error is not None:
+                            raise Exception(f"Rendering process failed:\n{error}")
+                        finished[doneid] = (image, donestats)
+                    curimage, stats = finished.pop(job)
+                elif last_rendered_frame is not None:
+                    # Nothing changed, make a copy of the previous render.
+                    curimage = last_rendered_frame.copy()
+                else:
+                    raise Exception("Logic error, no previous frame to copy!")
+
+                last_rendered_frame = curimage
+                yield frameno, curimage, stats
+        finally:
+            # Anything still being drawn is no longer wanted.
+            for proc in procs:
+                proc.terminate()
+            for proc in procs:
+                proc.join()
+
+    def __start_workers(
+        self, work: multiprocessing.Queue, results: multiprocessing.Queue
+    ) -> List[multiprocessing.Process]:
+        procs: List[multiprocessing.Process] = []
+        for _ in range(self.__frame_processes):
+            proc = multiprocessing.Process(
+                target=_rasterize_worker,
+                args=(self.textures, self.__cache_size, work, results),
+                daemon=True,
+            )
+            procs.append(proc)
+            proc.start()
+        return procs
+
+    def __snapshot(
+        self,
+        swf: SWF,
+        only_depths: Optional[List[int]],
+        only_frames: Optional[List[int]],
+        movie_transform: Matrix,
+        background_image: Optional[List[Image.Image]],
+        overridden_width: Optional[float],
+        overridden_height: Optional[float],
+    ) -> Generator[Tuple[int, Optional[DisplayList]], None, None]:
+        # Play the animation, returning the frame number and a snapshot of what to draw for
+        # every frame that should be rendered, or None if it looks the same as the last one.
         # First, let's attempt to resolve imports.
         self.__registered_objects = self.__handle_imports(swf)
 
         # Initialize overall frame advancement stuff.
-        last_rendered_frame: Optional[Image.Image] = None
+        last_display_list: Optional[DisplayList] = None
         frameno: int = 0
 
         # Calculate actual size based on given movie transform.
@@ -2234,11 +2966,6 @@ class AFPRenderer(VerboseOutput):
             )
             root_clip.placed_objects.append(background_container)
 
-        # Create the root mask for where to draw the root clip.
-        movie_mask = Image.new(
-            "RGBA", (resized_width, resized_height), color=(255, 0, 0, 255)
-        )
-
         # These could possibly be overwritten from an external source of we wanted.
         actual_mult_color = Color(1.0, 1.0, 1.0, 1.0)
         actual_add_color = Color(0.0, 0.0, 0.0, 0.0)
@@ -2297,11 +3024,11 @@ class AFPRenderer(VerboseOutput):
                         f"Skipped rendering frame {frameno + 1}/{len(root_clip.source.frames)}",
                         component="core",
                     )
-                    last_rendered_frame = None
+                    last_display_list = None
                     frameno += 1
                     continue
 
-                if changed or last_rendered_frame is None:
+                if changed or last_display_list is None:
                     if (
                         last_width != root_clip._width
                         or last_height != root_clip._height
@@ -2316,45 +3043,67 @@ class AFPRenderer(VerboseOutput):
                                 f"WARNING: Root clip requested to resize to {last_width}x{last_height} which overflows root canvas!"
                             )
 
-                    # Now, render out the placed objects.
-                    color = swf.color or Color(0.0, 0.0, 0.0, 0.0)
-                    curimage = Image.new(
-                        "RGBA", (resized_width, resized_height), color=color.as_tuple()
-                    )
-                    curimage = self.__render_object(
-                        curimage,
+                    # Now, snapshot the placed objects.
+                    commands: List[DrawCommand] = []
+                    self.__draw_object(
+                        commands,
                         root_clip,
                         movie_transform,
                         AP2PlaceObjectTag.PROJECTION_AFFINE,
-                        movie_mask,
+                        None,
                         actual_mult_color,
                         actual_add_color,
                         actual_hsl_shift,
                         actual_blend,
                         only_depths=only_depths,
                     )
+                    display_list: Optional[DisplayList] = DisplayList(
+                        resized_width,
+                        resized_height,
+                        swf.color or Color(0.0, 0.0, 0.0, 0.0),
+                        commands,
+                    )
+                    last_display_list = display_list
                 else:
-                    # Nothing changed, make a copy of the previous render.
+                    # Nothing changed, the previous render can be used again.
                     self.vprint("  Using previous frame render", component="core")
-                    curimage = last_rendered_frame.copy()
+                    display_list = None
 
                 # Return that frame, advance our bookkeeping.
-                self.vprint(
-                    f"Finished rendering frame {frameno + 1}/{len(root_clip.source.frames)}",
-                    component="core",
-                )
-                last_rendered_frame = curimage
                 frameno += 1
-                yield curimage
+                yield frameno, display_list
 
                 # See if we should bail because we passed the last requested frame.
                 if max_frame is not None and frameno == max_frame:
                     break
-        except KeyboardInterrupt:
-            # Allow ctrl-c to end early and render a partial animation.
-            print(
-                f"WARNING: Interrupted early, will render only {frameno}/{len(root_clip.source.frames)} frames of animation!"
-            )
-
-        # Clean up
-        self.__root = None
+        finally:
+            # Clean up
+            self.__root = None
+
+
+def _rasterize_worker(
+    textures: Dict[str, Image.Image],
+    cache_size: int,
+    work: multiprocessing.Queue,
+    results: multiprocessing.Queue,
+) -> None:
+    # The process playing the animation decides what happens on a ctrl-c, and will tear
+    # us down if it needs to.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Frames are already being drawn in parallel, so don't spread each one out as well.
+    renderer = AFPRenderer(
+        textures=textures, single_threaded=True, cache_size=cache_size
+    )
+
+    while True:
+        job = work.get()
+        if job is None:
+            break
+
+        jobid, display_list = job
+        try:
+            image = renderer.rasterize(display_list)
+            results.put((jobid, image, renderer.frame_stats, None))
+        except Exception:
+            results.put((jobid, None, None, traceback.format_exc()))
@@ -133,6 +133,7 @@ def format_server(server: Server) -> Dict[str, Any]:
         "token": server.token,
         "allow_stats": server.allow_stats,
         "allow_scores": server.allow_scores,
+        "synced": g.data.local.music.get_latest_remote_sync(server.id),
     }
 
 
@@ -655,7 +656,7 @@ def queryserver(serverid: int) -> Dict[str, Any]:
     if server is None:
         raise Exception("Unable to find server to query!")
 
-    client = APIClient(server.uri, server.token, False, False)
+    client = APIClient(server.uri, server.token, False, False, g.config)
     try:
         serverinfo = client.get_server_info()
         info = {
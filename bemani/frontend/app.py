@@ -3,7 +3,6 @@ import os
 import re
 import traceback
 from typing import Callable, Dict, Any, Optional, List
-from react.jsx import JSXTransformer  # type: ignore
 from flask import (
     Flask,
     flash,
@@ -21,6 +20,7 @@ from functools import wraps
 
 from bemani.common import AESCipher, GameConstants
 from bemani.data import Config, Data
+from bemani.frontend.jsx import Manifest, transform
 from bemani.frontend.types import g
 from bemani.frontend.templates import templates_location
 from bemani.frontend.static import static_location
@@ -45,6 +45,7 @@ def before_request() -> None:
         config={
             "CACHE_TYPE": "filesystem",
             "CACHE_DIR": config.cache_dir,
+            "CACHE_THRESHOLD": config.cache_threshold,
         },
     )
     if request.endpoint in ["jsx", "static"]:
@@ -154,13 +155,37 @@ def cacheable(max_age: int) -> Callable:
     return __cache
 
 
-# Note that this should really only be used for debug builds. In production, you should use
-# the "jsx" utility to bulk convert your JSX files and put them in a directory where your
-# actual webserver (nginx, apache, etc) can find them and serve them without going through
-# this endpoint.
+# Built JSX files are named after a hash of their contents, so they can be cached forever.
+JSX_MAX_AGE: int = 86400 * 365
+jsx_manifests: Dict[str, Manifest] = {}
+
+
+def jsx_manifest() -> Manifest:
+    # Config can be reloaded, so look up the manifest for wherever it currently points.
+    directory = config.jsx_directory
+    if directory not in jsx_manifests:
+        jsx_manifests[directory] = Manifest(directory)
+    return jsx_manifests[directory]
+
+
+# Files built with the "jsx" utility or at startup are served straight from the build
+# directory, and in production you can point your actual webserver (nginx, apache, etc)
+# at that directory to serve them without going through this endpoint. Anything that
+# isn't built, or everything in debug builds so that edits show up, is transformed on
+# the fly instead.
 @app.route("/jsx/<path:filename>")
-@cacheable(86400)
 def jsx(filename: str) -> Response:
+    manifest = jsx_manifest()
+    if manifest.is_output(filename):
+        # Only names listed in the manifest get here, so there's no path to traverse.
+        with open(os.path.join(manifest.directory, filename), "rb") as f:
+            response = Response(f.read(), mimetype="application/javascript")
+        response.set_etag(filename.rsplit(".", 2)[-2])
+        response.cache_control.public = True
+        response.cache_control.max_age = JSX_MAX_AGE
+        response.cache_control.immutable = True
+        return response.make_conditional(request)
+
     try:
         # Figure out what our update time is to namespace on
         jsxfile = os.path.join(static_location, filename)
@@ -173,13 +198,13 @@ def jsx(filename: str) -> Response:
         jsx = g.cache.get(namespace)
         if jsx is None:
             with open(jsxfile, "rb") as f:
-                transformer = JSXTransformer()
-                jsx = transformer.transform_string(
-                    polyfill_fragments(f.read().decode("utf-8"))
-                )
+                jsx = transform(f.read().decode("utf-8"))
             # Set the cache to one year, since we namespace on this file's update time
             g.cache.set(namespace, jsx, timeout=86400 * 365)
-        return Response(jsx, mimetype="application/javascript")
+        response = Response(jsx, mimetype="application/javascript")
+        response.add_etag()
+        response.cache_control.max_age = 86400
+        return response.make_conditional(request)
     except Exception as exception:
         if app.debug:
             # We should make sure this error shows up on the frontend
@@ -236,12 +261,6 @@ def assets(filename: str) -> Response:
         abort(404)
 
 
-def polyfill_fragments(jsx: str) -> str:
-    jsx = jsx.replace("<>", "<React.Fragment>")
-    jsx = jsx.replace("</>", "</React.Fragment>")
-    return jsx
-
-
 def render_react(
     title: str,
     controller: str,
@@ -354,6 +373,13 @@ def jinja2_theme(filename: str) -> str:
     return url_for("static", filename=f"themes/{config.theme}/{filename}")
 
 
+def jinja2_jsx(filename: str) -> str:
+    output = None if app.debug else jsx_manifest().output(filename)
+    if output is not None:
+        return url_for("jsx", filename=output)
+    return url_for("jsx", filename=filename) + f"?v={FRONTEND_CACHE_BUST}"
+
+
 @app.context_processor
 def navigation() -> Dict[str, Any]:
     # Look up JSX components we should provide for every page load
@@ -376,6 +402,7 @@ def navigation() -> Dict[str, Any]:
                 "any": jinja2_any,
                 "assets": f"themes/{config.theme}/",
                 "theme_url": jinja2_theme,
+                "jsx_url": jinja2_jsx,
                 "cache_bust": f"v={FRONTEND_CACHE_BUST}",
             }
     except AttributeError:
@@ -387,6 +414,7 @@ def navigation() -> Dict[str, Any]:
             "any": jinja2_any,
             "assets": f"themes/{config.theme}/",
             "theme_url": jinja2_theme,
+            "jsx_url": jinja2_jsx,
             "cache_bust": f"v={FRONTEND_CACHE_BUST}",
         }
 
@@ -942,5 +970,6 @@ def navigation() -> Dict[str, Any]:
         "any": jinja2_any,
         "assets": f"themes/{config.theme}/",
         "theme_url": jinja2_theme,
+        "jsx_url": jinja2_jsx,
         "cache_bust": f"v={FRONTEND_CACHE_BUST}",
     }
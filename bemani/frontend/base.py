@@ -1,11 +1,13 @@
 # vim: set fileencoding=utf-8
 import copy
+import pickle
+import zlib
 from abc import ABC
 from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, cast
 
 from flask_caching import Cache
 
-from bemani.common import GameConstants, Profile, ValidatedDict, ID
+from bemani.common import GameConstants, Profile, ValidatedDict, ID, Time
 from bemani.data import Data, Config, Score, Attempt, Link, Song, UserID, RemoteUser
 
 
@@ -35,6 +37,19 @@ class FrontendBase(ABC):
     """
     valid_rival_types: List[str] = []
 
+    """
+    Number of seconds that network records, scores and top scores built by the
+    scheduler are served for. If the scheduler stops refreshing them, pages go
+    back to querying the DB once this runs out.
+    """
+    snapshot_timeout: int = 600
+
+    """
+    Number of seconds between full rebuilds of the network snapshot. In between,
+    the scheduler only folds in what changed since the previous refresh.
+    """
+    snapshot_rebuild: int = 86400
+
     def __init__(self, data: Data, config: Config, cache: Cache) -> None:
         self.data = data
         self.config = config
@@ -128,14 +143,14 @@ class FrontendBase(ABC):
         self.cache.set(f"{self.game.value}.sorted_songs", songs, timeout=600)
         return songs
 
-    def get_all_player_info(
+    def __format_player_info(
         self,
         userids: List[UserID],
-        limit: Optional[int] = None,
-        allow_remote: bool = False,
+        profiles: Dict[UserID, Dict[int, Profile]],
+        playstats: Dict[UserID, ValidatedDict],
+        limit: Optional[int],
     ) -> Dict[UserID, Dict[int, Dict[str, Any]]]:
         info: Dict[UserID, Dict[int, Dict[str, Any]]] = {}
-        playstats: Dict[UserID, ValidatedDict] = {}
 
         # Find all versions of the users' profiles, sorted newest to oldest.
         versions = sorted(
@@ -143,24 +158,13 @@ class FrontendBase(ABC):
         )
         for userid in userids:
             info[userid] = {}
+            userprofiles = profiles.get(userid, {})
             userlimit = limit
             for version in versions:
-                if allow_remote:
-                    profile = self.data.remote.user.get_profile(
-                        self.game, version, userid
-                    )
-                else:
-                    profile = self.data.local.user.get_profile(
-                        self.game, version, userid
-                    )
+                profile = userprofiles.get(version)
                 if profile is not None:
-                    if userid not in playstats:
-                        stats = self.data.local.game.get_settings(self.game, userid)
-                        if stats is None:
-                            stats = ValidatedDict()
-                        playstats[userid] = stats
                     info[userid][version] = self.format_profile(
-                        profile, playstats[userid]
+                        profile, playstats.get(userid) or ValidatedDict()
                     )
                     info[userid][version]["remote"] = RemoteUser.is_remote(userid)
                     # Exit out if we've hit the limit
@@ -171,6 +175,56 @@ class FrontendBase(ABC):
 
         return info
 
+    def __load_player_info(
+        self,
+        userids: Optional[List[UserID]],
+        limit: Optional[int] = None,
+        allow_remote: bool = False,
+    ) -> Dict[UserID, Dict[int, Dict[str, Any]]]:
+        # Load every local profile and play stats for these users at once, instead of
+        # once for every user and version.
+        localids = (
+            None
+            if userids is None
+            else [userid for userid in userids if not RemoteUser.is_remote(userid)]
+        )
+        profiles: Dict[UserID, Dict[int, Profile]] = {}
+        for userid, profile in self.data.local.user.get_all_game_profiles(
+            self.game, localids
+        ):
+            profiles.setdefault(userid, {})[profile.version] = profile
+
+        if userids is None:
+            userids = list(profiles.keys())
+        elif allow_remote:
+            # Remote profiles can only be looked up one at a time.
+            versions = [version for (game, version, name) in self.all_games()]
+            for userid in userids:
+                if not RemoteUser.is_remote(userid):
+                    continue
+                for version in versions:
+                    profile = self.data.remote.user.get_profile(
+                        self.game, version, userid
+                    )
+                    if profile is not None:
+                        profiles.setdefault(userid, {})[version] = profile
+
+        playstats = {
+            userid: stats
+            for userid, stats in self.data.local.game.get_all_settings(
+                self.game, None if localids is None else list(profiles.keys())
+            )
+        }
+        return self.__format_player_info(userids, profiles, playstats, limit)
+
+    def get_all_player_info(
+        self,
+        userids: List[UserID],
+        limit: Optional[int] = None,
+        allow_remote: bool = False,
+    ) -> Dict[UserID, Dict[int, Dict[str, Any]]]:
+        return self.__load_player_info(userids, limit, allow_remote)
+
     def get_latest_player_info(
         self, userids: List[UserID]
     ) -> Dict[UserID, Dict[str, Any]]:
@@ -185,51 +239,104 @@ class FrontendBase(ABC):
 
         return info
 
-    def get_all_players(self) -> Dict[UserID, Dict[str, Any]]:
-        userids: Set[UserID] = set()
+    def get_all_players(
+        self, force_db_load: bool = False
+    ) -> Dict[UserID, Dict[str, Any]]:
+        if not force_db_load:
+            cached_players = self.cache.get(f"{self.game.value}.all_players")
+            if cached_players is not None:
+                return cast(Dict[UserID, Dict[str, Any]], cached_players)
+
+        # Grab the latest profile for every user that has played any version.
+        all_info = self.__load_player_info(None, 1)
+        players = {
+            userid: info[version]
+            for userid, info in all_info.items()
+            for version in info
+        }
 
-        versions = [version for (game, version, name) in self.all_games()]
-        for version in versions:
-            userids.update(self.data.local.user.get_all_players(self.game, version))
+        self.cache.set(f"{self.game.value}.all_players", players, timeout=600)
+        return players
+
+    def __snapshot_key(self, name: str) -> str:
+        if self.version is None:
+            return f"{self.game.value}.network.{name}"
+        return f"{self.game.value}.{self.version}.network.{name}"
 
-        return self.get_latest_player_info(list(userids))
+    @staticmethod
+    def __pack(value: Any) -> bytes:
+        return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    @staticmethod
+    def __unpack(blob: bytes) -> Any:
+        return pickle.loads(zlib.decompress(blob))
+
+    def __get_snapshot(self, name: str) -> Optional[Any]:
+        if self.cache.get(self.__snapshot_key("refreshed")) is None:
+            # The scheduler isn't keeping the snapshot up to date.
+            return None
+        blob = self.cache.get(self.__snapshot_key(name))
+        if blob is None:
+            return None
+        return self.__unpack(blob)
+
+    def __put_snapshot(self, name: str, value: Any, timeout: int) -> None:
+        self.cache.set(self.__snapshot_key(name), self.__pack(value), timeout=timeout)
+
+    def __network_scores(
+        self, attempts: List[Tuple[Optional[UserID], Attempt]]
+    ) -> Dict[str, Any]:
+        userids: Dict[UserID, None] = {}
+        formatted: List[Tuple[UserID, Dict[str, Any]]] = []
+        for userid, attempt in attempts:
+            if userid is not None:
+                userids[userid] = None
+                formatted.append((userid, self.format_attempt(userid, attempt)))
+
+        formatted = sorted(
+            formatted,
+            reverse=True,
+            key=lambda attempt: (
+                attempt[1]["timestamp"],
+                attempt[1]["songid"],
+                attempt[1]["chart"],
+            ),
+        )
+        return {
+            "attempts": [attempt for (_, attempt) in formatted],
+            "userids": [userid for (userid, _) in formatted],
+            "players": self.get_latest_player_info(list(userids)),
+        }
 
     def get_network_scores(self, limit: Optional[int] = None) -> Dict[str, Any]:
-        userids: List[UserID] = []
+        snapshot = self.__get_snapshot("scores")
+        if snapshot is not None:
+            attempts = snapshot["attempts"][:limit]
+            userids = snapshot["userids"][:limit]
+            return {
+                "attempts": attempts,
+                "players": {
+                    userid: snapshot["players"][userid]
+                    for userid in userids
+                    if userid in snapshot["players"]
+                },
+            }
 
         # Find all attempts across all games
-        attempts = [
-            attempt
-            for attempt in self.data.local.music.get_all_attempts(
+        scores = self.__network_scores(
+            self.data.local.music.get_all_attempts(
                 game=self.game, version=self.version, limit=limit
             )
-            if attempt[0] is not None
-        ]
-        for attempt in attempts:
-            if attempt[0] not in userids:
-                userids.append(attempt[0])
-
-        return {
-            "attempts": sorted(
-                [self.format_attempt(attempt[0], attempt[1]) for attempt in attempts],
-                reverse=True,
-                key=lambda attempt: (
-                    attempt["timestamp"],
-                    attempt["songid"],
-                    attempt["chart"],
-                ),
-            ),
-            "players": self.get_latest_player_info(userids),
-        }
+        )
+        del scores["userids"]
+        return scores
 
-    def get_network_records(self) -> Dict[str, Any]:
+    def __network_records(
+        self, highscores: List[Tuple[UserID, Score]]
+    ) -> Dict[str, Any]:
         records: Dict[str, Tuple[UserID, Score]] = {}
         userids: List[UserID] = []
 
-        # Find all high-scores across all games
-        highscores = self.data.local.music.get_all_records(
-            game=self.game, version=self.version
-        )
         for score in highscores:
             index = self.make_index(score[1].id, score[1].chart)
             if index not in records:
@@ -255,6 +362,121 @@ class FrontendBase(ABC):
             "players": self.get_latest_player_info(userids),
         }
 
+    def get_network_records(self) -> Dict[str, Any]:
+        snapshot = self.__get_snapshot("records")
+        if snapshot is not None:
+            return cast(Dict[str, Any], snapshot)
+
+        # Find all high-scores across all games
+        return self.__network_records(
+            self.data.local.music.get_all_records(game=self.game, version=self.version)
+        )
+
+    def refresh_network_snapshot(self) -> None:
+        """
+        Build or refresh the snapshot of network records, scores and top scores that
+        pages are served from. This is meant to be called regularly by the scheduler.
+        Apart from a periodic full rebuild, only attempts and scores newer than the
+        previous refresh are looked up and folded into the snapshot.
+        """
+        now = Time.now()
+        blob = self.cache.get(self.__snapshot_key("state"))
+        state: Optional[Dict[str, Any]] = (
+            self.__unpack(blob) if blob is not None else None
+        )
+        changed: Set[int] = set()
+
+        if state is None or state["built"] + self.snapshot_rebuild <= now:
+            state = {
+                "built": now,
+                "since": now,
+                "records": {
+                    (score.id, score.chart): (userid, score)
+                    for (userid, score) in self.data.local.music.get_all_records(
+                        game=self.game, version=self.version
+                    )
+                },
+                "attempts": self.data.local.music.get_all_attempts(
+                    game=self.game, version=self.version
+                ),
+            }
+        else:
+            since = state["since"]
+            seen = {
+                attempt.key
+                for (_, attempt) in state["attempts"]
+                if attempt.timestamp >= since
+            }
+            attempts = [
+                (userid, attempt)
+                for (userid, attempt) in self.data.local.music.get_all_attempts(
+                    game=self.game, version=self.version, timelimit=since
+                )
+                if attempt.key not in seen
+            ]
+
+            if attempts:
+                records: Dict[Tuple[int, int], Tuple[UserID, Score]] = state["records"]
+                for userid, score in self.data.local.music.get_all_scores(
+                    game=self.game, version=self.version, since=since
+                ):
+                    changed.add(score.id)
+                    index = (score.id, score.chart)
+                    current = records.get(index)
+                    if current is not None:
+                        # King-of-the-hill rules, the same as get_all_records().
+                        if current[1].key != score.key and (
+                            (current[1].points, current[1].timestamp, current[1].key)
+                            > (score.points, score.timestamp, score.key)
+                        ):
+                            continue
+                        score.plays = current[1].plays
+                    else:
+                        score.plays = 0
+                    records[index] = (userid, score)
+
+                # Records count every play of a chart, not just the record holder's.
+                for _, attempt in attempts:
+                    changed.add(attempt.id)
+                    index = (attempt.id, attempt.chart)
+                    if index in records:
+                        records[index][1].plays += 1
+
+                state["attempts"] = attempts + state["attempts"]
+            state["since"] = now
+
+        # Refresh the top scores of any song that was played and is cached.
+        for songid in list(changed):
+            for chart in self.valid_charts:
+                alternate = self.get_duplicate_id(songid, chart)
+                if alternate is not None:
+                    changed.add(alternate[0])
+        for songid in changed:
+            if self.cache.has(self.__snapshot_key(f"topscores.{songid}")):
+                self.__put_snapshot(
+                    f"topscores.{songid}",
+                    self.__top_scores(songid),
+                    self.snapshot_timeout,
+                )
+
+        self.__put_snapshot(
+            "records",
+            self.__network_records(
+                sorted(
+                    state["records"].values(),
+                    key=lambda record: (record[1].id, record[1].chart),
+                )
+            ),
+            self.snapshot_timeout,
+        )
+        self.__put_snapshot(
+            "scores", self.__network_scores(state["attempts"]), self.snapshot_timeout
+        )
+        self.__put_snapshot("state", state, self.snapshot_rebuild)
+        self.cache.set(
+            self.__snapshot_key("refreshed"), now, timeout=self.snapshot_timeout
+        )
+
     def get_scores(
         self, userid: UserID, limit: Optional[int] = None
     ) -> List[Dict[str, Any]]:
@@ -316,7 +538,7 @@ class FrontendBase(ABC):
 
         return [self.format_score(None, records[index][1]) for index in records]
 
-    def get_top_scores(self, musicid: int) -> Dict[str, Any]:
+    def __top_scores(self, musicid: int) -> Dict[str, Any]:
         scores = self.data.local.music.get_all_scores(
             game=self.game, version=self.version, songid=musicid
         )
@@ -349,6 +571,19 @@ class FrontendBase(ABC):
             "players": self.get_latest_player_info(userids),
         }
 
+    def get_top_scores(self, musicid: int) -> Dict[str, Any]:
+        snapshot = self.__get_snapshot(f"topscores.{musicid}")
+        if snapshot is not None:
+            return cast(Dict[str, Any], snapshot)
+
+        topscores = self.__top_scores(musicid)
+        if self.cache.get(self.__snapshot_key("refreshed")) is not None:
+            # The scheduler will keep this up to date from now on.
+            self.__put_snapshot(
+                f"topscores.{musicid}", topscores, self.snapshot_timeout
+            )
+        return topscores
+
     def get_rivals(
         self, userid: UserID
     ) -> Tuple[
@@ -1,7 +1,21 @@
+from flask_caching import Cache
+
 from bemani.data import Config, Data
+from bemani.frontend.app import app
+from bemani.frontend.bishi.bishi import BishiBashiFrontend
 
 
 class BishiBashiCache:
     @classmethod
     def preload(cls, data: Data, config: Config) -> None:
-        pass
+        cache = Cache(
+            app,
+            config={
+                "CACHE_TYPE": "filesystem",
+                "CACHE_DIR": config.cache_dir,
+                "CACHE_THRESHOLD": config.cache_threshold,
+            },
+        )
+        frontend = BishiBashiFrontend(data, config, cache)
+        frontend.get_all_players(force_db_load=True)
+        frontend.refresh_network_snapshot()
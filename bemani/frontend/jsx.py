@@ -0,0 +1,361 @@
+import concurrent.futures
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from typing_extensions import Final
+
+from react.jsx import JSXTransformer  # type: ignore
+
+from bemani.frontend.static import static_location
+
+# Bump this whenever the transform or minifier changes, so that everything is rebuilt.
+BUILD_VERSION: Final[str] = "1"
+MANIFEST_NAME: Final[str] = "manifest.json"
+
+
+def polyfill_fragments(jsx: str) -> str:
+    jsx = jsx.replace("<>", "<React.Fragment>")
+    jsx = jsx.replace("</>", "</React.Fragment>")
+    return jsx
+
+
+def _is_word(c: str) -> bool:
+    return c.isalnum() or c in "_$\\." or ord(c) > 127
+
+
+def _scan_string(js: str, start: int) -> int:
+    # Returns the index just past the closing quote of the string starting at start.
+    quote = js[start]
+    i = start + 1
+    while i < len(js):
+        c = js[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == quote:
+            return i + 1
+        if quote == "`" and c == "$" and js[i + 1 : i + 2] == "{":
+            i = _scan_expression(js, i + 2)
+            continue
+        i += 1
+    return len(js)
+
+
+def _scan_expression(js: str, start: int) -> int:
+    # Returns the index just past the brace closing a template literal expression.
+    depth = 1
+    i = start
+    while i < len(js):
+        c = js[i]
+        if c in "'\"`":
+            i = _scan_string(js, i)
+            continue
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return len(js)
+
+
+def _scan_regex(js: str, start: int) -> Optional[int]:
+    # Returns the index just past the flags of the regex starting at start, or None
+    # if this doesn't look like a regex after all.
+    i = start + 1
+    in_class = False
+    while i < len(js):
+        c = js[i]
+        if c == "\n":
+            return None
+        if c == "\\":
+            i += 2
+            continue
+        if c == "[":
+            in_class = True
+        elif c == "]":
+            in_class = False
+        elif c == "/" and not in_class:
+            i += 1
+            while i < len(js) and js[i].isalpha():
+                i += 1
+            return i
+        i += 1
+    return None
+
+
+_REGEX_KEYWORDS: Final[List[str]] = [
+    "return",
+    "typeof",
+    "instanceof",
+    "in",
+    "of",
+    "new",
+    "delete",
+    "void",
+    "throw",
+    "case",
+    "do",
+    "else",
+]
+
+
+def _regex_allowed(out: List[str]) -> bool:
+    # A slash starts a regex anywhere an expression can start, which is after an
+    # operator or punctuation, or after a keyword. Otherwise, it is a division.
+    if not out:
+        return True
+    last = out[-1][-1]
+    if last in "(,=:[!&|?{};+-*%<>~^\n":
+        return True
+    if not _is_word(last):
+        return False
+    word = ""
+    for chunk in reversed(out):
+        if not all(_is_word(c) for c in chunk):
+            break
+        word = chunk + word
+    return word in _REGEX_KEYWORDS
+
+
+def minify(js: str) -> str:
+    """
+    Conservatively minify transformed JSX. Comments and indentation are removed and runs
+    of whitespace are collapsed, but line breaks are kept so that automatic semicolon
+    insertion works the same, and strings, template literals and regexes are left alone.
+    """
+    out: List[str] = []
+    space = False
+    newline = False
+    i = 0
+    while i < len(js):
+        c = js[i]
+        if c in " \t\r\n\f\v":
+            if c in "\r\n":
+                newline = True
+            else:
+                space = True
+            i += 1
+            continue
+        if c == "/" and js[i + 1 : i + 2] == "/":
+            end = js.find("\n", i)
+            i = len(js) if end == -1 else end
+            continue
+        if c == "/" and js[i + 1 : i + 2] == "*":
+            end = js.find("*/", i + 2)
+            end = len(js) if end == -1 else end + 2
+            if "\n" in js[i:end]:
+                newline = True
+            else:
+                space = True
+            i = end
+            continue
+
+        if out:
+            last = out[-1][-1]
+            if newline:
+                out.append("\n")
+            elif space and (
+                (_is_word(last) and _is_word(c))
+                or (last in "+-" and c in "+-")
+                or (last == "/" and c == "/")
+            ):
+                out.append(" ")
+        space = False
+        newline = False
+
+        if c in "'\"`":
+            end = _scan_string(js, i)
+        elif c == "/" and _regex_allowed(out):
+            end = _scan_regex(js, i) or i + 1
+        elif _is_word(c):
+            # Keep identifiers together so that keywords can be recognized above.
+            end = i + 1
+            while end < len(js) and _is_word(js[end]):
+                end += 1
+        else:
+            end = i + 1
+        out.append(js[i:end])
+        i = end
+
+    return "".join(out) + "\n"
+
+
+def find_files(basedir: str = static_location) -> List[str]:
+    """
+    Return the path of every JSX file under a directory, relative to that directory.
+    """
+    files = []
+    for dirpath, _, fnames in os.walk(basedir):
+        for fname in fnames:
+            if fname.endswith(".react.js"):
+                files.append(
+                    os.path.relpath(os.path.join(dirpath, fname), basedir).replace(
+                        os.sep, "/"
+                    )
+                )
+    return sorted(files)
+
+
+_transformer: Optional[JSXTransformer] = None
+
+
+def transform(jsx: str) -> str:
+    """
+    Transform a JSX file's contents into minified javascript. The transformer is
+    expensive to create, so each process only creates it once.
+    """
+    global _transformer
+    if _transformer is None:
+        _transformer = JSXTransformer()
+    return minify(_transformer.transform_string(polyfill_fragments(jsx)))
+
+
+def _transform_file(path: str) -> str:
+    with open(path, "rb") as f:
+        return transform(f.read().decode("utf-8"))
+
+
+def _write(path: str, data: bytes) -> None:
+    # Write to a temporary file and move it into place, so that nobody serving this
+    # directory ever sees a half-written file.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def output_name(filename: str, digest: str) -> str:
+    """
+    Given a JSX file's name and the hash of its built contents, return the name
+    that the built file is written to.
+    """
+    base, ext = os.path.splitext(filename)
+    return f"{base}.{digest}{ext}"
+
+
+def build(
+    outdir: str,
+    basedir: str = static_location,
+    processes: Optional[int] = None,
+    verbose: bool = False,
+) -> Dict[str, str]:
+    """
+    Build every JSX file under basedir into outdir, transforming files in parallel
+    across processes. Outputs are named after a hash of their contents so that they
+    can be cached forever, and a manifest mapping source files to outputs is written
+    alongside them. Files that haven't changed since the last build are skipped.
+
+    Parameters:
+        outdir - Directory to write built files and the manifest to.
+        basedir - Directory to find JSX files under.
+        processes - Number of processes to transform with. Defaults to one per CPU.
+        verbose - Print out every file as it is built.
+
+    Returns:
+        A dictionary mapping each source file to its built file, both relative to
+        their respective directories.
+    """
+    previous = Manifest(outdir).entries
+    entries: Dict[str, Dict[str, str]] = {}
+    pending: List[Tuple[str, str]] = []
+
+    for fname in find_files(basedir):
+        with open(os.path.join(basedir, fname), "rb") as f:
+            source = hashlib.sha1(BUILD_VERSION.encode("ascii") + f.read()).hexdigest()
+        entry = previous.get(fname)
+        if (
+            entry is not None
+            and entry["source"] == source
+            and os.path.isfile(os.path.join(outdir, entry["output"]))
+        ):
+            entries[fname] = entry
+        else:
+            pending.append((fname, source))
+
+    paths = [os.path.join(basedir, fname) for (fname, _) in pending]
+    if processes == 1 or len(pending) <= 1:
+        outputs = [_transform_file(path) for path in paths]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as pool:
+            outputs = list(pool.map(_transform_file, paths))
+
+    for (fname, source), js in zip(pending, outputs):
+        data = js.encode("utf-8")
+        output = output_name(fname, hashlib.sha256(data).hexdigest()[:16])
+        if verbose:
+            print(f"Built {fname} into {output}")
+        _write(os.path.join(outdir, output), data)
+        entries[fname] = {"source": source, "output": output}
+
+    if entries != previous:
+        _write(
+            os.path.join(outdir, MANIFEST_NAME),
+            json.dumps(
+                {"version": BUILD_VERSION, "files": entries}, indent=4, sort_keys=True
+            ).encode("utf-8"),
+        )
+    return {fname: entry["output"] for fname, entry in entries.items()}
+
+
+class Manifest:
+    """
+    The manifest written by build(), which is reloaded whenever it changes on disk.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.__lock = threading.Lock()
+        self.__mtime: Optional[float] = None
+        self.__entries: Dict[str, Dict[str, str]] = {}
+        self.__outputs: Dict[str, str] = {}
+
+    def __load(self) -> None:
+        path = os.path.join(self.directory, MANIFEST_NAME)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+        if mtime == self.__mtime:
+            return
+
+        with self.__lock:
+            entries: Dict[str, Any] = {}
+            if mtime is not None:
+                try:
+                    with open(path, "rb") as f:
+                        manifest = json.loads(f.read().decode("utf-8"))
+                    if manifest.get("version") == BUILD_VERSION:
+                        entries = manifest.get("files", {})
+                except (OSError, ValueError):
+                    # Somebody is writing a bad manifest, act like there is none.
+                    pass
+            self.__entries = entries
+            self.__outputs = {
+                entry["output"]: fname for fname, entry in entries.items()
+            }
+            self.__mtime = mtime
+
+    @property
+    def entries(self) -> Dict[str, Dict[str, str]]:
+        self.__load()
+        return dict(self.__entries)
+
+    def output(self, filename: str) -> Optional[str]:
+        """
+        Return the name of the built file for a JSX file, or None if it isn't built.
+        """
+        self.__load()
+        entry = self.__entries.get(filename)
+        return entry["output"] if entry is not None else None
+
+    def is_output(self, filename: str) -> bool:
+        """
+        Return whether a file name is a built file listed in this manifest.
+        """
+        self.__load()
+        return filename in self.__outputs
@@ -13,7 +13,10 @@ class MusecaCache:
             config={
                 "CACHE_TYPE": "filesystem",
                 "CACHE_DIR": config.cache_dir,
+                "CACHE_THRESHOLD": config.cache_threshold,
             },
         )
         frontend = MusecaFrontend(data, config, cache)
         frontend.get_all_songs(force_db_load=True)
+        frontend.get_all_players(force_db_load=True)
+        frontend.refresh_network_snapshot()
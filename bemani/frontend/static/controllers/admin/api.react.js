@@ -453,6 +453,13 @@ var api_management = createReactClass({
         }
     },
 
+    renderServerSynced: function(server) {
+        if (!server.synced) {
+            return <span className="placeholder">never synced</span>;
+        }
+        return <Timestamp timestamp={server.synced} />;
+    },
+
     render: function() {
         return (
             <div>
@@ -542,6 +549,10 @@ var api_management = createReactClass({
                                     name: 'Allowed Data',
                                     render: this.renderServerAllowedData,
                                 },
+                                {
+                                    name: 'Last Synced',
+                                    render: this.renderServerSynced,
+                                },
                                 {
                                     name: '',
                                     render: this.renderServerEditButton,
@@ -1,5 +1,5 @@
 import struct
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from typing_extensions import Final
 
 from bemani.protocol.stream import InputStream, OutputStream
@@ -12,6 +12,49 @@ class BinaryEncodingException(Exception):
     """
 
 
+def _body_types() -> Dict[
+    int, Tuple[Optional[int], str, str, bool, int, Optional[struct.Struct]]
+]:
+    """
+    For every node type, return the size, struct encoding, data type, whether it is a
+    composite, alignment in the body and a precompiled struct for fixed size values.
+    """
+    ret: Dict[
+        int, Tuple[Optional[int], str, str, bool, int, Optional[struct.Struct]]
+    ] = {}
+    for nodetype in Node.NODE_TYPES:
+        node = Node(name="type", type=nodetype)
+        size = node.data_length
+        if size is None:
+            # Strings and binary blobs are prefixed with an integer length.
+            alignment = 4
+            unpacker = None
+        else:
+            # 64 bit values and larger composites are 32 bit aligned.
+            alignment = min(size, 4)
+            unpacker = struct.Struct(f">{node.data_encoding}")
+        ret[nodetype] = (
+            size,
+            node.data_encoding,
+            node.data_type,
+            node.is_composite,
+            alignment,
+            unpacker,
+        )
+    return ret
+
+
+_BODY_TYPES: Final[
+    Dict[int, Tuple[Optional[int], str, str, bool, int, Optional[struct.Struct]]]
+] = _body_types()
+
+# Packed node names that we have already decoded, keyed by their packed bytes.
+_NAME_CACHE: Final[Dict[bytes, str]] = {}
+
+# Node names that we have already packed for encoding, keyed by name.
+_PACKED_NAME_CACHE: Final[Dict[str, bytes]] = {}
+
+
 class PackedOrdering:
     """
     A class that helps us encapsulate Konami's batshit backtracking hole-fill algorithm.
@@ -231,7 +274,7 @@ class PackedOrdering:
                 }
             )
 
-        order = sorted(node.attributes.keys())
+        order = sorted(node.existing_attributes.keys())
         for attr in order:
             ordering.append(
                 {
@@ -243,7 +286,7 @@ class PackedOrdering:
             )
 
         if include_children:
-            for child in node.children:
+            for child in node.existing_children:
                 ordering.extend(PackedOrdering.node_to_body_ordering(child))
 
         return ordering
@@ -510,6 +553,355 @@ class BinaryDecoder:
         return root
 
 
+class _SinglePassUnsupported(Exception):
+    """
+    Thrown internally when a packet uses a layout that the single-pass decoder does not
+    handle, so that we can fall back to decoding it with the two-pass decoder.
+    """
+
+
+class BinarySinglePassDecoder:
+    """
+    A class capable of taking a binary blob and decoding it to a Node tree, reading the header
+    and body at the same time. Given that the body is laid out in the same order that nodes and
+    attributes appear in the header, we can fill in each node's value as soon as we read it from
+    the header instead of building the whole tree and then walking it a second time.
+
+    This also relies on a property of Konami's hole-filling algorithm as implemented in
+    PackedOrdering. Since every allocation takes the first 4 byte chunk that has room for it,
+    the used part of the body is always contiguous from the start. So, instead of tracking
+    every byte, we only need to track the end of the used area and the one partially filled
+    byte chunk and short chunk that can still be packed into.
+    """
+
+    def __init__(self, data: bytes, encoding: str, compressed: bool) -> None:
+        """
+        Initialize the object.
+
+        Parameters:
+            - data - A binary blob of data to be decoded
+            - encoding - A string representing the text encoding for string elements. Should be either
+                         'shift-jis', 'euc-jp' or 'utf-8'
+        """
+        self.data = data
+        self.encoding = encoding
+        self.compressed = compressed
+        self.executed = False
+
+        self.__pos = 0
+        self.__body = memoryview(b"")
+        self.__body_length = 0
+        self.__end = 0
+        self.__byte_chunk = 0
+        self.__byte_count = 4
+        self.__short_chunk = 0
+        self.__short_count = 4
+
+    def __read_node_name(self) -> str:
+        """
+        Given the current position in the header, read the 6-bit-byte packed string name of the
+        node.
+
+        Returns:
+            A string representing the name in ascii
+        """
+        data = self.data
+        pos = self.__pos
+        if pos >= len(data):
+            raise BinaryEncodingException(
+                "Ran out of data when attempting to read node name length!"
+            )
+        length = data[pos]
+        pos += 1
+
+        if not self.compressed:
+            if length < 0x40:
+                raise BinaryEncodingException(
+                    "Node name length under decompressed minimum"
+                )
+            elif length < 0x80:
+                length -= 0x3F
+            else:
+                if pos >= len(data):
+                    raise BinaryEncodingException(
+                        "Ran out of data when attempting to read node name length!"
+                    )
+                length = (length << 8) | data[pos]
+                pos += 1
+                length -= 0x7FBF
+
+            if length > BinaryEncoding.NAME_MAX_DECOMPRESSED:
+                raise BinaryEncodingException(
+                    "Node name length over decompressed limit"
+                )
+            if length <= 0 or pos + length > len(data):
+                raise BinaryEncodingException(
+                    "Ran out of data when attempting to read node name!"
+                )
+
+            self.__pos = pos + length
+            return data[pos : (pos + length)].decode(self.encoding)
+
+        if length > BinaryEncoding.NAME_MAX_COMPRESSED:
+            raise BinaryEncodingException("Node name length over compressed limit")
+
+        binary_length = ((length * 6) + 7) // 8
+        if pos + binary_length > len(data):
+            raise BinaryEncodingException(
+                "Ran out of data when attempting to read node name!"
+            )
+
+        # The same few hundred names show up in every packet, so remember them.
+        packed = data[(pos - 1) : (pos + binary_length)]
+        self.__pos = pos + binary_length
+        name = _NAME_CACHE.get(packed)
+        if name is None:
+            bits = int.from_bytes(packed[1:], "big")
+            shift = binary_length * 8
+            name = "".join(
+                Node.NODE_NAME_CHARS[(bits >> (shift - (6 * (i + 1)))) & 0x3F]
+                for i in range(length)
+            )
+            if len(_NAME_CACHE) < BinaryEncoding.NAME_CACHE_SIZE:
+                _NAME_CACHE[packed] = name
+        return name
+
+    def __allocate(self, size: int) -> int:
+        """
+        Allocate size bytes at the end of the used area of the body, rounded up to the
+        next 4 byte boundary, returning the location of the allocation.
+        """
+        loc = self.__end
+        self.__end = loc + ((size + 3) & ~3)
+        if loc + size > self.__body_length:
+            raise BinaryEncodingException(
+                "Ran out of data when attempting to read node data location!"
+            )
+        return loc
+
+    def __allocate_byte(self) -> int:
+        """
+        Allocate a byte, packed after any previous bytes in the current 4 byte chunk.
+        """
+        if self.__byte_count < 4:
+            loc = self.__byte_chunk + self.__byte_count
+            self.__byte_count += 1
+            return loc
+
+        self.__byte_chunk = self.__allocate(4)
+        self.__byte_count = 1
+        return self.__byte_chunk
+
+    def __allocate_short(self) -> int:
+        """
+        Allocate a short, packed after any previous short in the current 4 byte chunk.
+        """
+        if self.__short_count < 4:
+            loc = self.__short_chunk + self.__short_count
+            self.__short_count += 2
+            return loc
+
+        self.__short_chunk = self.__allocate(4)
+        self.__short_count = 2
+        return self.__short_chunk
+
+    def __read_blob(self) -> bytes:
+        """
+        Read a length-prefixed blob from the body, such as a string or binary value.
+        """
+        body = self.__body
+        loc = self.__allocate(4)
+        size = struct.unpack_from(">I", body, loc)[0]
+
+        # Now that we know the real size, extend the allocation to cover it.
+        self.__end = loc
+        loc = self.__allocate(size + 4) + 4
+        return bytes(body[loc : (loc + size)])
+
+    def __read_value(self, node: Node, node_type: int) -> None:
+        """
+        Read the value for a node out of the body, given its type.
+        """
+        info = _BODY_TYPES.get(node_type & (~Node.ARRAY_BIT))
+        if info is None:
+            # Let the Node constructor report this one.
+            return
+        size, enc, dtype, composite, alignment, unpacker = info
+        if size == 0:
+            # Void nodes have no value.
+            return
+
+        if node_type & Node.ARRAY_BIT:
+            if composite:
+                raise BinaryEncodingException(
+                    "Logic error, no support for composite arrays!"
+                )
+            if size is None:
+                raise BinaryEncodingException(
+                    "Logic error, no support for variable length arrays!"
+                )
+            data = self.__read_blob()
+            elems, remainder = divmod(len(data), size)
+            if remainder != 0:
+                raise BinaryEncodingException(
+                    "Array data is not a multiple of its type!"
+                )
+            if Node.NODE_TYPES[node_type & (~Node.ARRAY_BIT)]["int"]:
+                # Integer arrays are held packed, exactly as they are on the wire.
+                node.set_value(data)
+            elif len(enc) == 1:
+                node.set_value(list(struct.unpack(f">{elems}{enc}", data)))
+            else:
+                node.set_value(list(struct.unpack(">" + (enc * elems), data)))
+            return
+
+        if size is None:
+            data = self.__read_blob()
+            if dtype == "str":
+                # Need to convert this from encoding to standard string.
+                # Also, need to lob off the trailing null.
+                node.set_value(data[:-1].decode(self.encoding, "replace"))
+            else:
+                node.set_value(data)
+            return
+
+        if alignment == 1:
+            loc = self.__allocate_byte()
+        elif alignment == 2:
+            loc = self.__allocate_short()
+        elif alignment == 4:
+            loc = self.__allocate(size)
+        else:
+            raise _SinglePassUnsupported()
+
+        if composite:
+            node.set_value(list(unpacker.unpack_from(self.__body, loc)))
+        else:
+            node.set_value(unpacker.unpack_from(self.__body, loc)[0])
+
+    def __read_attributes(self, node: Node, attrs: List[str]) -> None:
+        """
+        Read the values for a node's attributes out of the body. These are always
+        stored sorted by attribute name after the node's value.
+        """
+        if self.__body_length == 0:
+            return
+
+        for attr in sorted(set(attrs)):
+            data = self.__read_blob()
+            node.set_attribute(attr, data[:-1].decode(self.encoding, "replace"))
+
+    def __read_node(self, node_type: int) -> Node:
+        """
+        Given an integer node type, read the node's name and fill in its value.
+        """
+        node = Node(name=self.__read_node_name(), type=node_type)
+        if self.__body_length > 0:
+            self.__read_value(node, node_type)
+        return node
+
+    def get_tree(self) -> Node:
+        """
+        Parse the header and body such that we can return a Node tree
+        representing the data passed to us.
+
+        Returns:
+            Node object
+        """
+        if self.executed:
+            raise BinaryEncodingException(
+                "Logic error, should only call this once per instance"
+            )
+        self.executed = True
+
+        try:
+            return self.__get_tree()
+        except struct.error:
+            raise BinaryEncodingException("Ran out of data when decoding body!")
+        except _SinglePassUnsupported:
+            # Let the two-pass decoder take care of this one.
+            decoder = BinaryDecoder(self.data, self.encoding, self.compressed)
+            return decoder.get_tree()
+
+    def __get_tree(self) -> Node:
+        data = self.data
+        datalen = len(data)
+        if datalen < 4:
+            raise BinaryEncodingException(
+                "Ran out of data when attempting to read header length!"
+            )
+        header_end = struct.unpack_from(">I", data, 0)[0] + 4
+
+        # Find the body first, so we can fill in values as we read the header.
+        if header_end + 4 <= datalen:
+            body_length = struct.unpack_from(">I", data, header_end)[0]
+            if body_length > 0:
+                if header_end + 4 + body_length > datalen:
+                    raise BinaryEncodingException("Body has insufficient data")
+                self.__body = memoryview(data)[
+                    (header_end + 4) : (header_end + 4 + body_length)
+                ]
+                self.__body_length = body_length
+
+        self.__pos = 4
+        if self.__pos >= datalen:
+            raise BinaryEncodingException(
+                "Ran out of data when attempting to read root node type!"
+            )
+        node_type = data[self.__pos]
+        self.__pos += 1
+        root = self.__read_node(node_type)
+
+        # For each node we're inside of, the attributes we haven't read values for yet
+        # and whether we've seen children yet.
+        stack: List[Node] = [root]
+        attrs: List[List[str]] = [[]]
+        has_children: List[bool] = [False]
+
+        while stack:
+            if self.__pos >= datalen:
+                raise BinaryEncodingException(
+                    "Ran out of data when attempting to read node type!"
+                )
+            child_type = data[self.__pos]
+            self.__pos += 1
+
+            if child_type == Node.END_OF_NODE:
+                node = stack.pop()
+                pending = attrs.pop()
+                has_children.pop()
+                if pending:
+                    self.__read_attributes(node, pending)
+            elif child_type == Node.ATTR_TYPE:
+                if has_children[-1]:
+                    # Attribute values are stored before any child values, so we can't
+                    # handle attributes that show up after children in one pass.
+                    raise _SinglePassUnsupported()
+                key = self.__read_node_name()
+                stack[-1].set_attribute(key)
+                attrs[-1].append(key)
+            else:
+                if attrs[-1]:
+                    self.__read_attributes(stack[-1], attrs[-1])
+                    attrs[-1] = []
+                has_children[-1] = True
+
+                child = self.__read_node(child_type)
+                stack[-1].add_child(child)
+                stack.append(child)
+                attrs.append([])
+                has_children.append(False)
+
+        if self.__pos >= datalen or data[self.__pos] != Node.END_OF_DOCUMENT:
+            eod = data[self.__pos] if self.__pos < datalen else None
+            raise BinaryEncodingException(f"Unknown node type {eod} at end of document")
+        if self.__pos + 1 > header_end:
+            # The header overran its declared length, so our guess at the body was wrong.
+            raise _SinglePassUnsupported()
+
+        return root
+
+
 class BinaryEncoder:
     """
     A class capable of taking a Node tree and encoding it into a binary format.
@@ -611,7 +1003,7 @@ class BinaryEncoder:
             self.__write_node_name(thing["name"])
 
         # Now, write out the children
-        for child in node.children:
+        for child in node.existing_children:
             self.__write_node(child)
 
         # Now, write out the end of node marker
@@ -798,6 +1190,261 @@ class BinaryEncoder:
         )
 
 
+class BinarySinglePassEncoder:
+    """
+    A class capable of taking a Node tree and encoding it into a binary format, laying out the
+    header and body in one walk of the tree and then writing everything into a single preallocated
+    buffer.
+
+    This relies on the same property of Konami's hole-filling algorithm that BinarySinglePassDecoder
+    does. Since every allocation takes the first 4 byte chunk that has room for it, the used part
+    of the body is always contiguous from the start, so we only need to track the end of the used
+    area and the one partially filled byte chunk and short chunk that can still be packed into.
+    """
+
+    def __init__(self, tree: Node, encoding: str, compressed: bool = True) -> None:
+        """
+        Initialize the object.
+
+        Parameters:
+            tree - A Node tree to be encoded
+            encoding - A string representing the text encoding for string elements. Should be either
+                       'shift-jis', 'euc-jp' or 'utf-8'
+        """
+        self.encoding = encoding
+        self.tree = tree
+        self.executed = False
+        self.compressed = compressed
+
+        self.__end = 0
+        self.__byte_chunk = 0
+        self.__byte_count = 4
+        self.__short_chunk = 0
+        self.__short_count = 4
+
+    def __pack_node_name(self, name: str) -> bytes:
+        """
+        Return the length-prefixed and 6-bit-byte packed representation of a node name.
+
+        Parameters:
+            name - A string name which should be encoded as a node name
+        """
+        if not self.compressed:
+            encoded = name.encode(self.encoding)
+            length = len(encoded)
+
+            if length > BinaryEncoding.NAME_MAX_DECOMPRESSED:
+                raise BinaryEncodingException(
+                    "Node name length over decompressed limit"
+                )
+
+            if length < 64:
+                return bytes([length + 0x3F]) + encoded
+            else:
+                length += 0x7FBF
+                return bytes([(length >> 8) & 0xFF, length & 0xFF]) + encoded
+
+        # The same few hundred names show up in every packet, so remember them.
+        packed = _PACKED_NAME_CACHE.get(name)
+        if packed is None:
+            length = len(name)
+            if length > BinaryEncoding.NAME_MAX_COMPRESSED:
+                raise BinaryEncodingException("Node name length over compressed limit")
+
+            bits = 0
+            for ch in name:
+                bits = (bits << 6) | Node.NODE_NAME_CHARS.index(ch)
+            binary_length = ((length * 6) + 7) // 8
+            bits <<= (binary_length * 8) - (length * 6)
+            packed = bytes([length]) + bits.to_bytes(binary_length, "big")
+            if len(_PACKED_NAME_CACHE) < BinaryEncoding.NAME_CACHE_SIZE:
+                _PACKED_NAME_CACHE[name] = packed
+        return packed
+
+    def __allocate(self, size: int) -> int:
+        """
+        Allocate size bytes at the end of the used area of the body, rounded up to the
+        next 4 byte boundary, returning the location of the allocation.
+        """
+        loc = self.__end
+        self.__end = loc + ((size + 3) & ~3)
+        return loc
+
+    def __allocate_byte(self) -> int:
+        """
+        Allocate a byte, packed after any previous bytes in the current 4 byte chunk.
+        """
+        if self.__byte_count < 4:
+            loc = self.__byte_chunk + self.__byte_count
+            self.__byte_count += 1
+            return loc
+
+        self.__byte_chunk = self.__allocate(4)
+        self.__byte_count = 1
+        return self.__byte_chunk
+
+    def __allocate_short(self) -> int:
+        """
+        Allocate a short, packed after any previous short in the current 4 byte chunk.
+        """
+        if self.__short_count < 4:
+            loc = self.__short_chunk + self.__short_count
+            self.__short_count += 2
+            return loc
+
+        self.__short_chunk = self.__allocate(4)
+        self.__short_count = 2
+        return self.__short_chunk
+
+    def __encode_string(self, name: str, val: Any) -> bytes:
+        """
+        Convert a string value to the packet's text encoding, with its trailing null.
+        """
+        if not isinstance(val, str):
+            raise BinaryEncodingException(
+                f"Node '{name}' has non-string value!",
+            )
+
+        try:
+            return val.encode(self.encoding) + b"\0"
+        except UnicodeEncodeError:
+            raise BinaryEncodingException(
+                f"Node '{name}' has un-encodable string value '{val}'"
+            )
+
+    def get_data(self) -> bytes:
+        """
+        Encode the header and body into binary format.
+
+        Returns:
+            Binary blob of data that can be decoded by a game.
+        """
+        if self.executed:
+            raise Exception("Logic error, should only call this once per instance")
+        self.executed = True
+
+        try:
+            return self.__get_data()
+        except struct.error as e:
+            raise BinaryEncodingException(
+                f"Node has a value that cannot be encoded: {e}"
+            )
+        except _SinglePassUnsupported:
+            # Let the original encoder take care of this one.
+            encoder = BinaryEncoder(self.tree, self.encoding, self.compressed)
+            return encoder.get_data()
+
+    def __get_data(self) -> bytes:
+        header = bytearray()
+        fixed: List[Tuple[struct.Struct, int, Any]] = []
+        composites: List[Tuple[struct.Struct, int, List[Any]]] = []
+        blobs: List[Tuple[int, bytes]] = []
+
+        # Walk the tree, writing the header and laying out the body as we go. The body is
+        # in the same order as the header, except that void nodes don't take up space.
+        # None on the stack marks where a node's children end.
+        stack: List[Optional[Node]] = [self.tree]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                header.append(Node.END_OF_NODE)
+                continue
+
+            name = node.name
+            node_type = node.type
+            header.append(node_type)
+            header += self.__pack_node_name(name)
+
+            info = _BODY_TYPES.get(node_type & (~Node.ARRAY_BIT))
+            if info is None:
+                raise BinaryEncodingException(f"Node '{name}' has unknown type!")
+            size, enc, dtype, composite, alignment, packer = info
+
+            if size != 0:
+                if node_type & Node.ARRAY_BIT:
+                    if composite or size is None:
+                        raise _SinglePassUnsupported()
+
+                    if node.is_packed:
+                        data = node.packed_value
+                    else:
+                        val = node.value
+                        if val is None:
+                            raise BinaryEncodingException(
+                                f"Node '{name}' has invalid value None",
+                            )
+                        if dtype == "bool":
+                            val = [1 if v else 0 for v in val]
+                        data = struct.pack(f">{len(val)}{enc}", *val)
+                    blobs.append((self.__allocate(len(data) + 4), data))
+                else:
+                    val = node.value
+                    if val is None:
+                        raise BinaryEncodingException(
+                            f"Node '{name}' has invalid value None",
+                        )
+
+                    if size is None:
+                        if dtype == "str":
+                            data = self.__encode_string(name, val)
+                        else:
+                            data = val
+                        blobs.append((self.__allocate(len(data) + 4), data))
+                    elif packer is None:
+                        raise Exception("Logic error, fixed size type has no packer!")
+                    else:
+                        if alignment == 1:
+                            loc = self.__allocate_byte()
+                        elif alignment == 2:
+                            loc = self.__allocate_short()
+                        elif alignment == 4:
+                            loc = self.__allocate(size)
+                        else:
+                            # The original encoder's handling of 3 byte types is all we have.
+                            raise _SinglePassUnsupported()
+
+                        if composite:
+                            composites.append((packer, loc, val))
+                        else:
+                            if dtype == "bool":
+                                val = 1 if val else 0
+                            fixed.append((packer, loc, val))
+
+            attributes = node.existing_attributes
+            for attr in sorted(attributes):
+                header.append(Node.ATTR_TYPE)
+                header += self.__pack_node_name(attr)
+
+                data = self.__encode_string(attr, attributes[attr])
+                blobs.append((self.__allocate(len(data) + 4), data))
+
+            stack.append(None)
+            stack.extend(reversed(node.existing_children))
+
+        header.append(Node.END_OF_DOCUMENT)
+        while (len(header) & 0x3) != 0:
+            header.append(0)
+
+        # Now that we know the size of everything, write it all out in one go.
+        header_length = len(header)
+        body_length = self.__end
+        base = header_length + 8
+        output = bytearray(base + body_length)
+        struct.pack_into(">I", output, 0, header_length)
+        output[4 : (header_length + 4)] = header
+        struct.pack_into(">I", output, header_length + 4, body_length)
+
+        for packer, loc, val in fixed:
+            packer.pack_into(output, base + loc, val)
+        for packer, loc, val in composites:
+            packer.pack_into(output, base + loc, *val)
+        for loc, data in blobs:
+            struct.pack_into(">I", output, base + loc, len(data))
+            output[(base + loc + 4) : (base + loc + 4 + len(data))] = data
+
+        return bytes(output)
+
+
 class BinaryEncoding:
     """
     Wrapper class representing a Binary Encoding.
@@ -813,6 +1460,9 @@ class BinaryEncoding:
     NAME_MAX_COMPRESSED: Final[int] = 0x24
     NAME_MAX_DECOMPRESSED: Final[int] = 0x1000
 
+    # Maximum number of decoded node names to remember across packets.
+    NAME_CACHE_SIZE: Final[int] = 4096
+
     # The string values should match the constants in EAmuseProtocol.
     # I have no better way to link these than to write this comment,
     # as otherwise we would have a circular dependency.
@@ -886,7 +1536,7 @@ class BinaryEncoding:
         if encoding is not None:
             self.encoding = encoding
             try:
-                decoder = BinaryDecoder(
+                decoder = BinarySinglePassDecoder(
                     data[4:], self.__sanitize_encoding(encoding), self.compressed
                 )
                 return decoder.get_tree()
@@ -926,7 +1576,9 @@ class BinaryEncoding:
         if encoding_magic is None:
             raise BinaryEncodingException(f"Invalid text encoding {encoding}")
 
-        encoder = BinaryEncoder(tree, self.__sanitize_encoding(encoding), compressed)
+        encoder = BinarySinglePassEncoder(
+            tree, self.__sanitize_encoding(encoding), compressed
+        )
         data = encoder.get_data()
         return (
             struct.pack(
@@ -1,7 +1,7 @@
 import ctypes
 import os
 from collections import defaultdict
-from typing import Generator, List, MutableMapping, Optional, Set, Tuple
+from typing import Dict, Generator, List, MutableMapping, Optional, Set, Tuple
 from typing_extensions import Final
 
 from .. import package_root
@@ -36,6 +36,29 @@ except Exception:
     clib = None
 
 
+def _flag_operations() -> List[Tuple[int, ...]]:
+    """
+    For each possible flag byte, return the list of operations it encodes in order. A
+    positive number is a run of that many copied bytes and a zero is a single backref.
+    """
+    ret: List[Tuple[int, ...]] = []
+    for flags in range(256):
+        operations: List[int] = []
+        for flagpos in range(8):
+            if (flags >> flagpos) & 1:
+                if operations and operations[-1] > 0:
+                    operations[-1] += 1
+                else:
+                    operations.append(1)
+            else:
+                operations.append(0)
+        ret.append(tuple(operations))
+    return ret
+
+
+_FLAG_OPERATIONS: Final[List[Tuple[int, ...]]] = _flag_operations()
+
+
 class LzException(Exception):
     """
     An exception thrown when we encounter an error with Lz77 encoding/decoding.
@@ -232,6 +255,88 @@ class Lz77Decompress:
             return
 
 
+class Lz77DecompressBuffer:
+    """
+    A class that can decompress an Lz77 stream of data all at once. This is the same
+    variant as Lz77Decompress above, but instead of streaming chunks through a backref
+    ring it writes directly into one preallocated output buffer and serves backrefs by
+    slicing out of what has already been written. The output buffer is prefixed with
+    a ring's worth of zeros so that backrefs reaching before the start of the data
+    read zeros, identically to the ring and to the C++ implementation.
+    """
+
+    RING_LENGTH: Final[int] = 0x1000
+
+    def __init__(self, data: bytes, backref: Optional[int] = None) -> None:
+        """
+        Initialize the object.
+
+        Parameters:
+            data - Binary blob representing the data to be decompressed.
+        """
+        self.data: bytes = data
+        self.ringlength: int = max(backref or self.RING_LENGTH, self.RING_LENGTH)
+
+    def decompress(self) -> bytes:
+        """
+        Decompress the entire stream, returning the decompressed data.
+
+        Returns:
+            Raw binary data.
+        """
+        data = self.data
+        inlen = len(data)
+        operations = _FLAG_OPERATIONS
+
+        # Given a maximum backref length of 18, the worst case expansion is (18 * 8) / (2 * 8 + 1),
+        # or 8.47, so allocate 9 times the input on top of the leading zeroed ring.
+        out = bytearray(self.ringlength + (inlen * 9))
+        inloc = 0
+        outloc = self.ringlength
+
+        while inloc < inlen:
+            flags = data[inloc]
+            inloc += 1
+
+            for amount in operations[flags]:
+                if amount > 0:
+                    # Copy a run of bytes directly out of the data source.
+                    if inloc + amount > inlen:
+                        raise LzException("Unexpected EOF during decompression!")
+                    out[outloc : (outloc + amount)] = data[inloc : (inloc + amount)]
+                    inloc += amount
+                    outloc += amount
+                    continue
+
+                # Backref copy
+                if inloc + 1 >= inlen:
+                    raise LzException("Unexpected EOF mid-backref")
+
+                hi = data[inloc]
+                lo = data[inloc + 1]
+                inloc += 2
+
+                copy_pos = (hi << 4) | (lo >> 4)
+                if copy_pos == 0:
+                    # This is the end of the stream.
+                    return bytes(memoryview(out)[self.ringlength : outloc])
+
+                copy_len = (lo & 0xF) + 3
+                start = outloc - copy_pos
+                if copy_len <= copy_pos:
+                    out[outloc : (outloc + copy_len)] = out[start : (start + copy_len)]
+                else:
+                    # The backref overlaps the data it is writing, which means that it
+                    # repeats the last copy_pos bytes until it has written enough.
+                    repeats = (copy_len // copy_pos) + 1
+                    out[outloc : (outloc + copy_len)] = (out[start:outloc] * repeats)[
+                        :copy_len
+                    ]
+                outloc += copy_len
+
+        return bytes(memoryview(out)[self.ringlength : outloc])
+
+
 class Lz77Compress:
     """
     A class that can compress arbitrary binary data using the Lz77 protocol.
@@ -451,16 +556,176 @@ class Lz77Compress:
                 yield bytes([flags]) + b"".join(data)
 
 
+class Lz77CompressHashChain:
+    """
+    A class that can compress arbitrary binary data using the Lz77 protocol, finding
+    backrefs with a hash chain instead of tracking sets of candidate locations. Every
+    position is hashed by its next three bytes, and each position remembers the previous
+    position in the ring with the same three bytes. Finding a backref is then a walk
+    down the chain for the current position, and the maximum number of candidates we
+    walk trades compression ratio for speed.
+    """
+
+    RING_LENGTH: Final[int] = 0x1000
+
+    MAX_BACKREF_LENGTH: Final[int] = 18
+
+    FLAG_COPY: Final[int] = 1
+    FLAG_BACKREF: Final[int] = 0
+
+    def __init__(
+        self, data: bytes, backref: Optional[int] = None, max_chain: int = 0x1000
+    ) -> None:
+        """
+        Initialize the object.
+
+        Parameters:
+            data - Binary blob representing the data to be compressed.
+            backref - Optional length of the backref ring, if it differs from the default.
+            max_chain - Maximum number of candidate backrefs to check per position.
+        """
+        self.data: bytes = data
+        self.ringlength: int = backref or self.RING_LENGTH
+        self.max_chain: int = max(max_chain, 1)
+
+    def compress(self) -> bytes:
+        """
+        Compress the entire stream, returning the compressed data.
+
+        Returns:
+            L7zz-compressed binary data.
+        """
+        data = self.data
+        inlen = len(data)
+        ringlength = self.ringlength
+        window = ringlength - 1
+        max_chain = self.max_chain
+        max_length = self.MAX_BACKREF_LENGTH
+
+        # The most recent position for every three byte sequence, and for every position
+        # in the ring the previous position that had the same three byte sequence.
+        head: Dict[int, int] = {}
+        prev: List[int] = [-1] * ringlength
+
+        out = bytearray()
+        inloc = 0
+        eof = False
+
+        while not eof:
+            flagsloc = len(out)
+            out.append(0)
+            flags = 0
+
+            if inloc == inlen:
+                # Output a dummy flag and an end of stream marker.
+                out += b"\x00\x00"
+                break
+
+            for flagpos in range(8):
+                if inloc == inlen:
+                    # Output the end of stream marker, set EOF since we've succeeded
+                    # in outputting all flags.
+                    out += b"\x00\x00"
+                    eof = True
+                    break
+
+                copy_amount = 0
+                copy_pos = 0
+                if inloc + 3 <= inlen:
+                    limit = min(inlen - inloc, max_length)
+                    candidate = head.get(
+                        (data[inloc] << 16) | (data[inloc + 1] << 8) | data[inloc + 2],
+                        -1,
+                    )
+                    chain = max_chain
+                    while candidate >= 0 and inloc - candidate <= window and chain > 0:
+                        # Only bother comparing if this could be longer than what we have.
+                        if data[candidate + copy_amount] == data[inloc + copy_amount]:
+                            # The first three bytes are known to match, so start after them.
+                            length = 3
+                            while (
+                                length < limit
+                                and data[candidate + length] == data[inloc + length]
+                            ):
+                                length += 1
+                            if length > copy_amount:
+                                copy_amount = length
+                                copy_pos = candidate
+                                if length == limit:
+                                    break
+                        candidate = prev[candidate % ringlength]
+                        chain -= 1
+
+                if copy_amount >= 3:
+                    backref_pos = inloc - copy_pos
+                    flags |= self.FLAG_BACKREF << flagpos
+                    out.append((backref_pos >> 4) & 0xFF)
+                    out.append(((copy_amount - 3) & 0xF) | ((backref_pos & 0xF) << 4))
+                else:
+                    flags |= self.FLAG_COPY << flagpos
+                    out.append(data[inloc])
+                    copy_amount = 1
+
+                # Remember every position we just consumed so future backrefs can find them.
+                for pos in range(inloc, min(inloc + copy_amount, inlen - 2)):
+                    key = (data[pos] << 16) | (data[pos + 1] << 8) | data[pos + 2]
+                    prev[pos % ringlength] = head.get(key, -1)
+                    head[key] = pos
+                inloc += copy_amount
+
+            out[flagsloc] = flags
+
+        return bytes(out)
+
+
 class Lz77:
     """
     A wrapper class encapsulating Lz77 encoding and decoding.
     """
 
-    def __init__(self, backref: Optional[int] = None) -> None:
+    # Compression levels, trading compression ratio for speed. These only affect the
+    # pure python compressor, since the C++ compressor is always fast and thorough.
+    LEVEL_FAST: Final[int] = 1
+    LEVEL_BEST: Final[int] = 9
+
+    # The maximum hash chain depth searched for a backref at each compression level.
+    CHAIN_DEPTHS: Final[Dict[int, int]] = {
+        1: 1,
+        2: 2,
+        3: 4,
+        4: 8,
+        5: 16,
+        6: 32,
+        7: 64,
+        8: 256,
+        9: 4096,
+    }
+
+    def __init__(
+        self, backref: Optional[int] = None, compiled: Optional[bool] = None
+    ) -> None:
         """
         Initialize the object.
+
+        Parameters:
+            backref - Optional length of the backref ring, if it differs from the default.
+            compiled - Whether to use the C++ implementation. If None, uses the C++
+                       implementation when it is available.
         """
+        if compiled is None:
+            compiled = clib is not None
+        if compiled and clib is None:
+            raise LzException("C++ implementation is not available!")
+
         self.backref = backref
+        self.compiled = compiled
+
+    @staticmethod
+    def compiled_available() -> bool:
+        """
+        Return whether the C++ implementation can be used.
+        """
+        return clib is not None
 
     def decompress(self, data: bytes) -> bytes:
         """
@@ -472,7 +737,7 @@ class Lz77:
         Returns:
             Raw binary data.
         """
-        if clib is not None:
+        if self.compiled:
             # Given a maximum backref length of 18, if we had a file that was
             # only backrefs of maximum size. We would get a compression of around
             # (18 * 8) / (2 * 8 + 1), or 8.47. So, allocate 9 times in the output
@@ -490,20 +755,21 @@ class Lz77:
             else:
                 raise LzException("Unknown exception in C++ code!")
         else:
-            lz = Lz77Decompress(data, backref=self.backref)
-            return b"".join(lz.decompress_bytes())
+            return Lz77DecompressBuffer(data, backref=self.backref).decompress()
 
-    def compress(self, data: bytes) -> bytes:
+    def compress(self, data: bytes, level: Optional[int] = None) -> bytes:
         """
         Given a binary blob, return a new binary blob representing the compressed data.
 
         Parameters:
             data - Raw binary data.
+            level - Compression level from Lz77.LEVEL_FAST to Lz77.LEVEL_BEST. If None,
+                    compresses as well as possible.
 
         Returns:
             L7zz-compressed binary data.
         """
-        if clib is not None:
+        if self.compiled:
             # Given a worst case scenario where we end up copying every byte to
             # the output, compression would actually inflate the file by 9/8 size.
             # Leave enough room for a trailing EOF reference.
@@ -520,5 +786,10 @@ class Lz77:
             else:
                 raise LzException("Unknown exception in C++ code!")
         else:
-            lz = Lz77Compress(data, backref=self.backref)
-            return b"".join(lz.compress_bytes())
+            if level is None:
+                level = self.LEVEL_BEST
+            if level not in self.CHAIN_DEPTHS:
+                raise LzException(f"Invalid compression level {level}!")
+            return Lz77CompressHashChain(
+                data, backref=self.backref, max_chain=self.CHAIN_DEPTHS[level]
+            ).compress()
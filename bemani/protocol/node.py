@@ -1,6 +1,7 @@
 import copy
 import struct
-from typing import Any, Dict, List, Optional, Union
+from types import MappingProxyType
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, Optional, Sequence
 from typing_extensions import Final
 
 # Hack to get around mypy's lack of scoping on types.
@@ -20,8 +21,23 @@ class Node:
     string attributes, and either a value or zero or more children. Note that it is possible and
     supported for a node to not have a value or children. This also includes a decent amount of
     constructor helper classmethods to make constructing a tree from source code easier.
+
+    Since large responses can be made up of tens of thousands of nodes, nodes are slotted and
+    only allocate attribute and child storage when used. Integer arrays are held in their packed
+    wire representation, and other values are held as given and only converted when read.
     """
 
+    __slots__ = (
+        "__name",
+        "__translated_type",
+        "__type",
+        "__attrs",
+        "__value",
+        "__children",
+        "__index",
+        "__indexed",
+    )
+
     NODE_NAME_CHARS: Final[
         str
     ] = "0123456789:ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
@@ -360,6 +376,9 @@ class Node:
     END_OF_NODE: Final[int] = 0xFE
     END_OF_DOCUMENT: Final[int] = 0xFF
 
+    # Number of children above which child lookups by name go through an index.
+    CHILD_INDEX_THRESHOLD: Final[int] = 8
+
     @staticmethod
     def void(name: str) -> "Node":
         return Node(name=name, type=Node.NODE_TYPE_VOID)
@@ -442,51 +461,43 @@ class Node:
 
     @staticmethod
     def u8_array(name: str, values: List[int]) -> "Node":
-        for value in values:
-            Node.__validate(Node.NODE_TYPE_U8, name, value)
-        return Node(name=name, type=Node.NODE_TYPE_U8, array=True, value=values)
+        packed = Node.__validate_array(Node.NODE_TYPE_U8, name, values)
+        return Node(name=name, type=Node.NODE_TYPE_U8, array=True, value=packed)
 
     @staticmethod
     def s8_array(name: str, values: List[int]) -> "Node":
-        for value in values:
-            Node.__validate(Node.NODE_TYPE_S8, name, value)
-        return Node(name=name, type=Node.NODE_TYPE_S8, array=True, value=values)
+        packed = Node.__validate_array(Node.NODE_TYPE_S8, name, values)
+        return Node(name=name, type=Node.NODE_TYPE_S8, array=True, value=packed)
 
     @staticmethod
     def u16_array(name: str, values: List[int]) -> "Node":
-        for value in values:
-            Node.__validate(Node.NODE_TYPE_U16, name, value)
-        return Node(name=name, type=Node.NODE_TYPE_U16, array=True, value=values)
+        packed = Node.__validate_array(Node.NODE_TYPE_U16, name, values)
+        return Node(name=name, type=Node.NODE_TYPE_U16, array=True, value=packed)
 
     @staticmethod
     def s16_array(name: str, values: List[int]) -> "Node":
-        for value in values:
-            Node.__validate(Node.NODE_TYPE_S16, name, value)
-        return Node(name=name, type=Node.NODE_TYPE_S16, array=True, value=values)
+        packed = Node.__validate_array(Node.NODE_TYPE_S16, name, values)
+        return Node(name=name, type=Node.NODE_TYPE_S16, array=True, value=packed)
 
     @staticmethod
     def u32_array(name: str, values: List[int]) -> "Node":
-        for value in values:
-            Node.__validate(Node.NODE_TYPE_U32, name, value)
-        return Node(name=name, type=Node.NODE_TYPE_U32, array=True, value=values)
+        packed = Node.__validate_array(Node.NODE_TYPE_U32, name, values)
+        return Node(name=name, type=Node.NODE_TYPE_U32, array=True, value=packed)
 
     @staticmethod
     def s32_array(name: str, values: List[int]) -> "Node":
-        for value in values:
-            Node.__validate(Node.NODE_TYPE_S32, name, value)
-        return Node(name=name, type=Node.NODE_TYPE_S32, array=True, value=values)
+        packed = Node.__validate_array(Node.NODE_TYPE_S32, name, values)
+        return Node(name=name, type=Node.NODE_TYPE_S32, array=True, value=packed)
 
     @staticmethod
     def u64_array(name: str, values: List[int]) -> "Node":
-        for value in values:
-            Node.__validate(Node.NODE_TYPE_U64, name, value)
-        return Node(name=name, type=Node.NODE_TYPE_U64, array=True, value=values)
+        packed = Node.__validate_array(Node.NODE_TYPE_U64, name, values)
+        return Node(name=name, type=Node.NODE_TYPE_U64, array=True, value=packed)
 
     @staticmethod
     def s64_array(name: str, values: List[int]) -> "Node":
-        for value in values:
-            Node.__validate(Node.NODE_TYPE_S64, name, value)
-        return Node(name=name, type=Node.NODE_TYPE_S64, array=True, value=values)
+        packed = Node.__validate_array(Node.NODE_TYPE_S64, name, values)
+        return Node(name=name, type=Node.NODE_TYPE_S64, array=True, value=packed)
 
     @staticmethod
     def fouru8(name: str, values: List[int]) -> "Node":
@@ -540,6 +551,23 @@ class Node:
             if value < -9223372036854775808 or value > 9223372036854775807:
                 raise NodeException(f"Invalid value {value} for s32 {name}")
 
+    @staticmethod
+    def __validate_array(nodetype: int, name: str, values: List[int]) -> bytes:
+        """
+        Validate an integer array by packing it to its wire representation, which
+        checks every value's range in one go. Only if that fails do we go through
+        the values one at a time to find the one to complain about.
+        """
+        translated_type = Node.NODE_TYPES[nodetype]
+        try:
+            return struct.pack(f">{len(values)}{translated_type['enc']}", *values)
+        except struct.error:
+            for value in values:
+                Node.__validate(nodetype, name, value)
+            raise NodeException(
+                f'Invalid value in {translated_type["name"]} array {name}'
+            )
+
     def __init__(
         self,
         name: Optional[str] = None,
@@ -562,12 +590,13 @@ class Node:
                     be initialized with.
         """
         self.__name: Optional[str] = None
-        self.__array = False
         self.__translated_type: Optional[Dict[str, Any]] = None
         self.__type: Optional[int] = None
-        self.__attrs: Dict[str, str] = {}
+        self.__attrs: Optional[Dict[str, str]] = None
         self.__value: Any = None
-        self.__children: List[Node] = []
+        self.__children: Optional[List[Node]] = None
+        self.__index: Optional[Dict[str, Node]] = None
+        self.__indexed = 0
 
         if name is not None:
             self.set_name(name)
@@ -585,9 +614,8 @@ class Node:
                 NODE_NAME_CHARS characters.
         """
         # Ensure it isn't a violation
-        for char in name:
-            if char not in Node.NODE_NAME_CHARS:
-                raise NodeException(f"Invalid node name {name}")
+        if not _NODE_NAME_CHARS.issuperset(name):
+            raise NodeException(f"Invalid node name {name}")
 
         self.__name = name
 
@@ -618,9 +646,6 @@ class Node:
             else:
                 type = type & (~Node.ARRAY_BIT)
 
-        if (type & Node.ARRAY_BIT) != 0:
-            self.__array = True
-
         try:
             self.__translated_type = Node.NODE_TYPES[type & (~Node.ARRAY_BIT)]
             self.__type = type
@@ -667,9 +692,7 @@ class Node:
             raise Exception(
                 "Logic error, tried to fetch data length before setting type!"
             )
-        if self.__translated_type["name"] in {"bin", "str"}:
-            return None
-        return struct.calcsize(self.__translated_type["enc"])
+        return _DATA_LENGTHS[self.__translated_type["name"]]
 
     @property
     def data_encoding(self) -> str:
@@ -694,6 +717,8 @@ class Node:
             val - The string value to set the attribute value to. Defaults to empty string if
                   not provided.
         """
+        if self.__attrs is None:
+            self.__attrs = {}
         self.__attrs[attr] = val
 
     def attribute(self, attr: str, default: Optional[str] = None) -> Optional[str]:
@@ -706,6 +731,8 @@ class Node:
         Returns:
             The attribute value as a string.
         """
+        if self.__attrs is None:
+            return default
         return self.__attrs.get(attr, default)
 
     def add_child(self, child: "Node") -> None:
@@ -718,7 +745,10 @@ class Node:
         if not isinstance(child, Node):
             raise NodeException("Invalid child")
 
-        self.__children.append(child)
+        if self.__children is None:
+            self.__children = [child]
+        else:
+            self.__children.append(child)
 
     def child(self, name: str) -> Optional["Node"]:
         """
@@ -732,18 +762,39 @@ class Node:
         Returns:
             A Node if a child was found by name, or None if not.
         """
-        tree = name.split("/", 1)
-        for child in self.__children:
-            if child.name == tree[0]:
-                if len(tree) == 1:
-                    # We don't have any more nodes to traverse.
-                    return child
-                else:
-                    # We have more nodes, try to get the next.
-                    return child.child(tree[1])
+        children = self.__children
+        if not children:
+            return None
 
-        # There was no child by this name, return None.
-        return None
+        first, _, rest = name.partition("/")
+        found: Optional[Node] = None
+        if len(children) > Node.CHILD_INDEX_THRESHOLD:
+            # Nodes with a lot of children get a lookup table of the first child
+            # with each name, built the first time it is needed and extended as
+            # children are added. This assumes children aren't renamed or removed
+            # once they've been added, which nothing does.
+            index = self.__index
+            if index is None or self.__indexed > len(children):
+                index = {}
+                self.__index = index
+                self.__indexed = 0
+            for child in children[self.__indexed :]:
+                index.setdefault(child.name, child)
+            self.__indexed = len(children)
+            found = index.get(first)
+        else:
+            for child in children:
+                if child.name == first:
+                    found = child
+                    break
+
+        if found is None or not rest:
+            # There was no child by this name, or we don't have any more nodes
+            # to traverse.
+            return found
+        else:
+            # We have more nodes, try to get the next.
+            return found.child(rest)
 
     def child_value(self, name: str) -> Optional[Any]:
         """
@@ -770,6 +821,8 @@ class Node:
         Returns:
             A list of Node instances which are children of this Node.
         """
+        if self.__children is None:
+            self.__children = []
         return self.__children
 
     @property
@@ -780,8 +833,32 @@ class Node:
         Returns:
             A dictionary keyed by attribute name whose values are strings.
         """
+        if self.__attrs is None:
+            self.__attrs = {}
         return self.__attrs
 
+    @property
+    def existing_children(self) -> Sequence["Node"]:
+        """
+        Read-only access to children, for code that walks every node such as the encoders.
+        Unlike children, this doesn't allocate a list for a node that has none.
+
+        Returns:
+            A sequence of Node instances which are children of this Node.
+        """
+        return self.__children if self.__children is not None else ()
+
+    @property
+    def existing_attributes(self) -> Mapping[str, str]:
+        """
+        Read-only access to attributes, for code that walks every node such as the encoders.
+        Unlike attributes, this doesn't allocate a dictionary for a node that has none.
+
+        Returns:
+            A mapping keyed by attribute name whose values are strings.
+        """
+        return self.__attrs if self.__attrs is not None else _NO_ATTRIBUTES
+
     @property
     def is_array(self) -> _renamed_bool:
         """
@@ -790,7 +867,9 @@ class Node:
         Returns:
             True if this Node is an array, False otherwise.
         """
-        return self.__array
+        if self.__type is None:
+            return False
+        return (self.__type & Node.ARRAY_BIT) != 0
 
     @property
     def is_composite(self) -> _renamed_bool:
@@ -807,19 +886,57 @@ class Node:
             )
         return self.__translated_type["composite"]
 
+    @property
+    def is_packed(self) -> _renamed_bool:
+        """
+        Returns whether this node's value is an integer array that is being held in its
+        packed big-endian wire representation.
+
+        Returns:
+            True if packed_value can be used instead of value, False otherwise.
+        """
+        return isinstance(self.__value, bytes) and self.is_array
+
+    @property
+    def packed_value(self) -> bytes:
+        """
+        Gets the value of a packed integer array node exactly as it appears on the wire,
+        without converting it to a list of integers and back.
+
+        Returns:
+            A bytes object containing the big-endian packed array elements.
+        """
+        if not self.is_packed:
+            raise Exception("Logic error, tried to get packed value of unpacked node!")
+        return self.__value
+
     def set_value(self, val: Any) -> None:
         """
         Sets the value of this node. If this node is an array type (see Node.array boolean), expects an array. If
-        not, expects a scalar value.
+        not, expects a scalar value. Integer arrays can also be set from a bytes object holding the big-endian
+        packed elements as they appear on the wire, which is how they are held internally when possible.
+
+        Values are stored as given and only converted to the node's data type when they are read back, so that
+        building and encoding a tree doesn't pay for converting every value twice.
 
         Paramters:
             val - A mixed value to set the node to.
         """
-        is_array = isinstance(val, (list, tuple))
-
-        if self.__translated_type is None:
+        if self.__translated_type is None or self.__type is None:
             raise Exception("Logic error, tried to set value before setting type!")
         translated_type: Dict[str, Any] = self.__translated_type
+        array = (self.__type & Node.ARRAY_BIT) != 0
+        packable = array and translated_type["int"] and not translated_type["composite"]
+
+        if packable and isinstance(val, (bytes, bytearray, memoryview)):
+            if len(val) % struct.calcsize(translated_type["enc"]) != 0:
+                raise NodeException(
+                    f'Packed input for {translated_type["name"]} array is not a multiple of the element size!'
+                )
+            self.__value = bytes(val)
+            return
+
+        is_array = isinstance(val, (list, tuple))
 
         # Handle composite types
         if translated_type["composite"]:
@@ -830,24 +947,14 @@ class Node:
                     f'Input array for {translated_type["name"]} expected to be {len(translated_type["enc"])} elements!'
                 )
             is_array = False
-        if is_array != self.__array:
+        if is_array != array:
             raise NodeException(
-                f'Input {"is" if is_array else "is not"} array, expected {"array" if self.__array else "scalar"}'
+                f'Input {"is" if is_array else "is not"} array, expected {"array" if array else "scalar"}'
             )
 
-        def val_to_str(val: Any) -> Union[str, bytes]:
-            if translated_type["name"] == "bool":
-                # Support user-built boolean types
-                if val is True:
-                    return "true"
-                if val is False:
-                    return "false"
-
-                # Support construction from binary
-                return "true" if val != 0 else "false"
-            elif translated_type["name"] == "float":
-                return str(val)
-            elif translated_type["name"] == "ip4":
+        if translated_type["name"] == "ip4":
+            # Normalize to a string up front, so that bad addresses are caught here.
+            def ip4_to_str(val: Any) -> str:
                 try:
                     # Support construction from binary
                     ip = struct.unpack("BBBB", val)
@@ -859,16 +966,22 @@ class Node:
                             return val
 
                     raise NodeException(f"Invalid value {val} for IP4 type")
-            elif translated_type["int"]:
-                return str(val)
-            else:
-                # This could return either a string or bytes.
-                return val
 
-        if is_array or translated_type["composite"]:
-            self.__value = [val_to_str(v) for v in val]
+            if array:
+                self.__value = [ip4_to_str(v) for v in val]
+            else:
+                self.__value = ip4_to_str(val)
+        elif packable:
+            try:
+                self.__value = struct.pack(f'>{len(val)}{translated_type["enc"]}', *val)
+            except struct.error:
+                # Out of range or non-integer values, keep them as-is so that the
+                # problem surfaces when the node is used, like it always has.
+                self.__value = list(val)
+        elif array or translated_type["composite"]:
+            self.__value = list(val)
         else:
-            self.__value = val_to_str(val)
+            self.__value = val
 
     @property
     def value(self) -> Any:
@@ -878,30 +991,29 @@ class Node:
         Returns:
             A mixed value corresponding to this node's value. The returned value will be of the correct data type.
         """
-        if self.__translated_type is None:
+        if self.__translated_type is None or self.__type is None:
             raise Exception("Logic error, tried to get value before setting type!")
         translated_type: Dict[str, Any] = self.__translated_type
-
-        def str_to_val(string: Union[str, bytes]) -> Any:
-            if translated_type["name"] == "bool":
-                return True if string == "true" else False
-            elif translated_type["name"] == "float":
-                return float(string)
-            elif translated_type["name"] == "ip4":
-                if not isinstance(string, str):
-                    raise Exception("Logic error, expected a string!")
-                ip = [int(tup) for tup in string.split(".")]
-                return struct.pack("BBBB", ip[0], ip[1], ip[2], ip[3])
-            elif translated_type["int"]:
-                return int(string)
-            else:
-                # At this point, we could be a string or bytes.
-                return string
-
-        if self.__array or translated_type["composite"]:
-            return [str_to_val(v) for v in self.__value]
+        value = self.__value
+
+        if (self.__type & Node.ARRAY_BIT) != 0 or translated_type["composite"]:
+            if isinstance(value, bytes):
+                return list(
+                    struct.unpack(
+                        f'>{len(value) // struct.calcsize(translated_type["enc"])}{translated_type["enc"]}',
+                        value,
+                    )
+                )
+            convert = _CONVERTERS.get(translated_type["name"])
+            if convert is None:
+                return [v for v in value]
+            return [convert(v) for v in value]
         else:
-            return str_to_val(self.__value)
+            convert = _CONVERTERS.get(translated_type["name"])
+            if convert is None:
+                # At this point, we could be a string or bytes.
+                return value
+            return convert(value)
 
     def __to_xml(self, depth: int) -> str:
         """
@@ -919,16 +1031,17 @@ class Node:
                 "Logic error, tried to get XML representation before setting type!"
             )
         translated_type: Dict[str, Any] = self.__translated_type
+        array = self.is_array
 
-        attrs_dict = copy.deepcopy(self.__attrs)
+        attrs_dict = copy.deepcopy(self.__attrs or {})
         order = sorted(attrs_dict.keys())
         if self.data_length != 0:
             # Represent type and length
-            if self.__array:
+            if array:
                 if self.__value is None:
                     attrs_dict["__count"] = "0"
                 else:
-                    attrs_dict["__count"] = str(len(self.__value))
+                    attrs_dict["__count"] = str(len(self.value))
                 order.insert(0, "__count")
             attrs_dict["__type"] = translated_type["name"]
             order.insert(0, "__type")
@@ -955,12 +1068,19 @@ class Node:
         else:
             attrs = ""
 
+        def val_to_str(val: Any) -> str:
+            if translated_type["name"] == "bool":
+                return "true" if val else "false"
+            elif translated_type["name"] == "ip4":
+                return f"{val[0]}.{val[1]}.{val[2]}.{val[3]}"
+            else:
+                return str(val)
+
         def get_val() -> str:
-            if self.__array or translated_type["composite"]:
-                if self.__value is None:
-                    vals = ""
-                else:
-                    vals = " ".join([val for val in self.__value])
+            if self.__value is None:
+                vals = "" if array or translated_type["composite"] else "None"
+            elif array or translated_type["composite"]:
+                vals = " ".join([val_to_str(val) for val in self.value])
             elif translated_type["name"] == "str":
                 vals = escape(self.__value)
             elif translated_type["name"] == "bin":
@@ -973,7 +1093,7 @@ class Node:
 
                 vals = "".join([bin_to_hex(v) for v in self.__value])
             else:
-                vals = str(self.__value)
+                vals = val_to_str(self.value)
             return vals
 
         if self.__children:
@@ -1023,37 +1143,21 @@ class Node:
         try:
             if self.__name != other.__name:
                 return False
-            if self.__array != other.__array:
-                return False
             if self.__type != other.__type:
                 return False
 
-            if not self.__array:
-                if self.__value != other.__value:
-                    return False
-            else:
-                if len(self.__value) != len(other.__value):
-                    return False
-
-                for i in range(len(self.__value)):
-                    if self.__value[i] != other.__value[i]:
-                        return False
-
-            for attr in self.__attrs:
-                if other.attribute(attr) != self.attribute(attr):
-                    return False
-            for attr in other.__attrs:
-                if self.attribute(attr) != other.attribute(attr):
+            # Values are stored as they were given, so only convert them when the
+            # stored values differ. This way a packed array compares equal to the
+            # same array given as a list.
+            if self.__value != other.__value:
+                if self.value != other.value:
                     return False
 
-            if len(self.__children) != len(other.__children):
+            if (self.__attrs or {}) != (other.__attrs or {}):
                 return False
 
-            for i in range(len(self.__children)):
-                if self.__children[i] != other.__children[i]:
-                    return False
-
-            return True
+            # This recurses into each child's __eq__ in order.
+            return (self.__children or []) == (other.__children or [])
         except Exception:
             return False
 
@@ -1068,3 +1172,53 @@ class Node:
             True if this node doesn't equal the other node, False if it does equal.
         """
         return not self.__eq__(other)
+
+
+def _to_bool(value: Any) -> bool:
+    # Support user-built booleans as well as construction from binary.
+    if value is True or value is False:
+        return value
+    return value != 0
+
+
+def _to_ip4(value: str) -> bytes:
+    ip = [int(tup) for tup in value.split(".")]
+    return struct.pack("BBBB", ip[0], ip[1], ip[2], ip[3])
+
+
+def _value_converters() -> Dict[str, Callable[[Any], Any]]:
+    """
+    Build a table of the function used to convert a stored value to each data type's
+    python representation, keyed by data type name. Types that aren't present in the
+    table are returned exactly as they were stored.
+    """
+    converters: Dict[str, Callable[[Any], Any]] = {
+        "bool": _to_bool,
+        "float": float,
+        "ip4": _to_ip4,
+    }
+    for translated_type in Node.NODE_TYPES.values():
+        if translated_type["int"]:
+            converters[translated_type["name"]] = int
+    return converters
+
+
+def _data_lengths() -> Dict[str, Optional[int]]:
+    """
+    Build a table of the encoded size in bytes of each data type, keyed by data type
+    name, with None for variable length types.
+    """
+    return {
+        translated_type["name"]: (
+            None
+            if translated_type["name"] in {"bin", "str"}
+            else struct.calcsize(translated_type["enc"])
+        )
+        for translated_type in Node.NODE_TYPES.values()
+    }
+
+
+_NODE_NAME_CHARS: Final[FrozenSet[str]] = frozenset(Node.NODE_NAME_CHARS)
+_CONVERTERS: Final[Dict[str, Callable[[Any], Any]]] = _value_converters()
+_DATA_LENGTHS: Final[Dict[str, Optional[int]]] = _data_lengths()
+_NO_ATTRIBUTES: Final[Mapping[str, str]] = MappingProxyType({})
@@ -1,9 +1,10 @@
 import binascii
 import hashlib
-from typing import Optional
+from typing import List, Optional, Tuple
 from typing_extensions import Final
 
 from bemani.protocol.lz77 import Lz77
+from bemani.protocol.rc4 import RC4, RC4Cache
 from bemani.protocol.binary import BinaryEncoding
 from bemani.protocol.xml import XmlEncoding
 from bemani.protocol.node import Node
@@ -20,6 +21,10 @@ class EAmuseProtocol:
     A wrapper object that encapsulates encoding/decoding the E-Amusement protocol by Konami.
     """
 
+    # Derived keys and keystreams shared by every protocol object in this process, since
+    # a response is always encrypted with the same key as the request it answers.
+    RC4_CACHE: Final[RC4Cache] = RC4Cache()
+
     SHARED_SECRET: Final[
         bytes
     ] = b"\x69\xD7\x46\x27\xD9\x85\xEE\x21\x87\x16\x15\x70\xD0\x8D\x93\xB1\x24\x55\x03\x5B\x6D\xF0\xD8\x20\x5D\xF5"
@@ -28,6 +33,13 @@ class EAmuseProtocol:
     BINARY: Final[int] = 2
     BINARY_DECOMPRESSED: Final[int] = 3
 
+    # Payloads up to each of these sizes are compressed at the given level, and anything
+    # larger is compressed at the fastest level so large responses don't stall a request.
+    COMPRESSION_LEVELS: Final[List[Tuple[int, int]]] = [
+        (64 * 1024, Lz77.LEVEL_BEST),
+        (512 * 1024, 6),
+    ]
+
     SHIFT_JIS_LEGACY: Final[str] = "shift-jis-legacy"
     SHIFT_JIS: Final[str] = "shift-jis"
     EUC_JP: Final[str] = "euc-jp"
@@ -52,24 +64,7 @@ class EAmuseProtocol:
         Returns:
             binary string representing the encrypted/decrypted data
         """
-        S = list(range(256))
-        j = 0
-        out = []
-
-        # KSA Phase
-        for i in range(256):
-            j = (j + S[i] + key[i % len(key)]) & 0xFF
-            S[i], S[j] = S[j], S[i]
-
-        # PRGA Phase
-        i = j = 0
-        for char in data:
-            i = (i + 1) & 0xFF
-            j = (j + S[i]) & 0xFF
-            S[i], S[j] = S[j], S[i]
-            out.append(char ^ S[(S[i] + S[j]) & 0xFF])
-
-        return bytes(out)
+        return RC4(key).crypt(data)
 
     def __decrypt(self, encryption_key: Optional[str], data: bytes) -> bytes:
         """
@@ -84,8 +79,12 @@ class EAmuseProtocol:
         Returns:
             binary string representing transformed data
         """
-        key: Optional[bytes] = None
-        if encryption_key:
+        if not encryption_key:
+            # No encryption
+            return data
+
+        cipher = EAmuseProtocol.RC4_CACHE.get(encryption_key)
+        if cipher is None:
             # Key is concatenated with the shared secret above
             version, first, second = encryption_key.split("-")
             key = (
@@ -96,14 +95,10 @@ class EAmuseProtocol:
             # Next, key is sent through MD5 to derive the real key
             m = hashlib.md5()
             m.update(key)
-            key = m.digest()
-
-        if key:
-            # This is an encrypted old-style packet
-            return self._rc4_crypt(data, key)
+            cipher = RC4(m.digest())
 
-        # No encryption
-        return data
+        # This is an encrypted old-style packet
+        return EAmuseProtocol.RC4_CACHE.crypt(encryption_key, cipher, data)
 
     def __encrypt(self, encryption_key: Optional[str], data: bytes) -> bytes:
         """
@@ -144,6 +139,21 @@ class EAmuseProtocol:
         else:
             raise EAmuseException(f"Unknown compression {compression}")
 
+    def _compression_level(self, length: int) -> int:
+        """
+        Given a payload length, return the Lz77 compression level to use for it.
+
+        Parameters:
+            length - Length in bytes of the data about to be compressed.
+
+        Returns:
+            An integer compression level suitable for passing to Lz77.compress().
+        """
+        for maximum, level in EAmuseProtocol.COMPRESSION_LEVELS:
+            if length <= maximum:
+                return level
+        return Lz77.LEVEL_FAST
+
     def __compress(self, compression: Optional[str], data: bytes) -> bytes:
         """
         Given data and an optional compression scheme, compress the data.
@@ -163,7 +173,7 @@ class EAmuseProtocol:
         elif compression == "lz77":
             # This is a compressed new-style packet
             lz = Lz77()
-            return lz.compress(data)
+            return lz.compress(data, level=self._compression_level(len(data)))
         else:
             raise EAmuseException(f"Unknown compression {compression}")
 
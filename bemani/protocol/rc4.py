@@ -0,0 +1,221 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Union
+from typing_extensions import Final
+
+
+# Attempt to use the faster compiled RC4 implementation if it's available
+try:
+    from Crypto.Cipher import ARC4
+except ImportError:
+    ARC4 = None
+
+
+class RC4:
+    """
+    An RC4 cipher that remembers the keystream it has generated so far. Since RC4 is
+    a symmetric stream cipher, encrypting or decrypting is just an XOR against the
+    keystream for a given key. The E-Amusement protocol encrypts a response with the
+    same key that was used to encrypt the request, so by remembering the keystream
+    we only pay for the KSA and PRGA phases once per request/response pair.
+    """
+
+    def __init__(self, key: bytes, compiled: Optional[bool] = None) -> None:
+        """
+        Initialize the object.
+
+        Parameters:
+            key - Binary string representing the key to use.
+            compiled - Whether to use the compiled keystream generator. If None,
+                       uses the compiled generator when it is available.
+        """
+        if compiled is None:
+            compiled = ARC4 is not None
+        if compiled and ARC4 is None:
+            raise Exception("Compiled RC4 implementation is not available!")
+
+        self.key: bytes = key
+        self.__lock = Lock()
+        self.__stream = bytearray()
+        self.__cipher = ARC4.new(key) if compiled else None
+        self.__state = bytearray(range(256))
+        self.__i = 0
+        self.__j = 0
+
+        if self.__cipher is None:
+            # KSA Phase
+            S = self.__state
+            keylen = len(key)
+            j = 0
+            for i in range(256):
+                j = (j + S[i] + key[i % keylen]) & 0xFF
+                S[i], S[j] = S[j], S[i]
+
+    @staticmethod
+    def compiled_available() -> bool:
+        """
+        Return whether the compiled keystream generator can be used.
+        """
+        return ARC4 is not None
+
+    def __len__(self) -> int:
+        """
+        Return the number of keystream bytes that have been generated so far.
+        """
+        return len(self.__stream)
+
+    def __generate(self, length: int) -> None:
+        """
+        Append the next length bytes of keystream to our remembered keystream.
+
+        Parameters:
+            length - Number of keystream bytes to generate.
+        """
+        if self.__cipher is not None:
+            # Encrypting zeros with RC4 is the keystream itself.
+            self.__stream += self.__cipher.encrypt(bytes(length))
+            return
+
+        # PRGA Phase
+        S = self.__state
+        i = self.__i
+        j = self.__j
+        out = bytearray(length)
+        for pos in range(length):
+            i = (i + 1) & 0xFF
+            j = (j + S[i]) & 0xFF
+            S[i], S[j] = S[j], S[i]
+            out[pos] = S[(S[i] + S[j]) & 0xFF]
+
+        self.__i = i
+        self.__j = j
+        self.__stream += out
+
+    def keystream(self, length: int) -> bytes:
+        """
+        Return the first length bytes of keystream for this key, generating
+        more keystream if we haven't already generated enough.
+
+        Parameters:
+            length - Number of keystream bytes to return.
+
+        Returns:
+            binary string of keystream bytes.
+        """
+        with self.__lock:
+            if length > len(self.__stream):
+                self.__generate(length - len(self.__stream))
+            return bytes(self.__stream[:length])
+
+    def crypt(self, data: Union[bytes, bytearray, memoryview]) -> bytes:
+        """
+        Given a data blob, perform RC4 encryption/decryption.
+
+        Parameters:
+            data - Binary string representing data to be encrypted/decrypted.
+
+        Returns:
+            binary string representing the encrypted/decrypted data.
+        """
+        length = len(data)
+        if length == 0:
+            return b""
+
+        # XOR the whole blob at once as a big integer instead of byte by byte.
+        keystream = self.keystream(length)
+        return (
+            int.from_bytes(data, "little") ^ int.from_bytes(keystream, "little")
+        ).to_bytes(length, "little")
+
+
+class RC4Cache:
+    """
+    A bounded LRU cache of RC4 ciphers keyed by an arbitrary string, such as the
+    X-Eamuse-Info header that a key was derived from. Ciphers whose remembered
+    keystream grows past the prefix length are dropped instead of being kept around,
+    so the memory used by this cache is bounded by entries times prefix length.
+    """
+
+    MAX_ENTRIES: Final[int] = 128
+    MAX_PREFIX_LENGTH: Final[int] = 64 * 1024
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_prefix_length: Optional[int] = None,
+    ) -> None:
+        """
+        Initialize the object.
+
+        Parameters:
+            max_entries - Maximum number of ciphers to remember.
+            max_prefix_length - Maximum number of keystream bytes a remembered cipher may hold.
+        """
+        self.max_entries: int = self.MAX_ENTRIES if max_entries is None else max_entries
+        self.max_prefix_length: int = (
+            self.MAX_PREFIX_LENGTH if max_prefix_length is None else max_prefix_length
+        )
+        self.__lock = Lock()
+        self.__ciphers: "OrderedDict[str, RC4]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.__ciphers)
+
+    def get(self, name: str) -> Optional[RC4]:
+        """
+        Look up a previously remembered cipher.
+
+        Parameters:
+            name - The name the cipher was stored under.
+
+        Returns:
+            An RC4 object, or None if we don't have a cipher for this name.
+        """
+        with self.__lock:
+            cipher = self.__ciphers.get(name)
+            if cipher is not None:
+                self.__ciphers.move_to_end(name)
+            return cipher
+
+    def put(self, name: str, cipher: RC4) -> None:
+        """
+        Remember a cipher, evicting the least recently used cipher if we are full.
+
+        Parameters:
+            name - The name to store the cipher under.
+            cipher - An RC4 object.
+        """
+        with self.__lock:
+            self.__ciphers[name] = cipher
+            self.__ciphers.move_to_end(name)
+            while len(self.__ciphers) > self.max_entries:
+                self.__ciphers.popitem(last=False)
+
+    def crypt(self, name: str, cipher: RC4, data: bytes) -> bytes:
+        """
+        Perform RC4 encryption/decryption with a cipher, remembering it for next time
+        if its keystream is still small enough to keep around.
+
+        Parameters:
+            name - The name to store the cipher under.
+            cipher - An RC4 object, usually one returned from get().
+            data - Binary string representing data to be encrypted/decrypted.
+
+        Returns:
+            binary string representing the encrypted/decrypted data.
+        """
+        result = cipher.crypt(data)
+        if len(cipher) <= self.max_prefix_length:
+            self.put(name, cipher)
+        else:
+            with self.__lock:
+                if self.__ciphers.get(name) is cipher:
+                    del self.__ciphers[name]
+        return result
+
+    def clear(self) -> None:
+        """
+        Forget all remembered ciphers.
+        """
+        with self.__lock:
+            self.__ciphers.clear()
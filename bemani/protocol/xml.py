@@ -1,4 +1,3 @@
-import copy
 import struct
 from typing import Any, Dict, Iterator, List, Optional, Tuple
 from typing_extensions import Final
@@ -386,7 +385,7 @@ class XmlEncoder:
         Returns:
             Bytes representing the XML-like data for this node and all children.
         """
-        attrs_dict = copy.deepcopy(node.attributes)
+        attrs_dict = dict(node.existing_attributes)
         order = sorted(attrs_dict.keys())
         if node.data_length != 0:
             # Represent type and length
@@ -431,9 +430,9 @@ class XmlEncoder:
         else:
             attrs = b""
 
-        if node.children:
+        if node.existing_children:
             # Has children nodes
-            children = [self.to_xml(child) for child in node.children]
+            children = [self.to_xml(child) for child in node.existing_children]
             string = b"".join(
                 [
                     b"<",
@@ -0,0 +1,209 @@
+# vim: set fileencoding=utf-8
+import importlib
+import unittest
+from PIL import Image
+
+from bemani.format.afp.blend.blend import (
+    CompositorPool,
+    affine_composite,
+    perspective_composite,
+)
+from bemani.format.afp.types import AAMode, Color, HSL, Matrix, Point, Rectangle
+
+
+class TestAFPBlend(unittest.TestCase):
+    def image(self, width: int, height: int, seed: int) -> Image.Image:
+        return Image.frombytes(
+            "RGBA",
+            (width, height),
+            bytes(((i * 37) + seed) % 256 for i in range(width * height * 4)),
+        )
+
+    def test_pool_matches_single_threaded(self) -> None:
+        canvas = self.image(32, 24, 1)
+        mask = self.image(32, 24, 2)
+        texture = self.image(10, 8, 3)
+        transform = Matrix.affine(a=1.2, b=0.3, c=-0.4, d=0.9, tx=12.0, ty=2.0)
+
+        with CompositorPool(2) as pool:
+            for blendfunc in [0, 2, 8, 257]:
+                for aa_mode in [AAMode.NONE, AAMode.SSAA_OR_BILINEAR]:
+                    args = (
+                        canvas,
+                        Color(0.1, 0.0, 0.0, 0.0),
+                        Color(1.0, 0.8, 1.0, 0.9),
+                        HSL(0.0, 0.0, 0.0),
+                        transform,
+                        mask,
+                        blendfunc,
+                        texture,
+                    )
+                    expected = affine_composite(
+                        *args, single_threaded=True, aa_mode=aa_mode
+                    ).tobytes()
+                    self.assertEqual(
+                        pool.affine_composite(
+                            *args, aa_mode=aa_mode, texture_name="tex"
+                        ).tobytes(),
+                        expected,
+                    )
+                    self.assertEqual(
+                        pool.affine_composite(*args, aa_mode=aa_mode).tobytes(),
+                        expected,
+                    )
+
+            perspective_args = (
+                canvas,
+                Color(0.0, 0.0, 0.0, 0.0),
+                Color(1.0, 1.0, 1.0, 1.0),
+                HSL(0.0, 0.0, 0.0),
+                Matrix.identity().translate(Point(5.0, 3.0, 10.0)),
+                Point(16.0, 12.0, -100.0),
+                100.0,
+                None,
+                0,
+                texture,
+            )
+            self.assertEqual(
+                pool.perspective_composite(
+                    *perspective_args, texture_name="tex"
+                ).tobytes(),
+                perspective_composite(
+                    *perspective_args, single_threaded=True
+                ).tobytes(),
+            )
+
+            # A different image under the same name, on a larger canvas.
+            canvas = self.image(48, 40, 4)
+            texture = self.image(12, 12, 5)
+            args = (
+                canvas,
+                Color(0.0, 0.0, 0.0, 0.0),
+                Color(1.0, 1.0, 1.0, 1.0),
+                HSL(0.0, 0.0, 0.0),
+                transform,
+                None,
+                0,
+                texture,
+            )
+            self.assertEqual(
+                pool.affine_composite(*args, texture_name="tex").tobytes(),
+                affine_composite(*args, single_threaded=True).tobytes(),
+            )
+
+            # Only drawing part of the canvas.
+            clip = Rectangle(left=10.0, top=5.0, bottom=30.0, right=20.0)
+            self.assertEqual(
+                pool.affine_composite(*args, texture_name="tex", clip=clip).tobytes(),
+                affine_composite(*args, single_threaded=True, clip=clip).tobytes(),
+            )
+
+            # Closing the pool still leaves it usable.
+            pool.close()
+            self.assertEqual(
+                pool.affine_composite(*args, texture_name="tex").tobytes(),
+                affine_composite(*args, single_threaded=True).tobytes(),
+            )
+
+            # Entirely off screen, so nothing gets drawn.
+            offscreen = Matrix.identity().translate(Point(100.0, 100.0))
+            self.assertIs(
+                pool.affine_composite(
+                    canvas,
+                    Color(0.0, 0.0, 0.0, 0.0),
+                    Color(1.0, 1.0, 1.0, 1.0),
+                    HSL(0.0, 0.0, 0.0),
+                    offscreen,
+                    None,
+                    0,
+                    texture,
+                ),
+                canvas,
+            )
+
+    def test_pool_dead_process(self) -> None:
+        canvas = self.image(32, 24, 1)
+        texture = self.image(10, 8, 3)
+        args = (
+            canvas,
+            Color(0.0, 0.0, 0.0, 0.0),
+            Color(1.0, 1.0, 1.0, 1.0),
+            HSL(0.0, 0.0, 0.0),
+            Matrix.identity(),
+            None,
+            0,
+            texture,
+        )
+
+        with CompositorPool(1) as pool:
+            pool.affine_composite(*args)
+
+            # A killed process should fail the composite instead of hanging it forever.
+            for proc in getattr(pool, "_CompositorPool__procs"):
+                proc.kill()
+                proc.join()
+            with self.assertRaisesRegex(Exception, "exited unexpectedly"):
+                pool.affine_composite(*args)
+
+            # The pool starts over on the next composite.
+            self.assertEqual(
+                pool.affine_composite(*args).tobytes(),
+                affine_composite(*args, single_threaded=True).tobytes(),
+            )
+
+    def test_numpy_matches_python(self) -> None:
+        try:
+            blendnumpy = importlib.import_module("bemani.format.afp.blend.blendnumpy")
+        except ImportError:
+            self.skipTest("numpy is not installed")
+
+        canvas = self.image(32, 24, 1)
+        mask = self.image(32, 24, 2)
+        texture = self.image(10, 8, 3)
+        transform = Matrix.affine(a=1.2, b=0.3, c=-0.4, d=0.9, tx=12.0, ty=2.0)
+
+        for blendfunc in [0, 2, 3, 8, 9, 13, 70, 256, 257]:
+            for aa_mode in [AAMode.NONE, AAMode.SSAA_OR_BILINEAR, AAMode.SSAA_ONLY]:
+                for hsl in [HSL(0.0, 0.0, 0.0), HSL(0.3, -0.2, 0.1)]:
+                    args = (
+                        canvas,
+                        Color(0.1, 0.0, 0.2, 0.0),
+                        Color(1.0, 0.8, 1.0, 0.9),
+                        hsl,
+                        transform,
+                        mask,
+                        blendfunc,
+                        texture,
+                    )
+                    self.assertEqual(
+                        blendnumpy.affine_composite(
+                            *args, single_threaded=True, aa_mode=aa_mode
+                        ).tobytes(),
+                        affine_composite(
+                            *args, single_threaded=True, aa_mode=aa_mode
+                        ).tobytes(),
+                    )
+
+        for aa_mode in [AAMode.NONE, AAMode.SSAA_OR_BILINEAR, AAMode.SSAA_ONLY]:
+            perspective_args = (
+                canvas,
+                Color(0.0, 0.0, 0.0, 0.0),
+                Color(1.0, 1.0, 1.0, 1.0),
+                HSL(0.0, 0.0, 0.0),
+                Matrix.identity()
+                .multiply(Matrix.affine(a=0.8, b=0.4, c=-0.3, d=1.1, tx=0.0, ty=0.0))
+                .translate(Point(5.0, 3.0, 10.0)),
+                Point(16.0, 12.0, -100.0),
+                100.0,
+                mask,
+                0,
+                texture,
+            )
+            self.assertEqual(
+                blendnumpy.perspective_composite(
+                    *perspective_args, single_threaded=True, aa_mode=aa_mode
+                ).tobytes(),
+                perspective_composite(
+                    *perspective_args, single_threaded=True, aa_mode=aa_mode
+                ).tobytes(),
+            )
@@ -0,0 +1,304 @@
+# vim: set fileencoding=utf-8
+import unittest
+from typing import List, Optional
+from PIL import Image
+
+from bemani.format.afp.geo import DrawParams, Shape
+from bemani.format.afp.render import (
+    AFPRenderer,
+    DisplayList,
+    DrawCommand,
+    DrawMask,
+    ImageCache,
+)
+from bemani.format.afp.swf import (
+    SWF,
+    Frame,
+    AP2ImageTag,
+    AP2PlaceObjectTag,
+    AP2ShapeTag,
+)
+from bemani.format.afp.types import AAMode, Color, HSL, Matrix, Point, Rectangle
+
+
+class TestAFPRender(unittest.TestCase):
+    def place(
+        self,
+        depth: int,
+        source: int,
+        transform: Matrix,
+        update: bool = False,
+        hsl_shift: Optional[HSL] = None,
+    ) -> AP2PlaceObjectTag:
+        return AP2PlaceObjectTag(
+            depth,
+            depth,
+            None if update else source,
+            None,
+            None,
+            8 if source == 2 else None,
+            update,
+            transform,
+            None,
+            AP2PlaceObjectTag.PROJECTION_AFFINE,
+            None,
+            None,
+            hsl_shift,
+            {},
+            False,
+        )
+
+    def renderer(
+        self, frame_processes: int = 0, frame_window: Optional[int] = None
+    ) -> AFPRenderer:
+        renderer = AFPRenderer(
+            shapes={},
+            textures={},
+            swfs={},
+            single_threaded=True,
+            frame_processes=frame_processes,
+            frame_window=frame_window,
+        )
+        renderer.add_texture(
+            "tex",
+            Image.frombytes(
+                "RGBA", (10, 8), bytes(((i * 37) + 3) % 256 for i in range(320))
+            ),
+        )
+
+        shape = Shape("rect", b"")
+        shape.vertex_points = [Point(0, 0), Point(7, 0), Point(7, 5), Point(0, 5)]
+        shape.draw_params = [DrawParams(0x9, None, [], Color(0.2, 0.6, 0.9, 0.8))]
+        shape.parsed = True
+        renderer.add_shape("rect", shape)
+
+        # An image that moves on the second frame, and a rectangle that changes color on
+        # the fourth, with two frames in between where nothing changes.
+        swf = SWF("test", b"")
+        swf.parsed = True
+        swf.exported_name = "test"
+        swf.fps = 30.0
+        swf.location = Rectangle(left=0.0, top=0.0, bottom=24.0, right=32.0)
+        swf.color = Color(0.1, 0.1, 0.1, 1.0)
+        swf.tags = [
+            AP2ImageTag(1, "tex"),
+            AP2ShapeTag(2, "rect"),
+            self.place(1, 1, Matrix.affine(a=1.2, b=0.3, c=-0.4, d=0.9, tx=12, ty=2)),
+            self.place(2, 2, Matrix.affine(a=1.0, b=0.0, c=0.0, d=1.0, tx=3, ty=4)),
+            self.place(
+                1,
+                1,
+                Matrix.affine(a=1.2, b=0.3, c=-0.4, d=0.9, tx=14, ty=3),
+                update=True,
+            ),
+            self.place(
+                2, 2, Matrix.identity(), update=True, hsl_shift=HSL(0.3, 0.1, -0.1)
+            ),
+        ]
+        swf.frames = [
+            Frame(0, 4),
+            Frame(4, 1),
+            Frame(5, 0),
+            Frame(5, 0),
+            Frame(5, 1),
+        ]
+        renderer.add_swf("test", swf)
+        return renderer
+
+    def render(
+        self,
+        renderer: AFPRenderer,
+        only_frames: Optional[List[int]] = None,
+        background_image: Optional[List[Image.Image]] = None,
+    ) -> List[bytes]:
+        return [
+            frame.tobytes()
+            for frame in renderer.render_path(
+                "test", only_frames=only_frames, background_image=background_image
+            )
+        ]
+
+    def test_pipelined_matches_in_order(self) -> None:
+        expected = self.render(self.renderer())
+        self.assertEqual(len(expected), 5)
+        self.assertEqual(len(set(expected)), 3)
+        self.assertEqual(expected[1], expected[2])
+        self.assertEqual(expected[1], expected[3])
+
+        for frame_processes, frame_window in [(2, None), (1, 1)]:
+            renderer = self.renderer(frame_processes, frame_window)
+            self.assertEqual(self.render(renderer), expected)
+            self.assertEqual(
+                self.render(renderer, only_frames=[3, 5]),
+                [expected[2], expected[4]],
+            )
+
+    def test_pipelined_background_image(self) -> None:
+        # The background is only added to the texture library once the animation starts
+        # playing, and every frame process needs it.
+        background = [
+            Image.frombytes(
+                "RGBA", (16, 12), bytes(((i * 29) + seed) % 256 for i in range(768))
+            )
+            for seed in [5, 11]
+        ]
+        expected = self.render(self.renderer(), background_image=background)
+        self.assertEqual(len(expected), 5)
+        self.assertNotEqual(expected[1], expected[2])
+
+        renderer = self.renderer(2)
+        self.assertEqual(
+            self.render(renderer, background_image=background),
+            expected,
+        )
+
+    def test_rasterize_only_redraws_changes(self) -> None:
+        textures = {
+            "bg": Image.frombytes(
+                "RGBA", (32, 24), bytes(((i * 37) + 1) % 256 for i in range(3072))
+            ),
+            "sprite": Image.frombytes(
+                "RGBA", (4, 4), bytes(((i * 53) + 7) % 256 for i in range(64))
+            ),
+        }
+        mask = DrawMask(
+            None,
+            Rectangle(left=0.0, top=0.0, bottom=12.0, right=16.0),
+            Matrix.affine(a=1.0, b=0.0, c=0.0, d=1.0, tx=2.0, ty=2.0),
+            None,
+        )
+
+        def draw(texture: str, x: float, blend: int = 0) -> DrawCommand:
+            return DrawCommand(
+                texture,
+                None,
+                Matrix.affine(a=1.0, b=0.2, c=0.0, d=1.0, tx=x, ty=3.0),
+                None,
+                Color(0.0, 0.0, 0.0, 0.0),
+                Color(1.0, 1.0, 1.0, 0.8),
+                HSL(0.0, 0.0, 0.0),
+                blend,
+                mask if texture == "sprite" else None,
+                AAMode.SSAA_OR_BILINEAR,
+            )
+
+        frames = [
+            [draw("bg", -2.0), draw("sprite", 4.0), draw("sprite", 20.0, 8)],
+            [draw("bg", -2.0), draw("sprite", 6.5), draw("sprite", 20.0, 8)],
+            [draw("bg", -2.0), draw("sprite", 20.0, 8), draw("sprite", 6.5)],
+            [draw("bg", -2.0), draw("sprite", 6.5)],
+            [draw("bg", -2.0), draw("sprite", 6.5)],
+        ]
+        renderer = AFPRenderer(textures=textures, single_threaded=True)
+        for i, commands in enumerate(frames):
+            display_list = DisplayList(32, 24, Color(0.1, 0.1, 0.1, 1.0), commands)
+            self.assertEqual(
+                renderer.rasterize(display_list).tobytes(),
+                AFPRenderer(textures=textures, single_threaded=True)
+                .rasterize(display_list)
+                .tobytes(),
+            )
+
+            stats = renderer.frame_stats
+            assert stats is not None
+            self.assertEqual(stats.objects, len(commands))
+            self.assertEqual(stats.total_pixels, 32 * 24)
+            if i == 0:
+                # Nothing to reuse on the first frame.
+                self.assertEqual(stats.pixels, stats.total_pixels)
+            elif i == 1:
+                # Only the area around the moving sprite is drawn again, which leaves
+                # the other sprite alone.
+                self.assertEqual(stats.reused, 1)
+                self.assertLess(stats.pixels, 100)
+            elif i == 4:
+                # Nothing changed at all.
+                self.assertEqual(stats.reused, 2)
+                self.assertEqual(stats.pixels, 0)
+
+    def test_cached_masks_match_uncached(self) -> None:
+        textures = {
+            "bg": Image.frombytes(
+                "RGBA", (32, 24), bytes(((i * 37) + 1) % 256 for i in range(3072))
+            ),
+            "sprite": Image.frombytes(
+                "RGBA", (4, 4), bytes(((i * 53) + 7) % 256 for i in range(64))
+            ),
+        }
+        outer = DrawMask(
+            None,
+            Rectangle(left=0.0, top=0.0, bottom=20.0, right=24.0),
+            Matrix.affine(a=1.0, b=0.0, c=0.0, d=1.0, tx=1.0, ty=1.0),
+            None,
+        )
+        inner = DrawMask(
+            outer,
+            Rectangle(left=0.0, top=0.0, bottom=12.0, right=16.0),
+            Matrix.affine(a=1.0, b=0.1, c=0.0, d=1.0, tx=4.0, ty=2.0),
+            None,
+        )
+
+        def draw(texture: str, x: float, mask: Optional[DrawMask]) -> DrawCommand:
+            return DrawCommand(
+                texture,
+                None,
+                Matrix.affine(a=1.0, b=0.2, c=0.0, d=1.0, tx=x, ty=3.0),
+                None,
+                Color(0.0, 0.0, 0.0, 0.0),
+                Color(1.0, 1.0, 1.0, 0.8),
+                HSL(0.0, 0.0, 0.0),
+                0,
+                mask,
+                AAMode.SSAA_OR_BILINEAR,
+            )
+
+        frames = [
+            DisplayList(
+                32,
+                24,
+                Color(0.1, 0.1, 0.1, 1.0),
+                [draw("bg", -2.0, outer), draw("sprite", 4.0 + i, inner)],
+            )
+            for i in range(4)
+        ]
+
+        # No cache at all, a cache too small to hold every mask so they get pushed out
+        # while drawing, and one big enough to hold everything.
+        expected = [
+            AFPRenderer(textures=textures, single_threaded=True, cache_size=0)
+            .rasterize(display_list)
+            .tobytes()
+            for display_list in frames
+        ]
+        for cache_size in [32 * 24 * 5, 1024 * 1024]:
+            renderer = AFPRenderer(
+                textures=textures, single_threaded=True, cache_size=cache_size
+            )
+            self.assertEqual(
+                [renderer.rasterize(display_list).tobytes() for display_list in frames],
+                expected,
+            )
+
+    def test_image_cache_evicts_least_recently_used(self) -> None:
+        cache = ImageCache(100)
+        cache.put("a", Image.new("RGBA", (5, 2)))
+        cache.put("b", Image.new("L", (10, 3)))
+        self.assertEqual(cache.bytes, 70)
+
+        # Looking up "a" makes "b" the one to go once there is no more room.
+        self.assertIsNotNone(cache.get("a"))
+        cache.put("c", Image.new("L", (8, 5)))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+        self.assertEqual(cache.bytes, 80)
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+        # Replacing an image doesn't count it twice.
+        cache.put("c", Image.new("L", (4, 5)))
+        self.assertEqual((len(cache), cache.bytes), (2, 60))
+
+        # Images that can never fit aren't held onto, and don't push anything out.
+        cache.put("d", Image.new("RGBA", (10, 10)))
+        self.assertIsNone(cache.get("d"))
+        self.assertEqual((len(cache), cache.bytes), (2, 60))
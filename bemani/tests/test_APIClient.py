@@ -1,10 +1,87 @@
 # vim: set fileencoding=utf-8
+import json
+import threading
+import time
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+from unittest.mock import patch
 
+from bemani.common import APIConstants, GameConstants, VersionConstants
+from bemani.data import Config
 from bemani.data.api.client import APIClient
+from bemani.data.api.federation import CircuitBreaker, FederationPool
+
+
+class FakeAPIServer(ThreadingHTTPServer):
+    """
+    A local stand-in for a remote BEMAPI server, which answers every request
+    with a single record after an optional delay.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), FakeAPIHandler)
+        self.status = 200
+        self.delay = 0.0
+        self.requests: List[Tuple[int, Dict[str, Any]]] = []
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def uri(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class FakeAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: FakeAPIServer
+
+    def do_GET(self) -> None:
+        length = int(self.headers.get("content-length", 0))
+        request = json.loads(self.rfile.read(length))
+        self.server.requests.append((self.client_address[1], request))
+        time.sleep(self.server.delay)
+
+        if self.server.status == 200:
+            response: Dict[str, Any] = {"records": [{"song": "1", "points": 100}]}
+        else:
+            response = {"error": "Nope!"}
+        body = json.dumps(response).encode("utf-8")
+
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
 
 
 class TestAPIClient(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = FakeAPIServer()
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def make_client(self, **settings: Any) -> APIClient:
+        return APIClient(
+            self.server.uri, "token", True, True, Config({"federation": settings})
+        )
+
+    def get_records(self, client: APIClient) -> List[Dict[str, Any]]:
+        return client.get_records(
+            GameConstants.IIDX,
+            VersionConstants.IIDX_ROOTAGE,
+            APIConstants.ID_TYPE_SERVER,
+            [],
+        )
+
     def test_content_type(self) -> None:
         client = APIClient("https://127.0.0.1", "token", False, False)
         self.assertFalse(client._content_type_valid("application/text"))
@@ -20,3 +97,108 @@ class TestAPIClient(unittest.TestCase):
         self.assertTrue(client._content_type_valid("application/json;charset=UTF-8"))
         self.assertTrue(client._content_type_valid("application/json;charset = UTF-8"))
         self.assertTrue(client._content_type_valid("application/json; charset = UTF-8"))
+
+    def test_keepalive(self) -> None:
+        client = self.make_client()
+        self.assertEqual(len(self.get_records(client)), 1)
+        self.assertEqual(len(self.get_records(self.make_client())), 1)
+
+        # Both requests should have gone over the same connection.
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.server.requests[0][0], self.server.requests[1][0])
+        self.assertEqual(self.server.requests[0][1]["objects"], ["records"])
+
+    def test_stale_while_revalidate(self) -> None:
+        client = self.make_client(cache_ttl=60, cache_stale_ttl=60)
+        now = time.time()
+
+        with patch("bemani.data.api.federation.time.time", return_value=now):
+            self.assertEqual(len(self.get_records(client)), 1)
+            self.get_records(client)
+            self.assertEqual(len(self.server.requests), 1)
+
+        with patch("bemani.data.api.federation.time.time", return_value=now + 90):
+            # The stale copy should come back immediately, while it is refreshed.
+            self.server.delay = 0.5
+            start = time.time()
+            self.assertEqual(len(self.get_records(client)), 1)
+            self.assertLess(time.time() - start, 0.4)
+            self.wait_for_requests(2)
+
+        with patch("bemani.data.api.federation.time.time", return_value=now + 200):
+            # The refreshed copy should be fresh again by now.
+            time.sleep(0.6)
+            self.get_records(client)
+            self.assertEqual(len(self.server.requests), 2)
+
+    def test_latency_budget(self) -> None:
+        client = self.make_client(latency_budget=0.2, cache_ttl=60)
+        self.server.delay = 1.0
+
+        # The request takes too long, so we should get nothing back in time.
+        start = time.time()
+        self.assertEqual(self.get_records(client), [])
+        self.assertLess(time.time() - start, 0.8)
+
+        # But it should have finished in the background and warmed the cache.
+        time.sleep(1.0)
+        self.assertEqual(len(self.get_records(client)), 1)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_circuit_breaker(self) -> None:
+        client = self.make_client(breaker_failures=2, breaker_reset=60)
+        self.server.status = 500
+
+        for _ in range(5):
+            self.assertEqual(self.get_records(client), [])
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(
+            FederationPool.shared().stats()[self.server.uri],
+            CircuitBreaker.OPEN,
+        )
+
+    def test_shared_pool_settings(self) -> None:
+        self.make_client(pool_size=3, timeout=2.5, latency_budget=1.5)
+
+        # A client without a config of its own must not reset the operator's settings.
+        APIClient(self.server.uri, "token", True, True)
+        pool = FederationPool.shared()
+        self.assertEqual(pool.pool_size, 3)
+        self.assertEqual(pool.timeout, 2.5)
+        self.assertEqual(pool.latency_budget, 1.5)
+
+        # But a client with one applies it.
+        self.make_client(timeout=4.0)
+        self.assertEqual(FederationPool.shared().timeout, 4.0)
+
+    def test_breaker_reset(self) -> None:
+        breaker = CircuitBreaker(2, 60)
+        now = time.time()
+
+        with patch("bemani.data.api.federation.time.time", return_value=now):
+            self.assertTrue(breaker.allow())
+            breaker.failure()
+            self.assertTrue(breaker.allow())
+            breaker.failure()
+            self.assertFalse(breaker.allow())
+            self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        with patch("bemani.data.api.federation.time.time", return_value=now + 61):
+            # Only a single trial request should be let through.
+            self.assertTrue(breaker.allow())
+            self.assertFalse(breaker.allow())
+            breaker.failure()
+            self.assertFalse(breaker.allow())
+
+        with patch("bemani.data.api.federation.time.time", return_value=now + 122):
+            self.assertTrue(breaker.allow())
+            breaker.success()
+            self.assertTrue(breaker.allow())
+            self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def wait_for_requests(self, count: int) -> None:
+        for _ in range(100):
+            if len(self.server.requests) >= count:
+                return
+            time.sleep(0.01)
+        raise Exception(f"Expected {count} requests to the server!")
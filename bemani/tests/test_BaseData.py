@@ -1,8 +1,15 @@
 # vim: set fileencoding=utf-8
 import unittest
+from typing import List
 from unittest.mock import Mock
+from sqlalchemy import create_engine, event  # type: ignore
+from sqlalchemy.orm import scoped_session, sessionmaker  # type: ignore
+from sqlalchemy.pool import StaticPool  # type: ignore
+from sqlalchemy.sql import text  # type: ignore
 
+from bemani.data.config import Config
 from bemani.data.mysql.base import BaseData
+from bemani.data.mysql.codec import Codec, available_backends
 
 
 class TestBaseData(unittest.TestCase):
@@ -30,9 +37,14 @@ class TestBaseData(unittest.TestCase):
         }
 
         serialized = data.serialize(testdict)
-        self.assertEqual(serialized, '{"bytes": ["__bytes__", 1, 2, 3, 4, 5]}')
+        self.assertEqual(serialized, '{"bytes":"AQIDBAU=","__b64__":[["bytes"]]}')
         self.assertEqual(data.deserialize(serialized), testdict)
 
+        # Rows written before bytes were base64 encoded must still decode.
+        self.assertEqual(
+            data.deserialize('{"bytes": ["__bytes__", 1, 2, 3, 4, 5]}'), testdict
+        )
+
     def test_deep_byte_serialize(self) -> None:
         data = BaseData(Mock(), None)
 
@@ -46,3 +58,73 @@ class TestBaseData(unittest.TestCase):
         }
 
         self.assertEqual(data.deserialize(data.serialize(testdict)), testdict)
+
+    def test_legacy_byte_deserialize(self) -> None:
+        data = BaseData(Mock(), None)
+
+        self.assertEqual(
+            data.deserialize(
+                '{"a": [["__bytes__", 1], [{"b": ["__bytes__"]}, ["__bytes__", 2]]], '
+                + '"c": {"d": ["__bytes__", 3, 4]}, "e": ["x", "__bytes__"]}'
+            ),
+            {
+                "a": [b"\x01", [{"b": b""}, b"\x02"]],
+                "c": {"d": b"\x03\x04"},
+                "e": ["x", "__bytes__"],
+            },
+        )
+
+    def test_codec_backends(self) -> None:
+        testdict = {
+            "name": "プレイヤー",
+            "big": 2**70,
+            "list": [1, 2.5, None, True, {"bytes": b"\x00\xff"}],
+            "nested": {"bytes": [b"", b"abc"], "str": "__b64__"},
+            # Looks like the old format, but isn't since this blob is in the new one.
+            "notbytes": ["__bytes__", 1],
+        }
+
+        for name, backend in available_backends().items():
+            codec = Codec(backend)
+            self.assertEqual(codec.decode(codec.encode(testdict)), testdict, name)
+            self.assertEqual(codec.decode('{"a": 1}'), {"a": 1}, name)
+
+            # Integers wider than 64 bits come back exactly, and not as floats that merely
+            # compare equal.
+            for wide in [2**70, -(2**63) - 1]:
+                decoded = codec.decode(codec.encode({"v": wide}))["v"]
+                self.assertEqual((type(decoded), decoded), (int, wide), name)
+
+            # Keys become strings and tuples become lists, same as plain JSON.
+            self.assertEqual(
+                codec.decode(codec.encode({1: {"b": (b"\x01", 2)}})),  # type: ignore
+                {"1": {"b": [b"\x01", 2]}},
+                name,
+            )
+
+    def test_stream(self) -> None:
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE test (id INTEGER)"))
+            conn.execute(
+                text("INSERT INTO test (id) VALUES (:id)"),
+                [{"id": i} for i in range(5)],
+            )
+        session = scoped_session(sessionmaker(bind=engine))
+        data = BaseData(Config({"database": {"engine": engine}}), session)
+
+        checkedout: List[bool] = []
+        event.listen(engine, "checkout", lambda *args: checkedout.append(True))
+        event.listen(engine, "checkin", lambda *args: checkedout.pop())
+
+        rows = data.stream(
+            "SELECT id FROM test WHERE id >= :id ORDER BY id", {"id": 1}, chunksize=2
+        )
+        self.assertEqual([row.id for row in rows], [1, 2, 3, 4])
+
+        # Closing the generator early gives the connection back.
+        rows = data.stream("SELECT id FROM test ORDER BY id", chunksize=2)
+        self.assertEqual(next(rows).id, 0)
+        rows.close()
+        self.assertEqual(checkedout, [])
+        session.remove()
@@ -0,0 +1,117 @@
+# vim: set fileencoding=utf-8
+import random
+import unittest
+
+from bemani.protocol.binary import (
+    BinaryDecoder,
+    BinaryEncoding,
+    BinaryEncodingException,
+    BinarySinglePassDecoder,
+)
+from bemani.protocol.node import Node
+
+
+def random_name() -> str:
+    return "".join(
+        random.choice(Node.NODE_NAME_CHARS) for _ in range(random.randint(1, 16))
+    )
+
+
+def random_node(depth: int = 0) -> Node:
+    choice = random.randint(0, 13)
+    name = random_name()
+    if choice == 0 or depth == 0:
+        node = Node.void(name)
+    elif choice == 1:
+        node = Node.u8(name, random.randint(0, 255))
+    elif choice == 2:
+        node = Node.s16(name, random.randint(-32768, 32767))
+    elif choice == 3:
+        node = Node.s32(name, random.randint(-2147483648, 2147483647))
+    elif choice == 4:
+        node = Node.u64(name, random.randint(0, 18446744073709551615))
+    elif choice == 5:
+        node = Node.string(name, random_name() * random.randint(0, 3))
+    elif choice == 6:
+        node = Node.binary(name, bytes(random.randint(0, 9)))
+    elif choice == 7:
+        node = Node.bool(name, random.choice([True, False]))
+    elif choice == 8:
+        node = Node.s8_array(
+            name, [random.randint(-128, 127) for _ in range(random.randint(0, 9))]
+        )
+    elif choice == 9:
+        node = Node.u16_array(
+            name, [random.randint(0, 65535) for _ in range(random.randint(0, 9))]
+        )
+    elif choice == 10:
+        node = Node.fouru8(name, [random.randint(0, 255) for _ in range(4)])
+    elif choice == 11:
+        node = Node.ipv4(name, "192.168.0.1")
+    elif choice == 12:
+        node = Node.float(name, 0.5)
+    else:
+        node = Node(name=name, type=Node.NODE_TYPE_2S8, value=[-1, 1])
+
+    for _ in range(random.randint(0, 2)):
+        node.set_attribute(random_name(), random_name())
+    if depth < 3:
+        for _ in range(random.randint(0, 5)):
+            node.add_child(random_node(depth + 1))
+    return node
+
+
+class TestBinarySinglePassDecoder(unittest.TestCase):
+    def assertSameTree(self, root: Node, compressed: bool) -> None:
+        data = BinaryEncoding().encode(root, encoding="utf-8", compressed=compressed)
+
+        legacy = BinaryDecoder(data[4:], "utf-8", compressed).get_tree()
+        singlepass = BinarySinglePassDecoder(data[4:], "utf-8", compressed).get_tree()
+        self.assertEqual(legacy, root)
+        self.assertEqual(singlepass, legacy)
+        self.assertEqual(str(singlepass), str(legacy))
+
+    def test_random_trees(self) -> None:
+        for _ in range(100):
+            root = random_node()
+            self.assertSameTree(root, compressed=True)
+            self.assertSameTree(root, compressed=False)
+
+    def test_packing(self) -> None:
+        # Interleave types that pack into partially filled 4 byte chunks with
+        # ones that take a whole chunk.
+        root = Node.void("root")
+        root.set_attribute("b", "attribute")
+        root.set_attribute("a", "another attribute")
+        for i in range(7):
+            root.add_child(Node.u8(f"byte{i}", i))
+            root.add_child(Node.s16(f"short{i}", -i))
+            root.add_child(Node.string(f"str{i}", "x" * i))
+            root.add_child(Node.s64(f"long{i}", i))
+        self.assertSameTree(root, compressed=True)
+
+    def test_attributes_after_children(self) -> None:
+        # Attributes after children can't be decoded in one pass, so make sure we fall back.
+        root = Node.void("root")
+        root.add_child(Node.s32("child", 5))
+        root.set_attribute("attr", "value")
+        data = BinaryEncoding().encode(root, encoding="ascii")
+
+        # Swap the attribute to after the child in the header. The root node is 5 bytes
+        # starting after the 8 bytes of magic and header length, the attribute is 5 bytes
+        # and the child including its end of node marker is 7 bytes.
+        reordered = data[:13] + data[18:25] + data[13:18] + data[25:]
+        legacy = BinaryDecoder(reordered[4:], "ascii", True).get_tree()
+        self.assertEqual(legacy, root)
+        self.assertEqual(
+            legacy, BinarySinglePassDecoder(reordered[4:], "ascii", True).get_tree()
+        )
+
+    def test_truncated(self) -> None:
+        root = Node.void("root")
+        root.add_child(Node.string("child", "a string value"))
+        data = BinaryEncoding().encode(root, encoding="ascii")
+
+        with self.assertRaises(BinaryEncodingException):
+            BinarySinglePassDecoder(data[4:-8], "ascii", True).get_tree()
+        self.assertIsNone(BinaryEncoding().decode(data[:-8], skip_on_exceptions=True))
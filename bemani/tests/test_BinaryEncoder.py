@@ -0,0 +1,83 @@
+# vim: set fileencoding=utf-8
+import unittest
+
+from bemani.protocol.binary import (
+    BinaryEncoder,
+    BinaryEncoding,
+    BinaryEncodingException,
+    BinarySinglePassEncoder,
+)
+from bemani.protocol.node import Node
+from bemani.protocol.xml import XmlEncoding
+from bemani.tests.test_BinaryDecoder import random_node
+
+
+class TestBinarySinglePassEncoder(unittest.TestCase):
+    def assertSameData(self, root: Node, compressed: bool) -> None:
+        legacy = BinaryEncoder(root, "utf-8", compressed).get_data()
+        singlepass = BinarySinglePassEncoder(root, "utf-8", compressed).get_data()
+        self.assertEqual(singlepass, legacy)
+
+    def test_random_trees(self) -> None:
+        for _ in range(100):
+            root = random_node()
+            self.assertSameData(root, compressed=True)
+            self.assertSameData(root, compressed=False)
+
+    def test_packing(self) -> None:
+        # Interleave types that pack into partially filled 4 byte chunks with
+        # ones that take a whole chunk, and make sure bytes and shorts go back
+        # and fill in the holes.
+        root = Node.void("root")
+        root.set_attribute("b", "attribute")
+        root.set_attribute("a", "another attribute")
+        for i in range(7):
+            root.add_child(Node.u8(f"byte{i}", i))
+            root.add_child(Node.s16(f"short{i}", -i))
+            root.add_child(Node.string(f"str{i}", "x" * i))
+            root.add_child(Node.s64(f"long{i}", i))
+            root.add_child(Node.u8_array(f"array{i}", list(range(i))))
+            root.add_child(Node.bool_array(f"bools{i}", [True] * i))
+        self.assertSameData(root, compressed=True)
+        self.assertSameData(root, compressed=False)
+
+        data = BinaryEncoding().encode(root, encoding="utf-8")
+        self.assertEqual(BinaryEncoding().decode(data), root)
+
+    def test_long_names(self) -> None:
+        root = Node.void("a" * (BinaryEncoding.NAME_MAX_COMPRESSED + 1))
+        with self.assertRaises(BinaryEncodingException):
+            BinarySinglePassEncoder(root, "utf-8").get_data()
+
+        # Long names are fine when names aren't packed.
+        self.assertSameData(root, compressed=False)
+
+    def test_invalid_values(self) -> None:
+        root = Node.void("root")
+        root.add_child(Node.string("str", "☃"))
+        with self.assertRaises(BinaryEncodingException):
+            BinarySinglePassEncoder(root, "ascii").get_data()
+
+        root = Node.void("root")
+        root.add_child(Node(name="u8", type=Node.NODE_TYPE_U8, value=256))
+        with self.assertRaises(BinaryEncodingException):
+            BinarySinglePassEncoder(root, "ascii").get_data()
+
+        root = Node.void("root")
+        root.add_child(Node(name="str", type=Node.NODE_TYPE_STR))
+        with self.assertRaises(BinaryEncodingException):
+            BinarySinglePassEncoder(root, "ascii").get_data()
+
+    def test_leaves_stay_unallocated(self) -> None:
+        root = Node.void("root")
+        root.set_attribute("status", "0")
+        leaf = Node.s32("leaf", 1)
+        root.add_child(leaf)
+
+        # Nodes only get a list of children or a dictionary of attributes once something
+        # is added to them, and encoding shouldn't undo that for every leaf.
+        BinaryEncoding().encode(root, "utf-8")
+        BinaryEncoder(root, "utf-8", True).get_data()
+        XmlEncoding().encode(root, "utf-8")
+        self.assertIsNone(getattr(leaf, "_Node__children"))
+        self.assertIsNone(getattr(leaf, "_Node__attrs"))
@@ -0,0 +1,77 @@
+# vim: set fileencoding=utf-8
+import unittest
+
+from sqlalchemy import create_engine
+
+from bemani.data import Config
+
+
+class TestConfig(unittest.TestCase):
+    def make_config(self) -> Config:
+        return Config(
+            {
+                "database": {
+                    "engine": create_engine("sqlite://"),
+                    "pooled": True,
+                },
+                "server": {"uri": "https://example.com"},
+                "paseli": {"enabled": True, "infinite": False},
+                "verbose": False,
+            }
+        )
+
+    def test_overlay_reads(self) -> None:
+        config = self.make_config()
+        overlay = config.overlay()
+
+        self.assertEqual(overlay.server.uri, "https://example.com")
+        self.assertTrue(overlay.paseli.enabled)
+        self.assertTrue(overlay.database.pooled)
+        self.assertIs(overlay.database.engine, config.database.engine)
+
+        # Reading through the properties shouldn't copy anything.
+        self.assertIs(dict.get(overlay, "paseli"), dict.get(config, "paseli"))
+
+    def test_overlay_writes(self) -> None:
+        config = self.make_config()
+        overlay = config.overlay()
+        overlay["client"] = {"address": "127.0.0.1"}
+        overlay["paseli"]["enabled"] = False
+        overlay["server"]["uri"] = None
+        overlay["verbose"] = True
+
+        self.assertFalse(overlay.paseli.enabled)
+        self.assertIsNone(overlay.server.uri)
+        self.assertEqual(overlay.client.address, "127.0.0.1")
+        self.assertTrue(overlay["verbose"])
+
+        # The original should be untouched.
+        self.assertTrue(config.paseli.enabled)
+        self.assertEqual(config.server.uri, "https://example.com")
+        self.assertNotIn("client", config)
+        self.assertFalse(config["verbose"])
+
+        # Copying the database section should keep the engine shared.
+        overlay["database"]["read_only"] = True
+        self.assertTrue(overlay.database.read_only)
+        self.assertFalse(config.database.read_only)
+        self.assertIs(overlay.database.engine, config.database.engine)
+
+    def test_nested_overlay(self) -> None:
+        config = self.make_config()
+        overlay = config.overlay()
+        overlay["paseli"]["enabled"] = False
+        nested = overlay.overlay()
+        nested["paseli"]["infinite"] = True
+
+        self.assertTrue(config.paseli.enabled)
+        self.assertFalse(config.paseli.infinite)
+        self.assertFalse(overlay.paseli.enabled)
+        self.assertFalse(overlay.paseli.infinite)
+        self.assertFalse(nested.paseli.enabled)
+        self.assertTrue(nested.paseli.infinite)
+
+        # Cloning an overlay still works.
+        clone = nested.clone()
+        self.assertTrue(clone.paseli.infinite)
+        self.assertIs(clone.database.engine, config.database.engine)
@@ -0,0 +1,149 @@
+# vim: set fileencoding=utf-8
+import unittest
+from typing import Any, Dict, Iterator, Optional, Tuple
+from unittest.mock import Mock
+
+from bemani.common import GameConstants, Time
+from bemani.data import Attempt, Score, UserID
+from bemani.frontend.base import FrontendBase
+
+
+class FakeCache:
+    def __init__(self) -> None:
+        self.values: Dict[str, Any] = {}
+
+    def get(self, key: str) -> Any:
+        return self.values.get(key)
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> None:
+        self.values[key] = value
+
+    def has(self, key: str) -> bool:
+        return key in self.values
+
+
+class FakeFrontend(FrontendBase):
+    game = GameConstants.IIDX
+    valid_charts = [0, 1]
+
+    def all_games(self) -> Iterator[Tuple[GameConstants, int, str]]:
+        yield (GameConstants.IIDX, 26, "IIDX 26")
+
+    def get_duplicate_id(self, musicid: int, chart: int) -> Optional[Tuple[int, int]]:
+        if musicid == 1000:
+            return (2000, chart)
+        return None
+
+
+class TestFrontendBase(unittest.TestCase):
+    def make_frontend(self) -> Tuple[FakeFrontend, Mock, FakeCache]:
+        data = Mock()
+        data.local.user.get_all_game_profiles.return_value = []
+        data.local.game.get_all_settings.return_value = []
+        cache = FakeCache()
+        return FakeFrontend(data, Mock(), cache), data, cache  # type: ignore
+
+    def test_network_snapshot(self) -> None:
+        frontend, data, cache = self.make_frontend()
+        now = Time.now()
+
+        # Without a snapshot, everything comes from the DB.
+        data.local.music.get_all_records.return_value = [
+            (UserID(1), Score(1, 1000, 0, 500, now - 10, now - 10, 0, 3, {})),
+        ]
+        data.local.music.get_all_attempts.return_value = [
+            (UserID(1), Attempt(10, 1000, 0, 500, now - 10, 0, True, {})),
+            (UserID(2), Attempt(11, 1000, 0, 400, now - 20, 0, True, {})),
+            (None, Attempt(12, 1000, 0, 300, now - 30, 0, False, {})),
+            (UserID(1), Attempt(15, 1000, 1, 200, now + 5, 0, True, {})),
+        ]
+        records = frontend.get_network_records()
+        self.assertEqual(
+            [(r["songid"], r["points"], r["plays"]) for r in records["records"]],
+            [(1000, 500, 3), (2000, 500, 3)],
+        )
+        self.assertEqual(data.local.music.get_all_records.call_count, 1)
+
+        # Build the snapshot, after which pages are served from it.
+        frontend.refresh_network_snapshot()
+        data.local.music.get_all_records.reset_mock()
+        data.local.music.get_all_attempts.reset_mock()
+        self.assertEqual(frontend.get_network_records()["records"], records["records"])
+        scores = frontend.get_network_scores()
+        self.assertEqual([a["points"] for a in scores["attempts"]], [200, 500, 400])
+        self.assertEqual(
+            [a["points"] for a in frontend.get_network_scores(limit=1)["attempts"]],
+            [200],
+        )
+        data.local.music.get_all_records.assert_not_called()
+        data.local.music.get_all_attempts.assert_not_called()
+
+        # A new record and an attempt that didn't beat it are folded in.
+        data.local.music.get_all_attempts.return_value = [
+            (UserID(2), Attempt(13, 1000, 0, 600, now, 0, True, {})),
+            (UserID(3), Attempt(14, 1000, 0, 100, now, 0, False, {})),
+            # Already in the snapshot, so this shouldn't be counted twice.
+            (UserID(1), Attempt(15, 1000, 1, 200, now + 5, 0, True, {})),
+        ]
+        data.local.music.get_all_scores.return_value = [
+            (UserID(2), Score(2, 1000, 0, 600, now, now, 0, 2, {})),
+            (UserID(3), Score(3, 1000, 0, 100, now, now, 0, 1, {})),
+        ]
+        frontend.refresh_network_snapshot()
+        data.local.music.get_all_records.assert_not_called()
+        self.assertEqual(
+            data.local.music.get_all_scores.call_args[1]["since"],
+            data.local.music.get_all_attempts.call_args[1]["timelimit"],
+        )
+
+        records = frontend.get_network_records()
+        self.assertEqual(
+            [
+                (r["userid"], r["songid"], r["points"], r["plays"])
+                for r in records["records"]
+            ],
+            [("2", 1000, 600, 5), ("2", 2000, 600, 5)],
+        )
+        self.assertEqual(
+            [a["points"] for a in frontend.get_network_scores()["attempts"]],
+            [200, 600, 100, 500, 400],
+        )
+
+    def test_top_scores_snapshot(self) -> None:
+        frontend, data, cache = self.make_frontend()
+        now = Time.now()
+        data.local.music.get_all_records.return_value = []
+        data.local.music.get_all_attempts.return_value = []
+        data.local.music.get_all_scores.return_value = [
+            (UserID(1), Score(1, 1000, 0, 500, now, now, 0, 1, {})),
+        ]
+
+        # Nothing is cached until the scheduler is keeping the snapshot fresh.
+        frontend.get_top_scores(1000)
+        self.assertEqual(data.local.music.get_all_scores.call_count, 1)
+        frontend.get_top_scores(1000)
+        self.assertEqual(data.local.music.get_all_scores.call_count, 2)
+
+        frontend.refresh_network_snapshot()
+        frontend.get_top_scores(1000)
+        topscores = frontend.get_top_scores(1000)
+        self.assertEqual(data.local.music.get_all_scores.call_count, 3)
+        self.assertEqual([s["points"] for s in topscores["topscores"]], [500])
+
+        # Playing the song refreshes its cached top scores, and those of its duplicate.
+        data.local.music.get_all_attempts.return_value = [
+            (UserID(1), Attempt(10, 1000, 0, 700, now, 0, True, {})),
+        ]
+        data.local.music.get_all_scores.return_value = [
+            (UserID(1), Score(1, 1000, 0, 700, now, now, 0, 2, {})),
+        ]
+        frontend.refresh_network_snapshot()
+        topscores = frontend.get_top_scores(1000)
+        self.assertEqual([s["points"] for s in topscores["topscores"]], [700])
+        self.assertEqual(
+            [
+                call[1].get("songid")
+                for call in data.local.music.get_all_scores.call_args_list[3:]
+            ],
+            [None, 1000],
+        )
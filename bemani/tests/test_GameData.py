@@ -3,6 +3,7 @@ import unittest
 from unittest.mock import Mock
 
 from bemani.common import GameConstants
+from bemani.data import UserID
 from bemani.data.mysql.game import GameData
 from bemani.tests.helpers import FakeCursor
 
@@ -55,3 +56,25 @@ class TestGameData(unittest.TestCase):
             "This event overlaps an existing one with start time 12345 and end time 12350"
             in str(context.exception)
         )
+
+    def test_get_all_settings(self) -> None:
+        game = GameData(Mock(), None)
+        game.execute = Mock(  # type: ignore
+            return_value=FakeCursor(
+                [
+                    {"userid": 1, "data": '{"total_plays": 5}'},
+                    {"userid": 2, "data": '{"total_plays": 7}'},
+                ]
+            )
+        )
+        settings = game.get_all_settings(GameConstants.IIDX, [UserID(1), UserID(2)])
+        self.assertEqual(
+            [(userid, stats.get_int("total_plays")) for userid, stats in settings],
+            [(1, 5), (2, 7)],
+        )
+        self.assertIn("userid IN :userids", game.execute.call_args[0][0])
+
+        # Nobody to look up means no query at all.
+        game.execute.reset_mock()
+        self.assertEqual(game.get_all_settings(GameConstants.IIDX, []), [])
+        self.assertEqual(game.execute.call_count, 0)
@@ -0,0 +1,160 @@
+# vim: set fileencoding=utf-8
+import unittest
+from typing import Any, List
+from unittest.mock import Mock, patch
+
+from bemani.common import DBConstants, GameConstants, VersionConstants
+from bemani.data import Config, Score, Server, UserID
+from bemani.data.api.client import APIClient, APIException
+from bemani.data.api.music import GlobalMusicData
+from bemani.data.remoteuser import RemoteUser
+
+
+class TestGlobalMusicData(unittest.TestCase):
+    def make_music(self, servers: List[Server]) -> Any:
+        api = Mock()
+        api.get_all_servers = Mock(return_value=servers)
+        return GlobalMusicData(Config(), api, Mock(), Mock())
+
+    def make_score(self, songid: int, points: int) -> Score:
+        return Score(
+            -1,
+            songid,
+            0,
+            points,
+            1234,
+            1234,
+            -1,
+            1,
+            {"clear_status": DBConstants.IIDX_CLEAR_STATUS_CLEAR},
+        )
+
+    def test_no_servers(self) -> None:
+        music = self.make_music([])
+        local = [(UserID(1), self.make_score(1000, 500))]
+        music.music.get_all_records = Mock(return_value=local)
+
+        self.assertEqual(
+            music.get_all_records(GameConstants.IIDX, VersionConstants.IIDX_ROOTAGE),
+            local,
+        )
+        music.music.get_remote_scores.assert_not_called()
+
+    def test_get_all_records(self) -> None:
+        music = self.make_music([Server(1, 0, "http://remote", "token", True, True)])
+        music.music.get_all_records = Mock(
+            return_value=[
+                (UserID(1), self.make_score(1000, 500)),
+                (UserID(1), self.make_score(1001, 500)),
+            ]
+        )
+        music.music.get_remote_scores = Mock(
+            return_value=[
+                ("E004000000000001", self.make_score(1000, 600)),
+                ("E004000000000002", self.make_score(1001, 400)),
+                ("E004000000000003", self.make_score(1002, 300)),
+            ]
+        )
+        music.music.get_remote_card_owners = Mock(
+            return_value={"E004000000000003": UserID(2)}
+        )
+
+        records = music.get_all_records(
+            GameConstants.IIDX, VersionConstants.IIDX_ROOTAGE
+        )
+        self.assertEqual(
+            sorted((score.id, userid, score.points) for userid, score in records),
+            [
+                (1000, RemoteUser.card_to_userid("E004000000000001"), 600),
+                (1001, UserID(1), 500),
+                (1002, UserID(2), 300),
+            ],
+        )
+
+    def test_sync_records(self) -> None:
+        music = self.make_music(
+            [
+                Server(1, 0, "http://remote", "token", True, True),
+                Server(2, 0, "http://noscores", "token", True, False),
+            ]
+        )
+        music.music.get_remote_sync = Mock(return_value=1000)
+        music.music.put_remote_scores = Mock(return_value=1)
+
+        with patch.object(
+            APIClient,
+            "sync_records",
+            return_value=[
+                {
+                    "cards": ["e004000000000001"],
+                    "song": "1000",
+                    "chart": "2",
+                    "points": 800,
+                    "status": "hc",
+                    "timestamp": 1234,
+                },
+                {"cards": [], "song": "1001", "chart": "2", "points": 800},
+            ],
+        ) as sync_records:
+            with patch("bemani.data.api.music.Time.now", return_value=2000):
+                self.assertEqual(
+                    music.sync_records(
+                        GameConstants.IIDX, VersionConstants.IIDX_ROOTAGE
+                    ),
+                    1,
+                )
+        sync_records.assert_called_once_with(
+            GameConstants.IIDX, VersionConstants.IIDX_ROOTAGE, 1000, 2000
+        )
+
+        serverid, _, _, scores = music.music.put_remote_scores.call_args[0]
+        self.assertEqual(serverid, 1)
+        self.assertEqual(len(scores), 1)
+        cards, score = scores[0]
+        self.assertEqual(cards, ["e004000000000001"])
+        self.assertEqual((score.id, score.chart, score.points), (1000, 2, 800))
+        self.assertEqual(
+            score.data["clear_status"], DBConstants.IIDX_CLEAR_STATUS_HARD_CLEAR
+        )
+        # The next sync goes back a little, in case the remote server's clock is behind ours.
+        music.music.put_remote_sync.assert_called_once_with(
+            1,
+            GameConstants.IIDX,
+            VersionConstants.IIDX_ROOTAGE,
+            "records",
+            2000 - GlobalMusicData.SYNC_OVERLAP,
+        )
+
+    def test_sync_failure(self) -> None:
+        music = self.make_music([Server(1, 0, "http://remote", "token", True, True)])
+        music.music.get_remote_sync = Mock(return_value=None)
+
+        with patch.object(APIClient, "sync_records", side_effect=APIException()):
+            self.assertEqual(
+                music.sync_records(GameConstants.IIDX, VersionConstants.IIDX_ROOTAGE),
+                0,
+            )
+
+        # We should pick up where we left off next time.
+        music.music.put_remote_scores.assert_not_called()
+        music.music.put_remote_sync.assert_not_called()
+
+    def test_sync_statistics(self) -> None:
+        music = self.make_music([Server(1, 0, "http://remote", "token", True, True)])
+        music.music.put_remote_statistics = Mock(return_value=1)
+
+        with patch.object(
+            APIClient,
+            "sync_statistics",
+            return_value=[
+                {"song": "1000", "chart": "0", "plays": 5, "clears": 3, "combos": -1},
+                {"song": "1000", "chart": "0", "plays": 2, "clears": 1, "combos": 1},
+                {"song": "1001", "plays": 2},
+            ],
+        ):
+            music.sync_statistics(GameConstants.IIDX, VersionConstants.IIDX_ROOTAGE)
+
+        _, _, _, statistics = music.music.put_remote_statistics.call_args[0]
+        self.assertEqual(
+            statistics, {1000: {0: {"plays": 7, "clears": 4, "combos": 1}}}
+        )
@@ -0,0 +1,138 @@
+# vim: set fileencoding=utf-8
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+
+from bemani.frontend import jsx
+from bemani.frontend.jsx import Manifest, build, minify
+
+
+class TestJSX(unittest.TestCase):
+    def test_minify_whitespace(self) -> None:
+        self.assertEqual(
+            minify("function  foo ( a,  b ) {\n\n    return a  +  b;\n}\n"),
+            "function foo(a,b){\nreturn a+b;\n}\n",
+        )
+        # Operators that would merge into a different operator keep their space.
+        self.assertEqual(minify("a + +b;\nc - -d;"), "a+ +b;\nc- -d;\n")
+        self.assertEqual(minify("1 .toString()"), "1 .toString()\n")
+
+    def test_minify_comments(self) -> None:
+        self.assertEqual(
+            minify("// header\nvar a = 1; // trailing\nvar b /* inline */ = 2;"),
+            "var a=1;\nvar b=2;\n",
+        )
+        # A comment spanning lines still separates statements for semicolon insertion.
+        self.assertEqual(minify("a = 1 /* one\ntwo */ b = 2"), "a=1\nb=2\n")
+
+    def test_minify_literals(self) -> None:
+        self.assertEqual(
+            minify("var a = 'it\\'s  // not a comment';"),
+            "var a='it\\'s  // not a comment';\n",
+        )
+        self.assertEqual(
+            minify('var b = "/* still   a string */";'),
+            'var b="/* still   a string */";\n',
+        )
+        self.assertEqual(
+            minify("var c = `a  ${ { x: '`' }.x }  b`;"),
+            "var c=`a  ${ { x: '`' }.x }  b`;\n",
+        )
+
+    def test_minify_regex(self) -> None:
+        self.assertEqual(
+            minify("var r = /[/]  \\/ x/g; // y"),
+            "var r=/[/]  \\/ x/g;\n",
+        )
+        self.assertEqual(
+            minify("return  /a  b/.test(s);"),
+            "return/a  b/.test(s);\n",
+        )
+        # Division is not a regex, so the second slash doesn't start a comment.
+        self.assertEqual(minify("x = a / b  /  c;"), "x=a/b/c;\n")
+
+    def test_build(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            basedir = os.path.join(tmpdir, "static")
+            outdir = os.path.join(tmpdir, "build")
+            os.makedirs(os.path.join(basedir, "controllers"))
+            with open(os.path.join(basedir, "controllers", "a.react.js"), "w") as f:
+                f.write("var a = <>A</>;")
+            with open(os.path.join(basedir, "b.react.js"), "w") as f:
+                f.write("var b = <div>B</div>;")
+            with open(os.path.join(basedir, "c.js"), "w") as f:
+                f.write("var c = 3;")
+
+            transformer = Mock()
+            transformer.transform_string = Mock(
+                side_effect=lambda js: f"/* built */ {js}"
+            )
+            with patch.object(jsx, "JSXTransformer", Mock(return_value=transformer)):
+                with patch.object(jsx, "_transformer", None):
+                    built = build(outdir, basedir=basedir, processes=1)
+
+                    self.assertEqual(
+                        sorted(built.keys()), ["b.react.js", "controllers/a.react.js"]
+                    )
+                    output = built["controllers/a.react.js"]
+                    self.assertRegex(
+                        output, r"^controllers/a\.react\.[0-9a-f]{16}\.js$"
+                    )
+                    with open(os.path.join(outdir, output)) as f:
+                        self.assertEqual(
+                            f.read(), "var a=<React.Fragment>A</React.Fragment>;\n"
+                        )
+                    with open(os.path.join(outdir, "manifest.json")) as f:
+                        manifest = json.load(f)
+                    self.assertEqual(manifest["version"], jsx.BUILD_VERSION)
+                    self.assertEqual(
+                        manifest["files"]["controllers/a.react.js"]["output"], output
+                    )
+
+                    # Nothing changed, so nothing should be transformed again.
+                    transformer.transform_string.reset_mock()
+                    self.assertEqual(build(outdir, basedir=basedir, processes=1), built)
+                    transformer.transform_string.assert_not_called()
+
+                    # Only the changed file gets rebuilt, under a new name.
+                    with open(os.path.join(basedir, "b.react.js"), "w") as f:
+                        f.write("var b = <span>B</span>;")
+                    rebuilt = build(outdir, basedir=basedir, processes=1)
+                    self.assertEqual(transformer.transform_string.call_count, 1)
+                    self.assertEqual(
+                        rebuilt["controllers/a.react.js"],
+                        built["controllers/a.react.js"],
+                    )
+                    self.assertNotEqual(rebuilt["b.react.js"], built["b.react.js"])
+
+    def test_manifest(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest = Manifest(tmpdir)
+            self.assertEqual(manifest.output("a.react.js"), None)
+
+            with open(os.path.join(tmpdir, "manifest.json"), "w") as f:
+                json.dump(
+                    {
+                        "version": jsx.BUILD_VERSION,
+                        "files": {
+                            "a.react.js": {
+                                "source": "abc",
+                                "output": "a.react.0123456789abcdef.js",
+                            },
+                        },
+                    },
+                    f,
+                )
+            self.assertEqual(
+                manifest.output("a.react.js"), "a.react.0123456789abcdef.js"
+            )
+            self.assertTrue(manifest.is_output("a.react.0123456789abcdef.js"))
+            self.assertFalse(manifest.is_output("a.react.js"))
+
+            # Manifests from an older build are ignored, so that everything is rebuilt.
+            with open(os.path.join(tmpdir, "manifest.json"), "w") as f:
+                json.dump({"version": "0", "files": {}}, f)
+            os.utime(os.path.join(tmpdir, "manifest.json"), (0, 0))
+            self.assertEqual(Manifest(tmpdir).output("a.react.js"), None)
@@ -0,0 +1,137 @@
+# vim: set fileencoding=utf-8
+import tempfile
+import unittest
+from typing import Any, Dict, List
+from unittest.mock import Mock
+from freezegun import freeze_time
+
+from bemani.common import GameConstants
+from bemani.data import Config, Machine, UserID, ArcadeID
+from bemani.data.mysql.machine import MachineData
+from bemani.tests.helpers import FakeCursor
+
+
+def machine_row() -> Dict[str, Any]:
+    return {
+        "id": 1,
+        "name": "machine",
+        "description": "",
+        "arcadeid": 5,
+        "port": 10000,
+        "game": "iidx",
+        "version": 26,
+        "data": '{"key": ["__bytes__", 1, 2]}',
+    }
+
+
+def arcade_rows() -> List[List[Dict[str, Any]]]:
+    return [
+        [
+            {
+                "name": "arcade",
+                "description": "",
+                "pin": "12345678",
+                "pref": 1,
+                "area": None,
+                "data": '{"paseli_enabled": true}',
+            }
+        ],
+        [{"userid": 3}],
+    ]
+
+
+class TestMachineData(unittest.TestCase):
+    def make_machine_data(self, name: str, **settings: Any) -> MachineData:
+        config = Config(
+            {
+                "database": {"database": name, **settings},
+                "cache_dir": tempfile.mkdtemp(),
+            }
+        )
+        return MachineData(config, Mock())
+
+    def test_uncached(self) -> None:
+        machine = self.make_machine_data("uncached")
+        machine.execute = Mock(return_value=FakeCursor([machine_row()]))  # type: ignore
+        machine.get_machine("pcbid")
+        machine.get_machine("pcbid")
+        self.assertEqual(machine.execute.call_count, 2)
+
+    def test_get_machine(self) -> None:
+        machine = self.make_machine_data("machine", machine_cache_ttl=60)
+        machine.execute = Mock(return_value=FakeCursor([machine_row()]))  # type: ignore
+
+        with freeze_time("2016-01-01 12:00"):
+            pcb = machine.get_machine("pcbid")
+            self.assertEqual(machine.execute.call_count, 1)
+
+            cached = machine.get_machine("pcbid")
+            self.assertEqual(machine.execute.call_count, 1)
+            if cached is None:
+                raise Exception("Expected a cached machine!")
+            self.assertIsNot(cached, pcb)
+            self.assertEqual(repr(cached), repr(pcb))
+            self.assertEqual(cached.game, GameConstants.IIDX)
+            self.assertEqual(cached.data.get_bytes("key"), b"\x01\x02")
+
+            # Other data objects in the same process should share the cache.
+            other = self.make_machine_data("machine", machine_cache_ttl=60)
+            other.execute = Mock(return_value=FakeCursor([]))  # type: ignore
+            self.assertIsNotNone(other.get_machine("pcbid"))
+            self.assertEqual(other.execute.call_count, 0)
+
+            # Writes should invalidate the cached lookup.
+            machine.put_machine(
+                Machine(1, "pcbid", "new", "", None, 10000, None, None, {})
+            )
+            machine.get_machine("pcbid")
+            self.assertEqual(machine.execute.call_count, 3)
+
+        with freeze_time("2016-01-01 12:02"):
+            # The entry should have expired.
+            machine.get_machine("pcbid")
+            self.assertEqual(machine.execute.call_count, 4)
+
+    def test_missing_machine(self) -> None:
+        machine = self.make_machine_data("missing", machine_cache_ttl=60)
+        machine.execute = Mock(return_value=FakeCursor([]))  # type: ignore
+        self.assertIsNone(machine.get_machine("pcbid"))
+        self.assertIsNone(machine.get_machine("pcbid"))
+        self.assertEqual(machine.execute.call_count, 1)
+
+        machine.destroy_machine("pcbid")
+        self.assertIsNone(machine.get_machine("pcbid"))
+        self.assertEqual(machine.execute.call_count, 3)
+
+    def test_get_arcade(self) -> None:
+        machine = self.make_machine_data("arcade", machine_cache_ttl=60)
+        machine.execute = Mock(side_effect=[FakeCursor(rows) for rows in arcade_rows()])  # type: ignore
+
+        arcade = machine.get_arcade(ArcadeID(5))
+        cached = machine.get_arcade(ArcadeID(5))
+        self.assertEqual(machine.execute.call_count, 2)
+        self.assertIsNotNone(arcade)
+        if cached is None:
+            raise Exception("Expected a cached arcade!")
+        self.assertEqual(cached.owners, [UserID(3)])
+        self.assertTrue(cached.data.get_bool("paseli_enabled"))
+
+        # Modifying what we got back shouldn't affect the cache.
+        cached.data.replace_bool("paseli_enabled", False)
+        self.assertTrue(machine.get_arcade(ArcadeID(5)).data.get_bool("paseli_enabled"))
+
+        machine.execute = Mock(return_value=FakeCursor([]))  # type: ignore
+        machine.put_arcade(cached)
+        self.assertIsNone(machine.get_arcade(ArcadeID(5)))
+
+    def test_shared_cache(self) -> None:
+        config: Dict[str, Any] = {"machine_cache_ttl": 60, "machine_cache_shared": True}
+        machine = self.make_machine_data("shared", **config)
+        machine.execute = Mock(return_value=FakeCursor([machine_row()]))  # type: ignore
+        machine.get_machine("pcbid")
+        machine.get_machine("pcbid")
+        self.assertEqual(machine.execute.call_count, 1)
+
+        machine.destroy_machine("pcbid")
+        machine.get_machine("pcbid")
+        self.assertEqual(machine.execute.call_count, 3)
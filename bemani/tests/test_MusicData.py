@@ -0,0 +1,485 @@
+# vim: set fileencoding=utf-8
+import unittest
+from unittest.mock import Mock
+
+from bemani.backend.iidx import IIDXBase
+from bemani.common import GameConstants, ValidatedDict
+from bemani.data import Score, UserID
+from bemani.data.mysql.music import MusicData
+from bemani.tests.helpers import FakeCursor
+
+
+class TestMusicData(unittest.TestCase):
+    def test_put_attempt_counters(self) -> None:
+        music = MusicData(Mock(), None)
+        music.execute = Mock(  # type: ignore
+            side_effect=[FakeCursor([{"id": 5}]), FakeCursor([]), FakeCursor([])]
+        )
+        music.put_attempt(
+            GameConstants.IIDX,
+            26,
+            UserID(1),
+            1000,
+            2,
+            1,
+            500,
+            {},
+            False,
+            counters={"total": 1, "clears": 1},
+        )
+
+        # Should look up the music ID, insert the history and then bump both counters.
+        self.assertEqual(music.execute.call_count, 3)
+        sql, params = music.execute.call_args[0]
+        self.assertIn("ON DUPLICATE KEY UPDATE value = value + VALUES(value)", sql)
+        self.assertEqual(
+            params,
+            {
+                "musicid0": 5,
+                "name0": "total",
+                "value0": 1,
+                "musicid1": 5,
+                "name1": "clears",
+                "value1": 1,
+            },
+        )
+
+        # No counters means no extra query.
+        music.execute = Mock(side_effect=[FakeCursor([{"id": 5}]), FakeCursor([])])  # type: ignore
+        music.put_attempt(GameConstants.IIDX, 26, None, 1000, 2, 1, 500, {}, False)
+        self.assertEqual(music.execute.call_count, 2)
+
+    def test_get_clear_rates(self) -> None:
+        music = MusicData(Mock(), None)
+        music.execute = Mock(  # type: ignore
+            return_value=FakeCursor(
+                [
+                    {"songid": 1000, "chart": 0, "name": "total", "value": 10},
+                    {"songid": 1000, "chart": 0, "name": "clears", "value": 4},
+                    {"songid": 1000, "chart": 1, "name": "total", "value": 3},
+                    {"songid": 1001, "chart": 0, "name": "total", "value": 1},
+                ]
+            )
+        )
+        self.assertEqual(
+            music.get_clear_rates(GameConstants.IIDX, 26),
+            {
+                1000: {0: {"total": 10, "clears": 4}, 1: {"total": 3}},
+                1001: {0: {"total": 1}},
+            },
+        )
+
+    def test_rebuild_attempt_counters(self) -> None:
+        music = MusicData(Mock(), None)
+        music.execute = Mock(  # type: ignore
+            side_effect=[
+                # Deleting old counters.
+                FakeCursor([]),
+                # Two chunks of attempts, then the end.
+                FakeCursor(
+                    [
+                        {
+                            "id": 1,
+                            "musicid": 5,
+                            "points": 10,
+                            "data": '{"clear_status": 100}',
+                        },
+                        {
+                            "id": 2,
+                            "musicid": 5,
+                            "points": 10,
+                            "data": '{"clear_status": 700}',
+                        },
+                    ]
+                ),
+                FakeCursor(
+                    [
+                        {
+                            "id": 3,
+                            "musicid": 6,
+                            "points": 10,
+                            "data": '{"clear_status": 50}',
+                        },
+                        {
+                            "id": 4,
+                            "musicid": 5,
+                            "points": 10,
+                            "data": '{"clear_status": 400}',
+                        },
+                    ]
+                ),
+                FakeCursor([]),
+                # No archived attempts.
+                FakeCursor([]),
+                # Writing the new counters.
+                FakeCursor([]),
+            ]
+        )
+        self.assertEqual(
+            music.rebuild_attempt_counters(
+                GameConstants.IIDX, IIDXBase.attempt_counters
+            ),
+            4,
+        )
+
+        # Attempts should be fetched after the last ID seen in the previous chunk.
+        self.assertEqual(music.execute.call_args_list[2][0][1]["lastid"], 2)
+        self.assertEqual(music.execute.call_args_list[3][0][1]["lastid"], 4)
+
+        # The song with only a no-play attempt shouldn't get any counters.
+        _, params = music.execute.call_args[0]
+        counters = {
+            params[f"name{i}"]: params[f"value{i}"] for i in range(len(params) // 3)
+        }
+        self.assertEqual(counters, {"total": 3, "clears": 2, "fcs": 1})
+        self.assertEqual(
+            {params[f"musicid{i}"] for i in range(len(params) // 3)},
+            {5},
+        )
+
+    def test_archive_attempts(self) -> None:
+        music = MusicData(Mock(), None)
+        music.execute = Mock(  # type: ignore
+            side_effect=[
+                # A chunk of old attempts, the first of which an interrupted run archived.
+                FakeCursor(
+                    [
+                        {
+                            "id": 1,
+                            "userid": 1,
+                            "musicid": 5,
+                            "points": 100,
+                            "timestamp": 1000,
+                            "new_record": 1,
+                        },
+                        {
+                            "id": 2,
+                            "userid": 1,
+                            "musicid": 5,
+                            "points": 200,
+                            "timestamp": 1100,
+                            "new_record": 1,
+                        },
+                        {
+                            "id": 3,
+                            "userid": 2,
+                            "musicid": 6,
+                            "points": 50,
+                            "timestamp": 1200,
+                            "new_record": 0,
+                        },
+                    ]
+                ),
+                FakeCursor([{"id": 1}]),
+                # Copying to the archive.
+                FakeCursor([]),
+                # The summary that the interrupted run wrote.
+                FakeCursor(
+                    [
+                        {
+                            "userid": 1,
+                            "musicid": 5,
+                            "plays": 4,
+                            "new_records": 2,
+                            "best_points": 150,
+                            "first_timestamp": 500,
+                            "last_timestamp": 1000,
+                            "lastid": 1,
+                        },
+                    ]
+                ),
+                # Writing summaries, then deleting the originals.
+                FakeCursor([]),
+                FakeCursor([]),
+                # Nothing else to archive.
+                FakeCursor([]),
+            ]
+        )
+        self.assertEqual(music.archive_attempts(1500, chunksize=3), 3)
+        self.assertEqual(music.execute.call_count, 7)
+
+        # The attempt that was already counted shouldn't be counted again.
+        _, params = music.execute.call_args_list[4][0]
+        summaries = {
+            (params[f"userid{i}"], params[f"musicid{i}"]): {
+                name: params[f"{name}{i}"]
+                for name in [
+                    "plays",
+                    "new_records",
+                    "best_points",
+                    "first_timestamp",
+                    "last_timestamp",
+                    "lastid",
+                ]
+            }
+            for i in range(len(params) // 8)
+        }
+        self.assertEqual(
+            summaries,
+            {
+                (1, 5): {
+                    "plays": 5,
+                    "new_records": 3,
+                    "best_points": 200,
+                    "first_timestamp": 500,
+                    "last_timestamp": 1100,
+                    "lastid": 2,
+                },
+                (2, 6): {
+                    "plays": 1,
+                    "new_records": 0,
+                    "best_points": 50,
+                    "first_timestamp": 1200,
+                    "last_timestamp": 1200,
+                    "lastid": 3,
+                },
+            },
+        )
+        sql, params = music.execute.call_args_list[5][0]
+        self.assertIn("DELETE FROM `score_history`", sql)
+        self.assertEqual(params, {"ids": (1, 2, 3)})
+
+        # A limited number of chunks stops early even if there is more to archive.
+        music.execute = Mock(  # type: ignore
+            side_effect=[
+                FakeCursor(
+                    [
+                        {
+                            "id": 4,
+                            "userid": 1,
+                            "musicid": 5,
+                            "points": 100,
+                            "timestamp": 1300,
+                            "new_record": 0,
+                        }
+                    ]
+                ),
+                FakeCursor([]),
+                FakeCursor([]),
+                FakeCursor([]),
+                FakeCursor([]),
+                FakeCursor([]),
+            ]
+        )
+        self.assertEqual(music.archive_attempts(1500, chunksize=1, chunks=1), 1)
+        self.assertEqual(music.execute.call_count, 6)
+
+    def test_get_all_attempts_archive(self) -> None:
+        def attempt(key: int, timestamp: int) -> dict:
+            return {
+                "scorekey": key,
+                "songid": 1000,
+                "chart": 0,
+                "points": 100,
+                "timestamp": timestamp,
+                "lid": 1,
+                "new_record": 0,
+                "data": "{}",
+                "userid": 1,
+            }
+
+        music = MusicData(Mock(), None)
+
+        # Nothing archived, so only recent attempts are looked at.
+        music.execute = Mock(  # type: ignore
+            side_effect=[
+                FakeCursor([{"timestamp": None}]),
+                FakeCursor([attempt(2, 2000)]),
+            ]
+        )
+        attempts = music.get_all_attempts(GameConstants.IIDX, 26)
+        self.assertEqual([a.key for _, a in attempts], [2])
+        self.assertEqual(music.execute.call_count, 2)
+
+        # A full page of attempts newer than anything archived doesn't need the archive.
+        music.execute = Mock(  # type: ignore
+            side_effect=[
+                FakeCursor([{"timestamp": 1000}]),
+                FakeCursor([attempt(2, 2000)]),
+            ]
+        )
+        attempts = music.get_all_attempts(GameConstants.IIDX, 26, limit=1)
+        self.assertEqual([a.key for _, a in attempts], [2])
+        self.assertEqual(music.execute.call_count, 2)
+
+        # A partial page means older attempts could be archived.
+        music.execute = Mock(  # type: ignore
+            side_effect=[
+                FakeCursor([{"timestamp": 1000}]),
+                FakeCursor([attempt(2, 2000)]),
+                FakeCursor([attempt(2, 2000), attempt(1, 1000)]),
+            ]
+        )
+        attempts = music.get_all_attempts(GameConstants.IIDX, 26, limit=2)
+        self.assertEqual([a.key for _, a in attempts], [2, 1])
+        sql, params = music.execute.call_args[0]
+        self.assertIn("score_history_archive", sql)
+        self.assertEqual(params["window"], 2)
+
+        # Asking for attempts newer than anything archived never needs the archive.
+        music.execute = Mock(  # type: ignore
+            side_effect=[FakeCursor([{"timestamp": 1000}]), FakeCursor([])]
+        )
+        music.get_all_attempts(GameConstants.IIDX, 26, timelimit=1500)
+        self.assertEqual(music.execute.call_count, 2)
+
+    def test_iter_all_attempts(self) -> None:
+        attempt = {
+            "scorekey": 1,
+            "songid": 1000,
+            "chart": 0,
+            "points": 100,
+            "timestamp": 1000,
+            "lid": 1,
+            "new_record": 1,
+            "data": "{}",
+            "userid": 0,
+        }
+        music = MusicData(Mock(), None)
+
+        # Nothing archived, so only recent attempts are streamed.
+        music.execute = Mock(return_value=FakeCursor([{"timestamp": None}]))  # type: ignore
+        music.stream = Mock(return_value=iter([attempt]))  # type: ignore
+        attempts = list(music.iter_all_attempts(GameConstants.IIDX, 26))
+        self.assertEqual(len(attempts), 1)
+        self.assertEqual(attempts[0][0], None)
+        self.assertEqual(attempts[0][1].key, 1)
+        self.assertTrue(attempts[0][1].new_record)
+        self.assertEqual(music.stream.call_count, 1)
+        self.assertNotIn("ORDER BY timestamp", music.stream.call_args[0][0])
+
+        # Archived attempts are streamed after recent ones.
+        music.execute = Mock(return_value=FakeCursor([{"timestamp": 1000}]))  # type: ignore
+        music.stream = Mock(side_effect=[iter([attempt]), iter([attempt])])  # type: ignore
+        attempts = list(music.iter_all_attempts(GameConstants.IIDX, 26))
+        self.assertEqual(len(attempts), 2)
+        self.assertIn("FROM score_history_archive", music.stream.call_args[0][0])
+
+        # Unless the archive is too old to matter.
+        music.stream = Mock(return_value=iter([]))  # type: ignore
+        list(music.iter_all_attempts(GameConstants.IIDX, 26, timelimit=1500))
+        self.assertEqual(music.stream.call_count, 1)
+
+    def test_iidx_attempt_counters(self) -> None:
+        def counters(clear_status: int) -> dict:
+            return IIDXBase.attempt_counters(
+                100, ValidatedDict({"clear_status": clear_status})
+            )
+
+        self.assertEqual(counters(IIDXBase.CLEAR_STATUS_NO_PLAY), {})
+        self.assertEqual(counters(IIDXBase.CLEAR_STATUS_FAILED), {"total": 1})
+        self.assertEqual(
+            counters(IIDXBase.CLEAR_STATUS_EASY_CLEAR), {"total": 1, "clears": 1}
+        )
+        self.assertEqual(
+            counters(IIDXBase.CLEAR_STATUS_FULL_COMBO),
+            {"total": 1, "clears": 1, "fcs": 1},
+        )
+        self.assertEqual(IIDXBase.attempt_counters(100, ValidatedDict()), {"total": 1})
+
+    def test_put_remote_scores(self) -> None:
+        music = MusicData(Mock(), None)
+        music.execute = Mock(  # type: ignore
+            side_effect=[
+                FakeCursor([{"id": 5, "songid": 1000, "chart": 0}]),
+                FakeCursor([]),
+                FakeCursor([]),
+                FakeCursor([]),
+            ]
+        )
+        stored = music.put_remote_scores(
+            1,
+            GameConstants.IIDX,
+            26,
+            [
+                (
+                    ["e004000000000002", "E004000000000001"],
+                    Score(-1, 1000, 0, 500, 10, 20, -1, 1, {"ghost": b"\x01"}),
+                ),
+                # Unknown songs should be skipped.
+                (
+                    ["E004000000000003"],
+                    Score(-1, 1001, 0, 500, 10, 20, -1, 1, {}),
+                ),
+            ],
+        )
+        self.assertEqual(stored, 1)
+
+        # Every card should map to the lowest one, which identifies the remote user.
+        _, cardparams = music.execute.call_args_list[2][0]
+        self.assertEqual(
+            cardparams,
+            {
+                "serverid0": 1,
+                "cardid0": "E004000000000001",
+                "ownerid0": "E004000000000001",
+                "serverid1": 1,
+                "cardid1": "E004000000000002",
+                "ownerid1": "E004000000000001",
+            },
+        )
+
+        sql, scoreparams = music.execute.call_args_list[3][0]
+        self.assertIn("ON DUPLICATE KEY UPDATE `points` = VALUES(`points`)", sql)
+        self.assertEqual(scoreparams["musicid0"], 5)
+        self.assertEqual(scoreparams["cardid0"], "E004000000000001")
+        self.assertEqual(scoreparams["update0"], 20)
+        self.assertEqual(music.deserialize(scoreparams["data0"]), {"ghost": b"\x01"})
+
+    def test_put_remote_scores_new_owner(self) -> None:
+        music = MusicData(Mock(), None)
+        score = Score(-1, 1000, 0, 500, 10, 20, -1, 1, {})
+
+        # The first sync only knows about one card, so that card owns the scores.
+        music.execute = Mock(  # type: ignore
+            side_effect=[
+                FakeCursor([{"id": 5, "songid": 1000, "chart": 0}]),
+                FakeCursor([]),
+                FakeCursor([]),
+                FakeCursor([]),
+            ]
+        )
+        music.put_remote_scores(
+            1, GameConstants.IIDX, 26, [(["E004000000000002"], score)]
+        )
+        self.assertEqual(music.execute.call_count, 4)
+        _, scoreparams = music.execute.call_args_list[3][0]
+        self.assertEqual(scoreparams["cardid0"], "E004000000000002")
+
+        # Syncing the same user with a new, lower card should move the scores stored
+        # under the old card over to the new one before storing the new scores.
+        music.execute = Mock(  # type: ignore
+            side_effect=[
+                FakeCursor([{"id": 5, "songid": 1000, "chart": 0}]),
+                FakeCursor(
+                    [{"cardid": "E004000000000002", "ownerid": "E004000000000002"}]
+                ),
+                FakeCursor([]),
+                FakeCursor([]),
+                FakeCursor([]),
+                FakeCursor([]),
+            ]
+        )
+        music.put_remote_scores(
+            1,
+            GameConstants.IIDX,
+            26,
+            [(["E004000000000002", "E004000000000001"], score)],
+        )
+        self.assertEqual(music.execute.call_count, 6)
+        moves = {
+            "serverid": 1,
+            "oldid": "E004000000000002",
+            "newid": "E004000000000001",
+        }
+        sql, params = music.execute.call_args_list[2][0]
+        self.assertIn("DELETE FROM old USING remote_score", sql)
+        self.assertEqual(params, moves)
+        sql, params = music.execute.call_args_list[3][0]
+        self.assertIn("UPDATE remote_score SET cardid = :newid", sql)
+        self.assertEqual(params, moves)
+        _, cardparams = music.execute.call_args_list[4][0]
+        self.assertEqual(cardparams["ownerid0"], "E004000000000001")
+        self.assertEqual(cardparams["ownerid1"], "E004000000000001")
+        _, scoreparams = music.execute.call_args_list[5][0]
+        self.assertEqual(scoreparams["cardid0"], "E004000000000001")
@@ -4,6 +4,7 @@ from unittest.mock import Mock
 from freezegun import freeze_time
 
 from bemani.common import GameConstants
+from bemani.data import UserID
 from bemani.data.mysql.network import NetworkData
 from bemani.tests.helpers import FakeCursor
 
@@ -61,3 +62,29 @@ class TestNetworkData(unittest.TestCase):
             self.assertTrue(
                 network.should_schedule(GameConstants.BISHI_BASHI, 1, "work", "weekly")
             )
+
+    def test_iter_events(self) -> None:
+        network = NetworkData(Mock(), None)
+        network.stream = Mock(  # type: ignore
+            return_value=iter(
+                [
+                    {
+                        "id": 2,
+                        "timestamp": 200,
+                        "userid": 1,
+                        "arcadeid": None,
+                        "type": "paseli_transaction",
+                        "data": '{"pcbid": "abc"}',
+                    },
+                ]
+            )
+        )
+        events = list(network.iter_events(userid=UserID(1), event="paseli_transaction"))
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].userid, 1)
+        self.assertEqual(events[0].arcadeid, None)
+        self.assertEqual(events[0].data.get_str("pcbid"), "abc")
+
+        sql, params = network.stream.call_args[0]
+        self.assertIn("WHERE userid = :userid AND type = :event", sql)
+        self.assertEqual(params["userid"], 1)
@@ -0,0 +1,100 @@
+# vim: set fileencoding=utf-8
+import struct
+import unittest
+
+from bemani.protocol.node import Node, NodeException
+
+
+class TestNode(unittest.TestCase):
+    def test_slotted(self) -> None:
+        node = Node.void("node")
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.something = 5  # type: ignore
+
+    def test_packed_arrays(self) -> None:
+        node = Node.s16_array("array", [-1, 0, 1, 32767])
+        self.assertTrue(node.is_packed)
+        self.assertEqual(node.packed_value, struct.pack(">4h", -1, 0, 1, 32767))
+        self.assertEqual(node.value, [-1, 0, 1, 32767])
+
+        # Building an array from its wire representation should be the same as
+        # building it from a list of values.
+        other = Node(name="array", type=Node.NODE_TYPE_S16, array=True)
+        other.set_value(struct.pack(">4h", -1, 0, 1, 32767))
+        self.assertEqual(node, other)
+        self.assertEqual(str(node), str(other))
+
+        with self.assertRaises(NodeException):
+            other.set_value(b"\x00\x01\x02")
+
+        # Non-integer arrays are never packed.
+        self.assertFalse(Node.float_array("array", [0.5, 1.5]).is_packed)
+        self.assertFalse(Node.s32("scalar", 5).is_packed)
+
+    def test_validation(self) -> None:
+        with self.assertRaises(NodeException):
+            Node.u8("value", 256)
+        with self.assertRaises(NodeException):
+            Node.u8_array("array", [1, 2, 256])
+        with self.assertRaises(NodeException):
+            Node.s64_array("array", [1, -9223372036854775809])
+        with self.assertRaises(NodeException):
+            Node.void("bad name")
+
+        # Values that don't fit aren't an error when constructed by hand, so make sure
+        # they're still kept around as given.
+        node = Node(name="array", type=Node.NODE_TYPE_U8, array=True, value=[1, 256])
+        self.assertFalse(node.is_packed)
+        self.assertEqual(node.value, [1, 256])
+
+    def test_lazy_values(self) -> None:
+        # Values from the binary decoder come in as integers and packed bytes.
+        true = Node(name="value", type=Node.NODE_TYPE_BOOL, value=1)
+        false = Node(name="value", type=Node.NODE_TYPE_BOOL, value=0)
+        self.assertEqual(true.value, True)
+        self.assertEqual(false.value, False)
+        self.assertEqual(true, Node.bool("value", True))
+        self.assertEqual(str(true), str(Node.bool("value", True)))
+
+        ip = Node(name="value", type=Node.NODE_TYPE_IP4, value=b"\x0a\x00\x00\x01")
+        self.assertEqual(ip.value, b"\x0a\x00\x00\x01")
+        self.assertEqual(ip, Node.ipv4("value", "10.0.0.1"))
+        self.assertEqual(Node.float("value", 1).value, 1.0)
+        self.assertNotEqual(Node.s32("value", 1), Node.s32("value", 2))
+
+    def test_child_lookup(self) -> None:
+        root = Node.void("root")
+        for i in range(Node.CHILD_INDEX_THRESHOLD * 2):
+            child = Node.void(f"child{i}")
+            child.add_child(Node.s32("value", i))
+            root.add_child(child)
+        root.add_child(Node.s32("child0", 1000))
+
+        # Lookups return the first child with a name, including after more children
+        # are added once the lookup index exists.
+        self.assertEqual(root.child_value("child3/value"), 3)
+        self.assertEqual(root.child("child0"), root.children[0])
+        self.assertIsNone(root.child("missing"))
+        self.assertIsNone(root.child("child3/missing"))
+
+        root.add_child(Node.s32("late", 5))
+        self.assertEqual(root.child_value("late"), 5)
+
+        # Small nodes and nodes without children should still work.
+        self.assertIsNone(Node.void("root").child("missing"))
+        self.assertEqual(root.children[1].child_value("value"), 1)
+
+    def test_attributes(self) -> None:
+        node = Node.void("node")
+        self.assertIsNone(node.attribute("missing"))
+        self.assertEqual(node.attribute("missing", "default"), "default")
+        self.assertEqual(node.attributes, {})
+
+        node.set_attribute("attr", "value")
+        self.assertEqual(node.attribute("attr"), "value")
+
+        other = Node.void("node")
+        self.assertNotEqual(node, other)
+        other.set_attribute("attr", "value")
+        self.assertEqual(node, other)
@@ -1,8 +1,12 @@
 # vim: set fileencoding=utf-8
 from abc import ABC
+import asyncio
+import concurrent.futures
+import threading
+import time
 import unittest
 
-from bemani.common import Parallel
+from bemani.common import AsyncParallel, Parallel
 
 
 class TestParallel(unittest.TestCase):
@@ -101,3 +105,105 @@ class TestParallel(unittest.TestCase):
     def test_flatten(self) -> None:
         results = Parallel.flatten([[1, 2, 3], [4, 5, 6], [7, 8, 9], []])
         self.assertEqual(results, [1, 2, 3, 4, 5, 6, 7, 8, 9])
+
+    def test_shared_pool(self) -> None:
+        results = Parallel.map(lambda x: threading.current_thread().name, [1, 2, 3])
+        for name in results:
+            self.assertTrue(name.startswith("parallel"))
+
+    def test_nested(self) -> None:
+        Parallel.configure(2)
+        try:
+            # With only two workers, waiting on the pool from inside the pool would deadlock.
+            results = Parallel.map(
+                lambda x: Parallel.map(lambda y: x * y, [1, 2, 3]),
+                [1, 2, 3, 4],
+                timeout=10,
+            )
+            self.assertEqual(results, [[1, 2, 3], [2, 4, 6], [3, 6, 9], [4, 8, 12]])
+        finally:
+            Parallel.configure(Parallel.DEFAULT_WORKERS)
+
+    def test_timeout(self) -> None:
+        Parallel.configure(1)
+        try:
+            release = threading.Event()
+            ran = []
+
+            def slow() -> int:
+                release.wait(5)
+                return 1
+
+            def queued() -> int:
+                ran.append(2)
+                return 2
+
+            timeouts = Parallel.stats()["timeouts"]
+            with self.assertRaises(concurrent.futures.TimeoutError):
+                Parallel.execute([slow, queued], timeout=0.1)
+            release.set()
+            self.assertEqual(Parallel.stats()["timeouts"], timeouts + 1)
+
+            # The queued call never got a worker, so it should have been cancelled.
+            self.assertEqual(Parallel.execute([lambda: 3, lambda: 4]), [3, 4])
+            self.assertEqual(ran, [])
+        finally:
+            Parallel.configure(Parallel.DEFAULT_WORKERS)
+
+    def test_nested_timeout(self) -> None:
+        ran = []
+
+        def slow(x: int) -> int:
+            ran.append(x)
+            time.sleep(0.2)
+            return x
+
+        def nested() -> str:
+            try:
+                Parallel.map(slow, [1, 2, 3], timeout=0.1)
+            except concurrent.futures.TimeoutError:
+                return "timeout"
+            return "finished"
+
+        # Nested calls run inline on the worker, but still honor their timeout and don't
+        # run anything else once it has passed.
+        timeouts = Parallel.stats()["timeouts"]
+        self.assertEqual(
+            Parallel.execute([nested, lambda: "other"]), ["timeout", "other"]
+        )
+        self.assertEqual(ran, [1])
+        self.assertEqual(Parallel.stats()["timeouts"], timeouts + 1)
+
+    def test_exception(self) -> None:
+        def fail() -> int:
+            raise ValueError("oops")
+
+        with self.assertRaises(ValueError):
+            Parallel.execute([lambda: 1, fail])
+
+    def test_stats(self) -> None:
+        completed = Parallel.stats()["completed"]
+        Parallel.execute([lambda: time.sleep(0.01), lambda: time.sleep(0.01)])
+        stats = Parallel.stats()
+        self.assertEqual(stats["completed"], completed + 2)
+        self.assertEqual(stats["queued"], 0)
+        self.assertGreater(stats["run_max"], 0.0)
+
+    def test_async(self) -> None:
+        def fun(x: int) -> int:
+            return x * 2
+
+        release = threading.Event()
+
+        async def run() -> None:
+            self.assertEqual(await AsyncParallel.execute([]), [])
+            self.assertEqual(
+                await AsyncParallel.execute([lambda: 1, lambda: 2]), [1, 2]
+            )
+            self.assertEqual(await AsyncParallel.map(fun, [1, 2, 3]), [2, 4, 6])
+            self.assertEqual(await AsyncParallel.call([fun, fun], 5), [10, 10])
+            with self.assertRaises(asyncio.TimeoutError):
+                await AsyncParallel.execute([lambda: release.wait(5)], timeout=0.05)
+
+        asyncio.run(run())
+        release.set()
@@ -2,7 +2,9 @@
 import random
 import unittest
 
+from bemani.protocol.node import Node
 from bemani.protocol.protocol import EAmuseProtocol
+from bemani.protocol.rc4 import RC4, RC4Cache
 
 
 class TestRC4Cipher(unittest.TestCase):
@@ -39,3 +41,76 @@ class TestRC4Cipher(unittest.TestCase):
 
         plaintext = proto._rc4_crypt(cyphertext, key)
         self.assertEqual(data, plaintext)
+
+    def test_engines_match(self) -> None:
+        data = bytes([random.randint(0, 255) for _ in range(10 * 1024)])
+        key = bytes([random.randint(0, 255) for _ in range(16)])
+
+        pure = RC4(key, compiled=False).crypt(data)
+        self.assertEqual(pure, RC4(key).crypt(data))
+        self.assertEqual(pure, RC4(key).crypt(bytearray(data)))
+        self.assertEqual(pure, RC4(key).crypt(memoryview(data)))
+
+    def test_keystream_extension(self) -> None:
+        key = b"12345"
+        full = RC4(key, compiled=False).keystream(4096)
+
+        # Generating the keystream in chunks should be identical to all at once.
+        for compiled in [False, *([True] if RC4.compiled_available() else [])]:
+            cipher = RC4(key, compiled=compiled)
+            self.assertEqual(full[:100], cipher.keystream(100))
+            self.assertEqual(full[:10], cipher.keystream(10))
+            self.assertEqual(full, cipher.keystream(4096))
+            self.assertEqual(len(cipher), 4096)
+
+    def test_cached_crypt(self) -> None:
+        key = "1-5d5a8b45-6d4c"
+        request = Node.void("request")
+        response = Node.void("response")
+        response.add_child(
+            Node.binary(
+                "data", bytes([random.randint(0, 255) for _ in range(10 * 1024)])
+            )
+        )
+        proto = EAmuseProtocol()
+
+        # Encrypt both packets without any remembered keystream.
+        EAmuseProtocol.RC4_CACHE.clear()
+        encrypted_request = proto.encode(
+            None, key, request, text_encoding="ascii", packet_encoding=1
+        )
+        EAmuseProtocol.RC4_CACHE.clear()
+        encrypted_response = proto.encode(
+            None, key, response, text_encoding="ascii", packet_encoding=1
+        )
+
+        # Now decrypt the request and encrypt the response as a server would, which
+        # extends the keystream remembered from the request.
+        EAmuseProtocol.RC4_CACHE.clear()
+        self.assertEqual(str(proto.decode(None, key, encrypted_request)), str(request))
+        self.assertIsNotNone(EAmuseProtocol.RC4_CACHE.get(key))
+        self.assertEqual(
+            encrypted_response,
+            proto.encode(None, key, response, text_encoding="ascii", packet_encoding=1),
+        )
+
+    def test_cache_eviction(self) -> None:
+        cache = RC4Cache(max_entries=2, max_prefix_length=1024)
+        first = RC4(b"first")
+        second = RC4(b"second")
+        third = RC4(b"third")
+
+        cache.crypt("first", first, b"1234")
+        cache.crypt("second", second, b"1234")
+        self.assertIs(cache.get("first"), first)
+        cache.crypt("third", third, b"1234")
+
+        # Second was least recently used, so it should have been evicted.
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("second"))
+        self.assertIs(cache.get("first"), first)
+        self.assertIs(cache.get("third"), third)
+
+        # Ciphers whose keystream grows past the prefix length are not kept.
+        cache.crypt("third", third, bytes(2048))
+        self.assertIsNone(cache.get("third"))
@@ -0,0 +1,155 @@
+# vim: set fileencoding=utf-8
+import unittest
+from unittest.mock import Mock
+
+from bemani.common import GameConstants
+from bemani.data import UserID
+from bemani.data.mysql.user import UserData
+from bemani.tests.helpers import FakeCursor
+
+
+class TestUserData(unittest.TestCase):
+    def test_get_any_profiles(self) -> None:
+        user = UserData(Mock(), None)
+        user.execute = Mock(  # type: ignore
+            side_effect=[
+                # Every profile each user has for this game.
+                FakeCursor(
+                    [
+                        {"version": 25, "userid": 1, "refid": "R1V25"},
+                        {"version": 26, "userid": 1, "refid": "R1V26"},
+                        {"version": 27, "userid": 1, "refid": "R1V27"},
+                        {"version": 24, "userid": 2, "refid": "R2V24"},
+                        {"version": 25, "userid": 2, "refid": "R2V25"},
+                    ]
+                ),
+                # The profiles that were picked.
+                FakeCursor(
+                    [
+                        {
+                            "userid": 1,
+                            "refid": "R1V26",
+                            "extid": 11111111,
+                            "data": '{"name": "ONE"}',
+                        },
+                        {
+                            "userid": 2,
+                            "refid": "R2V25",
+                            "extid": 22222222,
+                            "data": '{"name": "TWO"}',
+                        },
+                    ]
+                ),
+            ]
+        )
+
+        profiles = user.get_any_profiles(
+            GameConstants.IIDX, 26, [UserID(2), UserID(3), UserID(1)]
+        )
+
+        # Only two queries no matter how many users, preferring the requested version
+        # and otherwise the newest version the user has played.
+        self.assertEqual(user.execute.call_count, 2)
+        self.assertEqual(
+            sorted(user.execute.call_args[0][1]["refids"]), ["R1V26", "R2V25"]
+        )
+
+        self.assertEqual([uid for (uid, _) in profiles], [2, 3, 1])
+        one = profiles[2][1]
+        two = profiles[0][1]
+        assert one is not None
+        assert two is not None
+        self.assertEqual((one.version, one.refid, one.extid), (26, "R1V26", 11111111))
+        self.assertEqual(one.get_str("name"), "ONE")
+        self.assertEqual((two.version, two.refid, two.extid), (25, "R2V25", 22222222))
+        self.assertEqual(two.get_str("name"), "TWO")
+        self.assertIsNone(profiles[1][1])
+
+    def test_get_any_profiles_none(self) -> None:
+        user = UserData(Mock(), None)
+        user.execute = Mock(return_value=FakeCursor([]))  # type: ignore
+        self.assertEqual(user.get_any_profiles(GameConstants.IIDX, 26, []), [])
+        self.assertEqual(user.execute.call_count, 0)
+
+        # Nobody has a profile, so there's nothing to load.
+        self.assertEqual(
+            user.get_any_profiles(GameConstants.IIDX, 26, [UserID(1)]),
+            [(UserID(1), None)],
+        )
+        self.assertEqual(user.execute.call_count, 1)
+
+    def test_get_all_game_profiles(self) -> None:
+        user = UserData(Mock(), None)
+        user.execute = Mock(  # type: ignore
+            return_value=FakeCursor(
+                [
+                    {
+                        "userid": 1,
+                        "version": 25,
+                        "refid": "R1V25",
+                        "extid": 11111111,
+                        "data": '{"name": "OLD"}',
+                    },
+                    {
+                        "userid": 1,
+                        "version": 26,
+                        "refid": "R1V26",
+                        "extid": 11111111,
+                        "data": '{"name": "NEW"}',
+                    },
+                ]
+            )
+        )
+
+        # Every version comes back from a single query.
+        profiles = user.get_all_game_profiles(GameConstants.IIDX)
+        self.assertEqual(user.execute.call_count, 1)
+        self.assertNotIn(":userids", user.execute.call_args[0][0])
+        self.assertEqual(
+            [
+                (uid, profile.version, profile.get_str("name"))
+                for (uid, profile) in profiles
+            ],
+            [(1, 25, "OLD"), (1, 26, "NEW")],
+        )
+
+        user.get_all_game_profiles(GameConstants.IIDX, [UserID(1)])
+        self.assertIn("refid.userid IN :userids", user.execute.call_args[0][0])
+        self.assertEqual(user.execute.call_args[0][1]["userids"], [1])
+
+    def test_iter_all_profiles(self) -> None:
+        user = UserData(Mock(), None)
+        user.stream = Mock(  # type: ignore
+            return_value=iter(
+                [
+                    {
+                        "userid": 1,
+                        "refid": "R1",
+                        "extid": 11111111,
+                        "data": '{"name": "ONE"}',
+                    },
+                    {
+                        "userid": 2,
+                        "refid": "R2",
+                        "extid": 22222222,
+                        "data": '{"name": "TWO"}',
+                    },
+                ]
+            )
+        )
+        user.deserialize = Mock(wraps=user.deserialize)  # type: ignore
+        profiles = user.iter_all_profiles(GameConstants.IIDX, 26)
+
+        # Profiles are only decoded as they are iterated over.
+        uid, profile = next(profiles)
+        self.assertEqual(uid, 1)
+        self.assertEqual(profile.refid, "R1")
+        self.assertEqual(profile.get_str("name"), "ONE")
+        self.assertEqual(user.deserialize.call_count, 1)
+        self.assertEqual(user.stream.call_args[0][1], {"game": "iidx", "version": 26})
+
+        self.assertEqual(
+            [(uid, profile.get_str("name")) for (uid, profile) in profiles],
+            [(2, "TWO")],
+        )
+        self.assertEqual(user.deserialize.call_count, 2)
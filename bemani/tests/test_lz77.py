@@ -3,7 +3,14 @@ import os
 import random
 import unittest
 
-from bemani.protocol.lz77 import Lz77, Lz77Decompress
+from bemani.protocol.lz77 import (
+    Lz77,
+    Lz77Compress,
+    Lz77CompressHashChain,
+    Lz77Decompress,
+    Lz77DecompressBuffer,
+    LzException,
+)
 from bemani.tests.helpers import get_fixture
 
 
@@ -103,3 +110,76 @@ class TestLz77RealCompressor(unittest.TestCase):
 
         decompresseddata = lz77.decompress(compresseddata)
         self.assertEqual(data, decompresseddata)
+
+
+class TestLz77PythonDecompressor(unittest.TestCase):
+    def test_matches_streaming(self) -> None:
+        lz77 = Lz77()
+        for data in [
+            os.urandom(1 * 1024),
+            os.urandom(100 * 1024),
+            get_fixture("declaration.txt"),
+            get_fixture("lorem.txt"),
+            get_fixture("rawdata"),
+            b"abcabcabcabc",
+            b"\0" * 1024,
+        ]:
+            compresseddata = lz77.compress(data)
+
+            streaming = b"".join(Lz77Decompress(compresseddata).decompress_bytes())
+            self.assertEqual(data, streaming)
+            self.assertEqual(
+                streaming, Lz77DecompressBuffer(compresseddata).decompress()
+            )
+            self.assertEqual(data, Lz77(compiled=False).decompress(compresseddata))
+
+    def test_backref_before_start(self) -> None:
+        # Backrefs that reach before the start of the data read zeros.
+        compresseddata = b"\x00\x01\x00\x00\x00"
+        self.assertEqual(b"\0\0\0", Lz77DecompressBuffer(compresseddata).decompress())
+        self.assertEqual(
+            b"\0\0\0",
+            b"".join(Lz77Decompress(compresseddata).decompress_bytes()),
+        )
+
+    def test_truncated(self) -> None:
+        with self.assertRaises(LzException):
+            Lz77DecompressBuffer(b"\x00\x00").decompress()
+        with self.assertRaises(LzException):
+            Lz77DecompressBuffer(b"\x03a").decompress()
+
+
+class TestLz77HashChainCompressor(unittest.TestCase):
+    def test_levels(self) -> None:
+        for data in [
+            os.urandom(10 * 1024),
+            get_fixture("declaration.txt"),
+            get_fixture("rawdata"),
+            b"\0" * 10240,
+        ]:
+            sizes = []
+            for level in range(Lz77.LEVEL_FAST, Lz77.LEVEL_BEST + 1):
+                lz77 = Lz77(compiled=False)
+                compresseddata = lz77.compress(data, level=level)
+                self.assertEqual(data, lz77.decompress(compresseddata))
+                sizes.append(len(compresseddata))
+
+            # Searching deeper should never make the output worse.
+            self.assertEqual(sizes, sorted(sizes, reverse=True))
+
+    def test_known_compression(self) -> None:
+        for level in range(Lz77.LEVEL_FAST, Lz77.LEVEL_BEST + 1):
+            compresseddata = Lz77(compiled=False).compress(b"abcabcabcabc", level=level)
+            self.assertEqual(b"\x07abc\x006\x00\x00", compresseddata)
+
+    def test_matches_streaming(self) -> None:
+        # At the deepest chain the hash chain finds backrefs as long as the streaming compressor.
+        data = get_fixture("declaration.txt")
+        self.assertEqual(
+            len(b"".join(Lz77Compress(data).compress_bytes())),
+            len(Lz77CompressHashChain(data).compress()),
+        )
+
+    def test_invalid_level(self) -> None:
+        with self.assertRaises(LzException):
+            Lz77(compiled=False).compress(b"abcabcabcabc", level=0)
@@ -659,6 +659,9 @@ def render_path(
     *,
     disable_threads: bool = False,
     enable_anti_aliasing: bool = False,
+    frame_processes: int = 0,
+    frame_window: Optional[int] = None,
+    cache_size: int = 64,
     background_color: Optional[str] = None,
     background_image: Optional[str] = None,
     background_loop_start: Optional[int] = None,
@@ -680,7 +683,11 @@ def render_path(
         print("Loading textures, shapes and animation instructions...")
 
     renderer = AFPRenderer(
-        single_threaded=disable_threads, enable_aa=enable_anti_aliasing
+        single_threaded=disable_threads,
+        enable_aa=enable_anti_aliasing,
+        frame_processes=frame_processes,
+        frame_window=frame_window,
+        cache_size=cache_size * 1024 * 1024,
     )
     load_containers(renderer, containers, need_extras=True, verbose=verbose)
 
@@ -950,6 +957,7 @@ def render_path(
 
                 print(f"Wrote animation frame to {fullname}")
 
+    renderer.close()
     return 0
 
 
@@ -1178,6 +1186,38 @@ def main() -> int:
         action="store_true",
         help="Disable multi-threaded rendering. The animation will be rendered on a single core and threads will not be spawned.",
     )
+    render_parser.add_argument(
+        "--frame-processes",
+        metavar="NUM",
+        type=int,
+        default=0,
+        help=(
+            "Render this many whole frames at once in separate processes while the animation keeps playing, instead of "
+            "rendering each frame as soon as it is played. This is much faster for long animations when several cores "
+            "are available."
+        ),
+    )
+    render_parser.add_argument(
+        "--frame-window",
+        metavar="NUM",
+        type=int,
+        help=(
+            "The most frames to have in flight at once when rendering with --frame-processes, which bounds how much memory "
+            "is used to hold frames rendered ahead of the one that is written out next. Defaults to twice the number of "
+            "frame processes."
+        ),
+    )
+    render_parser.add_argument(
+        "--cache-size",
+        metavar="MB",
+        type=int,
+        default=64,
+        help=(
+            "How many megabytes of projected masks and generated textures to keep around so they don't need to be drawn "
+            "again on later frames. Animations with lots of masked objects render faster with a bigger cache. When "
+            "rendering with --frame-processes, each process gets a cache this size. Set to 0 to disable. Defaults to 64."
+        ),
+    )
     render_parser.add_argument(
         "--path",
         metavar="PATH",
@@ -1411,6 +1451,9 @@ def main() -> int:
             args.output,
             disable_threads=args.disable_threads,
             enable_anti_aliasing=args.enable_anti_aliasing,
+            frame_processes=args.frame_processes,
+            frame_window=args.frame_window,
+            cache_size=args.cache_size,
             background_color=args.background_color,
             background_image=args.background_image,
             background_loop_start=args.background_loop_start,
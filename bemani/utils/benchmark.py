@@ -0,0 +1,1069 @@
+import argparse
+import importlib
+import json
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+from unittest.mock import Mock
+
+from PIL import Image  # type: ignore
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import text
+
+from bemani.backend.iidx.rootage import IIDXRootage
+from bemani.backend.sdvx.heavenlyhaven import SoundVoltexHeavenlyHaven
+from bemani.common import DBConstants, GameConstants
+from bemani.data import Config, Data, Score, UserID
+from bemani.data.mysql.codec import Codec, available_backends
+from bemani.format.afp.types import AAMode, Color, HSL, Matrix, Point
+from bemani.protocol.binary import (
+    BinaryDecoder,
+    BinaryEncoder,
+    BinaryEncoding,
+    BinarySinglePassDecoder,
+    BinarySinglePassEncoder,
+)
+from bemani.protocol.lz77 import Lz77, Lz77Compress, Lz77Decompress
+from bemani.protocol.node import Node
+from bemani.protocol.rc4 import RC4, RC4Cache
+from bemani.utils.config import load_config
+from bemani.utils.benchmark_fixtures import (
+    get_fixture,
+    game_packet1,
+    game_packet2,
+    game_packet3,
+    game_packet4,
+    game_packet5,
+    game_packet6,
+    packet1,
+)
+
+
+def time_call(func: Callable[[], object], iterations: int) -> float:
+    """
+    Call a function a number of times and return the best wall-clock time in seconds
+    of any single call. The best time is used instead of the average since it is the
+    least affected by whatever else is happening on the machine.
+    """
+    best = None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        duration = time.perf_counter() - start
+        if best is None or duration < best:
+            best = duration
+    return best or 0.0
+
+
+def print_result(name: str, size: int, duration: float, baseline: float) -> None:
+    if duration > 0.0:
+        throughput = (size / (1024 * 1024)) / duration
+        speedup = baseline / duration
+    else:
+        throughput = float("inf")
+        speedup = float("inf")
+    print(
+        f"  {name:<28} {duration * 1000.0:10.3f}ms {throughput:10.2f}MB/s {speedup:8.2f}x"
+    )
+
+
+def score_list_packet(entries: int) -> Node:
+    """
+    A synthetic response shaped like the large score list responses that games request,
+    with a node per chart holding a handful of scalar values, attributes and arrays.
+    """
+    root = Node.void("response")
+    music = Node.void("music")
+    root.add_child(music)
+    for i in range(entries):
+        entry = Node.void("d")
+        entry.set_attribute("mid", str(1000 + (i // 5)))
+        entry.set_attribute("clid", str(i % 5))
+        entry.add_child(Node.s32("score", i * 37))
+        entry.add_child(Node.s16("combo", i % 1000))
+        entry.add_child(Node.u8("clear", i % 7))
+        entry.add_child(Node.string("name", f"PLAYER{i % 50}"))
+        entry.add_child(Node.s32_array("ghost", [i, i + 1, i + 2, i + 3, i + 4]))
+        music.add_child(entry)
+    return root
+
+
+def sample_packets() -> Dict[str, Node]:
+    """
+    The packets used by the protocol unit tests, as well as some larger synthetic ones.
+    """
+    return {
+        "game packet 1": game_packet1(),
+        "game packet 2": game_packet2(),
+        "game packet 3": game_packet3(),
+        "game packet 4": game_packet4(),
+        "game packet 5": game_packet5(),
+        "game packet 6": game_packet6(),
+        "all types": packet1(),
+        "score list 100": score_list_packet(100),
+        "score list 5000": score_list_packet(5000),
+    }
+
+
+def backend_responses(scores: int) -> Dict[str, Callable[[], Node]]:
+    """
+    Functions that build some of the largest responses that the game backends produce,
+    by calling the real request handlers against a mocked out data layer returning
+    the given number of scores.
+    """
+
+    def make_scores(charts: int) -> List[Score]:
+        return [
+            Score(
+                i,
+                1000 + (i // charts),
+                i % charts,
+                1000 + (i % 3000),
+                1234567890,
+                1234567890,
+                0,
+                3,
+                {
+                    "clear_type": DBConstants.SDVX_CLEAR_TYPE_CLEAR,
+                    "clear_status": DBConstants.IIDX_CLEAR_STATUS_CLEAR,
+                    "grade": DBConstants.SDVX_GRADE_AAA,
+                    "miss_count": 5,
+                    "stats": {"btn_rate": 100, "long_rate": 100, "vol_rate": 100},
+                },
+            )
+            for i in range(scores)
+        ]
+
+    sdvx_data = Mock()
+    sdvx_data.remote.user.from_refid.return_value = UserID(1)
+    sdvx_data.remote.music.get_scores.return_value = make_scores(5)
+    sdvx = SoundVoltexHeavenlyHaven(sdvx_data, Mock(), Mock())
+    sdvx_request = Node.void("game")
+    sdvx_request.add_child(Node.string("refid", "00000000DEADBEEF"))
+
+    iidx_data = Mock()
+    iidx_data.remote.user.from_extid.return_value = UserID(1)
+    iidx_data.remote.music.get_scores.return_value = make_scores(8)
+    iidx_data.local.music.get_most_played.return_value = []
+    iidx = IIDXRootage(iidx_data, Mock(), Mock())
+    iidx_request = Node.void("IIDX26music")
+    iidx_request.set_attribute("cltype", "0")
+    for rival in ["iidxid", "iidxid0", "iidxid1", "iidxid2", "iidxid3", "iidxid4"]:
+        iidx_request.set_attribute(rival, "12345678")
+
+    return {
+        "SDVX game.sv4_load_m": lambda: sdvx.handle_game_sv4_load_m_request(
+            sdvx_request
+        ),
+        "IIDX IIDX26music.getrank": lambda: iidx.handle_IIDX26music_getrank_request(
+            iidx_request
+        ),
+    }
+
+
+def benchmark_rc4(sizes: List[int], iterations: int) -> int:
+    engines = ["compiled"] if RC4.compiled_available() else []
+    print(f"Compiled RC4 engine available: {'yes' if engines else 'no'}")
+
+    for size in sizes:
+        data = os.urandom(size)
+        key = os.urandom(16)
+        print(f"Payload of {size} bytes:")
+
+        # The pure python cipher is our baseline that all others are compared against.
+        baseline = time_call(lambda: RC4(key, compiled=False).crypt(data), iterations)
+        print_result("pure python", size, baseline, baseline)
+
+        for engine in engines:
+            duration = time_call(
+                lambda: RC4(key, compiled=True).crypt(data), iterations
+            )
+            print_result(engine, size, duration, baseline)
+
+        # Simulate a server decrypting a request and then encrypting a same-sized
+        # response, where the second crypt reuses the cached keystream.
+        for compiled in [False, *([True] if engines else [])]:
+            cache = RC4Cache()
+
+            def request_response() -> None:
+                cache.clear()
+                cipher = RC4(key, compiled=compiled)
+                cache.crypt("key", cipher, data)
+                cipher = cache.get("key") or RC4(key, compiled=compiled)
+                cache.crypt("key", cipher, data)
+
+            duration = time_call(request_response, iterations)
+            print_result(
+                f"{'compiled' if compiled else 'pure python'} cached pair",
+                size * 2,
+                duration,
+                baseline * 2,
+            )
+
+    return 0
+
+
+def benchmark_lz77(corpora: List[str], iterations: int) -> int:
+    engines = [False, *([True] if Lz77.compiled_available() else [])]
+    print(f"C++ LZ77 engine available: {'yes' if len(engines) > 1 else 'no'}")
+
+    for name in corpora:
+        data = get_fixture(name)
+        compressed = Lz77().compress(data)
+        print(
+            f"Corpus {name}, {len(data)} bytes compressed to {len(compressed)} bytes:"
+        )
+
+        # The old streaming decompressor is our baseline that all others are compared against.
+        baseline = time_call(
+            lambda: b"".join(Lz77Decompress(compressed).decompress_bytes()),
+            iterations,
+        )
+        print_result("streaming python", len(data), baseline, baseline)
+
+        for compiled in engines:
+            lz77 = Lz77(compiled=compiled)
+            if lz77.decompress(compressed) != data:
+                raise Exception(f"Decompression of {name} produced the wrong output!")
+
+            duration = time_call(lambda: lz77.decompress(compressed), iterations)
+            print_result(
+                "c++" if compiled else "pure python", len(data), duration, baseline
+            )
+
+        # Now, compare compression speed and ratio for each level against the old
+        # streaming compressor.
+        baseline = time_call(
+            lambda: b"".join(Lz77Compress(data).compress_bytes()), iterations
+        )
+        print_result("streaming python compress", len(data), baseline, baseline)
+
+        for level in range(Lz77.LEVEL_FAST, Lz77.LEVEL_BEST + 1):
+            lz77 = Lz77(compiled=False)
+            size = len(lz77.compress(data, level=level))
+            duration = time_call(lambda: lz77.compress(data, level=level), iterations)
+            print_result(
+                f"level {level} compress ({size}b)", len(data), duration, baseline
+            )
+
+        if Lz77.compiled_available():
+            lz77 = Lz77(compiled=True)
+            size = len(lz77.compress(data))
+            duration = time_call(lambda: lz77.compress(data), iterations)
+            print_result(f"c++ compress ({size}b)", len(data), duration, baseline)
+
+    return 0
+
+
+def benchmark_binary_decode(iterations: int) -> int:
+    for name, packet in sample_packets().items():
+        data = BinaryEncoding().encode(packet, encoding="shift-jis")
+        print(f"Packet {name}, {len(data)} bytes:")
+
+        # The two-pass decoder is our baseline that all others are compared against.
+        baseline = time_call(
+            lambda: BinaryDecoder(data[4:], "shift-jis", True).get_tree(), iterations
+        )
+        print_result("two pass", len(data), baseline, baseline)
+
+        if BinarySinglePassDecoder(data[4:], "shift-jis", True).get_tree() != packet:
+            raise Exception(f"Decoding {name} produced the wrong tree!")
+        duration = time_call(
+            lambda: BinarySinglePassDecoder(data[4:], "shift-jis", True).get_tree(),
+            iterations,
+        )
+        print_result("single pass", len(data), duration, baseline)
+
+    return 0
+
+
+def benchmark_binary_encode(scores: int, iterations: int) -> int:
+    packets = sample_packets()
+    for name, build in backend_responses(scores).items():
+        packets[name] = build()
+
+    for name, packet in packets.items():
+        data = BinaryEncoder(packet, "shift-jis").get_data()
+        print(f"Packet {name}, {len(data)} bytes:")
+
+        # The original encoder is our baseline that all others are compared against.
+        baseline = time_call(
+            lambda: BinaryEncoder(packet, "shift-jis").get_data(), iterations
+        )
+        print_result("original", len(data), baseline, baseline)
+
+        if BinarySinglePassEncoder(packet, "shift-jis").get_data() != data:
+            raise Exception(f"Encoding {name} produced the wrong data!")
+        duration = time_call(
+            lambda: BinarySinglePassEncoder(packet, "shift-jis").get_data(),
+            iterations,
+        )
+        print_result("single pass", len(data), duration, baseline)
+
+    return 0
+
+
+def benchmark_node(scores: int, iterations: int) -> int:
+    for name, build in backend_responses(scores).items():
+        # Measure how much memory the finished tree holds on to.
+        tracemalloc.start()
+        response = build()
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        nodes = 0
+        remaining = [response]
+        while remaining:
+            node = remaining.pop()
+            nodes += 1
+            remaining.extend(node.children)
+
+        data = BinaryEncoding().encode(response, encoding="shift-jis")
+        print(
+            f"Response {name}, {nodes} nodes using {memory // 1024}KB, encoded to {len(data)} bytes:"
+        )
+
+        duration = time_call(build, iterations)
+        print_result("build", len(data), duration, duration)
+        duration = time_call(
+            lambda: BinaryEncoding().encode(response, encoding="shift-jis"), iterations
+        )
+        print_result("encode", len(data), duration, duration)
+        duration = time_call(lambda: BinaryEncoding().decode(data), iterations)
+        print_result("decode", len(data), duration, duration)
+
+    return 0
+
+
+def sample_blobs() -> Dict[str, Dict[str, Any]]:
+    """
+    Data blobs shaped like the largest ones that the game backends store, which are
+    IIDX and SDVX profiles and IIDX scores with ghost data.
+    """
+    iidx_profile: Dict[str, Any] = {
+        "name": "PLAYER",
+        "pid": 51,
+        "sp_dan": 15,
+        "dp_dan": -1,
+        "trophy": [0x7FFFFFFFFFFFFFFF - i for i in range(20)],
+        "secret": {f"flg{i}": [-1, -1, 0x3FFFFFFF] for i in range(1, 4)},
+        "qpro_secret": {
+            part: [-1] * 5 for part in ["hair", "head", "face", "body", "hand"]
+        },
+        "event1": {
+            "quiz_control_list": bytes(range(32)),
+            "maps": {
+                str(mapid): {
+                    "progress": mapid * 7,
+                    "boss_damage": [100, 200, 300],
+                    "is_clear": mapid % 2 == 0,
+                }
+                for mapid in range(30)
+            },
+        },
+        "favorites": [
+            {"music": list(range(1000 + i, 1020 + i)), "chart": [i % 3] * 20}
+            for i in range(10)
+        ],
+    }
+    iidx_profile.update({f"setting_{i}": i * 31 for i in range(80)})
+
+    sdvx_profile: Dict[str, Any] = {
+        "name": "PLAYER",
+        "loc": 51,
+        "skill_level": 12,
+        "params": {str(param): [param, 1, 2, 3, 4, 5] for param in range(200)},
+        "courses": [
+            {"course_id": i, "season_id": i % 10, "score": 2000000 + i, "clear_type": 2}
+            for i in range(50)
+        ],
+    }
+    sdvx_profile.update({f"setting_{i}": i * 17 for i in range(60)})
+
+    iidx_score: Dict[str, Any] = {
+        "clear_status": DBConstants.IIDX_CLEAR_STATUS_CLEAR,
+        "miss_count": 12,
+        "ghost": bytes((i * 37) & 0xFF for i in range(2048)),
+        "ghost_gauge": bytes((i * 11) & 0xFF for i in range(512)),
+    }
+
+    return {
+        "IIDX profile": iidx_profile,
+        "SDVX profile": sdvx_profile,
+        "IIDX score": iidx_score,
+    }
+
+
+def benchmark_json(iterations: int) -> int:
+    # The way data blobs were encoded before the codec, which is the baseline that
+    # everything else is compared against and the format that older rows are in.
+    def legacy_default(obj: Any) -> Any:
+        if isinstance(obj, bytes):
+            return ["__bytes__"] + [b for b in obj]
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def legacy_fix(jd: Any) -> Any:
+        if type(jd) == dict:
+            for key in jd:
+                jd[key] = legacy_fix(jd[key])
+            return jd
+        if type(jd) == list:
+            if len(jd) >= 1 and jd[0] == "__bytes__":
+                return bytes(jd[1:])
+            for i in range(len(jd)):
+                jd[i] = legacy_fix(jd[i])
+            return jd
+        return jd
+
+    codecs = {name: Codec(backend) for name, backend in available_backends().items()}
+    for name, blob in sample_blobs().items():
+        legacy = json.dumps(blob, default=legacy_default)
+        print(f"Blob {name}, {len(legacy)} bytes in the old format:")
+
+        baseline = time_call(
+            lambda: json.dumps(blob, default=legacy_default), iterations
+        )
+        print_result("old encode", len(legacy), baseline, baseline)
+        for codecname, codec in codecs.items():
+            duration = time_call(lambda: codec.encode(blob), iterations)
+            print_result(
+                f"{codecname} encode", len(codec.encode(blob)), duration, baseline
+            )
+
+        baseline = time_call(lambda: legacy_fix(json.loads(legacy)), iterations)
+        print_result("old decode", len(legacy), baseline, baseline)
+        for codecname, codec in codecs.items():
+            data = codec.encode(blob)
+            if codec.decode(data) != blob or codec.decode(legacy) != blob:
+                raise Exception(
+                    f"Decoding {name} with {codecname} produced the wrong blob!"
+                )
+            duration = time_call(lambda: codec.decode(data), iterations)
+            print_result(f"{codecname} decode", len(data), duration, baseline)
+            duration = time_call(lambda: codec.decode(legacy), iterations)
+            print_result(
+                f"{codecname} decode old format", len(legacy), duration, baseline
+            )
+
+    return 0
+
+
+def blend_backends() -> Dict[str, Any]:
+    """
+    Every AFP blend implementation that can be used on this system, keyed by name.
+    """
+    backends: Dict[str, Any] = {}
+    for name, module in [
+        ("pure python", "blend"),
+        ("numpy", "blendnumpy"),
+        ("c++", "blendcpp"),
+    ]:
+        try:
+            backends[name] = importlib.import_module(
+                f"bemani.format.afp.blend.{module}"
+            )
+        except ImportError:
+            pass
+    return backends
+
+
+def sample_composites(
+    width: int, height: int
+) -> Dict[str, Callable[[Any], Image.Image]]:
+    """
+    Composites shaped like the ones AFP animations are made of, each of which draws a
+    texture onto a canvas using whichever blend implementation it is handed.
+    """
+    rng = random.Random(0)
+
+    def noise(w: int, h: int) -> Image.Image:
+        pixels = bytearray()
+        for _ in range(w * h):
+            alpha = rng.choice([0, 255, 255, rng.randrange(256)])
+            pixels += bytes([rng.randrange(256) for _ in range(3)] + [alpha])
+        return Image.frombytes("RGBA", (w, h), bytes(pixels))
+
+    canvas = noise(width, height)
+    mask = noise(width, height)
+    texture = noise(width // 4, height // 4)
+
+    # Scaled up and rotated a bit, over the middle of the canvas.
+    angle = 0.3
+    scaled = Matrix.affine(
+        a=2.0 * math.cos(angle),
+        b=2.0 * math.sin(angle),
+        c=-2.0 * math.sin(angle),
+        d=2.0 * math.cos(angle),
+        tx=width / 3,
+        ty=height / 8,
+    )
+    shrunk = Matrix.affine(a=0.75, b=0.0, c=0.0, d=0.75, tx=width / 4, ty=height / 4)
+    tilted = Matrix(
+        a11=math.cos(0.5),
+        a12=0.0,
+        a13=-math.sin(0.5),
+        a21=0.0,
+        a22=1.0,
+        a23=0.0,
+        a31=math.sin(0.5),
+        a32=0.0,
+        a33=math.cos(0.5),
+        a41=width / 4,
+        a42=height / 4,
+        a43=0.0,
+    )
+    clear = Color(0.0, 0.0, 0.0, 0.0)
+    opaque = Color(1.0, 1.0, 1.0, 1.0)
+    unshifted = HSL(0.0, 0.0, 0.0)
+
+    return {
+        "normal": lambda backend: backend.affine_composite(
+            canvas,
+            clear,
+            opaque,
+            unshifted,
+            scaled,
+            None,
+            0,
+            texture,
+            single_threaded=True,
+            aa_mode=AAMode.NONE,
+        ),
+        "normal bilinear": lambda backend: backend.affine_composite(
+            canvas,
+            clear,
+            opaque,
+            unshifted,
+            scaled,
+            None,
+            0,
+            texture,
+            single_threaded=True,
+            aa_mode=AAMode.SSAA_OR_BILINEAR,
+        ),
+        "masked additive ssaa": lambda backend: backend.affine_composite(
+            canvas,
+            clear,
+            opaque,
+            unshifted,
+            shrunk,
+            mask,
+            8,
+            texture,
+            single_threaded=True,
+            aa_mode=AAMode.SSAA_ONLY,
+        ),
+        "colored hsl shift": lambda backend: backend.affine_composite(
+            canvas,
+            Color(0.1, 0.0, 0.05, 0.0),
+            Color(0.9, 1.0, 0.8, 0.75),
+            HSL(0.25, 0.1, -0.1),
+            scaled,
+            None,
+            0,
+            texture,
+            single_threaded=True,
+            aa_mode=AAMode.NONE,
+        ),
+        "perspective ssaa": lambda backend: backend.perspective_composite(
+            canvas,
+            clear,
+            opaque,
+            unshifted,
+            tilted,
+            Point(width / 2, height / 2, -1000.0),
+            1000.0,
+            None,
+            0,
+            texture,
+            single_threaded=True,
+            aa_mode=AAMode.SSAA_ONLY,
+        ),
+    }
+
+
+def benchmark_afp(width: int, height: int, iterations: int) -> int:
+    backends = blend_backends()
+    print(f"AFP blend implementations available: {', '.join(backends)}")
+
+    for name, composite in sample_composites(width, height).items():
+        # Every implementation is compared against the pure python one, which is both
+        # the baseline for speed and the reference for what the output should be.
+        expected = composite(backends["pure python"])
+        print(f"Composite {name} onto a {width}x{height} canvas:")
+
+        baseline = time_call(lambda: composite(backends["pure python"]), iterations)
+        print_result("pure python", width * height * 4, baseline, baseline)
+        for backendname, backend in backends.items():
+            if backendname == "pure python":
+                continue
+
+            duration = time_call(lambda: composite(backend), iterations)
+            print_result(backendname, width * height * 4, duration, baseline)
+
+            # The compiled implementation is known to round a few things differently,
+            # so report how far off each one is instead of giving up.
+            actual = composite(backend).tobytes()
+            differences = [
+                abs(a - b) for a, b in zip(expected.tobytes(), actual) if a != b
+            ]
+            if differences:
+                print(
+                    f"    {len(differences)} channels differ from pure python, by up to {max(differences)}"
+                )
+
+    return 0
+
+
+# Scores seeded by the scores benchmark are attached to this nonexistent IIDX version
+# and to users far above any real user ID, so they can be found and cleaned up again.
+SEED_VERSION = 10000
+SEED_USERS = 1000
+SEED_USERID_BASE = 0x7FFF000000000000
+SEED_BATCH = 10000
+
+
+def seed_scores(engine: Engine, history: int) -> int:
+    """
+    Seed a database with score_history rows and the score rows they would have produced,
+    returning the number of songs that scores were seeded for.
+    """
+    scores = min(history, 1000000)
+    songs = (scores + SEED_USERS - 1) // SEED_USERS
+
+    with engine.begin() as conn:
+        base = conn.execute(text("SELECT MAX(id) AS id FROM music")).fetchone()[0] or 0
+        conn.execute(
+            text(
+                "INSERT INTO music (id, songid, chart, game, version) VALUES (:id, :songid, 0, :game, :version)"
+            ),
+            [
+                {
+                    "id": base + 1 + song,
+                    "songid": song,
+                    "game": GameConstants.IIDX.value,
+                    "version": SEED_VERSION,
+                }
+                for song in range(songs)
+            ],
+        )
+
+    def insert(sql: str, rows: List[Dict[str, Any]]) -> None:
+        with engine.begin() as conn:
+            conn.execute(text(sql), rows)
+
+    score_rows: List[Dict[str, Any]] = []
+    history_rows: List[Dict[str, Any]] = []
+    for i in range(scores):
+        row = {
+            "userid": SEED_USERID_BASE + (i % SEED_USERS),
+            "musicid": base + 1 + (i // SEED_USERS),
+            "points": (i * 7919) % 5000,
+            "timestamp": 1000000000 + i,
+            "lid": i % 50,
+        }
+        score_rows.append(row)
+
+        # Spread the history evenly, with any remainder going to the first scores.
+        for play in range(history // scores + (1 if i < history % scores else 0)):
+            history_rows.append({**row, "timestamp": row["timestamp"] - play})
+            if len(history_rows) >= SEED_BATCH:
+                insert(
+                    "INSERT INTO score_history (userid, musicid, points, timestamp, lid, new_record, data) "
+                    + "VALUES (:userid, :musicid, :points, :timestamp, :lid, 0, '{}')",
+                    history_rows,
+                )
+                history_rows = []
+
+        if len(score_rows) >= SEED_BATCH:
+            insert(
+                "INSERT INTO score (userid, musicid, points, timestamp, `update`, lid, data) "
+                + "VALUES (:userid, :musicid, :points, :timestamp, :timestamp, :lid, '{}')",
+                score_rows,
+            )
+            score_rows = []
+
+    if score_rows:
+        insert(
+            "INSERT INTO score (userid, musicid, points, timestamp, `update`, lid, data) "
+            + "VALUES (:userid, :musicid, :points, :timestamp, :timestamp, :lid, '{}')",
+            score_rows,
+        )
+    if history_rows:
+        insert(
+            "INSERT INTO score_history (userid, musicid, points, timestamp, lid, new_record, data) "
+            + "VALUES (:userid, :musicid, :points, :timestamp, :lid, 0, '{}')",
+            history_rows,
+        )
+    return songs
+
+
+def unseed_scores(engine: Engine) -> None:
+    with engine.begin() as conn:
+        musicids = "SELECT id FROM music WHERE game = :game AND version = :version"
+        params = {"game": GameConstants.IIDX.value, "version": SEED_VERSION}
+        for table in ["score", "score_history"]:
+            conn.execute(
+                text(f"DELETE FROM {table} WHERE musicid IN ({musicids})"), params
+            )
+        conn.execute(
+            text("DELETE FROM music WHERE game = :game AND version = :version"), params
+        )
+
+
+def benchmark_scores(config: Config, sizes: List[int], iterations: int) -> int:
+    if config.database.read_only:
+        print("Cannot seed scores into a read-only database!", file=sys.stderr)
+        return 1
+
+    engine = config.database.engine
+    game = GameConstants.IIDX
+    users = [UserID(SEED_USERID_BASE + i) for i in range(10)]
+
+    # Start from a clean slate in case a previous run was interrupted.
+    unseed_scores(engine)
+    for size in sizes:
+        try:
+            songs = seed_scores(engine, size)
+            data = Data(config)
+            queries: Dict[str, Callable[[], List[Any]]] = {
+                "scores for a chart": lambda: data.local.music.get_all_scores(
+                    game, SEED_VERSION, songid=songs // 2, songchart=0
+                ),
+                "scores for a user": lambda: data.local.music.get_all_scores(
+                    game, SEED_VERSION, userid=users[0]
+                ),
+                "records": lambda: data.local.music.get_all_records(game, SEED_VERSION),
+                "records for 10 users": lambda: data.local.music.get_all_records(
+                    game, SEED_VERSION, userlist=list(users)
+                ),
+            }
+
+            print(f"{size} history rows over {songs} charts:")
+            for name, query in queries.items():
+                rows = len(query())
+                duration = time_call(query, iterations)
+                print(f"  {name:<28} {duration * 1000.0:10.3f}ms {rows:10} rows")
+            data.close()
+        finally:
+            unseed_scores(engine)
+
+    return 0
+
+
+def seed_profiles(engine: Engine, users: int) -> List[UserID]:
+    """
+    Seed a database with users that have IIDX profiles, returning their user IDs. Every
+    other user only has a profile for an older version, so that lookups have to fall
+    back to it.
+    """
+    userids = [UserID(SEED_USERID_BASE + i) for i in range(users)]
+    with engine.begin() as conn:
+        taken = {
+            result[0]
+            for result in conn.execute(
+                text("SELECT extid FROM extid WHERE extid >= 90000000")
+            )
+        }
+        extids = [extid for extid in range(90000000, 100000000) if extid not in taken]
+
+        refids: List[Dict[str, Any]] = []
+        for i, userid in enumerate(userids):
+            versions = [SEED_VERSION] if i % 2 == 0 else [SEED_VERSION - 1]
+            if i % 3 == 0:
+                versions.append(SEED_VERSION - 2)
+            for version in versions:
+                # Real RefIDs are hex, so these can never collide with them.
+                refids.append(
+                    {
+                        "game": GameConstants.IIDX.value,
+                        "version": version,
+                        "refid": f"Z{SEED_VERSION - version}{i:014X}",
+                        "userid": userid,
+                    }
+                )
+
+        conn.execute(
+            text(
+                "INSERT INTO extid (game, extid, userid) VALUES (:game, :extid, :userid)"
+            ),
+            [
+                {"game": GameConstants.IIDX.value, "extid": extids[i], "userid": userid}
+                for i, userid in enumerate(userids)
+            ],
+        )
+        conn.execute(
+            text(
+                "INSERT INTO refid (game, version, refid, userid) VALUES (:game, :version, :refid, :userid)"
+            ),
+            refids,
+        )
+        conn.execute(
+            text("INSERT INTO profile (refid, data) VALUES (:refid, :data)"),
+            [
+                {
+                    "refid": row["refid"],
+                    "data": f'{{"name": "PLAYER{i % 1000}", "area": {i % 47}}}',
+                }
+                for i, row in enumerate(refids)
+            ],
+        )
+    return userids
+
+
+def unseed_profiles(engine: Engine) -> None:
+    with engine.begin() as conn:
+        params = {"userid": SEED_USERID_BASE}
+        conn.execute(
+            text(
+                "DELETE FROM profile WHERE refid IN (SELECT refid FROM refid WHERE userid >= :userid)"
+            ),
+            params,
+        )
+        for table in ["refid", "extid"]:
+            conn.execute(text(f"DELETE FROM {table} WHERE userid >= :userid"), params)
+
+
+def benchmark_profiles(config: Config, sizes: List[int], iterations: int) -> int:
+    if config.database.read_only:
+        print("Cannot seed profiles into a read-only database!", file=sys.stderr)
+        return 1
+
+    engine = config.database.engine
+    game = GameConstants.IIDX
+
+    # Start from a clean slate in case a previous run was interrupted.
+    unseed_profiles(engine)
+    for size in sizes:
+        try:
+            userids = seed_profiles(engine, size)
+            data = Data(config)
+
+            # This is what a ranking request does for every score on a chart.
+            iidx = IIDXRootage(data, config, Mock())
+            iidx.version = SEED_VERSION
+            queries: Dict[str, Callable[[], List[Any]]] = {
+                "one at a time": lambda: [
+                    data.local.user.get_any_profile(game, SEED_VERSION, userid)
+                    for userid in userids
+                ],
+                "bulk": lambda: data.local.user.get_any_profiles(
+                    game, SEED_VERSION, userids
+                ),
+                "bulk from a backend": lambda: iidx.get_any_profiles(userids),
+            }
+
+            print(f"{size} users with scores on a chart:")
+            baseline = None
+            for name, query in queries.items():
+                rows = len(query())
+                duration = time_call(query, iterations)
+                baseline = baseline or duration
+                speedup = baseline / duration if duration > 0.0 else float("inf")
+                print(
+                    f"  {name:<28} {duration * 1000.0:10.3f}ms {rows:10} rows {speedup:8.2f}x"
+                )
+            data.close()
+        finally:
+            unseed_profiles(engine)
+
+    return 0
+
+
+def main() -> int:
+    # Options shared by every benchmark.
+    common_parser = argparse.ArgumentParser(add_help=False)
+    common_parser.add_argument(
+        "-i",
+        "--iterations",
+        help="Number of times to run each benchmark, keeping the best time. Defaults to 5.",
+        type=int,
+        default=5,
+    )
+
+    parser = argparse.ArgumentParser(
+        description="Micro-benchmarks for hot code paths, comparing the available implementations."
+    )
+    subparsers = parser.add_subparsers(help="Benchmark to run", dest="action")
+
+    rc4_parser = subparsers.add_parser(
+        "rc4",
+        help="Benchmark RC4 packet encryption",
+        description="Benchmark the pure python and compiled RC4 engines used to encrypt packets.",
+        parents=[common_parser],
+    )
+    rc4_parser.add_argument(
+        "-s",
+        "--size",
+        help="Payload size in bytes to benchmark. Can be specified multiple times. Defaults to 1KB, 16KB and 64KB.",
+        type=int,
+        action="append",
+    )
+
+    lz77_parser = subparsers.add_parser(
+        "lz77",
+        help="Benchmark LZ77 packet compression and decompression",
+        description="Benchmark the pure python and C++ LZ77 engines used to compress and decompress packets and files.",
+        parents=[common_parser],
+    )
+    lz77_parser.add_argument(
+        "-c",
+        "--corpus",
+        help="File to use as a corpus, or the name of a test fixture when running from a source checkout. Can be specified multiple times. Defaults to all fixtures.",
+        type=str,
+        action="append",
+    )
+
+    subparsers.add_parser(
+        "decode",
+        help="Benchmark binary packet decoding",
+        description="Benchmark the two pass and single pass binary packet decoders.",
+        parents=[common_parser],
+    )
+
+    encode_parser = subparsers.add_parser(
+        "encode",
+        help="Benchmark binary packet encoding",
+        description="Benchmark the original and single pass binary packet encoders.",
+        parents=[common_parser],
+    )
+    encode_parser.add_argument(
+        "-n",
+        "--scores",
+        help="Number of scores a player has when building game responses. Defaults to 5000.",
+        type=int,
+        default=5000,
+    )
+
+    node_parser = subparsers.add_parser(
+        "node",
+        help="Benchmark building and encoding large responses",
+        description="Benchmark the memory used by and time taken to build and encode the largest responses that game backends produce.",
+        parents=[common_parser],
+    )
+    node_parser.add_argument(
+        "-n",
+        "--scores",
+        help="Number of scores a player has when building responses. Defaults to 5000.",
+        type=int,
+        default=5000,
+    )
+
+    subparsers.add_parser(
+        "json",
+        help="Benchmark encoding and decoding data blobs",
+        description="Benchmark the available JSON backends used to store profiles and scores, against the original encoding.",
+        parents=[common_parser],
+    )
+
+    afp_parser = subparsers.add_parser(
+        "afp",
+        help="Benchmark AFP animation compositing",
+        description="Benchmark the available blend implementations used to render AFP animations, checking their output against the pure python implementation.",
+        parents=[common_parser],
+    )
+    afp_parser.add_argument(
+        "--width",
+        help="Width of the canvas to composite onto. Defaults to 256.",
+        type=int,
+        default=256,
+    )
+    afp_parser.add_argument(
+        "--height",
+        help="Height of the canvas to composite onto. Defaults to 192.",
+        type=int,
+        default=192,
+    )
+
+    scores_parser = subparsers.add_parser(
+        "scores",
+        help="Benchmark score and record lookups against a seeded database",
+        description=(
+            "Benchmark looking up scores and records as the score history grows. This seeds "
+            + "and then removes scores for a fake game version, so point it at a scratch database."
+        ),
+        parents=[common_parser],
+    )
+    scores_parser.add_argument(
+        "-c",
+        "--config",
+        help="Core configuration for the database to seed. Defaults to server.yaml",
+        type=str,
+        default="server.yaml",
+    )
+    scores_parser.add_argument(
+        "-s",
+        "--size",
+        help="Number of score history rows to seed. Can be specified multiple times. Defaults to 10K, 100K, 1M and 10M.",
+        type=int,
+        action="append",
+    )
+
+    profiles_parser = subparsers.add_parser(
+        "profiles",
+        help="Benchmark bulk profile lookups against a seeded database",
+        description=(
+            "Benchmark looking up the profiles of everyone with a score on a chart, as done when "
+            + "ranking scores. This seeds and then removes users, so point it at a scratch database."
+        ),
+        parents=[common_parser],
+    )
+    profiles_parser.add_argument(
+        "-c",
+        "--config",
+        help="Core configuration for the database to seed. Defaults to server.yaml",
+        type=str,
+        default="server.yaml",
+    )
+    profiles_parser.add_argument(
+        "-n",
+        "--users",
+        help="Number of users to seed. Can be specified multiple times. Defaults to 100, 1K and 5K.",
+        type=int,
+        action="append",
+    )
+
+    args = parser.parse_args()
+
+    if args.action == "rc4":
+        return benchmark_rc4(args.size or [1024, 16 * 1024, 64 * 1024], args.iterations)
+    elif args.action == "lz77":
+        return benchmark_lz77(
+            args.corpus or ["rawdata", "declaration.txt", "lorem.txt"],
+            args.iterations,
+        )
+    elif args.action == "decode":
+        return benchmark_binary_decode(args.iterations)
+    elif args.action == "encode":
+        return benchmark_binary_encode(args.scores, args.iterations)
+    elif args.action == "node":
+        return benchmark_node(args.scores, args.iterations)
+    elif args.action == "json":
+        return benchmark_json(args.iterations)
+    elif args.action == "afp":
+        return benchmark_afp(args.width, args.height, args.iterations)
+    elif args.action == "scores":
+        config = Config()
+        load_config(args.config, config)
+        return benchmark_scores(
+            config,
+            args.size or [10000, 100000, 1000000, 10000000],
+            args.iterations,
+        )
+    elif args.action == "profiles":
+        config = Config()
+        load_config(args.config, config)
+        return benchmark_profiles(
+            config, args.users or [100, 1000, 5000], args.iterations
+        )
+    else:
+        parser.print_help()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,7 +10,7 @@ from bemani.backend.sdvx import SoundVoltexFactory
 from bemani.backend.reflec import ReflecBeatFactory
 from bemani.backend.museca import MusecaFactory
 from bemani.backend.mga import MetalGearArcadeFactory
-from bemani.common import GameConstants
+from bemani.common import GameConstants, Parallel
 from bemani.data import Config, Data
 
 
@@ -25,6 +25,8 @@ def load_config(filename: str, config: Config) -> None:
             supported_series.add(series)
     config["support"] = supported_series
 
+    Parallel.configure(config.parallel_workers)
+
 
 def register_games(config: Config) -> None:
     if GameConstants.POPN_MUSIC in config.support:
@@ -1,8 +1,12 @@
 import argparse
 import getpass
 import sys
-from typing import Optional
+from typing import Callable, Dict, Optional
 
+from bemani.backend.iidx import IIDXBase
+from bemani.backend.museca import MusecaBase
+from bemani.backend.sdvx import SoundVoltexBase
+from bemani.common import GameConstants, ValidatedDict
 from bemani.data import Config, Data, DBCreateException
 from bemani.utils.config import load_config
 
@@ -68,13 +72,27 @@ def remove_admin(config: Config, username: Optional[str]) -> None:
     print(f"User {username} lost admin rights.")
 
 
+def backfill_clear_rates(config: Config) -> None:
+    # Games which keep running clear rate counters when saving attempts.
+    counters: Dict[GameConstants, Callable[[int, ValidatedDict], Dict[str, int]]] = {
+        GameConstants.IIDX: IIDXBase.attempt_counters,
+        GameConstants.MUSECA: MusecaBase.attempt_counters,
+        GameConstants.SDVX: SoundVoltexBase.attempt_counters,
+    }
+    data = Data(config)
+    for game, attempt_counters in counters.items():
+        attempts = data.local.music.rebuild_attempt_counters(game, attempt_counters)
+        print(f"Rebuilt clear rates for {game.value} from {attempts} attempts.")
+    data.close()
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="A utility for working with databases created with this codebase."
     )
     parser.add_argument(
         "operation",
-        help="Operation to perform, options include 'create', 'generate', 'upgrade', 'change-password', 'add-admin' and 'remove-admin'.",
+        help="Operation to perform, options include 'create', 'generate', 'upgrade', 'change-password', 'add-admin', 'remove-admin' and 'backfill-clear-rates'.",
         type=str,
     )
     parser.add_argument(
@@ -120,6 +138,8 @@ def main() -> None:
             remove_admin(config, args.username)
         elif args.operation == "change-password":
             change_password(config, args.username)
+        elif args.operation == "backfill-clear-rates":
+            backfill_clear_rates(config)
         else:
             raise Exception(f"Unknown operation '{args.operation}'")
     except DBCreateException as e:
@@ -1,4 +1,5 @@
 import argparse
+import traceback
 
 from bemani.common import GameConstants
 from bemani.frontend import app, config  # noqa: F401
@@ -6,6 +7,7 @@ from bemani.frontend.account import account_pages
 from bemani.frontend.admin import admin_pages
 from bemani.frontend.arcade import arcade_pages
 from bemani.frontend.home import home_pages
+from bemani.frontend.jsx import build
 from bemani.frontend.iidx import iidx_pages
 from bemani.frontend.popn import popn_pages
 from bemani.frontend.bishi import bishi_pages
@@ -54,6 +56,15 @@ def register_games() -> None:
     base_register_games(config)
 
 
+def build_jsx() -> None:
+    global config
+    try:
+        build(config.jsx_directory)
+    except Exception:
+        # JSX files can still be transformed on the fly, so don't refuse to start.
+        print(traceback.format_exc())
+
+
 def load_config(filename: str) -> None:
     global config
     base_load_config(filename, config)
@@ -1,9 +1,7 @@
 import argparse
 import os
-from react.jsx import JSXTransformer  # type: ignore
-
-from bemani.frontend.app import polyfill_fragments
 
+from bemani.frontend.jsx import build
 
 SCRIPT_PATH: str = os.path.dirname(os.path.realpath(__file__))
 
@@ -19,6 +17,13 @@ def main() -> None:
         type=str,
         default="./build/jsx",
     )
+    parser.add_argument(
+        "-p",
+        "--processes",
+        help="Number of processes to build with. Defaults to one per CPU.",
+        type=int,
+        default=None,
+    )
     args = parser.parse_args()
 
     outdir = os.path.abspath(args.output_directory)
@@ -26,39 +31,8 @@ def main() -> None:
     os.makedirs(outdir, exist_ok=True)
 
     basedir = os.path.abspath(os.path.join(SCRIPT_PATH, "../frontend/static"))
-    if not basedir.endswith("/"):
-        basedir += "/"
-
-    dirs = [basedir]
-    files = []
-    while dirs:
-        curdir = dirs.pop()
-        for dirpath, dnames, fnames in os.walk(curdir):
-            for fname in fnames:
-                if fname.endswith(".react.js"):
-                    fullpath = os.path.join(dirpath, fname)
-                    if fullpath.startswith(basedir):
-                        files.append(fullpath[len(basedir) :])
-            for dname in dnames:
-                if dname == "." or dname == "..":
-                    continue
-                dirs.append(os.path.join(dirpath, dname))
-
-    transformer = JSXTransformer()
-    for fname in sorted(list(set(files))):
-        print(f"Building {fname}...")
-        infile = os.path.join(basedir, fname)
-        outfile = os.path.join(outdir, fname)
-        os.makedirs(os.path.dirname(outfile), exist_ok=True)
-
-        with open(infile, "rb") as f:
-            jsx = transformer.transform_string(
-                polyfill_fragments(f.read().decode("utf-8"))
-            ).encode("utf-8")
-
-        print(f"Writing {outfile}...")
-        with open(outfile, "wb") as f:
-            f.write(jsx)
+    built = build(outdir, basedir=basedir, processes=args.processes, verbose=True)
+    print(f"Wrote manifest for {len(built)} files.")
 
 
 if __name__ == "__main__":
@@ -92,11 +92,11 @@ class ImportBase:
         api = ReadAPI(server, token)
         user = UserData(self.__config, self.__session)
         music = MusicData(self.__config, self.__session)
-        return GlobalMusicData(api, user, music)
+        return GlobalMusicData(self.__config, api, user, music)
 
     def remote_game(self, server: str, token: str) -> GlobalGameData:
         api = ReadAPI(server, token)
-        return GlobalGameData(api)
+        return GlobalGameData(self.__config, api)
 
     def get_next_music_id(self) -> int:
         cursor = self.execute("SELECT MAX(id) AS next_id FROM `music`")
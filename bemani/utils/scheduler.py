@@ -62,6 +62,16 @@ def run_scheduled_work(config: Config) -> None:
     for factory in enabled_factories:
         factory.run_scheduled_work(data, config)
 
+    # Now, pull in anything that changed on remote servers so that lookups never
+    # have to talk to them, and throw away data from servers that were removed
+    data.local.music.destroy_remote_data(
+        [server.id for server in data.local.api.get_all_servers()]
+    )
+    for factory in enabled_factories:
+        for game, version, _ in factory.all_games():
+            data.remote.music.sync_records(game, version)
+            data.remote.music.sync_statistics(game, version)
+
     # Now, warm the caches for the frontend
     for cache in enabled_caches:
         cache.preload(data, config)
@@ -73,6 +83,12 @@ def run_scheduled_work(config: Config) -> None:
         oldest_event = Time.now() - keep_duration
         data.local.network.delete_events(oldest_event)
 
+    # Now, possibly move old attempts out of the way of everyday lookups. This only does
+    # a bounded amount of work each run, so a large backlog is worked through over several.
+    archive_duration = config.attempt_archive_duration
+    if archive_duration:
+        data.local.music.archive_attempts(Time.now() - archive_duration, chunks=100)
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
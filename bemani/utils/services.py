@@ -1,10 +1,14 @@
 import argparse
+import threading
 import traceback
-from flask import Flask, request, redirect, Response, make_response
+from flask import Flask, request, redirect, Response, jsonify, make_response
+from typing import Optional
 
 from bemani.protocol import EAmuseProtocol
 from bemani.backend import Dispatch, UnrecognizedPCBIDException
+from bemani.common import Parallel
 from bemani.data import Config, Data
+from bemani.data.api.federation import FederationPool
 from bemani.utils.config import (
     load_config as base_load_config,
     register_games as base_register_games,
@@ -13,6 +17,50 @@ from bemani.utils.config import (
 
 app = Flask(__name__)
 config = Config()
+shared_data: Optional[Data] = None
+shared_data_lock = threading.Lock()
+
+
+def get_data(requestconfig: Config) -> Data:
+    """
+    Return a data provider for a single request. When the database is configured as
+    pooled, a single provider is lazily created per process and shared between requests,
+    otherwise a new provider is created for every request.
+    """
+    global config
+    global shared_data
+
+    if not config.database.pooled:
+        return Data(requestconfig)
+
+    if shared_data is None:
+        with shared_data_lock:
+            if shared_data is None:
+                shared_data = Data(config)
+    return shared_data
+
+
+def release_data(dataprovider: Data) -> None:
+    global config
+    if config.database.pooled:
+        # Give the connection back to the pool but keep the provider around.
+        dataprovider.release()
+    else:
+        dataprovider.close()
+
+
+@app.route("/health", methods=["GET"])
+def receive_health() -> Response:
+    global config
+    return jsonify(
+        {
+            "status": "ok",
+            "pooled": config.database.pooled,
+            "pool": Data.pool_stats(config),
+            "federation": FederationPool.shared(config).stats(),
+            "parallel": Parallel.stats(),
+        }
+    )
 
 
 @app.route("/", defaults={"path": ""}, methods=["GET"])
@@ -51,12 +99,12 @@ def receive_request(path: str) -> Response:
 
     # Create and format config
     global config
-    requestconfig = config.clone()
+    requestconfig = config.overlay()
     requestconfig["client"] = {
         "address": remote_address or request.remote_addr,
     }
 
-    dataprovider = Data(requestconfig)
+    dataprovider = get_data(requestconfig)
     try:
         dispatch = Dispatch(requestconfig, dataprovider, config["verbose"])
         resp = dispatch.handle(req)
@@ -112,7 +160,7 @@ def receive_request(path: str) -> Response:
         )
         return Response("Crash when handling packet!", 500)
     finally:
-        dataprovider.close()
+        release_data(dataprovider)
 
 
 def register_games() -> None:
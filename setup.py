@@ -124,6 +124,14 @@ def extensions():
                             "bemani/protocol/protocol.py",
                         ]
                     ),
+                    # Every encrypted packet is decrypted and its response encrypted using
+                    # this, so it is worth it to compile the pure python fallback as well.
+                    Extension(
+                        "bemani.protocol.rc4",
+                        [
+                            "bemani/protocol/rc4.py",
+                        ]
+                    ),
                     # This is used to implement a convenient way of parsing/creating binary
                     # data and it is memory-safe accessses of bytes so it is necessarily
                     # a bottleneck.